@@ -11,12 +11,14 @@ from django.urls import reverse_lazy
 # 导入所有需要的模型
 from apps.users.models import CustomUser
 from apps.orders.models import Order, OrderDetail
+from apps.orders.holds import cancel_orders
 from apps.scenic.models import ScenicSpot, ScenicCategory
 from apps.routes.models import Route, RouteCategory
 from apps.hotels.models import Hotel
 from apps.news.models import News, NewsCategory
 from apps.comments.models import Comment
 from apps.foods.models import Food, FoodCategory
+from apps.index.search import matching_ids
 
 # 导入表单
 from .forms import ScenicSpotForm, RouteForm, HotelForm, NewsForm, UserForm, OrderStatusForm, FoodForm
@@ -29,6 +31,12 @@ class StaffRequiredMixin(UserPassesTestMixin):
         return self.request.user.is_staff
 
 
+def filter_by_search(query, doc_type, search):
+    """按全文索引过滤后台列表（保持列表原有的排序）；搜索词中没有可检索的文字时返回空列表"""
+    ids = matching_ids(doc_type, search)
+    return query.filter(pk__in=ids) if ids is not None else query.none()
+
+
 class AdminIndexView(LoginRequiredMixin, StaffRequiredMixin, TemplateView):
     template_name = "admin_panel/dashboard.html"
     login_url = '/users/login/'
@@ -84,11 +92,7 @@ class ScenicListView(LoginRequiredMixin, StaffRequiredMixin, TemplateView):
         # 搜索过滤
         search = self.request.GET.get('search', '')
         if search:
-            query = query.filter(
-                Q(name__icontains=search) |
-                Q(address__icontains=search) |
-                Q(description__icontains=search)
-            )
+            query = filter_by_search(query, 'scenic', search)
 
         category_id = self.request.GET.get('category', '')
         if category_id:
@@ -127,10 +131,7 @@ class RoutesListView(LoginRequiredMixin, StaffRequiredMixin, TemplateView):
         # 搜索过滤
         search = self.request.GET.get('search', '')
         if search:
-            query = query.filter(
-                Q(name__icontains=search) |
-                Q(itinerary_summary__icontains=search)
-            )
+            query = filter_by_search(query, 'route', search)
 
         category_id = self.request.GET.get('category', '')
         if category_id:
@@ -169,11 +170,7 @@ class HotelsListView(LoginRequiredMixin, StaffRequiredMixin, TemplateView):
         # 搜索过滤
         search = self.request.GET.get('search', '')
         if search:
-            query = query.filter(
-                Q(name__icontains=search) |
-                Q(address__icontains=search) |
-                Q(brief__icontains=search)
-            )
+            query = filter_by_search(query, 'hotel', search)
 
         # 分页
         try:
@@ -206,11 +203,7 @@ class NewsListView(LoginRequiredMixin, StaffRequiredMixin, TemplateView):
         # 搜索过滤
         search = self.request.GET.get('search', '')
         if search:
-            query = query.filter(
-                Q(title__icontains=search) |
-                Q(abstract__icontains=search) |
-                Q(content__icontains=search)
-            )
+            query = filter_by_search(query, 'news', search)
 
         category_id = self.request.GET.get('category', '')
         if category_id:
@@ -636,6 +629,12 @@ class OrderUpdateStatusView(LoginRequiredMixin, StaffRequiredMixin, UpdateView):
         messages.success(self.request, '订单状态更新成功！')
         return reverse_lazy('admin_panel:orders_list')
 
+    def form_valid(self, form):
+        # 待支付/已支付订单改为已取消时，归还占用的名额和房间
+        if form.cleaned_data['status'] == 'cancelled' and form.initial.get('status') in ('pending', 'paid'):
+            cancel_orders([self.object.pk], statuses=('pending', 'paid'))
+        return super().form_valid(form)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = '更新订单状态'
@@ -723,11 +722,7 @@ class FoodsListView(LoginRequiredMixin, StaffRequiredMixin, TemplateView):
         # 搜索过滤
         search = self.request.GET.get('search', '')
         if search:
-            query = query.filter(
-                Q(name__icontains=search) |
-                Q(description__icontains=search) |
-                Q(tags__icontains=search)
-            )
+            query = filter_by_search(query, 'food', search)
 
         category_id = self.request.GET.get('category', '')
         if category_id:
@@ -1,12 +1,20 @@
 from django.contrib import admin
-from .models import AIQuery
+from .models import AIPlanResult, AIQuery
 
 
 @admin.register(AIQuery)
 class AIQueryAdmin(admin.ModelAdmin):
-    list_display = ['id', 'user', 'query_type', 'user_input', 'created_at', 'is_favorite']
+    list_display = ['id', 'user', 'query_type', 'user_input', 'plan_result', 'created_at', 'is_favorite']
     list_filter = ['query_type', 'is_favorite', 'created_at']
     search_fields = ['user_input', 'user__username']
     readonly_fields = ['created_at']
+    raw_id_fields = ['plan_result']
     date_hierarchy = 'created_at'
 
+
+@admin.register(AIPlanResult)
+class AIPlanResultAdmin(admin.ModelAdmin):
+    list_display = ['id', 'query_type', 'spot_ids', 'user_input', 'is_valid', 'created_at']
+    list_filter = ['query_type', 'is_valid', 'created_at']
+    search_fields = ['spot_ids', 'user_input']
+    readonly_fields = ['cache_key', 'created_at']
@@ -1,121 +1,66 @@
 import json
-from django.http import JsonResponse
+import logging
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
-from apps.scenic.models import ScenicSpot
-from apps.routes.models import Route
+from apps.index import hours
+from . import optimizer, plan_cache, providers, recommender, resolver
 from .models import AIQuery
 
+logger = logging.getLogger(__name__)
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class AIPlanAPIView(View):
     """
     AI助手规划API
     根据用户输入的景点，生成路线规划、交通规划、旅游策略
+    异步视图：ASGI 下等待大模型应答时不占用线程，查库、写库放到线程中执行（sync_to_async）
     """
+    # 一日游的上午、下午、傍晚游览时段（分钟），按景点当天的开放时间调整
+    ONE_DAY_SLOTS = ((540, 720), (810, 1020), (1020, 1110))
     
-    def post(self, request):
+    async def post(self, request):
         try:
             data = json.loads(request.body)
-            scenic_spot_names = data.get('scenic_spots', [])  # 景点名称列表
-            query_type = data.get('query_type', 'general')  # route, transport, strategy, general
-            user_input = data.get('user_input', '')  # 用户额外输入
-            
-            if not scenic_spot_names:
+            try:
+                scenic_spot_names, query_type, user_input, scenic_spots, warning_message = (
+                    await sync_to_async(self._resolve)(data)
+                )
+            except ValueError as e:
+                message, status = e.args
                 return JsonResponse({
                     'status': 'error',
-                    'message': '请至少输入一个景点'
-                }, status=400)
-            
-            # 查询景点信息
-            scenic_spots = []
-            not_found_spots = []  # 记录未找到的景点
+                    'message': message
+                }, status=status)
             
-            for name in scenic_spot_names:
-                name = name.strip()  # 去除首尾空格
-                if not name:
-                    continue
-                    
-                # 尝试多种匹配方式
-                spot = None
-                # 1. 精确匹配
-                spot = ScenicSpot.objects.filter(name=name).first()
-                # 2. 包含匹配
-                if not spot:
-                    spot = ScenicSpot.objects.filter(name__icontains=name).first()
-                # 3. 如果还是找不到，尝试去掉常见后缀后匹配
-                if not spot:
-                    # 去掉可能的"景区"、"公园"等后缀
-                    name_variants = [
-                        name.replace('景区', '').replace('公园', '').replace('景点', '').strip(),
-                        name.replace('旅游区', '').replace('风景区', '').strip(),
-                    ]
-                    for variant in name_variants:
-                        if variant and variant != name:
-                            spot = ScenicSpot.objects.filter(name__icontains=variant).first()
-                            if spot:
-                                break
+            # 同样的景点组合、规划类型和需求直接使用缓存的规划（见 plan_cache.py）
+            spot_ids = [spot['id'] for spot in scenic_spots]
+            cache_key = plan_cache.plan_key(spot_ids, query_type, user_input)
+            cached = await sync_to_async(plan_cache.plan_cache.get)(cache_key)
+            cache_hit = cached is not None
+            if not cache_hit:
+                itinerary = self._itinerary(scenic_spots, user_input)
                 
-                if spot:
-                    scenic_spots.append({
-                        'id': spot.id,
-                        'name': spot.name,
-                        'address': spot.address,
-                        'ticket_price': str(spot.ticket_price),
-                        'open_time': spot.open_time,
-                        'description': spot.description[:200],
-                        'latitude': float(spot.latitude) if spot.latitude else None,
-                        'longitude': float(spot.longitude) if spot.longitude else None,
-                    })
-                else:
-                    not_found_spots.append(name)
-            
-            # 如果所有景点都没找到，返回错误
-            if not scenic_spots:
-                error_msg = '未找到匹配的景点，请检查景点名称。'
-                if not_found_spots:
-                    error_msg += f'\n未找到的景点：{", ".join(not_found_spots)}'
-                return JsonResponse({
-                    'status': 'error',
-                    'message': error_msg
-                }, status=404)
-            
-            # 如果部分景点没找到，在响应中提示
-            warning_message = None
-            if not_found_spots:
-                warning_message = f'以下景点未找到：{", ".join(not_found_spots)}，将基于已找到的景点生成规划。'
-            
-            # 生成AI规划（这里使用规则引擎，后续可以替换为真实AI）
-            plan_result = self._generate_plan(scenic_spots, query_type, user_input)
-            
-            # 保存查询记录（如果用户已登录）
-            ai_query = None
-            if request.user.is_authenticated:
-                ai_query = AIQuery.objects.create(
-                    user=request.user,
-                    query_type=query_type,
-                    scenic_spots=json.dumps(scenic_spots, ensure_ascii=False),
-                    user_input=user_input or f"规划{', '.join(scenic_spot_names)}的旅游",
-                    route_plan=plan_result.get('route_plan', ''),
-                    transport_plan=plan_result.get('transport_plan', ''),
-                    strategy_plan=plan_result.get('strategy_plan', ''),
-                    full_response=json.dumps(plan_result, ensure_ascii=False)
+                # 生成规划（开启 USE_AI_API 时调用大模型，否则或失败时使用规则引擎）
+                plan_result = await self._generate_plan(
+                    itinerary.spots, query_type, user_input, itinerary, keep_alive=isinstance(request, ASGIRequest)
+                )
+                cached = await sync_to_async(plan_cache.plan_cache.put)(
+                    cache_key, spot_ids, query_type, user_input, plan_result
                 )
             
-            response_data = {
-                'scenic_spots': scenic_spots,
-                'plan': plan_result,
-                'query_id': ai_query.id if ai_query else None,
-                'is_favorite': ai_query.is_favorite if ai_query else False
-            }
-            
-            # 如果有警告信息，添加到响应中
-            if warning_message:
-                response_data['warning'] = warning_message
-            
+            user = await request.auser()
+            response_data = await sync_to_async(self._response_data)(
+                user, scenic_spot_names, query_type, user_input, scenic_spots, cached, cache_hit, warning_message
+            )
             return JsonResponse({
                 'status': 'success',
                 'data': response_data
@@ -132,68 +77,264 @@ class AIPlanAPIView(View):
                 'message': f'服务器错误: {str(e)}'
             }, status=500)
     
-    def _generate_plan(self, scenic_spots, query_type, user_input):
+    def _resolve(self, data):
+        """
+        读取请求参数并查询景点
+        返回 (景点名称列表, 规划类型, 用户需求, 景点信息列表, 警告信息)；
+        景点和需求都没有输入、或者景点全部没找到且按描述也推荐不出景点时抛出 ValueError(错误信息, HTTP状态码)
+        """
+        scenic_spot_names = data.get('scenic_spots', [])  # 景点名称列表
+        query_type = data.get('query_type', 'general')  # route, transport, strategy, general
+        user_input = data.get('user_input', '')  # 用户额外输入
+        
+        if not scenic_spot_names and not user_input:
+            raise ValueError('请至少输入一个景点', 400)
+        
+        # 查询景点信息：一次解析整个列表，常见情况下不访问数据库（见 resolver.py）
+        scenic_spots, not_found_spots = resolver.scenic_resolver.resolve(scenic_spot_names)
+        
+        # 景点名称都没找到（或者只输入了需求，如"想看荷花和古建筑"）时按描述推荐景点（见 recommender.py）
+        if not scenic_spots:
+            recommended = recommender.spot_recommender.recommend(' '.join([*not_found_spots, user_input]))
+            if recommended:
+                scenic_spots = [item.spot for item in recommended]
+                names = '、'.join(spot['name'] for spot in scenic_spots)
+                warning_message = f'根据您的描述推荐了以下景点：{names}。'
+                if not_found_spots:
+                    warning_message = f'以下景点未找到：{", ".join(not_found_spots)}，' + warning_message
+                return scenic_spot_names, query_type, user_input, scenic_spots, warning_message
+        
+        # 如果所有景点都没找到，返回错误
+        if not scenic_spots:
+            error_msg = '未找到匹配的景点，请检查景点名称。'
+            if not_found_spots:
+                error_msg += f'\n未找到的景点：{", ".join(not_found_spots)}'
+            raise ValueError(error_msg, 404)
+        
+        # 如果部分景点没找到，在响应中提示
+        warning_message = None
+        if not_found_spots:
+            warning_message = f'以下景点未找到：{", ".join(not_found_spots)}，将基于已找到的景点生成规划。'
+        return scenic_spot_names, query_type, user_input, scenic_spots, warning_message
+    
+    def _itinerary(self, scenic_spots, user_input):
+        """
+        按景点之间的距离优化游览顺序，多日行程按天分组（见 optimizer.py）；
+        先按ID排序，规划结果只取决于景点组合，与输入顺序无关
+        """
+        scenic_spots.sort(key=lambda spot: spot['id'])
+        days = optimizer.parse_days(user_input)
+        itinerary = optimizer.plan_itinerary(scenic_spots, days)
+        # 一日游：正反两个方向路程相同，选与景点开放时间冲突少的方向
+        if days == 1 and len(itinerary.spots) > 1 and all(itinerary.legs):
+            reverse = itinerary._replace(spots=itinerary.spots[::-1], days=[itinerary.spots[::-1]],
+                                         legs=itinerary.legs[::-1])
+            day = self._trip_day(user_input)
+            if self._slot_conflicts(reverse.spots, day) < self._slot_conflicts(itinerary.spots, day):
+                itinerary = reverse
+        return itinerary
+    
+    def _response_data(self, user, scenic_spot_names, query_type, user_input, scenic_spots, cached,
+                       cache_hit, warning_message):
+        """保存查询记录（如果用户已登录）并组装响应数据"""
+        plan_result = cached.plan
+        scenic_spots = self._in_plan_order(scenic_spots, plan_result)
+        
+        # 规划内容引用缓存的结果，不再另存一份
+        ai_query = None
+        if user.is_authenticated:
+            ai_query = AIQuery.objects.create(
+                user=user,
+                query_type=query_type,
+                scenic_spots=json.dumps(scenic_spots, ensure_ascii=False),
+                user_input=user_input or f"规划{', '.join(scenic_spot_names)}的旅游",
+                plan_result_id=cached.result_id,
+            )
+        
+        response_data = {
+            'scenic_spots': scenic_spots,
+            'plan': plan_result,
+            'query_id': ai_query.id if ai_query else None,
+            'is_favorite': ai_query.is_favorite if ai_query else False,
+            'cached': cache_hit,
+        }
+        
+        # 如果有警告信息，添加到响应中
+        if warning_message:
+            response_data['warning'] = warning_message
+        return response_data
+    
+    def _in_plan_order(self, scenic_spots, plan_result):
+        """按规划中的游览顺序排列景点信息（命中缓存时规划是按同一组景点生成的）"""
+        order = plan_result.get('itinerary', {}).get('order')
+        if not order:
+            return scenic_spots
+        remaining = list(scenic_spots)
+        ordered = []
+        for spot_id in order:
+            for i, spot in enumerate(remaining):
+                if spot['id'] == spot_id:
+                    ordered.append(remaining.pop(i))
+                    break
+        return ordered + remaining
+    
+    async def _generate_plan(self, scenic_spots, query_type, user_input, itinerary=None, keep_alive=True):
         """
         生成旅游规划
-        这里使用规则引擎生成基础规划，后续可以替换为真实AI服务
+        开启 USE_AI_API 时调用 AI_PROVIDER 的大模型（见 providers.py），未开启、熔断或调用失败时使用规则引擎
+        itinerary 为按距离优化后的行程（见 optimizer.py），不传时按 scenic_spots 现算；
+        keep_alive 为 False 时（WSGI 下）调用结束即关闭与服务商的连接
         """
+        if itinerary is None:
+            itinerary = optimizer.plan_itinerary(scenic_spots, optimizer.parse_days(user_input))
+        if getattr(settings, 'USE_AI_API', False):
+            messages = providers.build_messages(itinerary.spots, query_type, user_input, itinerary)
+            try:
+                text = await providers.async_registry.get(keep_alive=keep_alive).chat(messages)
+            except providers.ProviderError as e:
+                logger.warning(f"AI服务调用失败，使用规则引擎: {e}")
+            else:
+                return self._ai_plan(text, query_type, user_input, itinerary)
+        return self._rule_plan(query_type, user_input, itinerary)
+    
+    def _ai_plan(self, text, query_type, user_input, itinerary):
+        """大模型的回答按标题拆分；要求的部分模型没有给出时用规则引擎补上"""
+        result = self._rule_plan(query_type, user_input, itinerary)
+        sections = providers.split_sections(text)
+        for key in providers.QUERY_SECTIONS.get(query_type, providers.QUERY_SECTIONS['general']):
+            if sections[key]:
+                result[key] = sections[key]
+        result['source'] = 'ai'
+        return result
+    
+    def _rule_plan(self, query_type, user_input, itinerary):
+        """规则引擎生成规划"""
         result = {
             'route_plan': '',
             'transport_plan': '',
-            'strategy_plan': ''
+            'strategy_plan': '',
+            'itinerary': optimizer.serialize_itinerary(itinerary),
+            'source': 'rules',
         }
         
         # 路线规划
         if query_type in ['route', 'general']:
-            route_plan = self._generate_route_plan(scenic_spots, user_input)
+            route_plan = self._generate_route_plan(itinerary.spots, user_input, itinerary)
             result['route_plan'] = route_plan
         
         # 交通规划
         if query_type in ['transport', 'general']:
-            transport_plan = self._generate_transport_plan(scenic_spots)
+            transport_plan = self._generate_transport_plan(itinerary.spots)
             result['transport_plan'] = transport_plan
         
         # 旅游策略
         if query_type in ['strategy', 'general']:
-            strategy_plan = self._generate_strategy_plan(scenic_spots, user_input)
+            strategy_plan = self._generate_strategy_plan(itinerary.spots, user_input)
             result['strategy_plan'] = strategy_plan
         
         return result
     
-    def _generate_route_plan(self, scenic_spots, user_input=''):
-        """生成路线规划"""
-        # 解析用户输入，识别时间需求
-        user_input_lower = (user_input or '').lower()
-        days_requested = None
-        
-        # 识别天数需求
-        if '一天' in user_input_lower or '1天' in user_input_lower or '一日' in user_input_lower or '一天完成' in user_input_lower:
-            days_requested = 1
-        elif '两天' in user_input_lower or '2天' in user_input_lower or '二日' in user_input_lower:
-            days_requested = 2
-        elif '三天' in user_input_lower or '3天' in user_input_lower or '三日' in user_input_lower:
-            days_requested = 3
+    def _leg_text(self, leg, next_spot):
+        """到下一站的距离和车程"""
+        if leg is None:
+            return ''
+        return f"- **前往{next_spot['name']}**：约{leg.distance_km}公里，车程约{leg.minutes}分钟\n"
+    
+    def _trip_day(self, user_input, offset=0):
+        """
+        行程的第 offset + 1 天：返回 (日期 或 月*100+日, 星期)
+        需求中写明"5月1日""周六"时按该日期 / 星期，否则按今天的季节、不考虑闭馆日（星期为 None）
+        """
+        today = timezone.localdate()
+        travel_date, weekday = hours.parse_travel_day(user_input, today)
+        if travel_date:
+            day = travel_date + timedelta(days=offset)
+            return day, day.weekday()
+        day = today + timedelta(days=offset)
+        return day.month * 100 + day.day, None if weekday is None else (weekday + offset) % 7
+    
+    def _day_name(self, day):
+        date_or_mmdd, weekday = day
+        if hasattr(date_or_mmdd, 'month'):
+            return f"{date_or_mmdd.month}月{date_or_mmdd.day}日（{hours.weekday_name(weekday)}）"
+        return hours.weekday_name(weekday) if weekday is not None else '当天'
+    
+    def _visit_slot(self, spot, start, end, day):
+        """
+        把 start-end（分钟）的游览时段限制在景点当天的开放时间内（开放时间的解析见 apps/index/hours.py）
+        返回 (时段文字, 提示)；开放时间无法识别时按原时段
+        """
+        slot = f"{hours.format_minutes(start)}-{hours.format_minutes(end)}"
+        intervals = hours.parse_open_time(spot['open_time'])
+        if intervals is None:
+            return slot, ''
+        windows = hours.hours_on(intervals, *day)
+        if not windows:
+            return slot, f"- ⚠️ {spot['name']}{self._day_name(day)}不开放，建议调整日期\n"
+        visible = [(max(start, opens), min(end, closes)) for opens, closes in windows]
+        visible = [(opens, closes) for opens, closes in visible if opens < closes]
+        if not visible:
+            open_text = '、'.join(f"{hours.format_minutes(o)}-{hours.format_minutes(c)}" for o, c in windows)
+            return slot, f"- ⚠️ {spot['name']}开放时间为{open_text}，该时段已闭园，建议调整游览顺序\n"
+        return f"{hours.format_minutes(visible[0][0])}-{hours.format_minutes(visible[-1][1])}", ''
+    
+    def _slot_conflicts(self, scenic_spots, day):
+        """一日游按顺序安排在上午、下午、傍晚时，有多少个景点不在开放时间内"""
+        return sum(
+            bool(self._visit_slot(spot, *self.ONE_DAY_SLOTS[min(i, 2)], day)[1])
+            for i, spot in enumerate(scenic_spots)
+        )
+    
+    def _hours_text(self, spot, day):
+        """多日行程中景点当天的开放情况"""
+        intervals = hours.parse_open_time(spot['open_time'])
+        if intervals is None:
+            return ''
+        windows = hours.hours_on(intervals, *day)
+        if not windows:
+            return f"- ⚠️ **{self._day_name(day)}不开放**，建议调整日期\n"
+        if day[1] is None:
+            closed = hours.closed_weekdays(intervals)
+            return f"- **闭馆日**：{'、'.join(hours.weekday_name(d) for d in closed)}\n" if closed else ''
+        open_text = '、'.join(f"{hours.format_minutes(o)}-{hours.format_minutes(c)}" for o, c in windows)
+        return f"- **{self._day_name(day)}开放时间**：{open_text}\n"
+    
+    def _generate_route_plan(self, scenic_spots, user_input='', itinerary=None):
+        """生成路线规划（景点已按距离排好顺序，多日行程按天分组）"""
+        # 识别天数需求（一天、2天、三日……）
+        days_requested = optimizer.parse_days(user_input)
+        if itinerary is None:
+            itinerary = optimizer.plan_itinerary(scenic_spots, days_requested)
+        scenic_spots = itinerary.spots
+        next_legs = {id(spot): (leg, nxt) for spot, leg, nxt in zip(scenic_spots, itinerary.legs, scenic_spots[1:])}
+        # 各时段按景点当天的开放时间调整
+        first_day = self._trip_day(user_input)
         
         # 如果只有一个景点，直接生成一日游
         if len(scenic_spots) == 1:
             spot = scenic_spots[0]
+            morning, morning_note = self._visit_slot(spot, *self.ONE_DAY_SLOTS[0], first_day)
+            afternoon, afternoon_note = self._visit_slot(spot, *self.ONE_DAY_SLOTS[1], first_day)
             return f"""
 ## 一日游路线规划
 
 ### 景点：{spot['name']}
 
 **推荐行程：**
-- **上午（9:00-12:00）**：抵达{spot['name']}，参观主要景点，了解历史文化背景
+- **上午（{morning}）**：抵达{spot['name']}，参观主要景点，了解历史文化背景
 - **中午（12:00-13:30）**：在景区内或附近用餐，品尝当地特色美食
-- **下午（13:30-17:00）**：继续游览，体验特色项目，拍照留念
+- **下午（{afternoon}）**：继续游览，体验特色项目，拍照留念
 - **傍晚（17:00-18:00）**：结束游览，返回
-
+{morning_note or afternoon_note}
 **门票信息：** ¥{spot['ticket_price']}
 **开放时间：** {spot['open_time']}
 **建议游览时长：** 3-4小时
 """
         # 多个景点的情况
         else:
+            order_tip = ''
+            if itinerary.total_km:
+                order_tip = f"- 已按景点之间的距离安排游览顺序，景点间路程合计约{itinerary.total_km}公里\n"
             # 如果用户要求一天完成，将所有景点安排在同一天
             if days_requested == 1:
                 plan = "## 一日游路线规划\n\n"
@@ -201,68 +342,89 @@ class AIPlanAPIView(View):
                 
                 for i, spot in enumerate(scenic_spots, 1):
                     if i == 1:
+                        slot, note = self._visit_slot(spot, *self.ONE_DAY_SLOTS[0], first_day)
                         plan += f"""
 ### 上午：{spot['name']}
 
-- **时间**：9:00-12:00
+- **时间**：{slot}
 - **地址**：{spot['address']}
 - **游览重点**：{spot['description'][:80]}...
 - **门票价格**：¥{spot['ticket_price']}
 - **开放时间**：{spot['open_time']}
-
+{note}
 """
                     elif i == 2:
+                        slot, note = self._visit_slot(spot, *self.ONE_DAY_SLOTS[1], first_day)
                         plan += f"""
 ### 中午：用餐休息
 
 - **时间**：12:00-13:30
 - 建议在{scenic_spots[0]['name']}附近用餐，然后前往下一景点
-
+{self._leg_text(*next_legs[id(scenic_spots[0])])}
 """
                         plan += f"""
 ### 下午：{spot['name']}
 
-- **时间**：13:30-17:00
+- **时间**：{slot}
 - **地址**：{spot['address']}
 - **游览重点**：{spot['description'][:80]}...
 - **门票价格**：¥{spot['ticket_price']}
 - **开放时间**：{spot['open_time']}
-
+{note}
 """
                     else:
+                        slot, note = self._visit_slot(spot, *self.ONE_DAY_SLOTS[2], first_day)
                         plan += f"""
 ### 傍晚：{spot['name']}
 
-- **时间**：17:00-18:30
+{self._leg_text(*next_legs[id(scenic_spots[i - 2])])}- **时间**：{slot}
 - **地址**：{spot['address']}
 - **游览重点**：{spot['description'][:80]}...
 - **门票价格**：¥{spot['ticket_price']}
 - **开放时间**：{spot['open_time']}
-
+{note}
 """
                 
                 plan += "\n**温馨提示：**\n"
+                plan += order_tip
                 plan += "- 行程较为紧凑，建议提前规划好交通路线\n"
                 plan += "- 建议提前预订门票，节省排队时间\n"
                 plan += "- 如果时间紧张，可以选择重点游览部分景点\n"
                 plan += "- 注意各景点的开放时间，合理安排行程\n"
                 return plan
             else:
-                # 默认多日游，每个景点一天
+                # 多日游：未指定天数时每个景点一天，指定天数时相邻的景点安排在同一天
                 plan = "## 多日游路线规划\n\n"
-                for i, spot in enumerate(scenic_spots, 1):
-                    plan += f"""
-### 第{i}天：{spot['name']}
+                for day, group in enumerate(itinerary.days, 1):
+                    trip_day = self._trip_day(user_input, day - 1)
+                    if len(group) == 1:
+                        spot = group[0]
+                        plan += f"""
+### 第{day}天：{spot['name']}
 
 **行程安排：**
 - **上午**：前往{spot['name']}（地址：{spot['address']}）
 - **游览重点**：{spot['description'][:100]}...
 - **门票价格**：¥{spot['ticket_price']}
 - **开放时间**：{spot['open_time']}
-- **建议游览时长**：半天
+{self._hours_text(spot, trip_day)}- **建议游览时长**：半天
 
 """
+                        continue
+                    plan += f"\n### 第{day}天：{' → '.join(spot['name'] for spot in group)}\n\n"
+                    for i, spot in enumerate(group):
+                        plan += f"""#### {spot['name']}
+
+- **地址**：{spot['address']}
+- **游览重点**：{spot['description'][:100]}...
+- **门票价格**：¥{spot['ticket_price']}
+- **开放时间**：{spot['open_time']}
+{self._hours_text(spot, trip_day)}"""
+                        if i < len(group) - 1:
+                            plan += self._leg_text(*next_legs[id(spot)])
+                        plan += "\n"
                 plan += "\n**温馨提示：**\n"
+                plan += order_tip
                 plan += "- 建议提前预订门票，避免排队\n"
                 plan += "- 根据景点距离合理安排交通方式\n"
                 plan += "- 预留充足的游览时间，不要过于匆忙\n"
@@ -355,6 +517,96 @@ class AIPlanAPIView(View):
 
 
 @method_decorator(csrf_exempt, name='dispatch')
+class AIPlanStreamAPIView(AIPlanAPIView):
+    """
+    AI助手规划API（流式）
+    POST /api/v1/ai-assistant/plan/stream/，参数同 /plan/，以 server-sent events 返回：
+    - meta：景点信息（按游览顺序）、警告信息、是否命中缓存
+    - delta：生成中的一段 Markdown 文本（大模型逐段输出；规则引擎按整段输出）
+    - reset：大模型中途失败，已输出的文本作废，改由规则引擎重新输出
+    - done：完整结果，内容与 /plan/ 的 data 相同
+    - error：生成失败
+    参数有误或景点都没找到时与 /plan/ 一样返回 JSON 错误
+    """
+    
+    async def post(self, request):
+        try:
+            data = json.loads(request.body)
+            scenic_spot_names, query_type, user_input, scenic_spots, warning_message = (
+                await sync_to_async(self._resolve)(data)
+            )
+        except json.JSONDecodeError:
+            return JsonResponse({
+                'status': 'error',
+                'message': '请求数据格式错误'
+            }, status=400)
+        except ValueError as e:
+            message, status = e.args
+            return JsonResponse({
+                'status': 'error',
+                'message': message
+            }, status=status)
+        
+        # 事件流是异步生成器：ASGI 下逐段发送，同步迭代器会被 Django 先整个读完再发送
+        response = StreamingHttpResponse(
+            self._events(request, scenic_spot_names, query_type, user_input, scenic_spots, warning_message),
+            content_type='text/event-stream; charset=utf-8',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # 关闭 Nginx 的响应缓冲，否则浏览器要等全部生成完才收到
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    
+    async def _events(self, request, scenic_spot_names, query_type, user_input, scenic_spots, warning_message):
+        try:
+            spot_ids = [spot['id'] for spot in scenic_spots]
+            cache_key = plan_cache.plan_key(spot_ids, query_type, user_input)
+            cached = await sync_to_async(plan_cache.plan_cache.get)(cache_key)
+            cache_hit = cached is not None
+            if not cache_hit:
+                itinerary = self._itinerary(scenic_spots, user_input)
+                yield sse_event('meta', {'scenic_spots': itinerary.spots, 'warning': warning_message, 'cached': False})
+                plan_result = None
+                if getattr(settings, 'USE_AI_API', False):
+                    chunks = []
+                    messages = providers.build_messages(itinerary.spots, query_type, user_input, itinerary)
+                    client = providers.async_registry.get(keep_alive=isinstance(request, ASGIRequest))
+                    try:
+                        async for text in client.stream_chat(messages):
+                            chunks.append(text)
+                            yield sse_event('delta', {'text': text})
+                    except providers.ProviderError as e:
+                        logger.warning(f"AI服务调用失败，使用规则引擎: {e}")
+                        if chunks:
+                            yield sse_event('reset', {'message': 'AI服务暂时不可用，已改用规则引擎生成'})
+                    else:
+                        plan_result = self._ai_plan(''.join(chunks), query_type, user_input, itinerary)
+                if plan_result is None:
+                    plan_result = self._rule_plan(query_type, user_input, itinerary)
+                    for key in providers.SECTION_TITLES:
+                        if plan_result[key]:
+                            yield sse_event('delta', {'text': plan_result[key] + '\n'})
+                cached = await sync_to_async(plan_cache.plan_cache.put)(
+                    cache_key, spot_ids, query_type, user_input, plan_result
+                )
+            else:
+                ordered = self._in_plan_order(scenic_spots, cached.plan)
+                yield sse_event('meta', {'scenic_spots': ordered, 'warning': warning_message, 'cached': True})
+            user = await request.auser()
+            response_data = await sync_to_async(self._response_data)(
+                user, scenic_spot_names, query_type, user_input, scenic_spots, cached, cache_hit, warning_message
+            )
+            yield sse_event('done', response_data)
+        except Exception as e:
+            logger.error(f"流式生成规划失败: {e}", exc_info=True)
+            yield sse_event('error', {'message': f'服务器错误: {str(e)}'})
+
+
+def sse_event(event, data):
+    """一条 server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 class AIQueryHistoryAPIView(LoginRequiredMixin, View):
     """
     获取用户的AI查询历史
@@ -388,7 +640,8 @@ class AIQueryDetailAPIView(LoginRequiredMixin, View):
     
     def get(self, request, query_id):
         try:
-            query = AIQuery.objects.get(id=query_id, user=request.user)
+            query = AIQuery.objects.select_related('plan_result').get(id=query_id, user=request.user)
+            plan = query.get_plan()
             
             return JsonResponse({
                 'status': 'success',
@@ -398,9 +651,9 @@ class AIQueryDetailAPIView(LoginRequiredMixin, View):
                     'query_type_display': query.get_query_type_display(),
                     'user_input': query.user_input,
                     'scenic_spots': json.loads(query.scenic_spots),
-                    'route_plan': query.route_plan,
-                    'transport_plan': query.transport_plan,
-                    'strategy_plan': query.strategy_plan,
+                    'route_plan': plan['route_plan'],
+                    'transport_plan': plan['transport_plan'],
+                    'strategy_plan': plan['strategy_plan'],
                     'created_at': query.created_at.strftime('%Y-%m-%d %H:%M:%S'),
                     'is_favorite': query.is_favorite
                 }
@@ -463,8 +716,9 @@ class AIQueryExportAPIView(LoginRequiredMixin, View):
     
     def get(self, request, query_id):
         try:
-            query = AIQuery.objects.get(id=query_id, user=request.user)
+            query = AIQuery.objects.select_related('plan_result').get(id=query_id, user=request.user)
             scenic_spots = json.loads(query.scenic_spots)
+            plan = query.get_plan()
             
             # 构建导出文本
             export_text = f"""
@@ -488,28 +742,28 @@ class AIQueryExportAPIView(LoginRequiredMixin, View):
    开放时间：{spot['open_time']}
 """
             
-            if query.route_plan:
+            if plan['route_plan']:
                 export_text += f"""
 {'='*60}
 路线规划
 {'='*60}
-{query.route_plan}
+{plan['route_plan']}
 """
             
-            if query.transport_plan:
+            if plan['transport_plan']:
                 export_text += f"""
 {'='*60}
 交通规划
 {'='*60}
-{query.transport_plan}
+{plan['transport_plan']}
 """
             
-            if query.strategy_plan:
+            if plan['strategy_plan']:
                 export_text += f"""
 {'='*60}
 旅游策略
 {'='*60}
-{query.strategy_plan}
+{plan['strategy_plan']}
 """
             
             export_text += f"""
@@ -529,3 +783,44 @@ class AIQueryExportAPIView(LoginRequiredMixin, View):
                 'message': '查询记录不存在'
             }, status=404)
 
+
+class AIPlanCacheStatsAPIView(View):
+    """
+    AI规划缓存的命中率等指标（当前进程内累计，仅管理员）
+    GET /api/v1/ai-assistant/cache-stats/
+    """
+    
+    def get(self, request):
+        if not request.user.is_staff:
+            return JsonResponse({
+                'status': 'error',
+                'message': '无权查看'
+            }, status=403)
+        return JsonResponse({
+            'status': 'success',
+            'data': plan_cache.plan_cache.stats()
+        })
+
+
+class AIRecommendAPIView(View):
+    """
+    按文字描述推荐景点（见 recommender.py）
+    GET /api/v1/ai-assistant/recommend/?q=想看荷花和古建筑&limit=3
+    """
+    
+    def get(self, request):
+        text = request.GET.get('q', '').strip()
+        if not text:
+            return JsonResponse({
+                'status': 'error',
+                'message': '请输入描述'
+            }, status=400)
+        try:
+            limit = min(max(int(request.GET.get('limit', recommender.TOP_K)), 1), recommender.MAX_K)
+        except ValueError:
+            limit = recommender.TOP_K
+        results = recommender.spot_recommender.recommend(text, k=limit)
+        return JsonResponse({
+            'status': 'success',
+            'data': [dict(item.spot, score=item.score) for item in results]
+        })
@@ -3,6 +3,9 @@ from . import api
 
 urlpatterns = [
     path('plan/', api.AIPlanAPIView.as_view(), name='api-ai-plan'),
+    path('plan/stream/', api.AIPlanStreamAPIView.as_view(), name='api-ai-plan-stream'),
+    path('recommend/', api.AIRecommendAPIView.as_view(), name='api-ai-recommend'),
+    path('cache-stats/', api.AIPlanCacheStatsAPIView.as_view(), name='api-ai-cache-stats'),
     path('history/', api.AIQueryHistoryAPIView.as_view(), name='api-ai-history'),
     path('query/<int:query_id>/', api.AIQueryDetailAPIView.as_view(), name='api-ai-query-detail'),
     path('query/<int:query_id>/favorite/', api.AIQueryFavoriteAPIView.as_view(), name='api-ai-query-favorite'),
@@ -6,3 +6,21 @@ class AiAssistantConfig(AppConfig):
     name = 'apps.ai_assistant'
     verbose_name = 'AI助手'
 
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from apps.scenic.models import ScenicSpot
+
+        from . import plan_cache, recommender, resolver
+
+        # 景点保存或删除后景点名称解析的内存索引过期
+        post_save.connect(resolver.invalidate_on_change, sender=ScenicSpot, dispatch_uid='ai_resolver_scenic_save')
+        post_delete.connect(resolver.invalidate_on_change, sender=ScenicSpot, dispatch_uid='ai_resolver_scenic_delete')
+
+        # 景点保存或删除后包含该景点的规划缓存失效
+        post_save.connect(plan_cache.invalidate_on_change, sender=ScenicSpot, dispatch_uid='ai_plan_cache_scenic_save')
+        post_delete.connect(plan_cache.invalidate_on_change, sender=ScenicSpot, dispatch_uid='ai_plan_cache_scenic_delete')
+
+        # 景点保存或删除后只重新计算这个景点的推荐向量
+        post_save.connect(recommender.update_on_save, sender=ScenicSpot, dispatch_uid='ai_recommender_scenic_save')
+        post_delete.connect(recommender.remove_on_delete, sender=ScenicSpot, dispatch_uid='ai_recommender_scenic_delete')
@@ -0,0 +1,39 @@
+"""
+管理命令：启动本地模拟的大模型服务，用于离线联调AI助手（见 apps/ai_assistant/mock_provider.py）
+
+使用方法：
+python manage.py ai_mock_server
+python manage.py ai_mock_server --port 8765 --chunk-delay 0.05
+python manage.py ai_mock_server --fail-status 503
+
+然后在 settings.py 中设置 USE_AI_API = True、AI_API_BASE_URL = 'http://127.0.0.1:8765/v1'
+"""
+from django.core.management.base import BaseCommand
+
+from apps.ai_assistant.mock_provider import MockProviderServer
+
+
+class Command(BaseCommand):
+    help = '启动兼容 OpenAI 对话接口的本地模拟服务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认：127.0.0.1）')
+        parser.add_argument('--port', type=int, default=8765, help='监听端口（默认：8765）')
+        parser.add_argument('--latency', type=float, default=0, help='开始应答前的等待时间（秒）')
+        parser.add_argument('--chunk-delay', type=float, default=0.02, help='流式输出每段之间的间隔（秒）')
+        parser.add_argument('--fail-status', type=int, default=0, help='非 0 时所有请求返回该 HTTP 状态码')
+
+    def handle(self, *args, **options):
+        server = MockProviderServer(
+            (options['host'], options['port']),
+            latency=options['latency'],
+            chunk_delay=options['chunk_delay'],
+            fail_status=options['fail_status'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'模拟服务已启动：{server.base_url}（Ctrl+C 退出）'))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,56 @@
+"""
+管理命令：导出AI规划的请求语料，供 benchmarks/bench_ai_plan.py 回放
+
+从最近的查询记录（AIQuery，只记录登录用户的查询）中取出景点名称、规划类型和用户需求，
+连同涉及的景点信息写成与 benchmarks/data/ai_plan_corpus.json 相同格式的 JSON：
+python manage.py export_ai_corpus --limit 1000 --output corpus.json
+python -m benchmarks.bench_ai_plan --corpus corpus.json
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from apps.ai_assistant.models import AIQuery
+from apps.scenic.models import ScenicSpot
+
+SPOT_FIELDS = ('name', 'address', 'ticket_price', 'open_time', 'latitude', 'longitude', 'tags', 'best_season',
+               'aliases', 'description')
+
+
+def recorded_input(query, names):
+    """查询记录中没有填写需求时保存的是"规划X的旅游"，导出为空"""
+    if query.user_input == f"规划{', '.join(names)}的旅游":
+        return ''
+    return query.user_input
+
+
+class Command(BaseCommand):
+    help = '导出AI规划请求语料（景点 + 请求），用于离线压测'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='最多导出最近的多少条查询（默认：1000）')
+        parser.add_argument('--output', default='-', help='输出文件（默认：标准输出）')
+
+    def handle(self, *args, **options):
+        requests = []
+        for query in AIQuery.objects.order_by('-created_at')[:options['limit']]:
+            try:
+                names = [spot['name'] for spot in json.loads(query.scenic_spots)]
+            except (ValueError, TypeError, KeyError):
+                continue
+            requests.append({
+                'scenic_spots': names, 'query_type': query.query_type,
+                'user_input': recorded_input(query, names),
+            })
+        names = {name for request in requests for name in request['scenic_spots']}
+        spots = [
+            {field: str(value) if value is not None else None for field, value in spot.items()}
+            for spot in ScenicSpot.objects.filter(name__in=names).values(*SPOT_FIELDS)
+        ]
+        corpus = json.dumps({'spots': spots, 'requests': requests[::-1]}, ensure_ascii=False, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(corpus)
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(corpus + '\n')
+            self.stderr.write(self.style.SUCCESS(f'已导出 {len(requests)} 条请求、{len(spots)} 个景点'))
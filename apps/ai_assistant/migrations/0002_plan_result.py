@@ -0,0 +1,41 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_assistant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIPlanResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(db_index=True, max_length=64, verbose_name='缓存键')),
+                ('spot_ids', models.CharField(max_length=255, verbose_name='景点ID')),
+                ('query_type', models.CharField(max_length=20, verbose_name='查询类型')),
+                ('user_input', models.TextField(blank=True, default='', verbose_name='规范化的用户需求')),
+                ('route_plan', models.TextField(blank=True, default='', verbose_name='路线规划')),
+                ('transport_plan', models.TextField(blank=True, default='', verbose_name='交通规划')),
+                ('strategy_plan', models.TextField(blank=True, default='', verbose_name='旅游策略')),
+                ('full_response', models.TextField(blank=True, default='', verbose_name='完整AI响应')),
+                ('is_valid', models.BooleanField(default=True, verbose_name='是否有效（景点信息变化后失效）')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='创建时间')),
+            ],
+            options={
+                'verbose_name': 'AI规划结果',
+                'verbose_name_plural': 'AI规划结果',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='aiquery',
+            name='plan_result',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='queries', to='ai_assistant.aiplanresult', verbose_name='规划结果'),
+        ),
+    ]
@@ -0,0 +1,140 @@
+"""
+本地模拟的大模型服务（兼容 OpenAI 对话接口）
+
+用于离线联调和测试 providers.py：任意以 /chat/completions 结尾的 POST 请求都按 OpenAI 的格式应答，
+stream=True 时以 SSE 逐段返回（每段之间间隔 chunk_delay 秒），否则返回完整的 JSON。
+回答按提示词中要求的二级标题分段，内容引用提示词中的景点名称。
+
+可调整的行为（MockProviderServer 的属性，测试中可随时修改）：
+- latency：开始应答前的等待时间（秒），用于测试读取超时
+- chunk_delay：流式输出每段之间的间隔（秒）
+- fail_status：非 0 时直接返回该 HTTP 状态码，用于测试熔断和回退
+- requests / connections：收到的请求数、建立的连接数，用于验证连接复用
+
+    python manage.py ai_mock_server --port 8765
+    # settings.py：USE_AI_API = True，AI_API_BASE_URL = 'http://127.0.0.1:8765/v1'
+"""
+import json
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HEADING_RE = re.compile(r'"## ([^"]+)"')
+SPOT_RE = re.compile(r'^- ([^：\n]+)：', re.MULTILINE)
+
+
+def mock_answer(prompt):
+    """按提示词要求的标题生成模拟回答"""
+    spots = SPOT_RE.findall(prompt) or ['所选景点']
+    headings = HEADING_RE.findall(prompt) or ['路线规划']
+    parts = []
+    for heading in headings:
+        parts.append(f'## {heading}\n\n')
+        for number, spot in enumerate(spots, 1):
+            parts.append(f'{number}. {spot}：这是模拟服务生成的{heading}建议。\n')
+        parts.append('\n')
+    return ''.join(parts)
+
+
+def split_chunks(text, size=8):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # 响应头和各段分开写出，关闭 Nagle 算法，避免与客户端的延迟确认叠加出约 40ms 的等待
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        with self.server.lock:
+            self.server.requests += 1
+        if not self.path.endswith('/chat/completions'):
+            return self._send_json(404, {'error': {'message': 'not found'}})
+        if self.server.fail_status:
+            return self._send_json(self.server.fail_status, {'error': {'message': 'mock failure'}})
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._send_json(400, {'error': {'message': 'invalid json'}})
+        prompt = '\n'.join(message.get('content', '') for message in payload.get('messages', []))
+        answer = mock_answer(prompt)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if not payload.get('stream'):
+            return self._send_json(200, {
+                'object': 'chat.completion',
+                'model': payload.get('model'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+            })
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            for text in split_chunks(answer):
+                chunk = {'object': 'chat.completion.chunk', 'choices': [{'index': 0, 'delta': {'content': text}}]}
+                self._write_chunk(f'data: {json.dumps(chunk, ensure_ascii=False)}\n\n')
+                if self.server.chunk_delay:
+                    time.sleep(self.server.chunk_delay)
+            self._write_chunk('data: [DONE]\n\n')
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def _send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 压测时同时建立的连接较多
+    request_queue_size = 1024
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0, chunk_delay=0, fail_status=0):
+        super().__init__(address, MockProviderHandler)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.fail_status = fail_status
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # 客户端中途断开（测试放弃调用、超时）是预期情况，不打印错误
+        pass
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self):
+        """在后台线程中运行，返回 self"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -5,6 +5,32 @@ from django.utils import timezone
 User = get_user_model()
 
 
+class AIPlanResult(models.Model):
+    """
+    AI规划结果（缓存）
+    同样的景点组合、规划类型和需求只生成一次，命中缓存的查询记录引用同一条结果（见 plan_cache.py）
+    """
+    cache_key = models.CharField(max_length=64, db_index=True, verbose_name="缓存键")
+    # 景点ID前后都带逗号（",1,5,"），景点变化时按 ",ID," 查找失效
+    spot_ids = models.CharField(max_length=255, verbose_name="景点ID")
+    query_type = models.CharField(max_length=20, verbose_name="查询类型")
+    user_input = models.TextField(blank=True, default='', verbose_name="规范化的用户需求")
+    route_plan = models.TextField(blank=True, default='', verbose_name="路线规划")
+    transport_plan = models.TextField(blank=True, default='', verbose_name="交通规划")
+    strategy_plan = models.TextField(blank=True, default='', verbose_name="旅游策略")
+    full_response = models.TextField(blank=True, default='', verbose_name="完整AI响应")
+    is_valid = models.BooleanField(default=True, verbose_name="是否有效（景点信息变化后失效）")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="创建时间")
+
+    class Meta:
+        verbose_name = "AI规划结果"
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.query_type} - {self.spot_ids.strip(',')}"
+
+
 class AIQuery(models.Model):
     """
     AI助手查询记录
@@ -28,6 +54,9 @@ class AIQuery(models.Model):
     transport_plan = models.TextField(blank=True, null=True, verbose_name="交通规划")
     strategy_plan = models.TextField(blank=True, null=True, verbose_name="旅游策略")
     full_response = models.TextField(blank=True, null=True, verbose_name="完整AI响应")
+    # 规划结果保存在 AIPlanResult 时只引用，上面四个字段留空（早期的记录仍直接保存在上面）
+    plan_result = models.ForeignKey(AIPlanResult, on_delete=models.PROTECT, null=True, blank=True,
+                                    related_name='queries', verbose_name="规划结果")
     
     # 元数据
     created_at = models.DateTimeField(default=timezone.now, verbose_name="创建时间")
@@ -41,3 +70,13 @@ class AIQuery(models.Model):
     def __str__(self):
         return f"{self.get_query_type_display()} - {self.user_input[:50]}"
 
+    def get_plan(self):
+        """规划内容：引用了 AIPlanResult 时从其读取，否则读取记录本身的字段"""
+        source = self.plan_result if self.plan_result_id else self
+        return {
+            'route_plan': source.route_plan,
+            'transport_plan': source.transport_plan,
+            'strategy_plan': source.strategy_plan,
+            'full_response': source.full_response,
+        }
+
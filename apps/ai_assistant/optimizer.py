@@ -0,0 +1,245 @@
+"""
+AI助手的行程顺序优化
+
+原来路线规划按用户输入的顺序安排景点，没有用到已经取出的经纬度。现在：
+- 景点两两之间的距离矩阵用 NumPy 一次算出（球面距离，见 apps/index/geo.py），乘以 ROAD_FACTOR 估算道路里程、
+  按 AVERAGE_SPEED_KMH 估算车程；同一组坐标的矩阵缓存在进程内（LRU）
+- 游览顺序按总车程最短的路径（不要求回到起点）：不超过 EXACT_MAX_SPOTS 个景点时用状态压缩动态规划求精确解，
+  更多时从多个起点做最近邻，再用 2-opt 反转路段改进
+- 多日行程把排好序的路径切成连续的若干天，使最忙的一天（游览时间 + 当天车程）尽量短，
+  相邻的景点安排在同一天
+- 没有坐标的景点无法计算距离，按输入顺序排在最后
+
+15 个景点的规划在几毫秒内完成。
+"""
+import math
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+from apps.index.geo import haversine_km
+
+# 直线距离换算道路里程的系数、平均车速
+ROAD_FACTOR = 1.3
+AVERAGE_SPEED_KMH = 50
+# 每个景点的游览时长（小时）
+VISIT_HOURS = 3
+EXACT_MAX_SPOTS = 8
+MAX_NEAREST_STARTS = 20
+MAX_TWO_OPT_ROUNDS = 50
+MATRIX_CACHE_SIZE = 256
+MAX_DAYS = 15
+
+Leg = namedtuple('Leg', 'distance_km minutes')
+Itinerary = namedtuple('Itinerary', 'spots days legs total_km')
+
+CHINESE_NUMBERS = {'一': 1, '两': 2, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '七': 7, '八': 8, '九': 9, '十': 10}
+# "5月3日""第二天"不是天数：数字前不能是"月""第"或其他数字；"日"只认"日游"
+DAYS_RE = re.compile(
+    r'(?<![\d月第一两二三四五六七八九十])([1-9]\d?|[一两二三四五六七八九]?十[一二三四五六七八九]?|[一两二三四五六七八九])'
+    r'\s*(?:天|日游)'
+)
+
+
+def _number(value):
+    if value.isdigit():
+        return int(value)
+    tens, ten, ones = value.partition('十')
+    if not ten:
+        return CHINESE_NUMBERS[value]
+    return CHINESE_NUMBERS.get(tens, 1) * 10 + CHINESE_NUMBERS.get(ones, 0)
+
+
+def parse_days(text):
+    """用户输入中的天数需求（"一天完成""2天""三日游"），没有时返回 None"""
+    match = DAYS_RE.search(text or '')
+    if not match:
+        return None
+    return min(_number(match.group(1)), MAX_DAYS)
+
+
+@lru_cache(maxsize=MATRIX_CACHE_SIZE)
+def distance_matrix(points):
+    """
+    points 为 ((纬度, 经度), ...) 元组，返回估算道路里程（公里）的 n x n 矩阵（只读）
+    """
+    coordinates = np.array(points, dtype=np.float64).reshape(-1, 2)
+    matrix = np.zeros((len(coordinates), len(coordinates)))
+    for i, (lat, lng) in enumerate(coordinates.tolist()):
+        matrix[i] = haversine_km(lat, lng, coordinates[:, 0], coordinates[:, 1]) * ROAD_FACTOR
+    matrix.flags.writeable = False
+    return matrix
+
+
+def travel_minutes(distance_km):
+    return distance_km / AVERAGE_SPEED_KMH * 60
+
+
+def path_length(path, matrix):
+    return float(sum(matrix[a, b] for a, b in zip(path, path[1:])))
+
+
+def exact_path(matrix):
+    """
+    状态压缩动态规划：经过全部点、起点终点不限的最短路径
+    cost[mask][j] 为经过 mask 中的点、停在 j 的最短里程（点数少，纯 Python 列表比逐个 mask 调用 NumPy 快）
+    """
+    n = len(matrix)
+    full = (1 << n) - 1
+    rows = matrix.tolist()
+    cost = [[math.inf] * n for _ in range(full + 1)]
+    parent = [[-1] * n for _ in range(full + 1)]
+    for j in range(n):
+        cost[1 << j][j] = 0.0
+    for mask in range(1, full):
+        current = cost[mask]
+        for last in range(n):
+            base = current[last]
+            if base == math.inf:
+                continue
+            row = rows[last]
+            for nxt in range(n):
+                bit = 1 << nxt
+                if mask & bit:
+                    continue
+                total = base + row[nxt]
+                if total < cost[mask | bit][nxt]:
+                    cost[mask | bit][nxt] = total
+                    parent[mask | bit][nxt] = last
+    last = min(range(n), key=cost[full].__getitem__)
+    mask, path = full, []
+    while last >= 0:
+        path.append(last)
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    return path[::-1]
+
+
+def nearest_neighbor_path(matrix, start):
+    n = len(matrix)
+    visited = np.zeros(n, dtype=bool)
+    path = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        distances = np.where(visited, np.inf, matrix[path[-1]])
+        nxt = int(np.argmin(distances))
+        path.append(nxt)
+        visited[nxt] = True
+    return path
+
+
+def two_opt(path, matrix):
+    """
+    2-opt 改进开放路径：加一个到所有点距离为 0 的虚拟点，转成回路处理，最后从虚拟点处断开
+    每轮对每个 i 用 NumPy 一次算出反转 (i+1..j) 的全部收益，取最好的一个
+    """
+    n = len(path)
+    extended = np.zeros((n + 1, n + 1))
+    extended[:n, :n] = matrix
+    tour = np.array([n] + list(path))
+    size = n + 1
+    for _ in range(MAX_TWO_OPT_ROUNDS):
+        improved = False
+        for i in range(size - 2):
+            a, b = tour[i], tour[i + 1]
+            c = tour[i + 2:]
+            d = tour[np.arange(i + 3, size + 1) % size]
+            gains = extended[a, c] + extended[b, d] - extended[a, b] - extended[c, d]
+            k = int(np.argmin(gains))
+            if gains[k] < -1e-9:
+                j = i + 2 + k
+                tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    start = int(np.flatnonzero(tour == n)[0])
+    return [int(node) for node in np.roll(tour, -start)[1:]]
+
+
+def best_path(matrix):
+    """访问全部点的较短路径（点的下标列表）"""
+    n = len(matrix)
+    if n <= 2:
+        return list(range(n))
+    if n <= EXACT_MAX_SPOTS:
+        return exact_path(matrix)
+    starts = range(n) if n <= MAX_NEAREST_STARTS else np.linspace(0, n - 1, MAX_NEAREST_STARTS).astype(int)
+    candidate = min((nearest_neighbor_path(matrix, int(s)) for s in starts), key=lambda p: path_length(p, matrix))
+    return two_opt(candidate, matrix)
+
+
+def split_days(legs, days):
+    """
+    把 n 个按顺序游览的景点切成 days 段连续的行程，使最长一天的时长（游览 + 当天车程）最短
+    legs[i] 为第 i 个景点到第 i+1 个的 Leg（没有坐标时为 None，按 0 计），返回每天的景点数
+    """
+    n = len(legs) + 1
+    days = max(1, min(days, n))
+    travel = [0.0] + [leg.minutes / 60 if leg else 0.0 for leg in legs]
+    prefix = np.cumsum(travel)
+
+    def day_hours(i, j):
+        # 第 i..j-1 个景点在同一天：游览时间加上它们之间的车程
+        return (j - i) * VISIT_HOURS + prefix[j - 1] - prefix[i]
+
+    # best[d][j]：前 j 个景点安排 d 天时最长一天的时长
+    best = [[math.inf] * (n + 1) for _ in range(days + 1)]
+    cut = [[0] * (n + 1) for _ in range(days + 1)]
+    best[0][0] = 0.0
+    for d in range(1, days + 1):
+        for j in range(d, n + 1):
+            for i in range(d - 1, j):
+                value = max(best[d - 1][i], day_hours(i, j))
+                if value < best[d][j]:
+                    best[d][j], cut[d][j] = value, i
+    sizes, j = [], n
+    for d in range(days, 0, -1):
+        i = cut[d][j]
+        sizes.append(j - i)
+        j = i
+    return sizes[::-1]
+
+
+def plan_itinerary(spots, days=None):
+    """
+    spots 为 AIPlanAPIView 使用的景点信息字典列表（含 latitude / longitude）
+    返回 Itinerary：spots 为优化后的顺序，days 为每天的景点列表（days 为 None 时每天一个景点），
+    legs[i] 为 spots[i] 到 spots[i+1] 的 Leg（任一端没有坐标时为 None），total_km 为总里程
+    """
+    located, unlocated = [], []
+    for spot in spots:
+        has_location = spot.get('latitude') is not None and spot.get('longitude') is not None
+        (located if has_location else unlocated).append(spot)
+    matrix = distance_matrix(tuple((spot['latitude'], spot['longitude']) for spot in located))
+    ordered = [located[i] for i in best_path(matrix)] + unlocated
+
+    index = {id(spot): i for i, spot in enumerate(located)}
+    legs = []
+    for current, nxt in zip(ordered, ordered[1:]):
+        if id(current) in index and id(nxt) in index:
+            distance = float(matrix[index[id(current)], index[id(nxt)]])
+            legs.append(Leg(round(distance, 1), round(travel_minutes(distance))))
+        else:
+            legs.append(None)
+
+    if not ordered:
+        groups = []
+    elif days is None:
+        groups = [[spot] for spot in ordered]
+    else:
+        groups, start = [], 0
+        for size in split_days(legs, days):
+            groups.append(ordered[start:start + size])
+            start += size
+    total_km = round(sum(leg.distance_km for leg in legs if leg), 1)
+    return Itinerary(ordered, groups, legs, total_km)
+
+
+def serialize_itinerary(itinerary):
+    return {
+        'order': [spot['id'] for spot in itinerary.spots],
+        'days': [[spot['id'] for spot in day] for day in itinerary.days],
+        'legs': [leg._asdict() if leg else None for leg in itinerary.legs],
+        'total_km': itinerary.total_km,
+    }
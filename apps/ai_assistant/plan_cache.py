@@ -0,0 +1,168 @@
+"""
+AI规划结果缓存
+
+热门的景点组合（如直隶总督署 + 古莲花池）每次请求都重新生成整套路线、交通、策略文本；
+开启 USE_AI_API 后每次都是一次收费、耗时数秒的大模型调用。现在：
+- 缓存键 = 解析出的景点ID（排序后）+ 规划类型 + 规范化的用户需求（全角转半角、小写、合并空白、去掉首尾标点），
+  输入顺序不同、多打了空格的同一需求命中同一条缓存（游览顺序由 optimizer.py 按距离决定，与输入顺序无关）
+- 两级缓存：进程内 LRU（最多 AI_PLAN_CACHE_SIZE 条，超过 AI_PLAN_CACHE_TTL 秒过期），
+  未命中时按缓存键查 AIPlanResult 表（其他进程、重启前生成的结果），都没有才重新生成并写入 AIPlanResult
+- 登录用户的查询记录（AIQuery）引用 AIPlanResult，不再各自保存一份规划文本
+- 景点保存或删除后（事务提交时）移除内存中包含该景点的缓存，并把数据库中的结果标记为失效；
+  其他进程内存中的缓存最多在 AI_PLAN_CACHE_TTL 秒后过期
+- 命中、未命中、淘汰、失效次数记录在进程内，管理员可通过 /api/v1/ai-assistant/cache-stats/ 查看
+"""
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AIPlanResult
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL = 3600
+INPUT_PUNCTUATION = ' \t\r\n.,!?;:。，！？；：、~'
+
+CachedPlan = namedtuple('CachedPlan', 'result_id plan spot_ids expires_at')
+
+
+def normalize_input(text):
+    """规范化用户需求：全角转半角、小写、合并空白、去掉首尾标点"""
+    text = unicodedata.normalize('NFKC', str(text or '')).lower()
+    return ' '.join(text.split()).strip(INPUT_PUNCTUATION)
+
+
+def plan_key(spot_ids, query_type, user_input):
+    """缓存键（SHA-256 十六进制）：景点ID排序后拼接规划类型和规范化的需求"""
+    raw = '|'.join([','.join(str(i) for i in sorted(spot_ids)), query_type, normalize_input(user_input)])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _spot_ids_field(spot_ids):
+    return ',' + ','.join(str(i) for i in sorted(spot_ids)) + ','
+
+
+class PlanCache:
+    """AI规划结果的两级缓存（进程内 LRU + AIPlanResult 表）"""
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or getattr(settings, 'AI_PLAN_CACHE_SIZE', DEFAULT_MAX_ENTRIES)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'AI_PLAN_CACHE_TTL', DEFAULT_TTL)
+        self._entries = OrderedDict()
+        self._by_spot = {}
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    # ---------- 内存 ----------
+
+    def _store(self, key, entry):
+        """放入内存（调用方持有锁），超过容量时淘汰最久未使用的"""
+        self._discard(key)
+        self._entries[key] = entry
+        for spot_id in entry.spot_ids:
+            self._by_spot.setdefault(spot_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self._stats['evictions'] += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for spot_id in entry.spot_ids:
+            keys = self._by_spot.get(spot_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_spot[spot_id]
+
+    # ---------- 读写 ----------
+
+    def get(self, key):
+        """返回 CachedPlan，没有（或已过期、已失效）时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry
+                self._discard(key)
+                self._stats['expirations'] += 1
+
+        result = AIPlanResult.objects.filter(
+            cache_key=key, is_valid=True, created_at__gte=timezone.now() - timedelta(seconds=self.ttl)
+        ).order_by('-created_at').first()
+        if result is None:
+            with self._lock:
+                self._stats['misses'] += 1
+            return None
+        spot_ids = tuple(int(i) for i in result.spot_ids.strip(',').split(',') if i)
+        age = (timezone.now() - result.created_at).total_seconds()
+        entry = CachedPlan(result.id, json.loads(result.full_response), spot_ids, now + self.ttl - age)
+        with self._lock:
+            self._store(key, entry)
+            self._stats['db_hits'] += 1
+        return entry
+
+    def put(self, key, spot_ids, query_type, user_input, plan):
+        """保存新生成的规划（写入 AIPlanResult 并放入内存），返回 CachedPlan"""
+        result = AIPlanResult.objects.create(
+            cache_key=key,
+            spot_ids=_spot_ids_field(spot_ids),
+            query_type=query_type,
+            user_input=normalize_input(user_input),
+            route_plan=plan.get('route_plan', ''),
+            transport_plan=plan.get('transport_plan', ''),
+            strategy_plan=plan.get('strategy_plan', ''),
+            full_response=json.dumps(plan, ensure_ascii=False),
+        )
+        entry = CachedPlan(result.id, plan, tuple(sorted(set(spot_ids))), time.monotonic() + self.ttl)
+        with self._lock:
+            self._store(key, entry)
+        return entry
+
+    def invalidate_spot(self, spot_id):
+        """景点信息变化：移除内存中包含该景点的缓存，数据库中的结果标记为失效"""
+        with self._lock:
+            keys = list(self._by_spot.get(spot_id, ()))
+            for key in keys:
+                self._discard(key)
+            self._stats['invalidations'] += len(keys)
+        AIPlanResult.objects.filter(is_valid=True, spot_ids__contains=f',{spot_id},').update(is_valid=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_spot.clear()
+
+    def stats(self):
+        """命中率等指标（进程内累计）"""
+        with self._lock:
+            stats = {name: self._stats[name] for name in
+                     ('hits', 'db_hits', 'misses', 'evictions', 'expirations', 'invalidations')}
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['db_hits']) / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['ttl'] = self.ttl
+        return stats
+
+
+plan_cache = PlanCache()
+
+
+def invalidate_on_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    spot_id = instance.pk
+    transaction.on_commit(lambda: plan_cache.invalidate_spot(spot_id))
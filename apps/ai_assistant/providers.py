@@ -0,0 +1,573 @@
+"""
+大模型服务商客户端
+
+settings.USE_AI_API 为 True 时，AI助手通过这里调用 AI_PROVIDER 指定的服务商生成规划，否则（或调用失败时）使用规则引擎：
+- openai、qianfan（千帆 v2）、dashscope（通义千问兼容模式）都提供兼容 OpenAI 的对话接口
+  （POST {base_url}/chat/completions，Bearer 鉴权，stream=True 时按 SSE 逐段返回），共用同一个客户端，
+  只有默认地址、密钥和模型不同；AI_API_BASE_URL 可指向本地模拟服务（python manage.py ai_mock_server）
+- 只用标准库 http.client：每个服务商一个连接池，调用结束后连接放回池中复用（keep-alive），省去每次的 TCP/TLS 握手
+- 每个服务商同时进行的调用数由信号量限制（AI_API_MAX_CONCURRENCY），等待超过 AI_API_QUEUE_TIMEOUT 秒
+  抛出 ProviderBusy，由调用方改用规则引擎，不会让请求线程堆积在慢的服务商上
+- 超时分三种：建立连接（AI_API_CONNECT_TIMEOUT）、两次读取之间（AI_API_READ_TIMEOUT）、整次调用（AI_API_TOTAL_TIMEOUT）
+- 熔断：连续失败 AI_API_BREAKER_FAILURES 次后 AI_API_BREAKER_RESET 秒内不再调用（直接抛 CircuitOpen），
+  之后放行一次试探调用，成功则恢复、失败则继续熔断
+- 异步视图使用 AsyncProviderClient（asyncio 流），等待应答时不占用线程；与同步客户端共用熔断状态
+"""
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+import weakref
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+# 服务商默认接口地址、密钥和模型的设置项
+PROVIDERS = {
+    'openai': {
+        'base_url': 'https://api.openai.com/v1',
+        'key_setting': 'OPENAI_API_KEY',
+        'model_setting': 'OPENAI_MODEL',
+        'default_model': 'gpt-3.5-turbo',
+    },
+    'qianfan': {
+        'base_url': 'https://qianfan.baidubce.com/v2',
+        'key_setting': 'QIANFAN_API_KEY',
+        'model_setting': 'QIANFAN_MODEL',
+        'default_model': 'ernie-4.0-8k',
+    },
+    'dashscope': {
+        'base_url': 'https://dashscope.aliyuncs.com/compatible-mode/v1',
+        'key_setting': 'DASHSCOPE_API_KEY',
+        'model_setting': 'DASHSCOPE_MODEL',
+        'default_model': 'qwen-plus',
+    },
+}
+
+DEFAULTS = {
+    'AI_API_CONNECT_TIMEOUT': 5,
+    'AI_API_READ_TIMEOUT': 20,
+    'AI_API_TOTAL_TIMEOUT': 60,
+    'AI_API_MAX_CONCURRENCY': 8,
+    'AI_API_QUEUE_TIMEOUT': 2,
+    'AI_API_BREAKER_FAILURES': 5,
+    'AI_API_BREAKER_RESET': 30,
+}
+
+
+def _setting(name):
+    return getattr(settings, name, DEFAULTS[name])
+
+
+class ProviderError(Exception):
+    """调用服务商失败（调用方应改用规则引擎）"""
+
+
+class ProviderTimeout(ProviderError):
+    """连接、读取或整次调用超时"""
+
+
+class ProviderBusy(ProviderError):
+    """同时进行的调用已达上限，等待超时"""
+
+
+class CircuitOpen(ProviderError):
+    """连续失败后处于熔断期"""
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器：closed -> open（熔断）-> half_open（放行一次试探）-> closed / open"""
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if self._clock() - self._opened_at < self.reset_timeout:
+            return 'open'
+        return 'half_open'
+
+    def before_call(self):
+        """熔断期内抛出 CircuitOpen；熔断期过后只放行一个试探调用"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return
+            if state == 'open' or self._trial_running:
+                raise CircuitOpen('服务商连续调用失败，暂停调用')
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+    def release(self):
+        """试探调用既没成功也没失败（如被调用方中途放弃）时，允许下一次试探"""
+        with self._lock:
+            self._trial_running = False
+
+
+class ConnectionPool:
+    """同一主机的 keep-alive 连接池（后进先出，最多保留 size 个空闲连接）"""
+
+    def __init__(self, base_url, size, connect_timeout):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path.rstrip('/')
+        self.size = size
+        self.connect_timeout = connect_timeout
+        self.created = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self.created += 1
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.connect_timeout)
+
+    def release(self, connection):
+        """响应已读完的连接放回池中"""
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class ProviderClient:
+    """一个服务商的对话接口客户端（连接池 + 并发限制 + 熔断）"""
+
+    def __init__(self, name, base_url, api_key, model, connect_timeout=None, read_timeout=None,
+                 total_timeout=None, max_concurrency=None, queue_timeout=None, breaker=None):
+        self.name = name
+        self.model = model
+        self.api_key = api_key
+        self.connect_timeout = connect_timeout or _setting('AI_API_CONNECT_TIMEOUT')
+        self.read_timeout = read_timeout or _setting('AI_API_READ_TIMEOUT')
+        self.total_timeout = total_timeout or _setting('AI_API_TOTAL_TIMEOUT')
+        self.queue_timeout = queue_timeout if queue_timeout is not None else _setting('AI_API_QUEUE_TIMEOUT')
+        max_concurrency = max_concurrency or _setting('AI_API_MAX_CONCURRENCY')
+        self.pool = ConnectionPool(base_url, max_concurrency, self.connect_timeout)
+        self.breaker = breaker or CircuitBreaker(_setting('AI_API_BREAKER_FAILURES'), _setting('AI_API_BREAKER_RESET'))
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def stream_chat(self, messages, temperature=0.7):
+        """
+        流式对话：逐段产出模型生成的文本
+        失败时抛出 ProviderError 的子类；调用方中途停止迭代时关闭连接、释放并发名额
+        """
+        self.breaker.before_call()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.breaker.release()
+            raise ProviderBusy(f'{self.name} 同时进行的调用已达上限')
+        connection = None
+        finished = False
+        try:
+            deadline = time.monotonic() + self.total_timeout
+            connection, response = self._open(messages, temperature)
+            for text in self._read_events(response, deadline):
+                yield text
+            finished = True
+        except ProviderError:
+            self.breaker.record_failure()
+            raise
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            self.breaker.record_failure()
+            if isinstance(e, socket.timeout):
+                raise ProviderTimeout(f'{self.name} 响应超时') from e
+            raise ProviderError(f'{self.name} 调用失败：{e}') from e
+        finally:
+            if finished:
+                self.breaker.record_success()
+                self.pool.release(connection)
+            else:
+                self.breaker.release()
+                if connection is not None:
+                    connection.close()
+            self._slots.release()
+
+    def chat(self, messages, temperature=0.7):
+        """非流式调用：返回完整文本"""
+        return ''.join(self.stream_chat(messages, temperature))
+
+    def request_body(self, messages, temperature):
+        return json.dumps({
+            'model': self.model,
+            'messages': messages,
+            'temperature': temperature,
+            'stream': True,
+        }, ensure_ascii=False).encode('utf-8')
+
+    def request_headers(self):
+        return {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+            'Authorization': f'Bearer {self.api_key}',
+        }
+
+    def _open(self, messages, temperature):
+        body = self.request_body(messages, temperature)
+        headers = self.request_headers()
+        while True:
+            connection = self.pool.acquire()
+            reused = connection.sock is not None
+            try:
+                if not reused:
+                    connection.connect()
+                connection.sock.settimeout(self.read_timeout)
+                connection.request('POST', f'{self.pool.path}/chat/completions', body=body, headers=headers)
+                response = connection.getresponse()
+                break
+            except socket.timeout as e:
+                connection.close()
+                raise ProviderTimeout(f'{self.name} 连接超时') from e
+            except (ConnectionError, http.client.RemoteDisconnected):
+                connection.close()
+                # 池中的空闲连接可能已被服务端关闭，换一个新连接重试
+                if not reused:
+                    raise
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                raise
+        if response.status != 200:
+            detail = response.read(500).decode('utf-8', 'replace')
+            connection.close()
+            raise ProviderError(f'{self.name} 返回 HTTP {response.status}：{detail}')
+        return connection, response
+
+    def _read_events(self, response, deadline):
+        while True:
+            if time.monotonic() > deadline:
+                raise ProviderTimeout(f'{self.name} 调用超过 {self.total_timeout} 秒')
+            line = response.readline()
+            if not line:
+                break
+            texts = parse_event_line(self.name, line)
+            if texts is None:
+                break
+            yield from texts
+        # 读完剩余内容（分块传输的结尾），连接才能复用
+        response.read()
+
+
+def parse_event_line(name, line):
+    """
+    解析 SSE 的一行：data: 行是一个 JSON 片段，返回其中的文本列表；data: [DONE] 表示结束，返回 None
+    """
+    line = line.decode('utf-8').strip()
+    if not line.startswith('data:'):
+        return []
+    payload = line[5:].strip()
+    if payload == '[DONE]':
+        return None
+    chunk = json.loads(payload)
+    if chunk.get('error'):
+        raise ProviderError(f'{name} 返回错误：{chunk["error"]}')
+    texts = []
+    for choice in chunk.get('choices', ()):
+        text = (choice.get('delta') or {}).get('content')
+        if text:
+            texts.append(text)
+    return texts
+
+
+AsyncStream = namedtuple('AsyncStream', 'reader writer chunked reusable')
+
+
+class AsyncProviderClient:
+    """
+    ProviderClient 的 asyncio 版本（ASGI 下的异步视图使用）：等待服务商应答时不占用线程
+    直接用 asyncio 的流收发 HTTP/1.1，连接池和并发信号量属于创建它的事件循环；
+    超时设置、熔断器与同一服务商的同步客户端共用
+    """
+
+    def __init__(self, client, max_concurrency=None, keep_alive=True):
+        self.client = client
+        self.keep_alive = keep_alive
+        self.name = client.name
+        self.breaker = client.breaker
+        self.created = 0
+        self._idle = []
+        self._slots = asyncio.Semaphore(max_concurrency or _setting('AI_API_MAX_CONCURRENCY'))
+
+    async def stream_chat(self, messages, temperature=0.7):
+        """流式对话：逐段产出文本，失败时抛出 ProviderError 的子类"""
+        client = self.client
+        self.breaker.before_call()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), client.queue_timeout)
+        except asyncio.TimeoutError:
+            self.breaker.release()
+            raise ProviderBusy(f'{self.name} 同时进行的调用已达上限') from None
+        stream = None
+        finished = False
+        try:
+            deadline = time.monotonic() + client.total_timeout
+            stream = await self._open(client.request_body(messages, temperature), deadline)
+            async for text in self._read_events(stream, deadline):
+                yield text
+            finished = True
+        except ProviderError:
+            self.breaker.record_failure()
+            raise
+        except asyncio.TimeoutError as e:
+            self.breaker.record_failure()
+            raise ProviderTimeout(f'{self.name} 响应超时') from e
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            self.breaker.record_failure()
+            raise ProviderError(f'{self.name} 调用失败：{e}') from e
+        finally:
+            if finished:
+                self.breaker.record_success()
+            else:
+                self.breaker.release()
+            if stream is not None:
+                if finished and stream.reusable and self.keep_alive:
+                    self._idle.append(stream)
+                else:
+                    stream.writer.close()
+            self._slots.release()
+
+    async def chat(self, messages, temperature=0.7):
+        return ''.join([text async for text in self.stream_chat(messages, temperature)])
+
+    def _wait(self, awaitable, deadline, timeout=None):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ProviderTimeout(f'{self.name} 调用超过 {self.client.total_timeout} 秒')
+        return asyncio.wait_for(awaitable, min(timeout or self.client.read_timeout, remaining))
+
+    async def _open(self, body, deadline):
+        pool = self.client.pool
+        headers = dict(self.client.request_headers(), Host=pool.host, **{'Content-Length': str(len(body))})
+        head = f'POST {pool.path}/chat/completions HTTP/1.1\r\n' + ''.join(
+            f'{key}: {value}\r\n' for key, value in headers.items()
+        ) + '\r\n'
+        while True:
+            reused = bool(self._idle)
+            if reused:
+                stream = self._idle.pop()
+                reader, writer = stream.reader, stream.writer
+            else:
+                port = pool.port or (443 if pool.scheme == 'https' else 80)
+                reader, writer = await self._wait(
+                    asyncio.open_connection(pool.host, port, ssl=pool.scheme == 'https'),
+                    deadline, self.client.connect_timeout,
+                )
+                self.created += 1
+            try:
+                writer.write(head.encode('latin-1') + body)
+                await writer.drain()
+                status_line = await self._wait(reader.readline(), deadline)
+                if not status_line:
+                    raise ConnectionResetError('连接已关闭')
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                # 池中的空闲连接可能已被服务端关闭，换一个新连接重试
+                if not reused:
+                    raise
+            except BaseException:
+                writer.close()
+                raise
+        try:
+            response_headers = {}
+            while True:
+                line = await self._wait(reader.readline(), deadline)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, _, value = line.decode('latin-1').partition(':')
+                response_headers[key.strip().lower()] = value.strip()
+            status = int(status_line.split()[1])
+            if status != 200:
+                raise ProviderError(f'{self.name} 返回 HTTP {status}')
+        except BaseException:
+            writer.close()
+            raise
+        # 分块传输的响应读完后连接可以复用；按关闭连接界定结尾的不能
+        chunked = response_headers.get('transfer-encoding', '').lower() == 'chunked'
+        reusable = chunked and response_headers.get('connection', '').lower() != 'close'
+        return AsyncStream(reader, writer, chunked, reusable)
+
+    async def _read_chunk(self, reader, deadline):
+        """读一个分块，最后的 0 长度块返回 b''"""
+        size = int((await self._wait(reader.readline(), deadline)).split(b';')[0], 16)
+        if size == 0:
+            await self._wait(reader.readline(), deadline)
+            return b''
+        return (await self._wait(reader.readexactly(size + 2), deadline))[:-2]
+
+    async def _read_events(self, stream, deadline):
+        reader = stream.reader
+        chunked = stream.chunked
+        buffer = b''
+        done = False
+        while not done:
+            if chunked:
+                data = await self._read_chunk(reader, deadline)
+            else:
+                data = await self._wait(reader.read(65536), deadline)
+            if not data:
+                break
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                texts = parse_event_line(self.name, line)
+                if texts is None:
+                    done = True
+                    break
+                for text in texts:
+                    yield text
+        if chunked and done:
+            # 读完剩余的分块（通常只剩结尾的 0 长度块），连接才能复用
+            while await self._read_chunk(reader, deadline):
+                pass
+
+
+class ProviderRegistry:
+    """按服务商名称懒加载客户端（每个进程每个服务商一个，共享连接池和熔断状态）"""
+
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, name=None):
+        name = name or getattr(settings, 'AI_PROVIDER', 'openai')
+        if name not in PROVIDERS:
+            raise ValueError(f'不支持的AI服务商：{name}')
+        with self._lock:
+            client = self._clients.get(name)
+            if client is None:
+                config = PROVIDERS[name]
+                client = ProviderClient(
+                    name,
+                    getattr(settings, 'AI_API_BASE_URL', '') or config['base_url'],
+                    getattr(settings, config['key_setting'], ''),
+                    getattr(settings, config['model_setting'], config['default_model']),
+                )
+                self._clients[name] = client
+            return client
+
+    def reset(self):
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.pool.close()
+
+
+registry = ProviderRegistry()
+
+
+class AsyncProviderRegistry:
+    """
+    按服务商名称和事件循环懒加载异步客户端（asyncio 的连接和信号量不能跨事件循环使用）
+    ASGI 下每个进程只有一个事件循环，连接池和并发上限在进程内共享；熔断状态与同步客户端共享。
+    WSGI 下异步视图每个请求在一个临时事件循环中运行，应传 keep_alive=False：调用结束即关闭连接，
+    并发数由 WSGI 的线程数限制
+    """
+
+    def __init__(self, sync_registry=None):
+        self.sync_registry = sync_registry
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, name=None, keep_alive=True):
+        client = (self.sync_registry or registry).get(name)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.setdefault(loop, {})
+            key = (client, keep_alive)
+            if key not in clients:
+                clients[key] = AsyncProviderClient(client, keep_alive=keep_alive)
+            return clients[key]
+
+
+async_registry = AsyncProviderRegistry()
+
+
+# ---------- 规划提示词 ----------
+
+SECTION_TITLES = {
+    'route_plan': '路线规划',
+    'transport_plan': '交通规划',
+    'strategy_plan': '旅游策略',
+}
+QUERY_SECTIONS = {
+    'route': ['route_plan'],
+    'transport': ['transport_plan'],
+    'strategy': ['strategy_plan'],
+    'general': ['route_plan', 'transport_plan', 'strategy_plan'],
+}
+
+
+def build_messages(scenic_spots, query_type, user_input, itinerary=None):
+    """
+    规划提示词：景点信息、按距离优化好的游览顺序（见 optimizer.py），要求按固定的二级标题分段输出
+    """
+    sections = QUERY_SECTIONS.get(query_type, QUERY_SECTIONS['general'])
+    lines = ['请为以下保定景点制定旅游规划。景点信息（已按推荐的游览顺序排列）：']
+    for spot in scenic_spots:
+        lines.append(
+            f"- {spot['name']}：地址 {spot.get('address') or '未知'}，开放时间 {spot.get('open_time') or '未知'}，"
+            f"门票 {spot.get('ticket_price', 0)} 元"
+        )
+    if itinerary is not None and len(itinerary.days) > 1 and len(itinerary.days) < len(itinerary.spots):
+        for number, day in enumerate(itinerary.days, 1):
+            lines.append(f"第{number}天：{'、'.join(spot['name'] for spot in day)}")
+    if user_input:
+        lines.append(f'游客的需求：{user_input}')
+    headings = '、'.join(f'"## {SECTION_TITLES[key]}"' for key in sections)
+    lines.append(f'请使用 Markdown，依次输出以下二级标题的内容：{headings}，不要输出其他二级标题。')
+    return [
+        {'role': 'system', 'content': '你是保定旅游网的旅游规划助手，回答简洁、具体，使用中文。'},
+        {'role': 'user', 'content': '\n'.join(lines)},
+    ]
+
+
+def split_sections(text):
+    """把模型输出按"## 路线规划"等二级标题拆成 route_plan / transport_plan / strategy_plan"""
+    keys = {title: key for key, title in SECTION_TITLES.items()}
+    result = dict.fromkeys(SECTION_TITLES, '')
+    current = None
+    for line in text.splitlines(keepends=True):
+        if line.startswith('## '):
+            title = line[3:].strip()
+            current = next((key for name, key in keys.items() if name in title), None)
+        if current is not None:
+            result[current] += line
+    return {key: value.strip() + '\n' if value.strip() else '' for key, value in result.items()}
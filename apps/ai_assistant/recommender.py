@@ -0,0 +1,218 @@
+"""
+AI助手的景点推荐（按描述匹配）
+
+AIPlanAPIView 只认景点名称，"想看荷花和古建筑"这样不含名称的需求原来直接返回 404。现在：
+- 每个景点的介绍、标签、最佳游览季节切成汉字二元组（apps/index/search.py 的 tokenize，不补末尾单字），
+  词频取对数、按字段加权（FIELD_WEIGHTS）后乘以 IDF，每个景点的向量做 L2 归一化
+- 全部景点的向量存成按词项分列的稀疏矩阵（CSC：col_ptr / rows / weights 三个 NumPy 数组）；
+  查询同样向量化，取出查询词项对应的几列，np.bincount 一次累加出所有景点的余弦相似度，argpartition 取前 k 个
+- 景点保存或删除后（事务提交时）只重新计算这一个景点：矩阵中的旧行标记失效，新向量放入增量区单独打分（沿用当前的 IDF）；
+  增量区和失效行累计超过 COMPACT_MIN 且超过景点数的 COMPACT_RATIO 时在内存中重建矩阵、重新计算 IDF，不访问数据库
+- SPOT_RECOMMENDER_TTL 秒后从数据库整体重新加载，兜底 queryset.update() 和其他进程的修改
+
+景点名称都没解析出来时，AIPlanAPIView 用输入的文字推荐前几个景点交给规划；几千个景点的查询在 1 毫秒左右。
+"""
+import math
+import threading
+import time
+from collections import Counter, namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from apps.index.search import tokenize
+from apps.scenic.models import ScenicSpot
+
+from .resolver import serialize_spot
+
+DEFAULT_TTL = 300
+TOP_K = 3
+MAX_K = 10
+# 余弦相似度低于该值的不推荐
+MIN_SCORE = 0.05
+FIELD_WEIGHTS = (('tags', 2.0), ('best_season', 1.0), ('description', 1.0))
+COMPACT_MIN = 32
+COMPACT_RATIO = 0.05
+LOAD_FIELDS = (
+    'id', 'name', 'address', 'ticket_price', 'open_time', 'description', 'latitude', 'longitude',
+    'tags', 'best_season',
+)
+
+Recommendation = namedtuple('Recommendation', 'spot score')
+SpotMatrix = namedtuple('SpotMatrix', 'vocab idf col_ptr rows weights spot_ids row_of alive')
+
+
+def term_frequencies(spot):
+    """景点的词频（按字段加权，取对数）：{词项: 1 + ln(加权次数)}"""
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(getattr(spot, field, ''), tail=False):
+            counts[term] += weight
+    return {term: 1.0 + math.log(count) for term, count in counts.items()}
+
+
+def query_frequencies(text):
+    return {term: 1.0 + math.log(count) for term, count in Counter(tokenize(text, tail=False)).items()}
+
+
+def build_matrix(docs):
+    """docs 为 {景点ID: (景点信息, 词频)}（按模型默认排序），返回 SpotMatrix"""
+    spot_ids = list(docs)
+    df = Counter(term for spot_id in spot_ids for term in docs[spot_id][1])
+    vocab = {term: col for col, term in enumerate(df)}
+    idf = np.log((1 + len(spot_ids)) / (1 + np.fromiter(df.values(), dtype=np.float64, count=len(df)))) + 1
+
+    cols, rows, weights = [], [], []
+    for row, spot_id in enumerate(spot_ids):
+        frequencies = docs[spot_id][1]
+        if not frequencies:
+            continue
+        doc_cols = np.fromiter((vocab[term] for term in frequencies), dtype=np.int64, count=len(frequencies))
+        doc_weights = np.fromiter(frequencies.values(), dtype=np.float64, count=len(frequencies)) * idf[doc_cols]
+        cols.append(doc_cols)
+        rows.append(np.full(len(doc_cols), row, dtype=np.int64))
+        weights.append(doc_weights / np.linalg.norm(doc_weights))
+    if cols:
+        cols, rows, weights = np.concatenate(cols), np.concatenate(rows), np.concatenate(weights)
+    else:
+        cols = rows = np.zeros(0, dtype=np.int64)
+        weights = np.zeros(0)
+    # 按列排序（同一列内行号保持升序），col_ptr[c]:col_ptr[c+1] 为第 c 个词项出现的景点
+    order = np.argsort(cols, kind='stable')
+    col_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cols, minlength=len(vocab)), out=col_ptr[1:])
+    return SpotMatrix(
+        vocab, idf, col_ptr, rows[order], weights[order].astype(np.float32),
+        np.array(spot_ids, dtype=np.int64), {spot_id: row for row, spot_id in enumerate(spot_ids)},
+        np.ones(len(spot_ids), dtype=bool),
+    )
+
+
+def vectorize(frequencies, matrix):
+    """按矩阵的 IDF 计算 L2 归一化的 TF-IDF 向量 {词项: 权重}；矩阵中没有的词项按只在一个景点中出现计算"""
+    if not frequencies:
+        return {}
+    unseen_idf = math.log((1 + len(matrix.spot_ids)) / 2) + 1
+    vector = {
+        term: tf * (matrix.idf[matrix.vocab[term]] if term in matrix.vocab else unseen_idf)
+        for term, tf in frequencies.items()
+    }
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {term: weight / norm for term, weight in vector.items()}
+
+
+class SpotRecommender:
+    """按描述推荐景点的内存索引"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'SPOT_RECOMMENDER_TTL', DEFAULT_TTL)
+        self._docs = {}
+        self._matrix = None
+        self._delta = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """从数据库整体加载，返回景点数"""
+        docs = {
+            spot.id: (serialize_spot(spot), term_frequencies(spot))
+            for spot in ScenicSpot.objects.only(*LOAD_FIELDS)
+        }
+        matrix = build_matrix(docs)
+        with self._lock:
+            self._docs, self._matrix, self._delta = docs, matrix, {}
+            self._loaded_at = time.monotonic()
+        return len(docs)
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= self.ttl:
+            self.load()
+
+    # ---------- 增量更新 ----------
+
+    def update_spot(self, spot):
+        """景点保存后只重新计算这个景点（尚未加载时不处理，加载时自然包含）"""
+        frequencies = term_frequencies(spot)
+        data = serialize_spot(spot)
+        with self._lock:
+            if self._matrix is None:
+                return
+            self._docs[spot.pk] = (data, frequencies)
+            self._mask(spot.pk)
+            self._delta[spot.pk] = vectorize(frequencies, self._matrix)
+            self._maybe_compact()
+
+    def remove_spot(self, spot_id):
+        with self._lock:
+            if self._matrix is None:
+                return
+            self._docs.pop(spot_id, None)
+            self._delta.pop(spot_id, None)
+            self._mask(spot_id)
+            self._maybe_compact()
+
+    def _mask(self, spot_id):
+        row = self._matrix.row_of.get(spot_id)
+        if row is not None and self._matrix.alive[row]:
+            # 复制后再修改，正在进行的查询仍使用原来的数组
+            alive = self._matrix.alive.copy()
+            alive[row] = False
+            self._matrix = self._matrix._replace(alive=alive)
+
+    def _maybe_compact(self):
+        changed = len(self._delta) + int(len(self._matrix.alive) - self._matrix.alive.sum())
+        if changed >= max(COMPACT_MIN, COMPACT_RATIO * len(self._docs)):
+            self._matrix = build_matrix(self._docs)
+            self._delta = {}
+
+    # ---------- 查询 ----------
+
+    def recommend(self, text, k=TOP_K):
+        """按文字描述推荐景点，返回按相似度从高到低的 Recommendation 列表（最多 k 个）"""
+        self._ensure_loaded()
+        with self._lock:
+            matrix, delta, docs = self._matrix, dict(self._delta), self._docs
+        query = vectorize(query_frequencies(text), matrix)
+        if not query:
+            return []
+
+        # (相似度, 行号, 景点ID)；增量区的景点行号排在矩阵之后
+        candidates = []
+        columns = [(matrix.vocab[term], weight) for term, weight in query.items() if term in matrix.vocab]
+        if columns and len(matrix.spot_ids):
+            rows = np.concatenate([matrix.rows[matrix.col_ptr[c]:matrix.col_ptr[c + 1]] for c, _ in columns])
+            contributions = np.concatenate([
+                matrix.weights[matrix.col_ptr[c]:matrix.col_ptr[c + 1]] * weight for c, weight in columns
+            ])
+            scores = np.bincount(rows, weights=contributions, minlength=len(matrix.spot_ids))
+            scores[~matrix.alive] = 0
+            top = np.argpartition(-scores, k - 1)[:k] if len(scores) > k else np.arange(len(scores))
+            candidates.extend(
+                (float(scores[row]), int(row), int(matrix.spot_ids[row])) for row in top if scores[row] >= MIN_SCORE
+            )
+        for offset, (spot_id, vector) in enumerate(delta.items()):
+            score = sum(weight * vector.get(term, 0.0) for term, weight in query.items())
+            if score >= MIN_SCORE:
+                candidates.append((score, len(matrix.spot_ids) + offset, spot_id))
+
+        candidates.sort(key=lambda item: (-item[0], item[1]))
+        return [
+            Recommendation(dict(docs[spot_id][0]), round(score, 4))
+            for score, _, spot_id in candidates[:k] if spot_id in docs
+        ]
+
+
+spot_recommender = SpotRecommender()
+
+
+def update_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    transaction.on_commit(lambda: spot_recommender.update_spot(instance))
+
+
+def remove_on_delete(sender, instance, **kwargs):
+    spot_id = instance.pk
+    transaction.on_commit(lambda: spot_recommender.remove_spot(spot_id))
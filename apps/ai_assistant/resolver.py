@@ -0,0 +1,206 @@
+"""
+AI助手的景点名称解析
+
+原来 AIPlanAPIView 对每个输入的名称依次执行精确匹配、icontains、两次去后缀 icontains 和拼音匹配，
+一个景点最多五条查询，除精确匹配外都是全表扫描。现在景点数据和名称索引常驻进程内存：
+- 名称和别名（ScenicSpot.aliases）规范化：小写、去掉空白和标点，再去掉"风景区""景区""公园"等后缀，
+  "白洋淀景区""白洋淀风景区""白洋淀"都落到同一个键上
+- 一次解析整个名称列表，按顺序尝试：规范化后精确匹配名称或别名 -> 名称包含输入 -> 拼音或首字母前缀
+  （保存时算好的 SearchDocument.pinyin / initials，见 apps/index/pinyin.py） -> 编辑距离兜底（错字、漏字、多字）
+- 同一名称命中多个景点时，和原实现的 .first() 一样取模型默认排序（显示顺序、热门、评分）最靠前的
+- 景点保存或删除后（事务提交时）标记过期，下一次解析时整体重新加载；通过 queryset.update() 修改的数据
+  和其他进程的修改不触发信号，由 SCENIC_RESOLVER_TTL 兜底
+
+常见情况下解析不访问数据库，只有首次使用、数据变化后的第一次解析会加载（两条查询）。
+"""
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.index.models import SearchDocument
+from apps.index.pinyin import pinyin_query
+from apps.scenic.models import ScenicSpot
+
+DEFAULT_TTL = 300
+# 按长度从长到短去除，"风景名胜区"不会只去掉"景区"
+NAME_SUFFIXES = ('风景名胜区', '风景区', '旅游区', '景区', '景点', '公园')
+NON_WORD_RE = re.compile(r'[\W_]+')
+# 编辑距离兜底：输入至少 FUZZY_MIN_LENGTH 个字，距离不超过 max_distance()
+FUZZY_MIN_LENGTH = 2
+
+SpotEntry = namedtuple('SpotEntry', 'data key keys pinyin initials')
+
+
+def clean(text):
+    """小写，去掉空白和标点"""
+    return NON_WORD_RE.sub('', str(text or '').lower())
+
+
+def strip_suffix(key):
+    """去掉一个常见后缀，去掉后为空（输入就是"公园"）时保留原样"""
+    for suffix in NAME_SUFFIXES:
+        if key.endswith(suffix) and len(key) > len(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+def normalize_name(text):
+    return strip_suffix(clean(text))
+
+
+def max_distance(length):
+    return 1 if length <= 5 else 2
+
+
+def edit_distance(a, b, limit):
+    """
+    a、b 的编辑距离（插入、删除、替换、相邻交换各算一次），超过 limit 时返回 limit + 1
+    逐行计算，后面的行不可能回到 limit 以内时提前结束
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        # 相邻交换会用到上上一行，两行都超过 limit 才能确定结果超过
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def serialize_spot(spot):
+    """AI助手使用的景点信息（和原来 AIPlanAPIView 返回的字段一致）"""
+    return {
+        'id': spot.id,
+        'name': spot.name,
+        'address': spot.address,
+        'ticket_price': str(spot.ticket_price),
+        'open_time': spot.open_time,
+        'description': spot.description[:200],
+        'latitude': float(spot.latitude) if spot.latitude else None,
+        'longitude': float(spot.longitude) if spot.longitude else None,
+    }
+
+
+class ScenicResolver:
+    """景点名称解析的内存索引"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'SCENIC_RESOLVER_TTL', DEFAULT_TTL)
+        self._entries = []
+        self._by_key = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """从数据库整体加载，返回景点数"""
+        spelled = {
+            object_id: (pinyin, initials)
+            for object_id, pinyin, initials in SearchDocument.objects.filter(doc_type='scenic').values_list(
+                'object_id', 'pinyin', 'initials'
+            )
+        }
+        entries, by_key = [], {}
+        # 按模型默认排序加载，同一个键先放进去的优先
+        for spot in ScenicSpot.objects.only(
+            'id', 'name', 'address', 'ticket_price', 'open_time', 'description', 'latitude', 'longitude', 'aliases',
+        ):
+            key = clean(spot.name)
+            keys = {normalize_name(name) for name in [spot.name] + spot.get_aliases_list()} - {''}
+            entry = SpotEntry(serialize_spot(spot), key, tuple(sorted(keys)), *spelled.get(spot.id, ('', '')))
+            entries.append(entry)
+            for name_key in (key,) + entry.keys:
+                by_key.setdefault(name_key, entry)
+        self._entries, self._by_key = entries, by_key
+        self._loaded_at = time.monotonic()
+        return len(entries)
+
+    def invalidate(self):
+        """景点变化后标记过期，下一次解析时重新加载"""
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self.load()
+
+    def _match(self, name):
+        key = clean(name)
+        if not key:
+            return None
+        stripped = strip_suffix(key)
+        # 1. 规范化后精确匹配名称、别名
+        entry = self._by_key.get(key) or self._by_key.get(stripped)
+        if entry is not None:
+            return entry
+        entries = self._entries
+        # 2. 名称包含输入（去后缀前后各试一次）
+        for variant in dict.fromkeys((key, stripped)):
+            for entry in entries:
+                if variant in entry.key:
+                    return entry
+        # 3. 拼音或首字母前缀（baiyangdian、byd、白洋dian -> 白洋淀）
+        spelled = pinyin_query(name)
+        if spelled:
+            for entry in entries:
+                if entry.pinyin.startswith(spelled) or entry.initials.startswith(spelled):
+                    return entry
+        # 4. 编辑距离兜底：和去后缀的名称、别名比较，拉丁字母的输入和全拼比较
+        return self._closest(spelled or stripped, use_pinyin=bool(spelled))
+
+    def _closest(self, query, use_pinyin):
+        if len(query) < FUZZY_MIN_LENGTH:
+            return None
+        limit = max_distance(len(query))
+        best, best_distance = None, limit + 1
+        for entry in self._entries:
+            for candidate in ((entry.pinyin,) if use_pinyin else entry.keys):
+                if not candidate:
+                    continue
+                distance = edit_distance(query, candidate, best_distance - 1 if best else limit)
+                if distance < best_distance:
+                    best, best_distance = entry, distance
+                    if distance == 0:
+                        return best
+        return best
+
+    def resolve(self, names):
+        """
+        解析名称列表，返回 (找到的景点信息列表, 未找到的名称列表)，都按输入顺序
+        空白名称跳过
+        """
+        self._ensure_loaded()
+        found, missing = [], []
+        for name in names:
+            name = str(name or '').strip()
+            if not name:
+                continue
+            entry = self._match(name)
+            if entry is None:
+                missing.append(name)
+            else:
+                found.append(dict(entry.data))
+        return found, missing
+
+
+scenic_resolver = ScenicResolver()
+
+
+def invalidate_on_change(sender, **kwargs):
+    if kwargs.get('raw'):
+        return
+    transaction.on_commit(scenic_resolver.invalidate)
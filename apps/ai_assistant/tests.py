@@ -0,0 +1,612 @@
+import asyncio
+import itertools
+import json
+import random
+import time
+import warnings
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.scenic.models import ScenicSpot
+from apps.users.models import CustomUser
+from . import optimizer, plan_cache, providers, recommender, resolver
+from .models import AIPlanResult, AIQuery
+from .mock_provider import MockProviderServer
+from .plan_cache import PlanCache, normalize_input, plan_key
+from .recommender import SpotRecommender
+from .providers import AsyncProviderClient, CircuitBreaker, ProviderClient, ProviderRegistry
+from .resolver import ScenicResolver, edit_distance, normalize_name
+
+
+def create_spot(name, **fields):
+    fields.setdefault('address', '保定市')
+    fields.setdefault('description', '介绍')
+    fields.setdefault('open_time', '8:00-18:00')
+    return ScenicSpot.objects.create(name=name, ticket_price=40, **fields)
+
+
+def use_fresh_plan_cache(test):
+    """测试之间不共享进程内的规划缓存"""
+    cache = PlanCache(max_entries=4, ttl=60)
+    patcher = mock.patch.object(plan_cache, 'plan_cache', cache)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return cache
+
+
+class ScenicResolverTests(TestCase):
+    """AI助手景点名称解析测试"""
+
+    def setUp(self):
+        self.lake = create_spot('白洋淀', aliases='华北明珠，白洋淀荷花大观园')
+        self.lotus = create_spot('古莲花池')
+        self.mansion = create_spot('直隶总督署', display_order=1)
+        self.mountain = create_spot('野三坡风景区')
+        self.resolver = ScenicResolver()
+        use_fresh_plan_cache(self)
+
+    def resolve_ids(self, names):
+        found, missing = self.resolver.resolve(names)
+        return [spot['id'] for spot in found], missing
+
+    def test_normalize_strips_suffix_and_punctuation(self):
+        self.assertEqual(normalize_name(' 白洋淀 景区 '), '白洋淀')
+        self.assertEqual(normalize_name('野三坡风景区'), '野三坡')
+        self.assertEqual(normalize_name('Baiyangdian!'), 'baiyangdian')
+        self.assertEqual(normalize_name('公园'), '公园')
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('古莲池', '古莲花池', 2), 1)
+        self.assertEqual(edit_distance('baiyangdain', 'baiyangdian', 2), 1)
+        self.assertEqual(edit_distance('直隶总督署', '白洋淀', 2), 3)
+
+    def test_resolves_list_in_order(self):
+        ids, missing = self.resolve_ids(['白洋淀景区', '华北明珠', '野三坡', '总督', 'byd', '古莲池', '天安门', ' '])
+        self.assertEqual(ids, [self.lake.id, self.lake.id, self.mountain.id, self.mansion.id, self.lake.id, self.lotus.id])
+        self.assertEqual(missing, ['天安门'])
+
+    def test_pinyin_typo_falls_back_to_edit_distance(self):
+        self.assertEqual(self.resolve_ids(['baiyangdain', 'gulianhuchi'])[0], [self.lake.id, self.lotus.id])
+
+    def test_ambiguous_name_prefers_default_ordering(self):
+        create_spot('白洋淀码头', display_order=5)
+        self.assertEqual(self.resolve_ids(['白洋'])[0], [self.lake.id])
+
+    def test_resolve_does_not_query_after_load(self):
+        self.resolver.load()
+        with self.assertNumQueries(0):
+            ids, _ = self.resolve_ids(['白洋淀', 'zhili', '古莲池', '不存在的景点'])
+        self.assertEqual(ids, [self.lake.id, self.mansion.id, self.lotus.id])
+
+    def test_reloads_after_spot_changes(self):
+        self.resolver.load()
+        with mock.patch.object(resolver, 'scenic_resolver', self.resolver):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.lotus.name = '莲池书院'
+                self.lotus.save()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.mountain.delete()
+        ids, missing = self.resolve_ids(['莲池书院', '野三坡'])
+        self.assertEqual(ids, [self.lotus.id])
+        self.assertEqual(missing, ['野三坡'])
+
+    def test_plan_api_uses_resolver(self):
+        self.resolver.load()
+        # 解析景点不查库；规划缓存未命中时查一次 AIPlanResult、写入一条
+        with mock.patch.object(resolver, 'scenic_resolver', self.resolver), self.assertNumQueries(2):
+            response = self.client.post(
+                '/api/v1/ai-assistant/plan/', {'scenic_spots': ['白洋淀风景区', '火星']}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([spot['id'] for spot in data['scenic_spots']], [self.lake.id])
+        self.assertIn('火星', data['warning'])
+
+
+def make_spot(spot_id, lat, lng):
+    return {'id': spot_id, 'name': f'景点{spot_id}', 'address': '保定市', 'ticket_price': '0', 'open_time': '全天',
+            'description': '介绍', 'latitude': lat, 'longitude': lng}
+
+
+class RouteOptimizerTests(TestCase):
+    """AI助手行程顺序优化测试"""
+
+    def setUp(self):
+        use_fresh_plan_cache(self)
+
+    def test_parse_days(self):
+        self.assertEqual(optimizer.parse_days('希望一天完成'), 1)
+        self.assertEqual(optimizer.parse_days('两天时间'), 2)
+        self.assertEqual(optimizer.parse_days('5日游'), 5)
+        self.assertIsNone(optimizer.parse_days('带老人出行'))
+
+    def test_parse_days_ignores_dates(self):
+        self.assertEqual(optimizer.parse_days('5月3日出发，玩两天'), 2)
+        self.assertEqual(optimizer.parse_days('12月31日去两天'), 2)
+        self.assertIsNone(optimizer.parse_days('周六去，10月1日'))
+        self.assertIsNone(optimizer.parse_days('五月十一日出发，第二天回来'))
+        self.assertEqual(optimizer.parse_days('国庆十二天'), 12)
+        self.assertEqual(optimizer.parse_days('10月1日起3日游'), 3)
+
+    def test_exact_path_matches_brute_force(self):
+        rng = random.Random(7)
+        for n in (4, 6, 8):
+            points = tuple((38 + rng.random(), 115 + rng.random()) for _ in range(n))
+            matrix = optimizer.distance_matrix(points)
+            best = min(optimizer.path_length(p, matrix) for p in itertools.permutations(range(n)))
+            self.assertAlmostEqual(optimizer.path_length(optimizer.exact_path(matrix), matrix), best)
+
+    def test_spots_on_a_line_are_visited_in_order(self):
+        rng = random.Random(3)
+        spots = [make_spot(i, 38.8, 115.0 + i * 0.05) for i in range(20)]
+        shuffled = spots[:]
+        rng.shuffle(shuffled)
+        started = time.perf_counter()
+        itinerary = optimizer.plan_itinerary(shuffled)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        order = [spot['id'] for spot in itinerary.spots]
+        self.assertIn(order, [list(range(20)), list(range(19, -1, -1))])
+        self.assertEqual(len(itinerary.days), 20)
+
+    def test_days_group_nearby_spots(self):
+        # 两组景点相距约 100 公里，两天行程各游览一组
+        west = [make_spot(i, 38.8 + i * 0.01, 115.0) for i in range(3)]
+        east = [make_spot(10 + i, 38.8 + i * 0.01, 116.2) for i in range(3)]
+        spots = [east[0], west[0], east[1], west[1], east[2], west[2]]
+        itinerary = optimizer.plan_itinerary(spots, days=2)
+        days = [{spot['id'] for spot in day} for day in itinerary.days]
+        self.assertCountEqual(days, [{0, 1, 2}, {10, 11, 12}])
+        self.assertEqual(len(itinerary.legs), 5)
+        self.assertGreater(max(leg.distance_km for leg in itinerary.legs), 100)
+
+    def test_spots_without_location_go_last(self):
+        spots = [make_spot(1, None, None), make_spot(2, 38.8, 115.5), make_spot(3, 38.8, 115.0)]
+        itinerary = optimizer.plan_itinerary(spots, days=1)
+        self.assertEqual(itinerary.spots[-1]['id'], 1)
+        self.assertIsNone(itinerary.legs[-1])
+        self.assertEqual(len(itinerary.days), 1)
+
+    def test_plan_api_orders_spots_by_distance(self):
+        far = create_spot('远处景点', latitude='38.8000000', longitude='116.0000000')
+        near = create_spot('近处景点', latitude='38.8000000', longitude='115.1000000')
+        start = create_spot('起点景点', latitude='38.8000000', longitude='115.0000000')
+        with mock.patch.object(resolver, 'scenic_resolver', ScenicResolver()):
+            response = self.client.post('/api/v1/ai-assistant/plan/', {
+                'scenic_spots': ['远处景点', '起点景点', '近处景点'], 'query_type': 'route', 'user_input': '两天',
+            }, content_type='application/json')
+        data = response.json()['data']
+        self.assertIn([spot['id'] for spot in data['scenic_spots']], [[far.id, near.id, start.id], [start.id, near.id, far.id]])
+        self.assertEqual(len(data['plan']['itinerary']['days']), 2)
+        self.assertIn('车程约', data['plan']['route_plan'])
+
+    def test_route_plan_follows_opening_hours(self):
+        create_spot('晚开景点', open_time='10:00-16:00，周一闭馆', latitude='38.8000000', longitude='115.0000000')
+        create_spot('早关景点', open_time='8:00-13:00', latitude='38.8000000', longitude='115.0500000')
+        create_spot('常规景点', open_time='8:30-18:00', latitude='38.8000000', longitude='115.1000000')
+
+        def route_plan(spots, user_input):
+            with mock.patch.object(resolver, 'scenic_resolver', ScenicResolver()):
+                response = self.client.post('/api/v1/ai-assistant/plan/', {
+                    'scenic_spots': spots, 'query_type': 'route', 'user_input': user_input,
+                }, content_type='application/json')
+            return response.json()['data']['plan']['route_plan']
+
+        plan = route_plan(['晚开景点'], '周二出发')
+        self.assertIn('上午（10:00-12:00）', plan)
+        self.assertIn('下午（13:30-16:00）', plan)
+        self.assertIn('晚开景点周一不开放', route_plan(['晚开景点'], '周一出发'))
+
+        # 三个景点在一条线上，两个方向路程相同：晚开景点放在傍晚时已闭园，选从晚开景点出发的方向；
+        # 早关景点在中间，下午已闭园，给出提示
+        plan = route_plan(['常规景点', '早关景点', '晚开景点'], '一天，周二')
+        self.assertIn('### 上午：晚开景点\n\n- **时间**：10:00-12:00', plan)
+        self.assertIn('早关景点开放时间为8:00-13:00', plan)
+        self.assertIn('### 傍晚：常规景点', plan)
+        self.assertIn('**时间**：17:00-18:00', plan)
+
+        plan = route_plan(['晚开景点', '常规景点'], '两天，周日出发')
+        self.assertIn('**周日开放时间**：10:00-16:00', plan)
+        self.assertIn('**周一开放时间**：8:30-18:00', plan)
+        plan = route_plan(['晚开景点', '常规景点'], '两天')
+        self.assertIn('**闭馆日**：周一', plan)
+
+
+class PlanCacheTests(TestCase):
+    """AI规划结果缓存测试"""
+
+    def setUp(self):
+        self.cache = use_fresh_plan_cache(self)
+        self.mansion = create_spot('直隶总督署', latitude='38.8900000', longitude='115.4700000')
+        self.lotus = create_spot('古莲花池', latitude='38.8700000', longitude='115.4800000')
+        self.lake = create_spot('白洋淀', latitude='38.9400000', longitude='115.9300000')
+        self.user = CustomUser.objects.create_user(username='planner', password='pass12345')
+        patcher = mock.patch.object(resolver, 'scenic_resolver', ScenicResolver())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def plan(self, spots, user_input='', query_type='general'):
+        response = self.client.post('/api/v1/ai-assistant/plan/', {
+            'scenic_spots': spots, 'query_type': query_type, 'user_input': user_input,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_key_ignores_spot_order_and_input_formatting(self):
+        self.assertEqual(normalize_input('  两天，带老人！ '), '两天,带老人')
+        self.assertEqual(plan_key([3, 1], 'general', 'ＡＢ  c'), plan_key([1, 3], 'general', 'ab c。'))
+        self.assertNotEqual(plan_key([1, 3], 'general', ''), plan_key([1, 3], 'route', ''))
+
+    def test_repeated_request_hits_cache_and_shares_plan(self):
+        self.client.force_login(self.user)
+        first = self.plan(['直隶总督署', '古莲花池'], '两天')
+        self.assertFalse(first['cached'])
+        with mock.patch('apps.ai_assistant.api.AIPlanAPIView._generate_plan') as generate:
+            second = self.plan(['古莲花池', '直隶总督署'], ' 两天 ')
+        generate.assert_not_called()
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['plan'], first['plan'])
+        self.assertEqual([s['id'] for s in second['scenic_spots']], [s['id'] for s in first['scenic_spots']])
+
+        self.assertEqual(AIPlanResult.objects.count(), 1)
+        queries = AIQuery.objects.filter(user=self.user)
+        self.assertEqual(queries.count(), 2)
+        self.assertEqual({q.plan_result_id for q in queries}, {AIPlanResult.objects.get().id})
+        self.assertIsNone(queries[0].route_plan)
+
+        detail = self.client.get(f'/api/v1/ai-assistant/query/{second["query_id"]}/').json()['data']
+        self.assertEqual(detail['route_plan'], first['plan']['route_plan'])
+        export = self.client.get(f'/api/v1/ai-assistant/query/{second["query_id"]}/export/')
+        self.assertIn(first['plan']['strategy_plan'], export.content.decode('utf-8'))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+
+    def test_other_process_result_is_found_in_database(self):
+        first = self.plan(['直隶总督署'])
+        self.cache.clear()
+        second = self.plan(['直隶总督署'])
+        self.assertTrue(second['cached'])
+        self.assertEqual(second['plan'], first['plan'])
+        self.assertEqual(self.cache.stats()['db_hits'], 1)
+
+    def test_spot_change_invalidates_plans_containing_it(self):
+        self.plan(['直隶总督署', '古莲花池'])
+        self.plan(['白洋淀'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lotus.ticket_price = 60
+            self.lotus.save()
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+        self.assertEqual(AIPlanResult.objects.filter(is_valid=True).count(), 1)
+        self.assertTrue(self.plan(['白洋淀'])['cached'])
+        with mock.patch.object(resolver, 'scenic_resolver', ScenicResolver()):
+            data = self.plan(['直隶总督署', '古莲花池'])
+        self.assertFalse(data['cached'])
+        self.assertIn('¥100.00', data['plan']['strategy_plan'])
+
+    def test_lru_evicts_least_recently_used(self):
+        for name in ('直隶总督署', '古莲花池', '白洋淀'):
+            self.plan([name])
+        self.plan(['直隶总督署'])
+        for query_type in ('route', 'transport'):
+            self.plan(['白洋淀'], query_type=query_type)
+        stats = self.cache.stats()
+        self.assertEqual((stats['size'], stats['evictions']), (4, 1))
+        # 古莲花池最久未使用，被淘汰后从数据库取回
+        self.assertTrue(self.plan(['古莲花池'])['cached'])
+        self.assertEqual(self.cache.stats()['db_hits'], 1)
+
+    def test_stats_api_requires_staff(self):
+        self.assertEqual(self.client.get('/api/v1/ai-assistant/cache-stats/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        data = self.client.get('/api/v1/ai-assistant/cache-stats/').json()['data']
+        self.assertEqual(data['max_entries'], 4)
+
+    def test_export_corpus_from_recorded_queries(self):
+        self.client.force_login(self.user)
+        self.plan(['直隶总督署'])
+        self.plan(['白洋淀'], '两天', query_type='route')
+        out = StringIO()
+        call_command('export_ai_corpus', stdout=out)
+        corpus = json.loads(out.getvalue())
+        # 按查询先后导出，自动生成的"规划X的旅游"导出为空
+        self.assertEqual(corpus['requests'], [
+            {'scenic_spots': ['直隶总督署'], 'query_type': 'general', 'user_input': ''},
+            {'scenic_spots': ['白洋淀'], 'query_type': 'route', 'user_input': '两天'},
+        ])
+        spots = {spot['name']: spot for spot in corpus['spots']}
+        self.assertEqual(sorted(spots), ['白洋淀', '直隶总督署'])
+        self.assertEqual((spots['白洋淀']['latitude'], spots['白洋淀']['aliases']), ('38.9400000', None))
+
+
+class SpotRecommenderTests(TestCase):
+    """按描述推荐景点测试"""
+
+    def setUp(self):
+        self.lotus = create_spot('古莲花池', tags='园林,荷花,古建筑', best_season='夏季',
+                                 description='始建于元代的北方园林，夏季满池荷花，亭台楼阁保存完好')
+        self.mansion = create_spot('直隶总督署', tags='古建筑,历史', best_season='四季',
+                                   description='保存最完整的清代省级衙署，古建筑群规模宏大')
+        self.lake = create_spot('白洋淀', tags='湖泊,荷花,游船', best_season='夏季',
+                                description='华北最大的淡水湖，夏天可以乘船赏荷花、吃鱼')
+        self.mountain = create_spot('野三坡', tags='山水,徒步', best_season='秋季',
+                                    description='山高谷深，适合徒步和漂流')
+        self.recommender = SpotRecommender()
+        use_fresh_plan_cache(self)
+        for patcher in (mock.patch.object(resolver, 'scenic_resolver', ScenicResolver()),
+                        mock.patch.object(recommender, 'spot_recommender', self.recommender)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def names(self, text, k=3):
+        return [item.spot['name'] for item in self.recommender.recommend(text, k=k)]
+
+    def test_ranks_spots_by_description(self):
+        names = self.names('想看荷花和古建筑')
+        self.assertEqual(names[0], '古莲花池')
+        self.assertEqual(set(names), {'古莲花池', '白洋淀', '直隶总督署'})
+        self.assertEqual(self.names('秋天去徒步', k=1), ['野三坡'])
+        self.assertEqual(self.names('火星基地'), [])
+        self.assertEqual(self.names(''), [])
+
+    def test_recommend_does_not_query_after_load(self):
+        self.recommender.load()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('夏季赏荷花', k=2), ['白洋淀', '古莲花池'])
+
+    def test_incremental_update_and_delete(self):
+        self.recommender.load()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mountain.tags = '荷花,古建筑'
+            self.mountain.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lotus.delete()
+        with self.assertNumQueries(0):
+            names = self.names('想看荷花和古建筑')
+        self.assertEqual(names[0], '野三坡')
+        self.assertNotIn('古莲花池', names)
+
+    def test_compacts_after_many_updates(self):
+        self.recommender.load()
+        with mock.patch.object(recommender, 'COMPACT_MIN', 2), self.captureOnCommitCallbacks(execute=True):
+            self.lake.delete()
+            self.mountain.tags = '荷花'
+            self.mountain.save()
+        # 失效行 + 增量区达到 2 个时重建矩阵
+        self.assertEqual(self.recommender._delta, {})
+        self.assertEqual(len(self.recommender._matrix.spot_ids), 3)
+        self.assertEqual(self.names('荷花', k=2), ['野三坡', '古莲花池'])
+
+    def test_plan_api_recommends_when_no_name_resolves(self):
+        response = self.client.post('/api/v1/ai-assistant/plan/', {
+            'scenic_spots': [], 'user_input': '想看荷花和古建筑',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual({spot['name'] for spot in data['scenic_spots']}, {'古莲花池', '白洋淀', '直隶总督署'})
+        self.assertIn('推荐', data['warning'])
+
+        response = self.client.post('/api/v1/ai-assistant/plan/', {'scenic_spots': ['火星']},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post('/api/v1/ai-assistant/plan/', {'scenic_spots': []},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_recommend_api(self):
+        data = self.client.get('/api/v1/ai-assistant/recommend/', {'q': '荷花', 'limit': 1}).json()['data']
+        self.assertEqual([spot['name'] for spot in data], ['白洋淀'])
+        self.assertGreater(data[0]['score'], 0)
+        self.assertEqual(self.client.get('/api/v1/ai-assistant/recommend/').status_code, 400)
+
+
+async def read_chunks(response):
+    """按到达顺序读取流式响应：[(到达时间, 内容), ...]"""
+    return [(time.monotonic(), chunk) async for chunk in response.streaming_content]
+
+
+def read_events(response):
+    """解析流式接口返回的 server-sent events：[(事件名, 数据), ...]"""
+    body = b''.join(chunk for _, chunk in async_to_sync(read_chunks)(response)).decode('utf-8')
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+class ProviderClientTests(TestCase):
+    """大模型服务商客户端测试（使用本地模拟服务）"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = MockProviderServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.latency = 0
+        self.server.fail_status = 0
+        self.messages = providers.build_messages(
+            [{'name': '直隶总督署', 'address': '保定市', 'open_time': '8:30-18:00', 'ticket_price': 30}],
+            'general', '带老人',
+        )
+
+    def provider_client(self, **options):
+        options.setdefault('breaker', CircuitBreaker(2, 30))
+        return ProviderClient('openai', self.server.base_url, 'test-key', 'gpt-test', **options)
+
+    def test_streams_text_and_reuses_connection(self):
+        client = self.provider_client()
+        connections = self.server.connections
+        chunks = list(client.stream_chat(self.messages))
+        self.assertGreater(len(chunks), 1)
+        sections = providers.split_sections(''.join(chunks))
+        for key in ('route_plan', 'transport_plan', 'strategy_plan'):
+            self.assertIn('直隶总督署', sections[key])
+        self.assertEqual(client.chat(self.messages), ''.join(chunks))
+        self.assertEqual(client.pool.created, 1)
+        self.assertEqual(self.server.connections - connections, 1)
+
+    def test_failures_open_circuit_until_reset(self):
+        now = [0.0]
+        client = self.provider_client(breaker=CircuitBreaker(2, 30, clock=lambda: now[0]))
+        self.server.fail_status = 503
+        for _ in range(2):
+            with self.assertRaises(providers.ProviderError):
+                client.chat(self.messages)
+        self.assertEqual(client.breaker.state, 'open')
+        requests = self.server.requests
+        with self.assertRaises(providers.CircuitOpen):
+            client.chat(self.messages)
+        self.assertEqual(self.server.requests, requests)
+
+        # 熔断期过后放行一次试探调用，成功后恢复
+        now[0] = 31
+        self.server.fail_status = 0
+        self.assertEqual(client.breaker.state, 'half_open')
+        self.assertTrue(client.chat(self.messages))
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_read_timeout(self):
+        self.server.latency = 0.5
+        with self.assertRaises(providers.ProviderTimeout):
+            self.provider_client(read_timeout=0.1).chat(self.messages)
+
+    def test_concurrency_limit(self):
+        client = self.provider_client(max_concurrency=1, queue_timeout=0.05)
+        first = client.stream_chat(self.messages)
+        next(first)
+        with self.assertRaises(providers.ProviderBusy):
+            client.chat(self.messages)
+        # 中途放弃的调用释放名额，不计为失败
+        first.close()
+        self.assertTrue(client.chat(self.messages))
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_async_client_shares_breaker_and_reuses_connection(self):
+        client = self.provider_client()
+
+        async def run():
+            async_client = AsyncProviderClient(client)
+            texts = [await async_client.chat(self.messages) for _ in range(2)]
+            self.assertEqual(async_client.created, 1)
+            self.server.fail_status = 502
+            for _ in range(2):
+                with self.assertRaises(providers.ProviderError):
+                    await async_client.chat(self.messages)
+            with self.assertRaises(providers.CircuitOpen):
+                client.chat(self.messages)
+            # 失败的调用关闭了连接，池中不再有空闲连接
+            self.assertEqual(async_client._idle, [])
+            return texts
+
+        texts = asyncio.run(run())
+        self.assertEqual(texts[0], texts[1])
+        self.assertIn('直隶总督署', texts[0])
+
+    def test_async_client_read_timeout(self):
+        self.server.latency = 0.5
+
+        async def run():
+            await AsyncProviderClient(self.provider_client(read_timeout=0.1)).chat(self.messages)
+
+        with self.assertRaises(providers.ProviderTimeout):
+            asyncio.run(run())
+
+    def use_provider_for_plan_api(self):
+        """规划接口改用本地模拟服务，景点解析、规划缓存和客户端都不与其他测试共享"""
+        create_spot('直隶总督署', latitude='38.8900000', longitude='115.4700000')
+        use_fresh_plan_cache(self)
+        registry = ProviderRegistry()
+        self.addCleanup(registry.reset)
+        patches = [
+            mock.patch.object(resolver, 'scenic_resolver', ScenicResolver()),
+            mock.patch.object(providers, 'registry', registry),
+            mock.patch.object(providers, 'async_registry', providers.AsyncProviderRegistry(registry)),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        settings_override = override_settings(
+            USE_AI_API=True, AI_PROVIDER='dashscope', AI_API_BASE_URL=self.server.base_url
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_plan_api_uses_provider_and_falls_back(self):
+        self.use_provider_for_plan_api()
+
+        def plan(query_type):
+            response = self.client_post('/api/v1/ai-assistant/plan/', query_type)
+            return response.json()['data']['plan']
+
+        data = plan('route')
+        self.assertEqual(data['source'], 'ai')
+        self.assertIn('模拟服务', data['route_plan'])
+        self.assertEqual(data['transport_plan'], '')
+
+        self.server.fail_status = 500
+        with self.assertLogs('apps.ai_assistant.api', 'WARNING'):
+            data = plan('transport')
+        self.assertEqual(data['source'], 'rules')
+        self.assertTrue(data['transport_plan'])
+
+        # 流式接口：规则引擎的内容按整段输出，最后是完整结果
+        with self.assertLogs('apps.ai_assistant.api', 'WARNING'):
+            events = read_events(self.client_post('/api/v1/ai-assistant/plan/stream/', 'strategy'))
+        self.assertEqual([name for name, _ in events], ['meta', 'delta', 'done'])
+        self.assertEqual(events[-1][1]['plan']['source'], 'rules')
+
+        self.server.fail_status = 0
+        events = read_events(self.client_post('/api/v1/ai-assistant/plan/stream/', 'general'))
+        self.assertGreater(len([name for name, _ in events if name == 'delta']), 3)
+        done = events[-1][1]
+        self.assertEqual(done['plan']['source'], 'ai')
+        self.assertEqual(''.join(data['text'] for name, data in events if name == 'delta').count('模拟服务'), 3)
+        self.assertEqual(done['scenic_spots'][0]['name'], '直隶总督署')
+
+        # 再次请求命中缓存，不调用服务商
+        requests = self.server.requests
+        events = read_events(self.client_post('/api/v1/ai-assistant/plan/stream/', 'general'))
+        self.assertEqual([name for name, _ in events], ['meta', 'done'])
+        self.assertTrue(events[0][1]['cached'])
+        self.assertEqual(events[-1][1]['plan'], done['plan'])
+        self.assertEqual(self.server.requests, requests)
+
+    def test_stream_api_sends_chunks_as_they_arrive_under_asgi(self):
+        self.use_provider_for_plan_api()
+        self.server.chunk_delay = 0.02
+        self.addCleanup(setattr, self.server, 'chunk_delay', 0)
+
+        async def stream():
+            response = await self.async_client.post('/api/v1/ai-assistant/plan/stream/', {
+                'scenic_spots': ['直隶总督署'], 'query_type': 'route',
+            }, content_type='application/json')
+            self.assertTrue(response.is_async)
+            return await read_chunks(response)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            chunks = async_to_sync(stream)()
+        self.assertEqual([str(w.message) for w in caught if 'synchronous iterators' in str(w.message)], [])
+
+        # 大模型每输出一段就发送一段，而不是生成完再一起发送
+        deltas = [arrived for arrived, chunk in chunks if chunk.startswith(b'event: delta')]
+        self.assertGreater(len(deltas), 3)
+        self.assertGreater(deltas[-1] - deltas[0], self.server.chunk_delay * (len(deltas) - 2))
+        self.assertTrue(chunks[-1][1].startswith(b'event: done'))
+
+    def client_post(self, url, query_type):
+        return self.client.post(url, {
+            'scenic_spots': ['直隶总督署'], 'query_type': query_type,
+        }, content_type='application/json')
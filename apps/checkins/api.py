@@ -1,6 +1,8 @@
+from asgiref.sync import sync_to_async
 from django.http import JsonResponse
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
 from django.utils import timezone
 from django.db.models import Q
 import json
@@ -8,7 +10,7 @@ from .models import CheckIn, CheckInPhoto
 from apps.scenic.models import ScenicSpot
 
 
-class CheckInCreateAPIView(LoginRequiredMixin, View):
+class CheckInCreateAPIView(View):
     """
     创建打卡记录API
     POST /api/v1/checkins/
@@ -20,9 +22,17 @@ class CheckInCreateAPIView(LoginRequiredMixin, View):
     - notes: 备注（可选）
     - is_public: 是否公开（可选，默认True）
     - photos: 照片文件列表（可选，通过FormData上传）
+    异步视图：ASGI 下上传内容由服务器异步接收，慢速上传不占用线程；
+    解析表单、保存照片文件和写库在线程中执行（sync_to_async），不阻塞事件循环
     """
     
-    def post(self, request):
+    async def post(self, request):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await sync_to_async(self._create)(request, user)
+    
+    def _create(self, request, user):
         try:
             # 获取景点ID
             scenic_spot_id = request.POST.get('scenic_spot_id') or (
@@ -62,7 +72,7 @@ class CheckInCreateAPIView(LoginRequiredMixin, View):
             
             # 创建打卡记录
             checkin = CheckIn.objects.create(
-                user=request.user,
+                user=user,
                 scenic_spot=scenic_spot,
                 checkin_time=checkin_time,
                 latitude=float(latitude) if latitude else None,
@@ -109,7 +119,7 @@ class CheckInCreateAPIView(LoginRequiredMixin, View):
             return JsonResponse({
                 "status": "error",
                 "message": f"打卡失败：{str(e)}",
-                "debug": traceback.format_exc() if request.user.is_staff else None
+                "debug": traceback.format_exc() if user.is_staff else None
             }, status=500)
 
 
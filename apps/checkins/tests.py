@@ -1,3 +1,58 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from apps.scenic.models import ScenicSpot
+from apps.users.models import CustomUser
+from .models import CheckIn, CheckInPhoto
+
+# 1x1 像素的 GIF
+PIXEL_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+
+class CheckInCreateAPITests(TestCase):
+    """打卡API（异步视图）测试"""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='checkin_media_')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.spot = ScenicSpot.objects.create(
+            name='直隶总督署', address='保定市', ticket_price=30, open_time='8:30-18:00', description='介绍'
+        )
+        self.user = CustomUser.objects.create_user(username='traveler', password='pass12345')
+
+    def test_login_required(self):
+        response = self.client.post('/api/v1/checkins/create/', {'scenic_spot_id': self.spot.id})
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('next=/api/v1/checkins/create/', response['Location'])
+        self.assertFalse(CheckIn.objects.exists())
+
+    def test_create_with_photos(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/api/v1/checkins/create/', {
+            'scenic_spot_id': self.spot.id,
+            'notes': '到此一游',
+            'is_public': 'false',
+            'photos': [SimpleUploadedFile(f'p{i}.gif', PIXEL_GIF, content_type='image/gif') for i in range(2)],
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['scenic_spot_name'], data['is_public']), ('直隶总督署', False))
+        checkin = CheckIn.objects.get(id=data['id'])
+        self.assertEqual(checkin.user, self.user)
+        photos = CheckInPhoto.objects.filter(checkin=checkin).order_by('order')
+        self.assertEqual(photos.count(), 2)
+        self.assertEqual(photos[0].photo.read(), PIXEL_GIF)
+
+    def test_missing_spot(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.post('/api/v1/checkins/create/', {}).status_code, 400)
+        self.assertEqual(self.client.post('/api/v1/checkins/create/', {'scenic_spot_id': 999}).status_code, 404)
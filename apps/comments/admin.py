@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Comment
+from .models import Comment, RatingAggregate
+from .ratings import refresh_aggregates
 
 
 @admin.register(Comment)
@@ -64,12 +65,32 @@ class CommentAdmin(admin.ModelAdmin):
     
     def mark_as_deleted(self, request, queryset):
         """批量标记为已删除"""
+        targets = set(queryset.values_list('target_type', 'target_id'))
         count = queryset.update(is_deleted=True)
+        refresh_aggregates(targets)
         self.message_user(request, f"已将 {count} 条评论标记为已删除")
     mark_as_deleted.short_description = "标记为已删除"
     
     def mark_as_undeleted(self, request, queryset):
         """批量标记为未删除"""
+        targets = set(queryset.values_list('target_type', 'target_id'))
         count = queryset.update(is_deleted=False)
+        refresh_aggregates(targets)
         self.message_user(request, f"已将 {count} 条评论标记为未删除")
     mark_as_undeleted.short_description = "标记为未删除"
+
+
+@admin.register(RatingAggregate)
+class RatingAggregateAdmin(admin.ModelAdmin):
+    """评分汇总（由评论自动维护，只读）"""
+    list_display = ('target_type', 'target_id', 'count', 'average', 'star_5', 'star_4', 'star_3', 'star_2', 'star_1', 'updated_at')
+    list_filter = ('target_type',)
+    search_fields = ('target_id',)
+    readonly_fields = [field.name for field in RatingAggregate._meta.fields]
+
+    def average(self, obj):
+        return obj.average
+    average.short_description = "平均分"
+
+    def has_add_permission(self, request):
+        return False
@@ -5,3 +5,14 @@ class CommentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.comments'
     verbose_name = '评论管理'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save, pre_save
+
+        from .models import Comment
+        from .ratings import comment_post_delete, comment_post_save, comment_pre_save
+
+        # 评论新增、删除、修改评分时增量更新评分汇总
+        pre_save.connect(comment_pre_save, sender=Comment, dispatch_uid='comments_rating_pre_save')
+        post_save.connect(comment_post_save, sender=Comment, dispatch_uid='comments_rating_post_save')
+        post_delete.connect(comment_post_delete, sender=Comment, dispatch_uid='comments_rating_post_delete')
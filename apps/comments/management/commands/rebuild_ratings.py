@@ -0,0 +1,17 @@
+"""
+管理命令：按评论表一次性重建全部评分汇总，并同步景点、路线、酒店、美食的 rating 字段
+
+汇总平时由评论的新增、删除增量维护；直接改库、批量 update 等绕过信号的操作之后用本命令修复：
+python manage.py rebuild_ratings
+"""
+from django.core.management.base import BaseCommand
+
+from apps.comments.ratings import rebuild_all_aggregates
+
+
+class Command(BaseCommand):
+    help = '按评论表重建全部评分汇总'
+
+    def handle(self, *args, **options):
+        count = rebuild_all_aggregates()
+        self.stdout.write(self.style.SUCCESS(f'已重建 {count} 个对象的评分汇总'))
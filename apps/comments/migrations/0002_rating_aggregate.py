@@ -0,0 +1,64 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:09
+
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_aggregates(apps, schema_editor):
+    """按已有的有效评论生成评分汇总（对象的 rating 字段由 rebuild_ratings 命令同步）"""
+    Comment = apps.get_model('comments', 'Comment')
+    RatingAggregate = apps.get_model('comments', 'RatingAggregate')
+    stars = defaultdict(dict)
+    rows = Comment.objects.filter(is_deleted=False).values('target_type', 'target_id', 'rating').annotate(n=Count('id'))
+    for row in rows:
+        stars[(row['target_type'], row['target_id'])][row['rating']] = row['n']
+    RatingAggregate.objects.bulk_create([
+        RatingAggregate(
+            target_type=target_type, target_id=target_id,
+            count=sum(counts.values()), total=sum(star * n for star, n in counts.items()),
+            **{f'star_{star}': counts.get(star, 0) for star in range(1, 6)}
+        )
+        for (target_type, target_id), counts in stars.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(choices=[('scenic', '景点'), ('route', '路线'), ('hotel', '酒店'), ('news', '资讯'), ('food', '美食')], max_length=20, verbose_name='关联对象类型')),
+                ('target_id', models.PositiveIntegerField(verbose_name='关联对象ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='评价数')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='评分总和')),
+                ('star_1', models.PositiveIntegerField(default=0, verbose_name='1星')),
+                ('star_2', models.PositiveIntegerField(default=0, verbose_name='2星')),
+                ('star_3', models.PositiveIntegerField(default=0, verbose_name='3星')),
+                ('star_4', models.PositiveIntegerField(default=0, verbose_name='4星')),
+                ('star_5', models.PositiveIntegerField(default=0, verbose_name='5星')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '评分汇总',
+                'verbose_name_plural': '评分汇总',
+            },
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='target_type',
+            field=models.CharField(choices=[('scenic', '景点'), ('route', '路线'), ('hotel', '酒店'), ('news', '资讯'), ('food', '美食')], max_length=20, verbose_name='关联对象类型'),
+        ),
+        migrations.AddConstraint(
+            model_name='ratingaggregate',
+            constraint=models.UniqueConstraint(fields=('target_type', 'target_id'), name='unique_rating_target'),
+        ),
+        migrations.RunPython(build_aggregates, migrations.RunPython.noop),
+    ]
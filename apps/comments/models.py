@@ -12,6 +12,7 @@ class Comment(models.Model):
         ('route', '路线'),
         ('hotel', '酒店'),
         ('news', '资讯'),
+        ('food', '美食'),
     ]
     
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name="评论用户")
@@ -41,3 +42,40 @@ class Comment(models.Model):
         if self.images:
             return [img.strip() for img in self.images.split(',') if img.strip()]
         return []
+
+
+class RatingAggregate(models.Model):
+    """
+    评分汇总 - 每个评价对象一行，随评论的新增、删除增量维护（见 ratings.py）
+    详情页直接读取这一行，不再对 Comment 做 COUNT / AVG
+    """
+    target_type = models.CharField(max_length=20, choices=Comment.CONTENT_TYPE_CHOICES, verbose_name="关联对象类型")
+    target_id = models.PositiveIntegerField(verbose_name="关联对象ID")
+    count = models.PositiveIntegerField(default=0, verbose_name="评价数")
+    total = models.PositiveIntegerField(default=0, verbose_name="评分总和")
+    star_1 = models.PositiveIntegerField(default=0, verbose_name="1星")
+    star_2 = models.PositiveIntegerField(default=0, verbose_name="2星")
+    star_3 = models.PositiveIntegerField(default=0, verbose_name="3星")
+    star_4 = models.PositiveIntegerField(default=0, verbose_name="4星")
+    star_5 = models.PositiveIntegerField(default=0, verbose_name="5星")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "评分汇总"
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(fields=['target_type', 'target_id'], name='unique_rating_target'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_target_type_display()} #{self.target_id}: {self.average}"
+
+    @property
+    def average(self):
+        """平均评分（保留一位小数），没有评价时为0"""
+        return round(self.total / self.count, 1) if self.count else 0
+
+    @property
+    def histogram(self):
+        """各星级的评价数，从5星到1星"""
+        return [(star, getattr(self, f'star_{star}')) for star in range(5, 0, -1)]
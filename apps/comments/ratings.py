@@ -0,0 +1,173 @@
+"""
+评论评分的汇总（RatingAggregate）
+
+每个评价对象（景点、路线、酒店、资讯、美食）一行：评价数、评分总和、1-5星各自的数量。
+- 增量维护：评论新增、软删除 / 恢复、修改评分、物理删除时，由 Comment 的信号用 F() 更新这一行
+  （见 apps.py 中注册的 comment_pre_save / comment_post_save / comment_post_delete）
+- 对象自身的 rating 字段（景点、路线、酒店、美食）同步为用户评价的平均分，列表页按 rating 排序即可，
+  还没有评价的对象保留后台设置的评分
+- queryset.update() 不触发信号，批量修改评论后调用 refresh_aggregates(targets)；
+  数据不一致时用 python manage.py rebuild_ratings 一次性全部重算
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from apps.foods.models import Food
+from apps.hotels.models import Hotel
+from apps.routes.models import Route
+from apps.scenic.models import ScenicSpot
+
+from .models import Comment, RatingAggregate
+
+# 有 rating 字段、需要同步平均分的对象类型
+RATED_MODELS = {
+    'scenic': ScenicSpot,
+    'route': Route,
+    'hotel': Hotel,
+    'food': Food,
+}
+
+STARS = range(1, 6)
+
+
+def get_rating_summary(target_type, target_id):
+    """读取对象的评分汇总，没有评价时返回 None"""
+    return RatingAggregate.objects.filter(target_type=target_type, target_id=target_id, count__gt=0).first()
+
+
+def average_rating(count, total):
+    """平均分（一位小数），与对象的 rating 字段精度一致"""
+    return (Decimal(total) / count).quantize(Decimal('0.1'))
+
+
+def _sync_target_rating(target_type, target_id, aggregate):
+    model = RATED_MODELS.get(target_type)
+    if model is not None and aggregate.count:
+        model.objects.filter(pk=target_id).update(rating=average_rating(aggregate.count, aggregate.total))
+
+
+def apply_rating_change(target_type, target_id, rating, sign):
+    """
+    一条有效评论加入（sign=1）或移出（sign=-1）汇总
+    """
+    values = {
+        'count': F('count') + sign,
+        'total': F('total') + sign * rating,
+        f'star_{rating}': F(f'star_{rating}') + sign,
+    }
+    with transaction.atomic():
+        rows = RatingAggregate.objects.filter(target_type=target_type, target_id=target_id)
+        if not rows.update(**values):
+            if sign < 0:
+                return
+            try:
+                with transaction.atomic():
+                    RatingAggregate.objects.create(target_type=target_type, target_id=target_id)
+            except IntegrityError:
+                # 并发的第一条评价已经创建了这一行
+                pass
+            rows.update(**values)
+        _sync_target_rating(target_type, target_id, rows.get())
+
+
+def _counts_by_target(queryset):
+    """按 (类型, ID) 汇总有效评论，返回 {(类型, ID): {星级: 数量}}，一条 GROUP BY 查询"""
+    counts = defaultdict(dict)
+    rows = queryset.filter(is_deleted=False).values('target_type', 'target_id', 'rating').annotate(n=Count('id'))
+    for row in rows:
+        counts[(row['target_type'], row['target_id'])][row['rating']] = row['n']
+    return counts
+
+
+def _build_aggregate(target_type, target_id, stars):
+    aggregate = RatingAggregate(target_type=target_type, target_id=target_id)
+    for star in STARS:
+        setattr(aggregate, f'star_{star}', stars.get(star, 0))
+    aggregate.count = sum(stars.values())
+    aggregate.total = sum(star * n for star, n in stars.items())
+    return aggregate
+
+
+def _sync_target_ratings(aggregates):
+    """把平均分写回对象的 rating 字段：每种类型、每个不同的平均分一条 UPDATE"""
+    groups = defaultdict(list)
+    for aggregate in aggregates:
+        if aggregate.target_type in RATED_MODELS and aggregate.count:
+            key = (aggregate.target_type, average_rating(aggregate.count, aggregate.total))
+            groups[key].append(aggregate.target_id)
+    for (target_type, rating), ids in groups.items():
+        RATED_MODELS[target_type].objects.filter(pk__in=ids).update(rating=rating)
+
+
+@transaction.atomic
+def refresh_aggregates(targets):
+    """按评论表重新计算指定对象 [(类型, ID), ...] 的汇总（批量修改评论后调用）"""
+    targets = set(targets)
+    if not targets:
+        return 0
+    ids_by_type = defaultdict(set)
+    for target_type, target_id in targets:
+        ids_by_type[target_type].add(target_id)
+
+    counts = {}
+    for target_type, ids in ids_by_type.items():
+        counts.update(_counts_by_target(Comment.objects.filter(target_type=target_type, target_id__in=ids)))
+        RatingAggregate.objects.filter(target_type=target_type, target_id__in=ids).delete()
+
+    aggregates = [_build_aggregate(t, i, counts.get((t, i), {})) for t, i in sorted(targets)]
+    RatingAggregate.objects.bulk_create(aggregates)
+    _sync_target_ratings(aggregates)
+    return len(aggregates)
+
+
+@transaction.atomic
+def rebuild_all_aggregates():
+    """一次扫描评论表重建全部汇总，返回汇总行数"""
+    counts = _counts_by_target(Comment.objects.all())
+    RatingAggregate.objects.all().delete()
+    aggregates = [_build_aggregate(t, i, stars) for (t, i), stars in sorted(counts.items())]
+    RatingAggregate.objects.bulk_create(aggregates, batch_size=1000)
+    _sync_target_ratings(aggregates)
+    return len(aggregates)
+
+
+def _contribution(comment):
+    """评论对汇总的贡献：(类型, ID, 评分)，已删除的评论没有贡献"""
+    if comment.is_deleted:
+        return None
+    return (comment.target_type, int(comment.target_id), comment.rating)
+
+
+def comment_pre_save(sender, instance, raw=False, **kwargs):
+    """记录修改前的贡献（新评论没有）"""
+    if raw:
+        return
+    instance._previous_contribution = None
+    if instance.pk:
+        previous = Comment.objects.filter(pk=instance.pk).only(
+            'target_type', 'target_id', 'rating', 'is_deleted'
+        ).first()
+        if previous is not None:
+            instance._previous_contribution = _contribution(previous)
+
+
+def comment_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = getattr(instance, '_previous_contribution', None)
+    after = _contribution(instance)
+    if before == after:
+        return
+    if before:
+        apply_rating_change(*before, sign=-1)
+    if after:
+        apply_rating_change(*after, sign=1)
+
+
+def comment_post_delete(sender, instance, **kwargs):
+    contribution = _contribution(instance)
+    if contribution:
+        apply_rating_change(*contribution, sign=-1)
@@ -1,3 +1,97 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.foods.models import Food
+from apps.index import counters
+from apps.scenic.models import ScenicSpot
+from apps.users.models import CustomUser
+from .models import Comment, RatingAggregate
+from .ratings import refresh_aggregates
+
+
+class RatingAggregateTests(TestCase):
+    """评分汇总的增量维护与重建"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='reviewer', phone='13800000004')
+        self.spot = ScenicSpot.objects.create(
+            name='古莲花池', address='保定市', ticket_price=50, open_time='8:00-17:00', description='介绍', rating=5
+        )
+
+    def comment(self, rating, target=None, target_type='scenic'):
+        return Comment.objects.create(
+            user=self.user, target_type=target_type, target_id=(target or self.spot).id, content='不错', rating=rating
+        )
+
+    def aggregate(self, target_type='scenic', target_id=None):
+        return RatingAggregate.objects.get(target_type=target_type, target_id=target_id or self.spot.id)
+
+    def test_create_delete_and_edit_update_aggregate(self):
+        first = self.comment(4)
+        self.comment(2)
+        self.comment(2)
+
+        aggregate = self.aggregate()
+        self.assertEqual((aggregate.count, aggregate.total), (3, 8))
+        self.assertEqual(aggregate.histogram, [(5, 0), (4, 1), (3, 0), (2, 2), (1, 0)])
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.rating, Decimal('2.7'))
+
+        # 软删除移出汇总，恢复后重新计入
+        first.is_deleted = True
+        first.save()
+        self.assertEqual((self.aggregate().count, self.aggregate().total), (2, 4))
+        first.is_deleted = False
+        first.save()
+        self.assertEqual(self.aggregate().count, 3)
+
+        # 修改评分、物理删除
+        first.rating = 5
+        first.save()
+        self.assertEqual((self.aggregate().total, self.aggregate().star_4, self.aggregate().star_5), (9, 0, 1))
+        first.delete()
+        self.assertEqual((self.aggregate().count, self.aggregate().total), (2, 4))
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.rating, Decimal('2.0'))
+
+    def test_detail_view_reads_one_precomputed_row(self):
+        for rating in (5, 4, 4):
+            self.comment(rating)
+
+        with mock.patch.object(counters, 'counter', counters.ViewCounter(autostart=False)):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/scenic/detail/{self.spot.id}/')
+        self.assertEqual(response.context['avg_rating'], 4.3)
+        self.assertEqual(response.context['rating_summary'].count, 3)
+        self.assertFalse([q for q in queries if 'AVG(' in q['sql'] or 'COUNT(' in q['sql']])
+
+    def test_food_reviews_update_food_rating(self):
+        food = Food.objects.create(name='驴肉火烧', description='介绍', rating=5)
+        self.comment(3, target=food, target_type='food')
+        food.refresh_from_db()
+        self.assertEqual(food.rating, Decimal('3.0'))
+
+    def test_bulk_update_is_repaired_by_refresh_and_rebuild(self):
+        for rating in (5, 3, 1):
+            self.comment(rating)
+
+        # queryset.update() 不触发信号
+        Comment.objects.filter(rating=1).update(is_deleted=True)
+        self.assertEqual(self.aggregate().count, 3)
+        refresh_aggregates([('scenic', self.spot.id)])
+        self.assertEqual((self.aggregate().count, self.aggregate().total), (2, 8))
 
-# Create your tests here.
+        RatingAggregate.objects.update(count=0, total=0, star_5=0, star_3=0)
+        ScenicSpot.objects.update(rating=1)
+        out = StringIO()
+        call_command('rebuild_ratings', stdout=out)
+        self.assertIn('已重建 1 个对象', out.getvalue())
+        self.assertEqual((self.aggregate().count, self.aggregate().star_5, self.aggregate().star_3), (2, 1, 1))
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.rating, Decimal('4.0'))
@@ -14,7 +14,7 @@ class CommentCreateView(LoginRequiredMixin, View):
     def post(self, request):
         """处理评价提交"""
         # 获取参数
-        target_type = request.POST.get('target_type')  # scenic, route, hotel
+        target_type = request.POST.get('target_type')  # scenic, route, hotel, news, food
         target_id = request.POST.get('target_id')
         content = request.POST.get('content', '').strip()
         rating = int(request.POST.get('rating', 5))
@@ -29,7 +29,7 @@ class CommentCreateView(LoginRequiredMixin, View):
             rating = 5
         
         # 验证target_type是否有效
-        valid_types = ['scenic', 'route', 'hotel', 'news']
+        valid_types = ['scenic', 'route', 'hotel', 'news', 'food']
         if target_type not in valid_types:
             messages.error(request, '无效的评价对象类型')
             return self._redirect_back(request, target_type, target_id)
@@ -95,6 +95,9 @@ class CommentCreateView(LoginRequiredMixin, View):
             elif target_type == 'news':
                 from apps.news.models import News
                 return News.objects.filter(pk=target_id).exists()
+            elif target_type == 'food':
+                from apps.foods.models import Food
+                return Food.objects.filter(pk=target_id).exists()
         except Exception:
             return False
         return False
@@ -113,5 +116,8 @@ class CommentCreateView(LoginRequiredMixin, View):
         elif target_type == 'news':
             from django.urls import reverse
             return redirect(reverse('news:detail', kwargs={'pk': target_id}))
+        elif target_type == 'food':
+            from django.urls import reverse
+            return redirect(reverse('foods:detail', kwargs={'pk': target_id}))
         else:
             return redirect('/')
@@ -1,6 +1,7 @@
 from django.http import JsonResponse
 from django.views import View
 from django.db.models import Q
+from apps.index.counters import apply_pending, record_view
 from .models import Food, FoodCategory
 
 
@@ -52,7 +53,8 @@ class FoodListAPIView(View):
             total = queryset.count()
             start = (page - 1) * page_size
             end = start + page_size
-            foods = queryset[start:end]
+            # 加上尚未写库的浏览次数
+            foods = apply_pending(queryset[start:end])
             
             # 构建返回数据
             food_list = []
@@ -108,9 +110,8 @@ class FoodDetailAPIView(View):
         try:
             food = Food.objects.select_related('category').prefetch_related('images').get(id=food_id)
             
-            # 增加浏览次数
-            food.views_count += 1
-            food.save(update_fields=['views_count'])
+            # 增加浏览次数（缓冲后批量写库，见 apps/index/counters.py）
+            record_view(food)
             
             # 获取图片
             images = food.images.all()
@@ -1,5 +1,6 @@
 from django.views.generic import ListView, DetailView
 from django.db.models import Q
+from apps.index.counters import record_view
 from .models import Food, FoodCategory
 
 
@@ -60,9 +61,8 @@ class FoodDetailView(DetailView):
     
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
-        # 增加浏览次数
-        obj.views_count += 1
-        obj.save(update_fields=['views_count'])
+        # 增加浏览次数（缓冲后批量写库，见 apps/index/counters.py）
+        record_view(obj)
         return obj
     
     def get_context_data(self, **kwargs):
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Hotel, RoomType, HotelImage
+from .models import Hotel, RoomType, HotelImage, RoomInventory
 
 
 class RoomTypeInline(admin.TabularInline):
@@ -129,3 +129,19 @@ class HotelImageAdmin(admin.ModelAdmin):
             )
         return "无图片"
     image_preview.short_description = "图片预览"
+
+
+@admin.register(RoomInventory)
+class RoomInventoryAdmin(admin.ModelAdmin):
+    """房间库存台账管理 - 按房型、按晚查看和调整库存"""
+    list_display = ('room_type', 'date', 'total', 'reserved', 'available', 'updated_at')
+    list_filter = ('room_type__hotel', 'date')
+    search_fields = ('room_type__name', 'room_type__hotel__name')
+    list_editable = ('total',)
+    date_hierarchy = 'date'
+    readonly_fields = ('updated_at',)
+
+    def available(self, obj):
+        """剩余可订数量"""
+        return obj.available
+    available.short_description = "剩余数量"
@@ -0,0 +1,124 @@
+"""
+酒店房间库存台账
+
+按"房型 + 日期"记录每一晚的可售总数和已预订数量（RoomInventory）。
+预订时对入住区间内的每一晚执行一条带条件的 UPDATE：
+    reserved = reserved + quantity  WHERE reserved + quantity <= total
+只有全部日期都更新成功才算预订成功，否则抛出 ValueError 由外层事务回滚。
+不同房型、不同日期的预订只会碰到各自的台账行，不再锁定整个酒店。
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+from .models import RoomInventory
+
+
+def iter_nights(check_in, check_out):
+    """返回入住区间内需要占用的每一晚（含入住当天，不含退房当天）"""
+    return [check_in + timedelta(days=i) for i in range((check_out - check_in).days)]
+
+
+def ensure_inventory(room_type, nights):
+    """
+    补齐缺失的台账行
+    首次被预订的日期以房型的 remaining_count 作为当晚可售总数，已存在的行保持不变
+    """
+    RoomInventory.objects.bulk_create(
+        [RoomInventory(room_type=room_type, date=night, total=room_type.remaining_count) for night in nights],
+        ignore_conflicts=True,
+    )
+
+
+def reserve_room_nights(room_type, check_in, check_out, quantity):
+    """
+    预订房间 - 原子地扣减入住区间内每一晚的库存
+
+    返回占用的晚数；任意一晚库存不足时抛出 ValueError，本次扣减全部回滚
+    """
+    if quantity <= 0:
+        raise ValueError("预订数量必须大于0")
+
+    nights = iter_nights(check_in, check_out)
+    if not nights:
+        raise ValueError("退房日期必须晚于入住日期")
+
+    with transaction.atomic():
+        ensure_inventory(room_type, nights)
+
+        # 条件更新：只有剩余数量足够的日期才会被更新
+        updated = RoomInventory.objects.filter(
+            room_type=room_type,
+            date__gte=check_in,
+            date__lt=check_out,
+            reserved__lte=F('total') - quantity,
+        ).update(reserved=F('reserved') + quantity)
+
+        if updated != len(nights):
+            # 有日期库存不足，抛出异常使已扣减的日期一并回滚
+            raise ValueError(f"房间不足：所选日期内{room_type.name}剩余不足{quantity}间")
+
+    return len(nights)
+
+
+def release_room_nights(room_type_id, check_in, check_out, quantity):
+    """释放房间 - 归还入住区间内每一晚的库存（取消订单、超时未支付时调用）"""
+    return RoomInventory.objects.filter(
+        room_type_id=room_type_id,
+        date__gte=check_in,
+        date__lt=check_out,
+        reserved__gte=quantity,
+    ).update(reserved=F('reserved') - quantity)
+
+
+def release_room_nights_bulk(quantities):
+    """
+    批量释放房间
+    quantities 为 {(房型ID, 日期): 数量}；先一次查出涉及的台账行，
+    再按释放数量分组，每种数量执行一条 UPDATE（分组数通常只有个位数）
+    """
+    if not quantities:
+        return 0
+
+    room_type_ids = {room_type_id for room_type_id, _ in quantities}
+    nights = [night for _, night in quantities]
+    rows = RoomInventory.objects.filter(
+        room_type_id__in=room_type_ids,
+        date__gte=min(nights),
+        date__lte=max(nights),
+    ).values_list('id', 'room_type_id', 'date')
+
+    ids_by_quantity = defaultdict(list)
+    for pk, room_type_id, night in rows:
+        quantity = quantities.get((room_type_id, night))
+        if quantity:
+            ids_by_quantity[quantity].append(pk)
+
+    released_rows = 0
+    for quantity, ids in ids_by_quantity.items():
+        released_rows += RoomInventory.objects.filter(pk__in=ids).update(
+            reserved=Greatest(F('reserved') - quantity, Value(0))
+        )
+    return released_rows
+
+
+def get_available_count(room_type, check_in, check_out):
+    """查询入住区间内该房型最多还能预订的房间数（取各晚剩余数量的最小值）"""
+    nights = iter_nights(check_in, check_out)
+    if not nights:
+        return 0
+
+    rows = RoomInventory.objects.filter(
+        room_type=room_type,
+        date__gte=check_in,
+        date__lt=check_out,
+    ).values_list('total', 'reserved')
+
+    available = [total - reserved for total, reserved in rows]
+    # 还没有台账行的日期尚未被预订过，剩余数量等于房型总数
+    if len(available) < len(nights):
+        available.append(room_type.remaining_count)
+    return max(min(available), 0)
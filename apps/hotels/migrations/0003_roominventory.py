@@ -0,0 +1,38 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0002_hotelimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='入住日期（按晚）')),
+                ('total', models.PositiveIntegerField(verbose_name='可售总数')),
+                ('reserved', models.PositiveIntegerField(default=0, verbose_name='已预订数量')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventories', to='hotels.roomtype', verbose_name='所属房型')),
+            ],
+            options={
+                'verbose_name': '房间库存',
+                'verbose_name_plural': '房间库存',
+                'ordering': ['room_type', 'date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roominventory',
+            constraint=models.CheckConstraint(check=models.Q(('reserved__lte', models.F('total'))), name='room_inventory_no_oversell'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='roominventory',
+            unique_together={('room_type', 'date')},
+        ),
+    ]
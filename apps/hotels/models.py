@@ -70,4 +70,33 @@ class HotelImage(models.Model):
     class Meta:
         verbose_name = "酒店图片"
         verbose_name_plural = verbose_name
-        ordering = ['hotel', 'display_order', '-created_at']
\ No newline at end of file
+        ordering = ['hotel', 'display_order', '-created_at']
+
+class RoomInventory(models.Model):
+    """
+    房间库存台账 - 按房型、按晚记录库存
+    每一行代表某个房型在某一晚的可售总数与已预订数量，
+    预订时对入住区间内的每一晚做条件更新，不同房型、不同日期互不阻塞
+    """
+    room_type = models.ForeignKey(RoomType, related_name='inventories', on_delete=models.CASCADE, verbose_name="所属房型")
+    date = models.DateField(verbose_name="入住日期（按晚）")
+    total = models.PositiveIntegerField(verbose_name="可售总数")
+    reserved = models.PositiveIntegerField(default=0, verbose_name="已预订数量")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        verbose_name = "房间库存"
+        verbose_name_plural = verbose_name
+        ordering = ['room_type', 'date']
+        unique_together = ('room_type', 'date')
+        constraints = [
+            models.CheckConstraint(check=models.Q(reserved__lte=models.F('total')), name='room_inventory_no_oversell'),
+        ]
+
+    def __str__(self):
+        return f"{self.room_type} - {self.date}"
+
+    @property
+    def available(self):
+        """剩余可订数量"""
+        return self.total - self.reserved
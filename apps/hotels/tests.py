@@ -1,3 +1,71 @@
+from datetime import date
+
 from django.test import TestCase
 
-# Create your tests here.
+from apps.orders.views import OrderPaymentView
+from apps.users.models import CustomUser
+from .inventory import get_available_count, release_room_nights, reserve_room_nights
+from .models import Hotel, RoomInventory, RoomType
+
+
+class RoomInventoryTests(TestCase):
+    """房间库存台账测试"""
+
+    def setUp(self):
+        self.hotel = Hotel.objects.create(
+            name='测试酒店', address='保定市', phone='0312-0000000', brief='简介', description='详情'
+        )
+        self.room_type = RoomType.objects.create(
+            hotel=self.hotel, name='标准间', price=300, capacity=2, description='房间描述', remaining_count=3
+        )
+        self.check_in = date(2026, 5, 1)
+        self.check_out = date(2026, 5, 4)
+
+    def test_reserve_decrements_every_night(self):
+        nights = reserve_room_nights(self.room_type, self.check_in, self.check_out, 2)
+
+        self.assertEqual(nights, 3)
+        rows = RoomInventory.objects.filter(room_type=self.room_type)
+        self.assertEqual(rows.count(), 3)
+        self.assertTrue(all(row.reserved == 2 and row.total == 3 for row in rows))
+        self.assertEqual(get_available_count(self.room_type, self.check_in, self.check_out), 1)
+
+    def test_shortage_on_one_night_rolls_back_whole_range(self):
+        # 5月2日单独订满
+        reserve_room_nights(self.room_type, date(2026, 5, 2), date(2026, 5, 3), 3)
+
+        with self.assertRaises(ValueError):
+            reserve_room_nights(self.room_type, self.check_in, self.check_out, 1)
+
+        # 5月1日、5月3日不应被部分扣减
+        reserved = dict(RoomInventory.objects.values_list('date', 'reserved'))
+        self.assertEqual(reserved.get(date(2026, 5, 1), 0), 0)
+        self.assertEqual(reserved.get(date(2026, 5, 3), 0), 0)
+        self.assertEqual(reserved[date(2026, 5, 2)], 3)
+
+    def test_release_returns_rooms(self):
+        reserve_room_nights(self.room_type, self.check_in, self.check_out, 3)
+        release_room_nights(self.room_type.id, self.check_in, self.check_out, 2)
+
+        self.assertEqual(get_available_count(self.room_type, self.check_in, self.check_out), 2)
+
+    def test_create_order_reserves_room_nights(self):
+        user = CustomUser.objects.create_user(username='guest', password='pwd', phone='13800000000')
+        view = OrderPaymentView()
+
+        order = view.create_order(
+            user, self.hotel.id, 'hotel', 2, '张三', '13800000000',
+            '2026-05-01', '2026-05-03', self.room_type.id
+        )
+
+        detail = order.details.get()
+        self.assertEqual(detail.check_in_date, date(2026, 5, 1))
+        self.assertEqual(order.total_amount, 300 * 2 * 2)
+        self.assertEqual(get_available_count(self.room_type, date(2026, 5, 1), date(2026, 5, 3)), 1)
+
+        with self.assertRaises(ValueError):
+            view.create_order(
+                user, self.hotel.id, 'hotel', 2, '张三', '13800000000',
+                '2026-05-02', '2026-05-03', self.room_type.id
+            )
+        self.assertEqual(user.order_set.count(), 1)
@@ -2,12 +2,15 @@ from django.views.generic import TemplateView
 from django.views import View
 from django.contrib import messages
 from django.shortcuts import redirect
-from django.db.models import Avg
 from django.template.response import TemplateResponse
 from django.utils import timezone
 from django.conf import settings
 from .models import Hotel
 from apps.comments.models import Comment
+from apps.comments.ratings import get_rating_summary
+from apps.index.counters import apply_pending, record_view
+from apps.index.geo import nearby_objects
+from apps.index.search import name_filter
 
 
 class HotelListView(TemplateView):
@@ -31,7 +34,8 @@ class HotelListView(TemplateView):
         
         # 搜索筛选
         if search_query:
-            hotels = hotels.filter(name__icontains=search_query)
+            # 名称包含，或拼音 / 首字母匹配
+            hotels = hotels.filter(name_filter('hotel', search_query))
         
         # 排序
         sort_by = self.request.GET.get('sort', 'display_order')
@@ -46,7 +50,8 @@ class HotelListView(TemplateView):
         else:
             hotels = hotels.order_by('display_order', '-is_recommended', '-rating', '-views_count')
         
-        context['hotels'] = hotels
+        # 加上尚未写库的浏览次数
+        context['hotels'] = apply_pending(hotels)
         context['search_query'] = search_query
         context['is_recommended'] = is_recommended == '1'
         
@@ -61,9 +66,8 @@ class HotelDetailView(View):
         """显示酒店详情"""
         try:
             hotel = Hotel.objects.get(pk=pk)
-            # 增加浏览次数
-            hotel.views_count += 1
-            hotel.save(update_fields=['views_count'])
+            # 增加浏览次数（缓冲后批量写库，见 apps/index/counters.py）
+            record_view(hotel)
             
             # 获取房间类型
             room_types = hotel.room_types.filter(is_available=True).order_by('price')
@@ -76,6 +80,9 @@ class HotelDetailView(View):
                 is_recommended=True
             ).exclude(pk=pk).order_by('-rating', '-views_count')[:4]
             
+            # 周边景点（按距离，查内存中的地理位置索引，见 apps/index/geo.py）
+            nearby_spots = nearby_objects('scenic', hotel)
+            
             # 获取评价列表（排除已删除的）
             comments = Comment.objects.filter(
                 target_type='hotel',
@@ -83,13 +90,9 @@ class HotelDetailView(View):
                 is_deleted=False
             ).select_related('user').order_by('-created_at')[:20]  # 最多显示20条
             
-            # 计算平均评分
-            if comments.exists():
-                avg_rating = comments.aggregate(
-                    avg_rating=Avg('rating')
-                )['avg_rating'] or 0
-            else:
-                avg_rating = 0
+            # 平均评分：读取预先汇总的一行（见 apps/comments/ratings.py）
+            rating_summary = get_rating_summary('hotel', pk)
+            avg_rating = rating_summary.average if rating_summary else 0
             
             # 确保hotel_images是列表格式
             if not isinstance(hotel_images, list):
@@ -100,8 +103,10 @@ class HotelDetailView(View):
                 'room_types': room_types,
                 'hotel_images': hotel_images,
                 'related_hotels': related_hotels,
+                'nearby_spots': nearby_spots,
                 'comments': comments,
                 'avg_rating': avg_rating,
+                'rating_summary': rating_summary,
                 'today': timezone.now().date(),
                 'page_title': f"{hotel.name} - 酒店详情 - 保定旅游网"
             }
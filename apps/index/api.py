@@ -0,0 +1,20 @@
+from django.http import JsonResponse
+from django.views import View
+
+from . import suggest
+
+
+class SuggestAPIView(View):
+    """
+    搜索框输入联想API（只查内存索引，不访问数据库）
+    GET /api/v1/search/suggest/?q=白洋&limit=8
+    返回 data: [{text, type, type_label, url}, ...]，type 为 scenic/route/hotel/food/news，热门搜索词为 query
+    """
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.GET.get('limit', suggest.DEFAULT_LIMIT)), 1), suggest.MAX_LIMIT)
+        except (TypeError, ValueError):
+            limit = suggest.DEFAULT_LIMIT
+        suggestions = suggest.suggest_index.lookup(request.GET.get('q', ''), limit)
+        return JsonResponse({"status": "success", "data": [suggest.serialize_suggestion(item) for item in suggestions]})
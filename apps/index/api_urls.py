@@ -0,0 +1,7 @@
+from django.urls import re_path
+from . import api
+
+# /api/v1/search/
+urlpatterns = [
+    re_path(r'^suggest/?$', api.SuggestAPIView.as_view(), name='api-suggest'),
+]
@@ -0,0 +1,41 @@
+from django.apps import AppConfig
+
+
+class IndexConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.index'
+    verbose_name = '首页'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+
+        from .feed import FEED_MODELS, invalidate_feed
+        from apps.scenic.models import ScenicSpot
+
+        from . import geo, hours, suggest
+        from .search import SEARCH_SOURCES, index_on_save, remove_on_delete
+
+        # 首页内容相关的数据保存或删除后清除首页缓存
+        for model in FEED_MODELS:
+            post_save.connect(invalidate_feed, sender=model, dispatch_uid=f'index_feed_save_{model.__name__}')
+            post_delete.connect(invalidate_feed, sender=model, dispatch_uid=f'index_feed_delete_{model.__name__}')
+
+        # 检索对象保存或删除后增量更新倒排索引
+        for source in SEARCH_SOURCES.values():
+            model = source.model
+            post_save.connect(index_on_save, sender=model, dispatch_uid=f'index_search_save_{model.__name__}')
+            post_delete.connect(remove_on_delete, sender=model, dispatch_uid=f'index_search_delete_{model.__name__}')
+
+        # 名称变化、对象删除后增量更新输入联想
+        for source in suggest.SUGGEST_SOURCES.values():
+            model = source.model
+            post_save.connect(suggest.update_on_save, sender=model, dispatch_uid=f'index_suggest_save_{model.__name__}')
+            post_delete.connect(suggest.remove_on_delete, sender=model, dispatch_uid=f'index_suggest_delete_{model.__name__}')
+
+        # 有坐标的对象保存或删除后地理位置索引过期
+        for model in geo.MODEL_TYPES:
+            post_save.connect(geo.invalidate_on_change, sender=model, dispatch_uid=f'index_geo_save_{model.__name__}')
+            post_delete.connect(geo.invalidate_on_change, sender=model, dispatch_uid=f'index_geo_delete_{model.__name__}')
+
+        # 景点保存后重新解析开放时间（删除时随外键级联删除）
+        post_save.connect(hours.index_on_save, sender=ScenicSpot, dispatch_uid='index_hours_scenic_save')
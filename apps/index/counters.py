@@ -0,0 +1,189 @@
+"""
+浏览次数的延迟写入（write-behind）
+
+详情页原来每次访问都执行 views_count += 1 再 save()：先读后写会丢失并发的计数，
+而且 SQLite 上每次浏览都要拿一次写锁，和下单等写操作互相排队。
+现在详情页只调用 record_view()，在进程内累加，不访问数据库：
+- 缓冲区分成多个分片，每个分片一把锁；同一个热门条目的并发浏览按 (条目, 线程) 分散到不同分片，
+  不会都排在同一把锁上
+- 后台线程每隔 VIEW_COUNTER_FLUSH_INTERVAL 秒，或某个分片累计的浏览次数达到阈值时，
+  把缓冲区整体取出，在一个事务中按 (模型, 增量) 分组执行 UPDATE ... SET views_count = views_count + n
+- 写库失败时增量放回缓冲区，下次再写；后台线程启动后，进程退出时写完剩余的增量
+- 后台线程在第一次浏览时才启动；VIEW_COUNTER_AUTOSTART = False 时不启动、退出时也不写库
+
+列表页和详情页展示时用 apply_pending() 把本进程尚未写库的增量加到 views_count 上；
+按浏览次数排序仍以数据库为准，最多滞后一个写库间隔。
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from apps.orders.transactions import booking_transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARDS = 16
+DEFAULT_FLUSH_INTERVAL = 5
+DEFAULT_FLUSH_THRESHOLD = 1000
+
+
+@booking_transaction
+def write_deltas(deltas, field='views_count'):
+    """
+    把 {(模型, 主键): 增量} 写入数据库，返回执行的 UPDATE 数量
+    同一模型、同一增量的条目合并为一条 UPDATE
+    """
+    groups = defaultdict(list)
+    for (model, pk), amount in deltas.items():
+        groups[(model, amount)].append(pk)
+
+    for (model, amount), pks in sorted(groups.items(), key=lambda item: (item[0][0]._meta.label, item[0][1])):
+        model.objects.filter(pk__in=sorted(pks)).update(**{field: F(field) + amount})
+    return len(groups)
+
+
+class _Shard:
+    __slots__ = ('lock', 'counts', 'total')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.total = 0
+
+
+class ViewCounter:
+    """
+    分片的浏览次数缓冲区
+    autostart=False 时不启动后台线程，由调用方（测试、压测）手动 flush()；为 None 时按 VIEW_COUNTER_AUTOSTART
+    """
+
+    def __init__(self, shards=None, interval=None, threshold=None, autostart=None):
+        self.shard_count = shards or getattr(settings, 'VIEW_COUNTER_SHARDS', DEFAULT_SHARDS)
+        self.interval = interval or getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        threshold = threshold or getattr(settings, 'VIEW_COUNTER_FLUSH_THRESHOLD', DEFAULT_FLUSH_THRESHOLD)
+        # 阈值按分片均摊，只检查当前分片，不需要全局锁
+        self.shard_threshold = max(threshold // self.shard_count, 1)
+        if autostart is None:
+            autostart = getattr(settings, 'VIEW_COUNTER_AUTOSTART', True)
+        self.autostart = autostart
+        self._shards = [_Shard() for _ in range(self.shard_count)]
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _shard(self, key):
+        return self._shards[hash((key, threading.get_ident())) % self.shard_count]
+
+    def incr(self, model, pk, amount=1):
+        key = (model, pk)
+        shard = self._shard(key)
+        with shard.lock:
+            shard.counts[key] += amount
+            shard.total += amount
+            full = shard.total >= self.shard_threshold
+        if self.autostart:
+            self._ensure_started()
+            if full:
+                self._wake.set()
+
+    def pending(self, model, pk):
+        """本进程尚未写库的增量"""
+        return self.pending_many(model, [pk]).get(pk, 0)
+
+    def pending_many(self, model, pks):
+        """批量查询尚未写库的增量，返回 {主键: 增量}（只包含有增量的条目）"""
+        keys = [(model, pk) for pk in pks]
+        result = defaultdict(int)
+        for shard in self._shards:
+            with shard.lock:
+                if not shard.total:
+                    continue
+                for key in keys:
+                    amount = shard.counts.get(key)
+                    if amount:
+                        result[key[1]] += amount
+        return dict(result)
+
+    def _drain(self):
+        deltas = defaultdict(int)
+        for shard in self._shards:
+            with shard.lock:
+                counts, shard.counts, shard.total = shard.counts, defaultdict(int), 0
+            for key, amount in counts.items():
+                deltas[key] += amount
+        return deltas
+
+    def _restore(self, deltas):
+        for key, amount in deltas.items():
+            shard = self._shard(key)
+            with shard.lock:
+                shard.counts[key] += amount
+                shard.total += amount
+
+    def flush(self):
+        """把缓冲区写入数据库，返回写入的浏览次数"""
+        with self._flush_lock:
+            deltas = self._drain()
+            if not deltas:
+                return 0
+            try:
+                write_deltas(deltas)
+            except Exception as e:
+                # 写库失败不丢计数：放回缓冲区，下次再写
+                logger.error(f"浏览次数写库失败: {e}", exc_info=True)
+                self._restore(deltas)
+                return 0
+            return sum(deltas.values())
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='view-counter-flusher', daemon=True)
+                self._thread.start()
+                # 只有后台线程在写库的进程，退出时才需要写完剩余的增量
+                atexit.register(self._flush_on_exit)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+    def _flush_on_exit(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"进程退出时写入浏览次数失败: {e}", exc_info=True)
+
+
+counter = ViewCounter()
+
+
+def record_view(obj):
+    """记录一次浏览，并把本进程尚未写库的增量加到 obj.views_count 上用于展示"""
+    model = type(obj)
+    counter.incr(model, obj.pk)
+    obj.views_count += counter.pending(model, obj.pk)
+    return obj
+
+
+def apply_pending(objects):
+    """把尚未写库的浏览次数加到一组对象（同一模型）的 views_count 上，返回原列表"""
+    objects = list(objects)
+    if objects:
+        pending = counter.pending_many(type(objects[0]), [obj.pk for obj in objects])
+        for obj in objects:
+            obj.views_count += pending.get(obj.pk, 0)
+    return objects
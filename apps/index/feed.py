@@ -0,0 +1,123 @@
+"""
+首页内容（热门景点、各分类路线、推荐酒店、最新资讯、精选评价）的预计算与缓存
+
+原来首页每次请求都按"热门 → 推荐 → 评分最高"逐级补足，路线还要对每个分类各查三次，
+一次渲染二十多条查询。现在：
+- build_feed() 一次算出首页需要的全部对象（路线用窗口函数一次取出每个分类的前三条），
+  评价的用户信息一并取出，渲染模板时不再查库
+- get_feed() 从缓存读取，缓存缺失时重建；景点、路线、路线分类、酒店、资讯、评论
+  保存或删除后（事务提交时）清除缓存，下一个请求重建（信号在 apps.py 中注册）
+- 浏览次数、评分等通过 queryset.update() 修改的字段不触发信号，由 HOMEPAGE_FEED_TTL 兜底
+
+多进程部署时应把 CACHES 配置为 Redis 等共享缓存，清除缓存才对所有进程生效；
+使用本地内存缓存时其他进程最多在 HOMEPAGE_FEED_TTL 秒后看到更新。
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from apps.comments.models import Comment
+from apps.hotels.models import Hotel
+from apps.news.models import News
+from apps.routes.models import Route, RouteCategory
+from apps.scenic.models import ScenicSpot
+
+FEED_CACHE_KEY = 'index:homepage_feed'
+DEFAULT_FEED_TTL = 600
+
+HOT_SPOT_LIMIT = 8
+ROUTES_PER_CATEGORY = 3
+HOTEL_LIMIT = 6
+NEWS_LIMIT = 5
+COMMENT_LIMIT = 8
+
+
+def pick_in_tiers(queryset, tiers, limit):
+    """
+    按优先级依次从每一档取对象补足 limit 个（不重复）
+    tiers 为 [(筛选条件, 排序), ...]，排序为 None 时使用模型默认排序；取满后不再查询后面的档
+    """
+    picked = []
+    for condition, ordering in tiers:
+        remaining = limit - len(picked)
+        if remaining <= 0:
+            break
+        rows = queryset.filter(condition).exclude(pk__in=[obj.pk for obj in picked])
+        if ordering:
+            rows = rows.order_by(*ordering)
+        picked.extend(rows[:remaining])
+    return picked
+
+
+def top_routes_by_category():
+    """
+    每个分类取前 ROUTES_PER_CATEGORY 条路线：热门优先，其次推荐，再按评分和报名人数补足
+    窗口函数按分类编号后一次查询取出，返回 {分类名: [路线, ...]}（按分类顺序，没有路线的分类不出现）
+    """
+    # 热门、推荐两档按模型默认顺序（显示顺序、评分、创建时间），补足的一档按评分、报名人数
+    tier = Case(When(is_hot=True, then=Value(0)), When(is_recommended=True, then=Value(1)),
+                default=Value(2), output_field=IntegerField())
+    featured = Q(is_hot=True) | Q(is_recommended=True)
+    rank = Window(
+        expression=RowNumber(),
+        partition_by=[F('category_id')],
+        order_by=[
+            tier.asc(),
+            Case(When(featured, then=F('display_order')), default=Value(0)).asc(),
+            F('rating').desc(),
+            Case(When(featured, then=F('created_at'))).desc(nulls_last=True),
+            F('sales_count').desc(),
+        ],
+    )
+    routes = Route.objects.filter(category__isnull=False).annotate(rank=rank).filter(
+        rank__lte=ROUTES_PER_CATEGORY
+    ).order_by('category_id', 'rank')
+
+    by_category = {}
+    for route in routes:
+        by_category.setdefault(route.category_id, []).append(route)
+
+    return {
+        category.name: by_category[category.id]
+        for category in RouteCategory.objects.filter(pk__in=by_category).order_by('id')
+    }
+
+
+def build_feed():
+    """从数据库计算首页内容"""
+    return {
+        'hot_spots': pick_in_tiers(ScenicSpot.objects.all(), [
+            (Q(is_hot=True), None),
+            (Q(is_recommended=True), None),
+            (Q(), ('-rating', '-views_count')),
+        ], HOT_SPOT_LIMIT),
+        'route_categories': top_routes_by_category(),
+        'latest_news': list(News.objects.order_by('-published_at')[:NEWS_LIMIT]),
+        'recommended_hotels': pick_in_tiers(Hotel.objects.all(), [
+            (Q(is_recommended=True), ('-rating', '-views_count', 'display_order')),
+            (Q(), ('-rating', '-views_count')),
+        ], HOTEL_LIMIT),
+        'latest_comments': list(
+            Comment.objects.filter(is_deleted=False).select_related('user').order_by('-rating', '-created_at')[:COMMENT_LIMIT]
+        ),
+    }
+
+
+def get_feed():
+    """读取首页内容，缓存缺失时重建"""
+    feed = cache.get(FEED_CACHE_KEY)
+    if feed is None:
+        feed = build_feed()
+        cache.set(FEED_CACHE_KEY, feed, getattr(settings, 'HOMEPAGE_FEED_TTL', DEFAULT_FEED_TTL))
+    return feed
+
+
+def invalidate_feed(**kwargs):
+    """首页相关的数据变化后，在事务提交时清除缓存（可直接作为信号处理函数）"""
+    transaction.on_commit(lambda: cache.delete(FEED_CACHE_KEY))
+
+
+# 修改后需要重建首页内容的模型
+FEED_MODELS = (ScenicSpot, Route, RouteCategory, Hotel, News, Comment)
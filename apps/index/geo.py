@@ -0,0 +1,273 @@
+"""
+景点、酒店的地理位置索引（依赖 NumPy：pip install numpy）
+
+景点和酒店都有经纬度，原来没有任何按距离的查询，详情页的"相关推荐"只按分类匹配。现在每类对象的坐标
+常驻进程内存：
+- 按 CELL_DEGREES 度的经纬度网格编号（行号 * 列数 + 列号），坐标数组按网格编号排序；
+  查询半径 / 矩形范围时，每一行网格对应有序数组上的一段，二分查找取出候选点
+- 候选点用 NumPy 一次算出球面距离（haversine），按距离取前 limit 个
+- 地图图层（GeoJSON）：矩形范围内的点按缩放级别对应的网格聚合，一个格子里多于一个点时只返回
+  中心位置和数量，缩放到 CLUSTER_MAX_ZOOM 级及以上不再聚合
+- 对象保存或删除后（事务提交时）该类索引过期，下一次查询时整体重新加载；其他进程的修改由 GEO_INDEX_TTL 兜底
+
+只处理没有跨越 180 度经线的范围（服务范围在国内）。
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+
+from apps.hotels.models import Hotel
+from apps.scenic.models import ScenicSpot
+
+DEFAULT_TTL = 300
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+# 网格约 5.5 公里见方（纬度方向）
+CELL_DEGREES = 0.05
+GRID_COLUMNS = int(round(360 / CELL_DEGREES))
+MAX_RADIUS_KM = 200
+DEFAULT_RADIUS_KM = 5
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# 详情页"周边"推荐的范围
+DETAIL_RADIUS_KM = 10
+# 地图聚合：每张 256 像素的瓦片按 CLUSTER_CELLS_PER_TILE x CLUSTER_CELLS_PER_TILE 个格子聚合
+CLUSTER_CELLS_PER_TILE = 4
+CLUSTER_MAX_ZOOM = 17
+MAX_FEATURES = 2000
+
+GeoSource = namedtuple('GeoSource', 'model url_name label')
+GeoHit = namedtuple('GeoHit', 'id name latitude longitude distance_km')
+
+GEO_SOURCES = {
+    'scenic': GeoSource(ScenicSpot, 'scenic:detail', '景点'),
+    'hotel': GeoSource(Hotel, 'hotels:detail', '酒店'),
+}
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """(lat, lng) 到各点的球面距离（公里），lats / lngs 为 NumPy 数组，单位为度"""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def cell_keys(lats, lngs):
+    rows = np.floor((np.asarray(lats) + 90) / CELL_DEGREES).astype(np.int64)
+    columns = np.floor((np.asarray(lngs) + 180) / CELL_DEGREES).astype(np.int64)
+    return rows * GRID_COLUMNS + np.clip(columns, 0, GRID_COLUMNS - 1)
+
+
+def validate_point(lat, lng):
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('经纬度超出范围')
+
+
+def validate_bbox(west, south, east, north):
+    validate_point(south, west)
+    validate_point(north, east)
+    if west > east or south > north:
+        raise ValueError('范围格式应为 西经度,南纬度,东经度,北纬度')
+
+
+class GeoLayer:
+    """一类对象的坐标，按网格编号排序"""
+
+    def __init__(self, ids, names, lats, lngs):
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+        keys = cell_keys(lats, lngs)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.lats = lats[order]
+        self.lngs = lngs[order]
+        self.names = [names[i] for i in order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidates(self, west, south, east, north):
+        """矩形范围所在网格中的点（下标数组，可能包含范围外的点）"""
+        if not len(self):
+            return np.empty(0, dtype=np.int64)
+        first_row = int(math.floor((max(south, -90) + 90) / CELL_DEGREES))
+        last_row = int(math.floor((min(north, 90) + 90) / CELL_DEGREES))
+        first_column = max(int(math.floor((west + 180) / CELL_DEGREES)), 0)
+        last_column = min(int(math.floor((east + 180) / CELL_DEGREES)), GRID_COLUMNS - 1)
+        rows = np.arange(first_row, last_row + 1, dtype=np.int64) * GRID_COLUMNS
+        starts = np.searchsorted(self.keys, rows + first_column, side='left')
+        stops = np.searchsorted(self.keys, rows + last_column, side='right')
+        spans = [(start, stop) for start, stop in zip(starts.tolist(), stops.tolist()) if stop > start]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, stop) for start, stop in spans])
+
+    def nearby(self, lat, lng, radius_km, limit, exclude=None):
+        """距离 (lat, lng) 不超过 radius_km 的点，按距离从近到远，最多 limit 个"""
+        radius_km = min(radius_km, MAX_RADIUS_KM)
+        if limit <= 0 or radius_km < 0:
+            return []
+        delta_lat = radius_km / KM_PER_DEGREE
+        delta_lng = min(delta_lat / max(math.cos(math.radians(lat)), 1e-6), 180)
+        candidates = self._candidates(lng - delta_lng, lat - delta_lat, lng + delta_lng, lat + delta_lat)
+        if exclude is not None:
+            candidates = candidates[self.ids[candidates] != exclude]
+        if not len(candidates):
+            return []
+        distances = haversine_km(lat, lng, self.lats[candidates], self.lngs[candidates])
+        within = distances <= radius_km
+        candidates, distances = candidates[within], distances[within]
+        if len(candidates) > limit:
+            nearest = np.argpartition(distances, limit - 1)[:limit]
+            candidates, distances = candidates[nearest], distances[nearest]
+        order = np.argsort(distances, kind='stable')
+        return [
+            GeoHit(int(self.ids[i]), self.names[i], float(self.lats[i]), float(self.lngs[i]), float(distance))
+            for i, distance in zip(candidates[order].tolist(), distances[order].tolist())
+        ]
+
+    def within(self, west, south, east, north):
+        """矩形范围内的点（下标数组）"""
+        candidates = self._candidates(west, south, east, north)
+        lats, lngs = self.lats[candidates], self.lngs[candidates]
+        inside = (lats >= south) & (lats <= north) & (lngs >= west) & (lngs <= east)
+        return candidates[inside]
+
+    def clusters(self, west, south, east, north, zoom):
+        """
+        矩形范围内的点按缩放级别聚合
+        返回 [(点的下标或 None, 纬度, 经度, 数量), ...]，数量为 1 时是单个点
+        """
+        indexes = self.within(west, south, east, north)
+        if not len(indexes) or zoom >= CLUSTER_MAX_ZOOM:
+            return [(int(i), float(self.lats[i]), float(self.lngs[i]), 1) for i in indexes.tolist()]
+        size = 360 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+        lats, lngs = self.lats[indexes], self.lngs[indexes]
+        columns = np.floor((lngs - west) / size).astype(np.int64)
+        rows = np.floor((lats - south) / size).astype(np.int64)
+        keys = rows * (int((east - west) / size) + 1) + columns
+        unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        center_lats = np.bincount(inverse, weights=lats) / counts
+        center_lngs = np.bincount(inverse, weights=lngs) / counts
+        # 只有一个点的格子返回这个点本身
+        single = np.full(len(unique), -1, dtype=np.int64)
+        single[inverse] = indexes
+        return [
+            (int(single[k]) if count == 1 else None, float(center_lats[k]), float(center_lngs[k]), int(count))
+            for k, count in enumerate(counts.tolist())
+        ]
+
+
+class GeoIndex:
+    """各类对象的地理位置索引，按类型分别加载"""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'GEO_INDEX_TTL', DEFAULT_TTL)
+        self._layers = {}
+        self._lock = threading.Lock()
+
+    def load(self, doc_type):
+        """从数据库加载一类对象的坐标（没有坐标的对象不参与）"""
+        rows = GEO_SOURCES[doc_type].model.objects.filter(
+            latitude__isnull=False, longitude__isnull=False
+        ).order_by().values_list('pk', 'name', 'latitude', 'longitude')
+        ids, names, lats, lngs = [], [], [], []
+        for pk, name, lat, lng in rows.iterator(chunk_size=5000):
+            ids.append(pk)
+            names.append(name)
+            lats.append(float(lat))
+            lngs.append(float(lng))
+        layer = GeoLayer(ids, names, lats, lngs)
+        self._layers[doc_type] = (layer, time.monotonic())
+        return layer
+
+    def layer(self, doc_type):
+        loaded = self._layers.get(doc_type)
+        if loaded is not None and time.monotonic() - loaded[1] < self.ttl:
+            return loaded[0]
+        with self._lock:
+            loaded = self._layers.get(doc_type)
+            if loaded is not None and time.monotonic() - loaded[1] < self.ttl:
+                return loaded[0]
+            return self.load(doc_type)
+
+    def invalidate(self, doc_type):
+        self._layers.pop(doc_type, None)
+
+    def nearby(self, doc_type, lat, lng, radius_km=DEFAULT_RADIUS_KM, limit=DEFAULT_LIMIT, exclude=None):
+        validate_point(lat, lng)
+        return self.layer(doc_type).nearby(lat, lng, radius_km, limit, exclude)
+
+    def features(self, doc_types, west, south, east, north, zoom):
+        """矩形范围内各类对象的 GeoJSON 要素（聚合后），最多 MAX_FEATURES 个"""
+        validate_bbox(west, south, east, north)
+        features = []
+        for doc_type in doc_types:
+            layer = self.layer(doc_type)
+            for index, lat, lng, count in layer.clusters(west, south, east, north, zoom):
+                if index is None:
+                    properties = {'type': doc_type, 'cluster': True, 'count': count}
+                else:
+                    properties = {
+                        'type': doc_type, 'cluster': False, 'count': 1,
+                        'id': int(layer.ids[index]), 'name': layer.names[index],
+                        'url': reverse(GEO_SOURCES[doc_type].url_name, kwargs={'pk': int(layer.ids[index])}),
+                    }
+                features.append({
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [round(lng, 7), round(lat, 7)]},
+                    'properties': properties,
+                })
+        return features[:MAX_FEATURES]
+
+
+geo_index = GeoIndex()
+
+
+def serialize_hit(doc_type, hit):
+    return {
+        'id': hit.id,
+        'name': hit.name,
+        'latitude': hit.latitude,
+        'longitude': hit.longitude,
+        'distance_km': round(hit.distance_km, 2),
+        'url': reverse(GEO_SOURCES[doc_type].url_name, kwargs={'pk': hit.id}),
+    }
+
+
+def nearby_objects(doc_type, obj, radius_km=DETAIL_RADIUS_KM, limit=4):
+    """
+    详情页的周边推荐：距离 obj 不超过 radius_km 的对象（模型实例，按距离排序，带 distance_km 属性）
+    obj 没有坐标时返回空列表，不加载索引
+    """
+    if obj.latitude is None or obj.longitude is None:
+        return []
+    exclude = obj.pk if isinstance(obj, GEO_SOURCES[doc_type].model) else None
+    hits = geo_index.nearby(doc_type, float(obj.latitude), float(obj.longitude), radius_km, limit, exclude)
+    objects = GEO_SOURCES[doc_type].model.objects.in_bulk([hit.id for hit in hits])
+    results = []
+    for hit in hits:
+        found = objects.get(hit.id)
+        if found is not None:
+            found.distance_km = round(hit.distance_km, 1)
+            results.append(found)
+    return results
+
+
+# ---------- 信号 ----------
+
+MODEL_TYPES = {source.model: doc_type for doc_type, source in GEO_SOURCES.items()}
+
+
+def invalidate_on_change(sender, raw=False, **kwargs):
+    if not raw:
+        doc_type = MODEL_TYPES[sender]
+        transaction.on_commit(lambda: geo_index.invalidate(doc_type))
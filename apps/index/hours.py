@@ -0,0 +1,276 @@
+"""
+景点开放时间的解析与索引
+
+ScenicSpot.open_time 是自由填写的文字（"08:00-18:00"、"旺季（4月1日-10月31日）8:00-18:00；淡季8:30-17:00；周一闭馆"），
+parse_open_time 把它解析成若干 Interval(weekdays, start_date, end_date, opens, closes)：
+- weekdays：适用的星期（位掩码，周一为第 0 位）
+- start_date / end_date：适用的日期范围（月 * 100 + 日，如 401、1031；start_date 大于 end_date 表示跨年，如 1101 至 331）
+- opens / closes：开门、关门时间（当天零点起的分钟数；营业到次日凌晨时 closes 超过 1440）
+解析不出任何时段的文字返回 None（未知），"暂停开放"这类明确不开放的返回空元组；
+只按日期闭园（如"冬季闭园"）而没有按季节给出开放时段的不识别，按全年开放处理。
+
+景点保存时解析结果写入 OpeningHours 表（每个时段一行），景点列表的"正在开放 / 某天开放"筛选是一个子查询，
+不需要逐个解析文字；AI助手按解析结果安排每个景点的游览时段（parse_open_time 按文字缓存）。
+"""
+import calendar
+import re
+from collections import namedtuple
+from datetime import timedelta
+from functools import lru_cache
+
+from django.db.models import F, Q
+
+from .models import OpeningHours
+
+ALL_WEEKDAYS = 0b1111111
+WHOLE_YEAR = (101, 1231)
+DAY_MINUTES = 24 * 60
+WEEKDAY_NAMES = '一二三四五六日'
+
+Interval = namedtuple('Interval', 'weekdays start_date end_date opens closes')
+
+DASH = r'[-－—–~～至到]'
+TIME = r'(\d{1,2})(?:[:：](\d{2})|点(半|\d{1,2})?分?)'
+TIME_RANGE_RE = re.compile(TIME + r'\s*' + DASH + r'+\s*(次日|翌日)?\s*' + TIME)
+DATE_RANGE_RE = re.compile(
+    r'(\d{1,2})(?:月(?:(\d{1,2})[日号])?)?\s*' + DASH + r'\s*(?:次年|翌年)?(\d{1,2})月(?:(\d{1,2})[日号])?'
+)
+WEEKDAY = r'(?:周|星期|礼拜)([一二三四五六日天七1-7])'
+WEEKDAY_RE = re.compile(WEEKDAY + r'(?:\s*' + DASH + r'\s*(?:周|星期|礼拜)?([一二三四五六日天七1-7]))?')
+CLAUSE_SPLIT_RE = re.compile(r'[；;，,。\n|/]')
+CLOSED_RE = re.compile(r'闭馆|闭园|休馆|休园|休息|午休|不开放|暂停开放|关闭|停业')
+ALL_DAY_RE = re.compile(r'全天|24\s*小时')
+# 没有写明日期时按常见的旺季 / 淡季划分
+SEASONS = (
+    (re.compile(r'旺季|夏季|夏令'), (401, 1031)),
+    (re.compile(r'淡季|冬季|冬令'), (1101, 331)),
+)
+WEEKDAY_WORDS = (
+    (re.compile(r'周末|双休日'), 0b1100000),
+    (re.compile(r'工作日'), 0b0011111),
+    (re.compile(r'每天|每日|全年|全周'), ALL_WEEKDAYS),
+)
+TRAVEL_DATE_RE = re.compile(r'(\d{1,2})月(\d{1,2})[日号]')
+TRAVEL_WEEKDAY_RE = re.compile(WEEKDAY)
+
+
+def _weekday_index(char):
+    if char.isdigit():
+        return (int(char) - 1) % 7
+    return 6 if char in '日天七' else WEEKDAY_NAMES.index(char)
+
+
+def _weekdays(clause):
+    """子句中提到的星期（位掩码），没有提到时返回 None"""
+    mask = 0
+    for word_re, bits in WEEKDAY_WORDS:
+        if word_re.search(clause):
+            mask |= bits
+    for match in WEEKDAY_RE.finditer(clause):
+        first = _weekday_index(match.group(1))
+        last = _weekday_index(match.group(2)) if match.group(2) else first
+        day = first
+        while True:
+            mask |= 1 << day
+            if day == last:
+                break
+            day = (day + 1) % 7
+    return mask or None
+
+
+def _dates(clause):
+    """子句中的日期范围 (start_date, end_date)，没有时返回 None"""
+    match = DATE_RANGE_RE.search(clause)
+    if match:
+        start_month, start_day, end_month, end_day = match.groups()
+        if 1 <= int(start_month) <= 12 and 1 <= int(end_month) <= 12:
+            end_day = end_day or calendar.monthrange(2000, int(end_month))[1]
+            return int(start_month) * 100 + int(start_day or 1), int(end_month) * 100 + int(end_day)
+    for season_re, dates in SEASONS:
+        if season_re.search(clause):
+            return dates
+    return None
+
+
+def _minutes(hour, minute, half_or_minute):
+    minute = minute or ('30' if half_or_minute == '半' else half_or_minute) or 0
+    return int(hour) * 60 + int(minute)
+
+
+def _times(clause):
+    """子句中的开放时段 [(opens, closes)]"""
+    if ALL_DAY_RE.search(clause):
+        return [(0, DAY_MINUTES)]
+    times = []
+    for match in TIME_RANGE_RE.finditer(clause):
+        opens = _minutes(*match.group(1, 2, 3))
+        closes = _minutes(*match.group(5, 6, 7))
+        if opens > DAY_MINUTES or closes > DAY_MINUTES:
+            continue
+        if closes <= opens or match.group(4):
+            closes += DAY_MINUTES
+        times.append((opens, closes))
+    return times
+
+
+def _overlaps(first, second):
+    """两个（可能跨年的）日期范围是否有重叠"""
+    def days(start, end):
+        return [(start, end)] if start <= end else [(start, 1231), (101, end)]
+    return any(a <= d and c <= b for a, b in days(*first) for c, d in days(*second))
+
+
+@lru_cache(maxsize=2048)
+def parse_open_time(text):
+    """解析开放时间文字，返回 Interval 的元组；不识别时返回 None"""
+    intervals, closures = [], []
+    context = None
+    for clause in CLAUSE_SPLIT_RE.split(str(text or '')):
+        clause = clause.strip()
+        if not clause:
+            continue
+        dates, weekdays, times = _dates(clause), _weekdays(clause), _times(clause)
+        if times and CLOSED_RE.search(clause):
+            # "12:00-13:30午休"：不当作开放时段
+            continue
+        if not times:
+            if CLOSED_RE.search(clause):
+                closures.append((weekdays, dates))
+            elif dates:
+                # "旺季（4月1日-10月31日）：" 单独一行时，适用于后面的时段
+                context = dates
+            continue
+        dates = dates or context or WHOLE_YEAR
+        for opens, closes in times:
+            intervals.append(Interval(weekdays or ALL_WEEKDAYS, *dates, opens, closes))
+
+    if not intervals:
+        # "暂停开放"：明确不开放；其他文字无法识别
+        return () if any(weekdays is None and dates is None for weekdays, dates in closures) else None
+    for weekdays, dates in closures:
+        if weekdays is None:
+            continue
+        intervals = [
+            interval._replace(weekdays=interval.weekdays & ~weekdays)
+            if dates is None or _overlaps(dates, interval[1:3]) else interval
+            for interval in intervals
+        ]
+    return tuple(interval for interval in intervals if interval.weekdays)
+
+
+def _in_range(mmdd, start_date, end_date):
+    if start_date <= end_date:
+        return start_date <= mmdd <= end_date
+    return mmdd >= start_date or mmdd <= end_date
+
+
+def hours_on(intervals, day, weekday=None):
+    """
+    某天的开放时段 [(opens, closes)]，按开门时间排序
+    day 为日期（或 月*100+日）；weekday 为 None 时取 day 的星期，day 为整数且 weekday 为 None 时不看星期
+    """
+    if hasattr(day, 'month'):
+        weekday = day.weekday() if weekday is None else weekday
+        day = day.month * 100 + day.day
+    return sorted(
+        (interval.opens, interval.closes) for interval in intervals or ()
+        if _in_range(day, interval.start_date, interval.end_date)
+        and (weekday is None or interval.weekdays >> weekday & 1)
+    )
+
+
+def is_open(intervals, moment):
+    """moment（本地时间）是否在开放时段内，包括前一天营业到凌晨的时段"""
+    minute = moment.hour * 60 + moment.minute
+    if any(opens <= minute < closes for opens, closes in hours_on(intervals, moment.date())):
+        return True
+    return any(closes - DAY_MINUTES > minute for _, closes in hours_on(intervals, moment.date() - timedelta(days=1)))
+
+
+def closed_weekdays(intervals):
+    """全年都不开放的星期，如 [0] 表示周一闭馆"""
+    mask = 0
+    for interval in intervals or ():
+        mask |= interval.weekdays
+    return [day for day in range(7) if not mask >> day & 1]
+
+
+def format_minutes(minutes):
+    hour, minute = divmod(minutes, 60)
+    return f"{'次日' if hour >= 24 else ''}{hour % 24}:{minute:02d}"
+
+
+def weekday_name(weekday):
+    return f'周{WEEKDAY_NAMES[weekday]}'
+
+
+def parse_travel_day(text, today):
+    """
+    从用户需求中识别出行日期：返回 (日期, 星期)
+    写明"5月1日"时返回该日期（已过则为明年）；只写"周六"时日期为 None；都没有时返回 (None, None)
+    """
+    text = str(text or '')
+    match = TRAVEL_DATE_RE.search(text)
+    if match:
+        month, day = int(match.group(1)), int(match.group(2))
+        for year in (today.year, today.year + 1):
+            try:
+                travel_date = today.replace(year=year, month=month, day=day)
+            except ValueError:
+                continue
+            if travel_date >= today:
+                return travel_date, travel_date.weekday()
+    match = TRAVEL_WEEKDAY_RE.search(text)
+    if match:
+        return None, _weekday_index(match.group(1))
+    return None, None
+
+
+# ---------- 数据库索引 ----------
+
+FIELDS = ('weekdays', 'start_date', 'end_date', 'opens', 'closes')
+
+
+def index_spot(spot):
+    """把景点开放时间的解析结果写入 OpeningHours，与已有的相同时不写库；返回是否有变化"""
+    intervals = sorted(parse_open_time(spot.open_time) or ())
+    existing = sorted(OpeningHours.objects.filter(spot_id=spot.pk).values_list(*FIELDS))
+    if existing == intervals:
+        return False
+    OpeningHours.objects.filter(spot_id=spot.pk).delete()
+    OpeningHours.objects.bulk_create([OpeningHours(spot_id=spot.pk, **interval._asdict()) for interval in intervals])
+    return True
+
+
+def index_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'open_time' not in update_fields):
+        return
+    index_spot(instance)
+
+
+def _date_q(day):
+    mmdd = day.month * 100 + day.day
+    return (
+        Q(start_date__lte=F('end_date')) & Q(start_date__lte=mmdd, end_date__gte=mmdd)
+        | Q(start_date__gt=F('end_date')) & (Q(start_date__lte=mmdd) | Q(end_date__gte=mmdd))
+    )
+
+
+def open_spot_ids(moment):
+    """moment（本地时间）正在开放的景点ID（子查询），包括前一天营业到凌晨的时段"""
+    minute = moment.hour * 60 + moment.minute
+    today, yesterday = moment.date(), moment.date() - timedelta(days=1)
+    return OpeningHours.objects.annotate(
+        today=F('weekdays').bitand(1 << today.weekday()),
+        yesterday=F('weekdays').bitand(1 << yesterday.weekday()),
+    ).filter(
+        _date_q(today) & Q(today__gt=0, opens__lte=minute, closes__gt=minute)
+        | _date_q(yesterday) & Q(yesterday__gt=0, closes__gt=minute + DAY_MINUTES)
+    ).values('spot_id')
+
+
+def open_on_spot_ids(day):
+    """day 当天开放的景点ID（子查询）"""
+    return OpeningHours.objects.annotate(
+        on_weekday=F('weekdays').bitand(1 << day.weekday())
+    ).filter(_date_q(day), on_weekday__gt=0).values('spot_id')
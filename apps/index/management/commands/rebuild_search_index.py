@@ -0,0 +1,23 @@
+"""
+管理命令：全量重建站内搜索的倒排索引
+
+索引平时随景点、路线、酒店、资讯、美食的保存和删除增量维护；首次部署、导入数据、
+批量 update 等绕过信号的操作之后用本命令重建：
+python manage.py rebuild_search_index [--type scenic --type news]
+"""
+from django.core.management.base import BaseCommand
+
+from apps.index.search import SEARCH_SOURCES, rebuild_index
+
+
+class Command(BaseCommand):
+    help = '重建站内搜索的倒排索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', action='append', dest='doc_types', choices=list(SEARCH_SOURCES),
+                            help='只重建指定类型（可重复），默认全部')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批索引的对象数')
+
+    def handle(self, *args, **options):
+        count = rebuild_index(options['doc_types'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'已索引 {count} 个对象'))
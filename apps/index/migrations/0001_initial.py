@@ -0,0 +1,80 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_index(apps, schema_editor):
+    """为已有的景点、路线、酒店、资讯、美食建立倒排索引"""
+    from apps.index.search import POSTING_BATCH_SIZE, SEARCH_SOURCES, document_terms
+
+    SearchDocument = apps.get_model('index', 'SearchDocument')
+    SearchPosting = apps.get_model('index', 'SearchPosting')
+    for doc_type, source in SEARCH_SOURCES.items():
+        model = apps.get_model(source.model._meta.label)
+        for obj in model.objects.order_by('pk'):
+            counts, length = document_terms(obj, source)
+            document = SearchDocument.objects.create(doc_type=doc_type, object_id=obj.pk, length=length)
+            SearchPosting.objects.bulk_create([
+                SearchPosting(term=term, document=document, doc_type=doc_type, object_id=obj.pk, tf=tf, length=length)
+                for term, tf in counts.items()
+            ], batch_size=POSTING_BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('foods', '0001_initial'),
+        ('hotels', '0003_roominventory'),
+        ('news', '0002_initial'),
+        ('routes', '0005_route_is_flash_sale'),
+        ('scenic', '0002_alter_scenicspot_options_scenicspot_best_season_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(max_length=20, verbose_name='对象类型')),
+                ('object_id', models.PositiveIntegerField(verbose_name='对象ID')),
+                ('length', models.PositiveIntegerField(default=0, verbose_name='词项数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='索引时间')),
+            ],
+            options={
+                'verbose_name': '检索文档',
+                'verbose_name_plural': '检索文档',
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=20, verbose_name='词项')),
+                ('doc_type', models.CharField(max_length=20, verbose_name='对象类型')),
+                ('object_id', models.PositiveIntegerField(verbose_name='对象ID')),
+                ('tf', models.PositiveIntegerField(verbose_name='词频（标题加权）')),
+                ('length', models.PositiveIntegerField(verbose_name='文档词项数')),
+            ],
+            options={
+                'verbose_name': '倒排索引',
+                'verbose_name_plural': '倒排索引',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchdocument',
+            constraint=models.UniqueConstraint(fields=('doc_type', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.AddField(
+            model_name='searchposting',
+            name='document',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='index.searchdocument', verbose_name='文档'),
+        ),
+        migrations.AddIndex(
+            model_name='searchposting',
+            index=models.Index(fields=['term', 'doc_type', 'object_id', 'tf', 'length'], name='search_posting_term_idx'),
+        ),
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('index', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=50, unique=True, verbose_name='关键词')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='搜索次数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='最近搜索时间')),
+            ],
+            options={
+                'verbose_name': '搜索关键词',
+                'verbose_name_plural': '搜索关键词',
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+def add_pinyin(apps, schema_editor):
+    """为已有的检索文档补上名称的全拼、首字母，并作为标题词项写入倒排索引"""
+    from apps.index.search import MAX_TERM_LENGTH, SEARCH_SOURCES, TITLE_BOOST, title_pinyin
+
+    SearchDocument = apps.get_model('index', 'SearchDocument')
+    SearchPosting = apps.get_model('index', 'SearchPosting')
+    for doc_type, source in SEARCH_SOURCES.items():
+        objects = apps.get_model(source.model._meta.label).objects.in_bulk()
+        for document in SearchDocument.objects.filter(doc_type=doc_type):
+            obj = objects.get(document.object_id)
+            if obj is None:
+                continue
+            document.pinyin, document.initials = title_pinyin(obj, source)
+            document.save(update_fields=['pinyin', 'initials'])
+            existing = set(SearchPosting.objects.filter(document=document).values_list('term', flat=True))
+            terms = {spelled[:MAX_TERM_LENGTH] for spelled in (document.pinyin, document.initials)} - existing - {''}
+            SearchPosting.objects.bulk_create([
+                SearchPosting(term=term, document=document, doc_type=doc_type, object_id=document.object_id,
+                              tf=TITLE_BOOST, length=document.length)
+                for term in terms
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('index', '0002_search_query'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchdocument',
+            name='initials',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='名称首字母'),
+        ),
+        migrations.AddField(
+            model_name='searchdocument',
+            name='pinyin',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='名称全拼'),
+        ),
+        migrations.AddIndex(
+            model_name='searchdocument',
+            index=models.Index(fields=['doc_type', 'pinyin'], name='search_document_pinyin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchdocument',
+            index=models.Index(fields=['doc_type', 'initials'], name='search_document_initials_idx'),
+        ),
+        migrations.RunPython(add_pinyin, migrations.RunPython.noop),
+    ]
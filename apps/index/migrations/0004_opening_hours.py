@@ -0,0 +1,46 @@
+# Generated by Django 5.0.3 on 2026-10-18 14:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def index_opening_hours(apps, schema_editor):
+    """解析已有景点的开放时间"""
+    from apps.index.hours import parse_open_time
+
+    ScenicSpot = apps.get_model('scenic', 'ScenicSpot')
+    OpeningHours = apps.get_model('index', 'OpeningHours')
+    OpeningHours.objects.bulk_create([
+        OpeningHours(spot_id=spot_id, **interval._asdict())
+        for spot_id, open_time in ScenicSpot.objects.values_list('id', 'open_time')
+        for interval in parse_open_time(open_time) or ()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('index', '0003_document_pinyin'),
+        ('scenic', '0003_scenicspot_aliases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekdays', models.PositiveSmallIntegerField(verbose_name='适用星期')),
+                ('start_date', models.PositiveSmallIntegerField(default=101, verbose_name='开始日期')),
+                ('end_date', models.PositiveSmallIntegerField(default=1231, verbose_name='结束日期')),
+                ('opens', models.PositiveSmallIntegerField(verbose_name='开门时间')),
+                ('closes', models.PositiveSmallIntegerField(verbose_name='关门时间')),
+                ('spot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours', to='scenic.scenicspot', verbose_name='景点')),
+            ],
+            options={
+                'verbose_name': '景点开放时段',
+                'verbose_name_plural': '景点开放时段',
+                'indexes': [models.Index(fields=['opens', 'closes'], name='opening_hours_time_idx')],
+            },
+        ),
+        migrations.RunPython(index_opening_hours, migrations.RunPython.noop),
+    ]
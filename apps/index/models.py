@@ -0,0 +1,93 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    全文检索的文档 - 每个被索引的景点、路线、酒店、资讯、美食一行（见 search.py）
+    length 为文档的词项数，用于 BM25 的长度归一化；pinyin / initials 为名称的全拼和首字母（见 pinyin.py）
+    """
+    doc_type = models.CharField(max_length=20, verbose_name="对象类型")
+    object_id = models.PositiveIntegerField(verbose_name="对象ID")
+    length = models.PositiveIntegerField(default=0, verbose_name="词项数")
+    pinyin = models.CharField(max_length=255, blank=True, default='', verbose_name="名称全拼")
+    initials = models.CharField(max_length=100, blank=True, default='', verbose_name="名称首字母")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="索引时间")
+
+    class Meta:
+        verbose_name = "检索文档"
+        verbose_name_plural = verbose_name
+        constraints = [
+            models.UniqueConstraint(fields=['doc_type', 'object_id'], name='unique_search_document'),
+        ]
+        indexes = [
+            models.Index(fields=['doc_type', 'pinyin'], name='search_document_pinyin_idx'),
+            models.Index(fields=['doc_type', 'initials'], name='search_document_initials_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.doc_type} #{self.object_id}"
+
+
+class SearchPosting(models.Model):
+    """
+    倒排索引 - 每个 (词项, 文档) 一行
+    doc_type / object_id / length 从文档冗余过来，索引包含打分用到的全部列，检索时只读索引、不需要联表
+    """
+    term = models.CharField(max_length=20, verbose_name="词项")
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings', verbose_name="文档")
+    doc_type = models.CharField(max_length=20, verbose_name="对象类型")
+    object_id = models.PositiveIntegerField(verbose_name="对象ID")
+    tf = models.PositiveIntegerField(verbose_name="词频（标题加权）")
+    length = models.PositiveIntegerField(verbose_name="文档词项数")
+
+    class Meta:
+        verbose_name = "倒排索引"
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['term', 'doc_type', 'object_id', 'tf', 'length'], name='search_posting_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.doc_type} #{self.object_id}"
+
+
+class SearchQuery(models.Model):
+    """
+    用户搜索过的关键词及次数 - 搜索建议按热门搜索加权（见 suggest.py）
+    计数先在进程内累加，由建议索引的后台线程定期批量写入
+    """
+    query = models.CharField(max_length=50, unique=True, verbose_name="关键词")
+    count = models.PositiveIntegerField(default=0, verbose_name="搜索次数")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="最近搜索时间")
+
+    class Meta:
+        verbose_name = "搜索关键词"
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f"{self.query} ({self.count})"
+
+
+class OpeningHours(models.Model):
+    """
+    景点开放时段 - 由 ScenicSpot.open_time 解析，每个时段一行（见 hours.py）
+    weekdays 为适用的星期（位掩码，周一为第 0 位），start_date / end_date 为适用日期（月*100+日，可跨年），
+    opens / closes 为开门、关门时间的分钟数（营业到次日凌晨时 closes 超过 1440）
+    """
+    spot = models.ForeignKey('scenic.ScenicSpot', on_delete=models.CASCADE, related_name='opening_hours',
+                             verbose_name="景点")
+    weekdays = models.PositiveSmallIntegerField(verbose_name="适用星期")
+    start_date = models.PositiveSmallIntegerField(default=101, verbose_name="开始日期")
+    end_date = models.PositiveSmallIntegerField(default=1231, verbose_name="结束日期")
+    opens = models.PositiveSmallIntegerField(verbose_name="开门时间")
+    closes = models.PositiveSmallIntegerField(verbose_name="关门时间")
+
+    class Meta:
+        verbose_name = "景点开放时段"
+        verbose_name_plural = verbose_name
+        indexes = [
+            models.Index(fields=['opens', 'closes'], name='opening_hours_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.spot_id} {self.opens}-{self.closes}"
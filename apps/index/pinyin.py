@@ -0,0 +1,42 @@
+"""
+名称的拼音和首字母（依赖 pypinyin：pip install pypinyin）
+
+不少用户在拉丁键盘上输入 baiyangdian 或 byd 找"白洋淀"。景点、路线、酒店、美食名称和资讯标题的
+全拼、首字母在保存时算好，存在 SearchDocument.pinyin / initials 上并写入倒排索引（见 search.py），
+查询时只对用户输入做转换，不再逐个转换库里的名称：
+- 搜索页、后台列表：全拼和首字母作为标题词项参与 BM25 检索
+- 景点/路线/酒店列表的名称筛选、AI 助手的景点匹配：pinyin_matches() 按前缀查 SearchDocument 的索引
+- 输入联想：全拼和首字母作为联想项的前缀（见 suggest.py）
+"""
+import re
+
+from pypinyin import Style, lazy_pinyin
+
+NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+CJK_RE = re.compile(r'[㐀-鿿]')
+LATIN_RE = re.compile(r'[a-z]')
+
+
+def _join(syllables):
+    return NON_ALNUM_RE.sub('', ''.join(syllables).lower())
+
+
+def to_pinyin(text):
+    """返回 (全拼, 首字母)，只保留小写字母和数字：'白洋淀' -> ('baiyangdian', 'byd')"""
+    text = str(text or '')
+    if not text:
+        return '', ''
+    return _join(lazy_pinyin(text)), _join(lazy_pinyin(text, style=Style.FIRST_LETTER))
+
+
+def pinyin_query(query):
+    """
+    需要按拼音匹配的查询转成全拼，不需要时返回空字符串
+    纯拉丁字母的输入（byd、baiyang）和中英混合的输入（白洋dian）都按拼音匹配；纯中文直接按汉字匹配
+    """
+    query = str(query or '').lower()
+    if not LATIN_RE.search(query):
+        return ''
+    if CJK_RE.search(query):
+        return to_pinyin(query)[0]
+    return NON_ALNUM_RE.sub('', query)
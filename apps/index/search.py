@@ -0,0 +1,425 @@
+"""
+站内全文检索：中文二元分词 + 倒排索引（SearchDocument / SearchPosting）+ BM25 排序
+
+原来的搜索对描述、行程、正文等长文本逐个 icontains，每次都是全表扫描，结果没有相关性排序。
+现在：
+- 分词：连续的汉字切成相邻两字的二元组（"白洋淀" -> 白洋、洋淀），再补上末尾的单字（淀），
+  这样任意单字都是某个词项的开头；字母数字按整词、小写
+- 索引：每个对象一行 SearchDocument（词项数），每个 (词项, 对象) 一行 SearchPosting（词频，标题词频乘以 TITLE_BOOST）；
+  对象保存 / 删除时由信号增量更新（apps.py），python manage.py rebuild_search_index 全量重建
+- 检索：查询同样分词，汉字二元组精确匹配，单个汉字和字母数字词按前缀匹配（索引上的范围查询）；
+  文档至少要命中 MIN_MATCH_RATIO 的查询词项，BM25 打分、排名在数据库中完成；索引包含打分用到的列，查询只读索引
+- 拼音：标题的全拼和首字母（baiyangdian、byd）作为标题词项写入索引；中英混合的查询（白洋dian）整体转成全拼后按前缀匹配
+- 摘要：highlight() 在正文中找命中最密集的一段，命中的文字用 <mark> 标出
+
+SearchView 和后台管理的景点、路线、酒店、资讯、美食列表的搜索都走这里。
+"""
+import math
+import re
+from collections import Counter, namedtuple
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Avg, Case, Count, ExpressionWrapper, F, FloatField, Q, Sum, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from apps.foods.models import Food
+from apps.hotels.models import Hotel
+from apps.news.models import News
+from apps.routes.models import Route
+from apps.scenic.models import ScenicSpot
+
+from .models import SearchDocument, SearchPosting
+from .pinyin import CJK_RE, pinyin_query, to_pinyin
+
+TOKEN_RE = re.compile(r'[㐀-鿿]+|[a-z0-9]+')
+MAX_TERM_LENGTH = 20
+PREFIX_END = '\U0010ffff'
+
+TITLE_BOOST = 3
+K1 = 1.2
+B = 0.75
+MIN_MATCH_RATIO = 0.75
+
+STATS_CACHE_KEY = 'search:stats'
+STATS_TTL = 60
+SNIPPET_LENGTH = 80
+POSTING_BATCH_SIZE = 5000
+
+SearchSource = namedtuple('SearchSource', 'model title_fields body_fields')
+SearchHits = namedtuple('SearchHits', 'total ids scores')
+Scoring = namedtuple('Scoring', 'any_term conditions candidates min_match score')
+
+# 类型 -> (模型, 标题字段, 正文字段)；摘要取正文字段中第一个有命中的
+SEARCH_SOURCES = {
+    'scenic': SearchSource(ScenicSpot, ('name',), ('description', 'address', 'tags')),
+    'route': SearchSource(Route, ('name',), ('itinerary_summary', 'tags', 'meeting_point')),
+    'hotel': SearchSource(Hotel, ('name',), ('brief', 'address', 'description')),
+    'news': SearchSource(News, ('title',), ('abstract', 'content')),
+    'food': SearchSource(Food, ('name',), ('description', 'ingredients', 'tags')),
+}
+
+
+def _is_cjk(run):
+    return run[0] >= '㐀'
+
+
+def tokenize(text, tail=True):
+    """
+    把文本切成词项列表（可重复）
+    tail 为 False 时不补末尾的单字（只有一个字的汉字串除外），只保留二元组
+    """
+    terms = []
+    for run in TOKEN_RE.findall(str(text or '').lower()):
+        if _is_cjk(run):
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+            if tail or len(run) == 1:
+                terms.append(run[-1])
+        else:
+            terms.append(run[:MAX_TERM_LENGTH])
+    return terms
+
+
+def query_terms(query):
+    """
+    查询分词，返回 [(词项, 是否前缀匹配), ...]（去重、保持顺序）
+    汉字二元组精确匹配；单个汉字、字母数字词按前缀匹配；中英混合的查询整体转成全拼，按前缀匹配
+    """
+    spelled = pinyin_query(query)
+    if spelled and CJK_RE.search(str(query)):
+        return [(spelled[:MAX_TERM_LENGTH], True)]
+    terms = []
+    for run in TOKEN_RE.findall(str(query or '').lower()):
+        if _is_cjk(run) and len(run) > 1:
+            terms.extend((run[i:i + 2], False) for i in range(len(run) - 1))
+        else:
+            terms.append((run[:MAX_TERM_LENGTH], True))
+    return list(dict.fromkeys(terms))
+
+
+def _term_condition(term, prefix):
+    if prefix:
+        return Q(term__gte=term, term__lt=term + PREFIX_END)
+    return Q(term=term)
+
+
+# ---------- 索引 ----------
+
+def _field_text(obj, field):
+    return getattr(obj, field, None) or ''
+
+
+def title_pinyin(obj, source):
+    """标题的 (全拼, 首字母)"""
+    full, initials = to_pinyin(' '.join(_field_text(obj, field) for field in source.title_fields))
+    meta = SearchDocument._meta
+    return full[:meta.get_field('pinyin').max_length], initials[:meta.get_field('initials').max_length]
+
+
+def document_terms(obj, source):
+    """
+    计算对象的 (词频, 文档长度)，标题中的词频乘以 TITLE_BOOST
+    标题的全拼、首字母作为额外的标题词项（不计入文档长度）
+    """
+    counts = Counter()
+    length = 0
+    for fields, weight in ((source.title_fields, TITLE_BOOST), (source.body_fields, 1)):
+        for field in fields:
+            terms = tokenize(_field_text(obj, field))
+            length += len(terms)
+            for term in terms:
+                counts[term] += weight
+    for spelled in title_pinyin(obj, source):
+        term = spelled[:MAX_TERM_LENGTH]
+        if term and term not in counts:
+            counts[term] = TITLE_BOOST
+    return counts, length
+
+
+POSTING_FIELDS = ('term', 'document', 'doc_type', 'object_id', 'tf', 'length')
+
+
+def _postings(document, counts, length):
+    return [
+        (term, document.id, document.doc_type, document.object_id, tf, length)
+        for term, tf in counts.items()
+    ]
+
+
+def _insert_postings(rows):
+    """
+    批量写入倒排记录（按 POSTING_FIELDS 顺序的元组）
+    记录数是对象数的上百倍，bulk_create 逐字段处理的开销占重建时间的大头，这里直接 executemany
+    """
+    meta = SearchPosting._meta
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(meta.get_field(name).column) for name in POSTING_FIELDS)
+    placeholders = ', '.join(['%s'] * len(POSTING_FIELDS))
+    sql = f'INSERT INTO {quote(meta.db_table)} ({columns}) VALUES ({placeholders})'
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), POSTING_BATCH_SIZE):
+            cursor.executemany(sql, rows[start:start + POSTING_BATCH_SIZE])
+
+
+@transaction.atomic
+def index_object(doc_type, obj):
+    """重新索引单个对象（保存后调用）"""
+    source = SEARCH_SOURCES[doc_type]
+    counts, length = document_terms(obj, source)
+    pinyin, initials = title_pinyin(obj, source)
+    document, created = SearchDocument.objects.update_or_create(
+        doc_type=doc_type, object_id=obj.pk, defaults={'length': length, 'pinyin': pinyin, 'initials': initials}
+    )
+    if not created:
+        SearchPosting.objects.filter(document=document).delete()
+    _insert_postings(_postings(document, counts, length))
+
+
+@transaction.atomic
+def remove_object(doc_type, object_id):
+    """从索引中删除对象（删除后调用）"""
+    SearchPosting.objects.filter(doc_type=doc_type, object_id=object_id).delete()
+    SearchDocument.objects.filter(doc_type=doc_type, object_id=object_id).delete()
+
+
+def rebuild_index(doc_types=None, batch_size=1000):
+    """全量重建索引，返回索引的对象数量；每种类型一个事务"""
+    total = 0
+    for doc_type in doc_types or SEARCH_SOURCES:
+        total += _rebuild_type(doc_type, batch_size)
+    cache.delete(STATS_CACHE_KEY)
+    return total
+
+
+@transaction.atomic
+def _rebuild_type(doc_type, batch_size):
+    source = SEARCH_SOURCES[doc_type]
+    SearchPosting.objects.filter(doc_type=doc_type).delete()
+    SearchDocument.objects.filter(doc_type=doc_type).delete()
+
+    count = 0
+    fields = ('pk',) + source.title_fields + source.body_fields
+    batch = []
+    for obj in source.model.objects.only(*fields).order_by('pk').iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            count += _index_batch(doc_type, source, batch)
+            batch = []
+    if batch:
+        count += _index_batch(doc_type, source, batch)
+    return count
+
+
+def _index_batch(doc_type, source, objects):
+    analysed = [document_terms(obj, source) for obj in objects]
+    documents = SearchDocument.objects.bulk_create([
+        SearchDocument(doc_type=doc_type, object_id=obj.pk, length=length, **dict(zip(
+            ('pinyin', 'initials'), title_pinyin(obj, source)
+        )))
+        for obj, (_, length) in zip(objects, analysed)
+    ])
+    postings = []
+    for document, (counts, length) in zip(documents, analysed):
+        postings.extend(_postings(document, counts, length))
+    _insert_postings(postings)
+    return len(objects)
+
+
+# ---------- 检索 ----------
+
+def corpus_stats():
+    """文档总数和平均长度（缓存 STATS_TTL 秒，BM25 对统计量的小幅变化不敏感）"""
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None:
+        row = SearchDocument.objects.aggregate(count=Count('id'), avg_length=Avg('length'))
+        stats = (row['count'], row['avg_length'] or 1.0)
+        cache.set(STATS_CACHE_KEY, stats, STATS_TTL)
+    return stats
+
+
+def _scoring(terms):
+    """
+    查询的匹配条件和单条倒排记录的 BM25 得分表达式
+    各词项的 IDF 先用一条查询算出文档频率，打分在数据库中完成
+    """
+    conditions = [_term_condition(term, prefix) for term, prefix in terms]
+    any_term = Q()
+    for condition in conditions:
+        any_term |= condition
+
+    count, avg_length = corpus_stats()
+    # 同一文档的每个词项只有一行，精确词项直接计数；前缀匹配可能命中同一文档的多个词项，需要去重
+    frequencies = SearchPosting.objects.filter(any_term).aggregate(**{
+        f't{i}': Count('document_id', filter=condition, distinct=True) if prefix else Count('id', filter=condition)
+        for i, ((term, prefix), condition) in enumerate(zip(terms, conditions))
+    })
+    idf = Case(*[
+        When(condition, then=Value(math.log(1 + (count - frequencies[f't{i}'] + 0.5) / (frequencies[f't{i}'] + 0.5))))
+        for i, condition in enumerate(conditions)
+    ], default=Value(0.0), output_field=FloatField())
+    weight = F('tf') * (K1 + 1) / (F('tf') + K1 * (1 - B + B * F('length') / Value(float(avg_length))))
+    # 至少命中 min_match 个词项的文档，一定包含文档频率最低的 n - min_match + 1 个词项之一，用它们缩小候选范围
+    min_match = math.ceil(len(terms) * MIN_MATCH_RATIO)
+    rarest = sorted(range(len(terms)), key=lambda i: frequencies[f't{i}'])[:len(terms) - min_match + 1]
+    candidates = Q()
+    for i in rarest:
+        candidates |= conditions[i]
+    return Scoring(any_term, conditions, candidates, min_match, idf * weight)
+
+
+def _scored_matches(terms, scoring, doc_type):
+    """某一类型命中文档的 (类型, ID, 得分) 查询集"""
+    postings = SearchPosting.objects.filter(scoring.any_term, doc_type=doc_type).values('doc_type', 'object_id')
+    if len(terms) == 1 and not terms[0][1]:
+        # 单个精确词项：每个文档只有一行倒排记录，不需要分组
+        return postings.annotate(score=ExpressionWrapper(scoring.score, output_field=FloatField()))
+
+    matches = postings.annotate(score=Sum(scoring.score, output_field=FloatField()))
+    if len(terms) == 1:
+        return matches
+    candidates = SearchPosting.objects.filter(scoring.candidates, doc_type=doc_type).values('object_id')
+    matched_term = Case(*[When(condition, then=Value(i)) for i, condition in enumerate(scoring.conditions)])
+    return matches.filter(object_id__in=candidates).annotate(
+        matched=Count(matched_term, distinct=True)
+    ).filter(matched__gte=scoring.min_match)
+
+
+def search(query, doc_types=None, limit=10):
+    """
+    检索并按 BM25 排序，返回 {类型: SearchHits(total, ids, scores)}，ids 为得分最高的 limit 个
+    每种类型一条排名查询，命中数达到 limit 时再加一条计数查询；没有可检索的词项时返回空字典
+    """
+    terms = query_terms(query)
+    if not terms:
+        return {}
+    scoring = _scoring(terms)
+    hits = {}
+    for doc_type in doc_types if doc_types is not None else SEARCH_SOURCES:
+        matches = _scored_matches(terms, scoring, doc_type)
+        top = list(matches.order_by('-score', 'object_id')[:limit])
+        total = len(top) if len(top) < limit else matches.count()
+        hits[doc_type] = SearchHits(total, [row['object_id'] for row in top], [row['score'] for row in top])
+    return hits
+
+
+def matching_ids(doc_type, query):
+    """
+    命中的对象ID子查询，用于后台列表：queryset.filter(pk__in=matching_ids('scenic', q))
+    没有可检索的词项时返回 None，由调用方决定是否过滤
+    """
+    terms = query_terms(query)
+    if not terms:
+        return None
+    return _scored_matches(terms, _scoring(terms), doc_type).values('object_id')
+
+
+def pinyin_matches(doc_type, query):
+    """
+    名称的全拼或首字母以查询开头的对象ID子查询（走 SearchDocument 上的索引）
+    查询不需要按拼音匹配（纯中文）时返回 None
+    """
+    spelled = pinyin_query(query)
+    if not spelled:
+        return None
+    end = spelled + PREFIX_END
+    return SearchDocument.objects.filter(
+        Q(pinyin__gte=spelled, pinyin__lt=end) | Q(initials__gte=spelled, initials__lt=end), doc_type=doc_type
+    ).values('object_id')
+
+
+def name_filter(doc_type, query, field='name'):
+    """列表页按名称筛选的条件：名称包含查询，或名称的拼音 / 首字母以查询开头"""
+    condition = Q(**{f'{field}__icontains': query})
+    matches = pinyin_matches(doc_type, query)
+    if matches is not None:
+        condition |= Q(pk__in=matches)
+    return condition
+
+
+def load_results(doc_type, ids, query=None, queryset=None):
+    """按 ids 的顺序加载对象；传入 query 时为每个对象生成 search_snippet（高亮摘要）"""
+    source = SEARCH_SOURCES[doc_type]
+    objects = (queryset if queryset is not None else source.model.objects).in_bulk(ids)
+    results = [objects[pk] for pk in ids if pk in objects]
+    if query:
+        for obj in results:
+            obj.search_snippet = snippet(obj, source, query)
+    return results
+
+
+# ---------- 摘要 ----------
+
+def _marked_positions(text, query):
+    """文本中被查询词项命中的字符位置"""
+    lowered = text.lower()
+    marked = [False] * len(text)
+    for term, prefix in query_terms(query):
+        width = len(term)
+        start = lowered.find(term)
+        while start != -1:
+            for i in range(start, start + width):
+                marked[i] = True
+            start = lowered.find(term, start + 1)
+    return marked
+
+
+def highlight(text, query, length=SNIPPET_LENGTH):
+    """截取命中最密集的一段文字（最长 length 个字），命中部分用 <mark> 标出，返回安全的 HTML"""
+    text = ' '.join(str(text or '').split())
+    if not text:
+        return mark_safe('')
+    marked = _marked_positions(text, query)
+
+    # 滑动窗口找命中字符最多的一段
+    best_start, best, current = 0, -1, sum(marked[:length])
+    best = current
+    for start in range(1, max(len(text) - length, 0) + 1):
+        current += marked[start + length - 1] - marked[start - 1]
+        if current > best:
+            best_start, best = start, current
+    end = min(best_start + length, len(text))
+
+    parts = ['…' if best_start > 0 else '']
+    i = best_start
+    while i < end:
+        j = i
+        while j < end and marked[j] == marked[i]:
+            j += 1
+        chunk = escape(text[i:j])
+        parts.append(f'<mark>{chunk}</mark>' if marked[i] else chunk)
+        i = j
+    if end < len(text):
+        parts.append('…')
+    return mark_safe(''.join(parts))
+
+
+def snippet(obj, source, query):
+    """对象的摘要：第一个有命中的正文字段，都没有命中时取第一个非空正文字段的开头"""
+    fallback = ''
+    for field in source.body_fields:
+        text = _field_text(obj, field)
+        if not text:
+            continue
+        if any(_marked_positions(text, query)):
+            return highlight(text, query)
+        fallback = fallback or text
+    return highlight(fallback, query)
+
+
+# ---------- 信号 ----------
+
+MODEL_TYPES = {source.model: doc_type for doc_type, source in SEARCH_SOURCES.items()}
+
+
+def index_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    doc_type = MODEL_TYPES[sender]
+    source = SEARCH_SOURCES[doc_type]
+    # save(update_fields=['views_count']) 等没有修改检索字段的保存不需要重新分词
+    if raw or (update_fields is not None and not set(update_fields) & {*source.title_fields, *source.body_fields}):
+        return
+    index_object(doc_type, instance)
+
+
+def remove_on_delete(sender, instance, **kwargs):
+    remove_object(MODEL_TYPES[sender], instance.pk)
@@ -0,0 +1,418 @@
+"""
+搜索框的输入联想（/api/v1/search/suggest/?q=）
+
+每输入一个字都发一次完整的 SearchView 请求太重。联想改为查进程内的有序数组，不访问数据库：
+- 景点、路线、酒店、美食的名称和资讯标题规范化（小写、去空白）后，把每个后缀都放进有序数组，
+  查询时二分查找前缀所在的区间，输入名称中间的字（"总督" -> 直隶总督署）也能联想到
+- 名称的全拼、首字母（保存时算好存在 SearchDocument 上，见 pinyin.py）也放进有序数组，输入 byd、baiyang 能联想到白洋淀
+- 排序权重 = log(1 + 浏览次数) + QUERY_BOOST * log(1 + 该名称被搜索的次数)，从名称开头匹配的再加 PREFIX_BONUS；
+  搜索次数达到 MIN_QUERY_COUNT 的关键词本身也作为联想项
+- 进程启动时加载（wsgi.py 调用 warm_up()，否则第一次查询时加载）；对象保存、删除时由信号增量更新；
+  后台线程每隔 SUGGEST_REFRESH_INTERVAL 秒把搜索次数批量写库并整体重新加载，
+  同步通过 F() 更新的浏览次数和其他进程记录的搜索次数
+
+有序数组整体替换（写时复制），查询时只读取当前数组的引用，不需要加锁。
+"""
+import logging
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from apps.foods.models import Food
+from apps.hotels.models import Hotel
+from apps.news.models import News
+from apps.routes.models import Route
+from apps.scenic.models import ScenicSpot
+
+from .models import SearchDocument, SearchQuery
+from .pinyin import CJK_RE, LATIN_RE, pinyin_query, to_pinyin
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 300
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+MAX_QUERY_LENGTH = 50
+# 超过这个长度的名称（多为资讯标题）只按开头匹配，避免后缀数量过多
+MAX_INFIX_LENGTH = 16
+MIN_QUERY_COUNT = 2
+QUERY_BOOST = 2.0
+PREFIX_BONUS = 3.0
+RESULT_CACHE_SIZE = 2048
+# 一两个字的前缀区间很大，加载时为每个这样的前缀预先选出权重最高的 HEAD_SIZE 个候选
+HEAD_PREFIX_LENGTH = 2
+HEAD_SIZE = 64
+PREFIX_END = '\U0010ffff'
+
+SuggestSource = namedtuple('SuggestSource', 'model field url_name label')
+Suggestion = namedtuple('Suggestion', 'text doc_type ident views pinyin initials', defaults=('', ''))
+# 条目的起始位置：非负数为名称中的位置，负数表示全拼、首字母
+PINYIN_OFFSET = -1
+INITIALS_OFFSET = -2
+
+# 类型 -> (模型, 名称字段, 详情页 URL 名称, 显示名)
+SUGGEST_SOURCES = {
+    'scenic': SuggestSource(ScenicSpot, 'name', 'scenic:detail', '景点'),
+    'route': SuggestSource(Route, 'name', 'routes:detail', '路线'),
+    'hotel': SuggestSource(Hotel, 'name', 'hotels:detail', '酒店'),
+    'food': SuggestSource(Food, 'name', 'foods:detail', '美食'),
+    'news': SuggestSource(News, 'title', 'news:detail', '资讯'),
+}
+QUERY_TYPE = 'query'
+
+
+def normalize(text):
+    """小写并去掉所有空白"""
+    return ''.join(str(text or '').lower().split())[:MAX_QUERY_LENGTH]
+
+
+def _entry_key(item, offset):
+    if offset == PINYIN_OFFSET:
+        return item.pinyin
+    if offset == INITIALS_OFFSET:
+        return item.initials
+    return normalize(item.text)[offset:]
+
+
+def _entries_for(item):
+    """联想项在有序数组中的条目 (后缀、全拼或首字母, 类型, 标识, 起始位置)"""
+    key = normalize(item.text)
+    if not key:
+        return []
+    stop = len(key) if len(key) <= MAX_INFIX_LENGTH else 1
+    entries = [(key[i:], item.doc_type, item.ident, i) for i in range(stop)]
+    for offset in (PINYIN_OFFSET, INITIALS_OFFSET):
+        spelled = _entry_key(item, offset)
+        if spelled and spelled != key:
+            entries.append((spelled, item.doc_type, item.ident, offset))
+    return entries
+
+
+class SuggestIndex:
+    """
+    输入联想的内存索引
+    autostart=False 时不启动后台线程，由调用方（测试、压测）手动 load() / refresh()
+    """
+
+    def __init__(self, interval=None, autostart=True):
+        self.interval = interval or getattr(settings, 'SUGGEST_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL)
+        self.autostart = autostart
+        self._entries = []
+        self._items = {}
+        self._by_key = {}
+        self._query_counts = Counter()
+        self._pending_queries = Counter()
+        self._heads = {}
+        self._results = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # ---------- 加载 ----------
+
+    def load(self):
+        """从数据库整体加载"""
+        spelled = {
+            (doc_type, object_id): (pinyin, initials)
+            for doc_type, object_id, pinyin, initials in SearchDocument.objects.values_list(
+                'doc_type', 'object_id', 'pinyin', 'initials'
+            ).iterator(chunk_size=5000)
+        }
+        items = {}
+        for doc_type, source in SUGGEST_SOURCES.items():
+            rows = source.model.objects.order_by().values_list('pk', source.field, 'views_count')
+            for pk, text, views in rows.iterator(chunk_size=5000):
+                items[(doc_type, pk)] = Suggestion(text, doc_type, pk, views, *spelled.get((doc_type, pk), ('', '')))
+        stored = Counter(dict(SearchQuery.objects.values_list('query', 'count')))
+
+        with self._lock:
+            query_counts = stored + self._pending_queries
+            for query, count in query_counts.items():
+                if count >= MIN_QUERY_COUNT:
+                    items[(QUERY_TYPE, query)] = Suggestion(query, QUERY_TYPE, query, 0)
+            entries = [entry for item in items.values() for entry in _entries_for(item)]
+            entries.sort()
+            by_key = {}
+            for key, item in items.items():
+                by_key.setdefault(normalize(item.text), set()).add(key)
+            self._items, self._entries, self._by_key = items, entries, by_key
+            self._query_counts = query_counts
+            self._heads = self._build_heads(entries, items)
+            self._results = {}
+            self._loaded = True
+        return len(items)
+
+    def _score(self, item, offset):
+        return self._weight(item) + (PREFIX_BONUS if offset <= 0 else 0)
+
+    def _build_heads(self, entries, items):
+        """{短前缀: [(类型, 标识, 起始位置), ...]}，每个前缀保留得分最高的 HEAD_SIZE 个对象"""
+        weights = {key: self._weight(item) for key, item in items.items()}
+        candidates = {}
+        for suffix, doc_type, ident, offset in entries:
+            score = weights[(doc_type, ident)] + (PREFIX_BONUS if offset <= 0 else 0)
+            for length in range(1, min(len(suffix), HEAD_PREFIX_LENGTH) + 1):
+                candidates.setdefault(suffix[:length], []).append((score, doc_type, ident, offset))
+        heads = {}
+        for prefix, scored in candidates.items():
+            scored.sort(key=lambda row: -row[0])
+            head, seen = [], set()
+            for _, doc_type, ident, offset in scored:
+                if (doc_type, ident) not in seen:
+                    seen.add((doc_type, ident))
+                    head.append((doc_type, ident, offset))
+                    if len(head) >= HEAD_SIZE:
+                        break
+            heads[prefix] = head
+        return heads
+
+    def _add_to_heads(self, key, item):
+        """新增或权重变化的联想项加入短前缀的候选（查询时会重新打分，多出来的候选不影响结果）"""
+        for suffix, doc_type, ident, offset in _entries_for(item):
+            for length in range(1, min(len(suffix), HEAD_PREFIX_LENGTH) + 1):
+                head = self._heads.setdefault(suffix[:length], [])
+                if (doc_type, ident, offset) not in head:
+                    self._heads[suffix[:length]] = head + [(doc_type, ident, offset)]
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._refresh_lock:
+                if not self._loaded:
+                    self.load()
+        if self.autostart:
+            self._ensure_started()
+
+    # ---------- 增量更新 ----------
+
+    def _replace(self, key, item):
+        """替换（item 为 None 时删除）一个联想项，调用方持有锁"""
+        entries = list(self._entries)
+        old = self._items.pop(key, None)
+        if old is not None:
+            for entry in _entries_for(old):
+                index = bisect_left(entries, entry)
+                if index < len(entries) and entries[index] == entry:
+                    del entries[index]
+            self._by_key.get(normalize(old.text), set()).discard(key)
+        if item is not None:
+            self._items[key] = item
+            for entry in _entries_for(item):
+                insort(entries, entry)
+            self._by_key.setdefault(normalize(item.text), set()).add(key)
+            self._add_to_heads(key, item)
+        self._entries = entries
+        self._results = {}
+
+    def update(self, doc_type, obj):
+        """对象保存后更新名称"""
+        if not self._loaded:
+            return
+        text = getattr(obj, SUGGEST_SOURCES[doc_type].field)
+        item = Suggestion(text, doc_type, obj.pk, obj.views_count, *to_pinyin(text))
+        with self._lock:
+            self._replace((doc_type, obj.pk), item)
+
+    def remove(self, doc_type, pk):
+        """对象删除后移除"""
+        if not self._loaded:
+            return
+        with self._lock:
+            self._replace((doc_type, pk), None)
+
+    def record_query(self, query):
+        """记录一次搜索（只在进程内累加，由 refresh() 批量写库）"""
+        query = normalize(query)
+        if not query:
+            return
+        with self._lock:
+            self._pending_queries[query] += 1
+            self._query_counts[query] += 1
+            if self._loaded:
+                key = (QUERY_TYPE, query)
+                if self._query_counts[query] >= MIN_QUERY_COUNT and key not in self._items:
+                    self._replace(key, Suggestion(query, QUERY_TYPE, query, 0))
+                elif query in self._by_key:
+                    for same_name in tuple(self._by_key[query]):
+                        self._add_to_heads(same_name, self._items[same_name])
+                    self._results = {}
+        if self.autostart:
+            self._ensure_started()
+
+    # ---------- 查询 ----------
+
+    def _names_object(self, text):
+        return any(key[0] != QUERY_TYPE for key in tuple(self._by_key.get(normalize(text), ())))
+
+    def _weight(self, item):
+        weight = math.log1p(item.views or 0)
+        return weight + QUERY_BOOST * math.log1p(self._query_counts.get(normalize(item.text), 0))
+
+    def lookup(self, prefix, limit=DEFAULT_LIMIT):
+        """按前缀联想，返回按权重排序的 Suggestion 列表；不访问数据库（首次加载除外）"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        if CJK_RE.search(prefix) and LATIN_RE.search(prefix):
+            # 中英混合（白洋dian）整体转成全拼
+            prefix = pinyin_query(prefix)
+        self._ensure_loaded()
+        results = self._results
+        cached = results.get((prefix, limit))
+        if cached is not None:
+            return cached
+
+        items = self._items
+        if len(prefix) <= HEAD_PREFIX_LENGTH:
+            candidates = self._heads.get(prefix, ())
+        else:
+            entries = self._entries
+            start = bisect_left(entries, (prefix,))
+            stop = bisect_left(entries, (prefix + PREFIX_END,), start)
+            candidates = [entry[1:] for entry in entries[start:stop]]
+        scores = {}
+        for doc_type, ident, offset in candidates:
+            key = (doc_type, ident)
+            item = items.get(key)
+            # 预选的候选可能已改名或删除
+            if item is None or not _entry_key(item, offset).startswith(prefix):
+                continue
+            score = self._score(item, offset)
+            if score > scores.get(key, -1):
+                scores[key] = score
+
+        ranked = sorted(scores, key=lambda key: (-scores[key], key[0], str(key[1])))
+        suggestions = []
+        for key in ranked:
+            item = items[key]
+            # 热门关键词和某个对象同名时只保留对象
+            if item.doc_type == QUERY_TYPE and self._names_object(item.text):
+                continue
+            suggestions.append(item)
+            if len(suggestions) >= limit:
+                break
+
+        if len(results) >= RESULT_CACHE_SIZE:
+            results.clear()
+        results[(prefix, limit)] = suggestions
+        return suggestions
+
+    # ---------- 定期刷新 ----------
+
+    def flush_queries(self):
+        """把进程内累加的搜索次数写入数据库，返回写入的次数；失败时放回，下次再写"""
+        with self._lock:
+            pending, self._pending_queries = self._pending_queries, Counter()
+        if not pending:
+            return 0
+        try:
+            with transaction.atomic():
+                SearchQuery.objects.bulk_create(
+                    [SearchQuery(query=query) for query in pending], ignore_conflicts=True
+                )
+                by_amount = {}
+                for query, amount in pending.items():
+                    by_amount.setdefault(amount, []).append(query)
+                now = timezone.now()
+                for amount, queries in by_amount.items():
+                    SearchQuery.objects.filter(query__in=queries).update(count=F('count') + amount, updated_at=now)
+        except Exception as e:
+            logger.error(f"搜索次数写库失败: {e}", exc_info=True)
+            with self._lock:
+                self._pending_queries.update(pending)
+            return 0
+        return sum(pending.values())
+
+    def refresh(self):
+        """写入搜索次数并重新加载"""
+        with self._refresh_lock:
+            self.flush_queries()
+            self.load()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='suggest-refresher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"刷新搜索联想失败: {e}", exc_info=True)
+            finally:
+                connection.close()
+
+
+suggest_index = SuggestIndex()
+
+
+def suggestion_url(item):
+    """联想项的跳转地址：对象的详情页，热门关键词跳转到搜索页"""
+    if item.doc_type == QUERY_TYPE:
+        return f"{reverse('index:search')}?{urlencode({'q': item.text})}"
+    return reverse(SUGGEST_SOURCES[item.doc_type].url_name, kwargs={'pk': item.ident})
+
+
+def serialize_suggestion(item):
+    label = '搜索' if item.doc_type == QUERY_TYPE else SUGGEST_SOURCES[item.doc_type].label
+    return {'text': item.text, 'type': item.doc_type, 'type_label': label, 'url': suggestion_url(item)}
+
+
+def _warm_up():
+    try:
+        with suggest_index._refresh_lock:
+            if not suggest_index._loaded:
+                suggest_index.load()
+    except Exception as e:
+        logger.warning(f"预加载搜索联想失败: {e}")
+
+
+def warm_up(background=False):
+    """
+    进程启动时加载联想索引（数据库尚未迁移等情况下只记录日志，第一次查询时再加载）
+    background=True 时在后台线程中加载并返回该线程：ASGI 服务器在事件循环中导入应用，不能直接同步访问数据库
+    """
+    if not background:
+        _warm_up()
+        return None
+
+    def run():
+        try:
+            _warm_up()
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run, name='suggest-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------- 信号 ----------
+
+MODEL_TYPES = {source.model: doc_type for doc_type, source in SUGGEST_SOURCES.items()}
+
+
+def update_on_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        doc_type = MODEL_TYPES[sender]
+        transaction.on_commit(lambda: suggest_index.update(doc_type, instance))
+
+
+def remove_on_delete(sender, instance, **kwargs):
+    doc_type, pk = MODEL_TYPES[sender], instance.pk
+    transaction.on_commit(lambda: suggest_index.remove(doc_type, pk))
@@ -0,0 +1,63 @@
+"""
+通用的 (类型, ID) 目标对象批量加载
+
+订单明细（item_type/item_id）、收藏和评论（target_type/target_id）都用
+"类型 + ID" 指向景点、路线、酒店、资讯或美食。逐行 objects.get() 会产生 N+1 查询，
+这里先按类型分组，每种类型只执行一次 in_bulk() 查询，再把对象和详情页链接挂回每一行：
+    row.target       目标对象（已删除时为 None）
+    row.target_url   目标详情页链接（已删除或不支持的类型为 None）
+"""
+from collections import defaultdict
+
+from django.urls import reverse
+
+from apps.foods.models import Food
+from apps.hotels.models import Hotel
+from apps.news.models import News
+from apps.routes.models import Route
+from apps.scenic.models import ScenicSpot
+
+# 类型 -> (模型, 详情页路由名)
+TARGET_MODELS = {
+    'scenic': (ScenicSpot, 'scenic:detail'),
+    'route': (Route, 'routes:detail'),
+    'hotel': (Hotel, 'hotels:detail'),
+    'news': (News, 'news:detail'),
+    'food': (Food, 'foods:detail'),
+}
+
+
+def load_targets(pairs):
+    """批量加载 (类型, ID) 对应的对象，返回 {(类型, ID): 对象}，每种类型一条查询"""
+    ids_by_type = defaultdict(set)
+    for target_type, target_id in pairs:
+        if target_type in TARGET_MODELS:
+            ids_by_type[target_type].add(target_id)
+
+    targets = {}
+    for target_type, ids in ids_by_type.items():
+        model, _ = TARGET_MODELS[target_type]
+        for pk, obj in model.objects.in_bulk(ids).items():
+            targets[(target_type, pk)] = obj
+    return targets
+
+
+def target_url(target_type, target_id):
+    """目标详情页链接"""
+    if target_type not in TARGET_MODELS:
+        return None
+    return reverse(TARGET_MODELS[target_type][1], kwargs={'pk': target_id})
+
+
+def resolve_targets(rows, type_field='target_type', id_field='target_id'):
+    """
+    为每一行挂上 target 和 target_url，返回行列表
+    订单明细使用 resolve_targets(details, 'item_type', 'item_id')
+    """
+    rows = list(rows)
+    targets = load_targets((getattr(row, type_field), getattr(row, id_field)) for row in rows)
+    for row in rows:
+        key = (getattr(row, type_field), getattr(row, id_field))
+        row.target = targets.get(key)
+        row.target_url = target_url(*key) if row.target else None
+    return rows
@@ -0,0 +1,598 @@
+import asyncio
+import threading
+from datetime import date, datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.ai_assistant import plan_cache, resolver
+from apps.comments.models import Comment
+from apps.hotels.models import Hotel
+from apps.news.models import News
+from apps.routes.models import Route, RouteCategory
+from apps.scenic.models import ScenicSpot
+from apps.users.models import CustomUser
+from . import counters, geo, hours, search, suggest
+from .feed import build_feed, get_feed
+from .models import OpeningHours, SearchDocument, SearchPosting, SearchQuery
+
+
+class ViewCounterTests(TestCase):
+    """浏览次数延迟写入测试（不启动后台线程，由测试同步 flush）"""
+
+    def setUp(self):
+        self.counter = counters.ViewCounter(shards=4, threshold=100, autostart=False)
+        patcher = mock.patch.object(counters, 'counter', self.counter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.spot = ScenicSpot.objects.create(
+            name='直隶总督署', address='保定市', ticket_price=50, open_time='8:00-17:00', description='介绍'
+        )
+
+    def test_detail_view_buffers_without_writing(self):
+        for expected in (1, 2, 3):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f'/scenic/detail/{self.spot.id}/')
+            self.assertEqual(response.context['spot'].views_count, expected)
+            self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.views_count, 0)
+
+        self.assertEqual(self.counter.flush(), 3)
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.views_count, 3)
+        self.assertEqual(self.counter.pending(ScenicSpot, self.spot.id), 0)
+
+    def test_concurrent_views_are_not_lost(self):
+        def worker():
+            for _ in range(500):
+                self.counter.incr(ScenicSpot, self.spot.id)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(self.counter.pending(ScenicSpot, self.spot.id), 4000)
+        self.counter.flush()
+        self.spot.refresh_from_db()
+        self.assertEqual(self.spot.views_count, 4000)
+
+    def test_flush_groups_updates_by_model_and_amount(self):
+        spots = ScenicSpot.objects.bulk_create([
+            ScenicSpot(name=f'景点{i}', address='保定市', ticket_price=50, open_time='8:00-17:00', description='介绍')
+            for i in range(10)
+        ])
+        route = Route.objects.create(
+            name='路线', price=199, group_size=20, deadline='2030-01-01',
+            itinerary_summary='行程', cost_include='包含', cost_exclude='不含', notes='须知'
+        )
+        for spot in spots:
+            self.counter.incr(ScenicSpot, spot.id)
+        self.counter.incr(ScenicSpot, self.spot.id, 5)
+        self.counter.incr(Route, route.id)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.counter.flush()
+        updates = [q for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 3)
+        self.assertEqual(
+            list(ScenicSpot.objects.filter(pk__in=[s.id for s in spots]).values_list('views_count', flat=True)),
+            [1] * 10
+        )
+
+    def test_failed_flush_keeps_counts(self):
+        self.counter.incr(ScenicSpot, self.spot.id, 2)
+        with mock.patch.object(counters, 'write_deltas', side_effect=OperationalError('database is locked')):
+            with self.assertLogs('apps.index.counters', 'ERROR'):
+                self.assertEqual(self.counter.flush(), 0)
+
+        self.assertEqual(self.counter.pending(ScenicSpot, self.spot.id), 2)
+        self.assertEqual(self.counter.flush(), 2)
+
+    def test_list_page_includes_pending_views(self):
+        news = News.objects.create(title='资讯', abstract='摘要', content='正文', views_count=10)
+        self.client.get(f'/news/detail/{news.id}/')
+        self.client.get(f'/news/detail/{news.id}/')
+
+        response = self.client.get('/news/list/')
+        self.assertEqual(response.context['news_list'][0].views_count, 12)
+
+        self.client.get(f'/scenic/detail/{self.spot.id}/')
+        response = self.client.get('/scenic/list/')
+        self.assertEqual(response.context['spots'][0].views_count, 1)
+        self.assertContains(response, '(共 1 个景点)')
+
+    @override_settings(VIEW_COUNTER_AUTOSTART=False)
+    def test_flusher_does_not_start_when_disabled(self):
+        # VIEW_COUNTER_AUTOSTART 为 False：浏览不启动后台线程，也不注册退出时的写库
+        counter = counters.ViewCounter()
+        with mock.patch.object(counters.atexit, 'register') as register:
+            counter.incr(ScenicSpot, self.spot.id)
+        self.assertIsNone(counter._thread)
+        register.assert_not_called()
+
+    def test_flusher_starts_on_first_view(self):
+        counter = counters.ViewCounter(interval=3600)
+        self.assertIsNone(counter._thread)
+        with mock.patch.object(counters.threading.Thread, 'start'), \
+                mock.patch.object(counters.atexit, 'register') as register:
+            counter.incr(ScenicSpot, self.spot.id)
+            counter.incr(ScenicSpot, self.spot.id)
+        self.assertIsNotNone(counter._thread)
+        register.assert_called_once_with(counter._flush_on_exit)
+
+
+class HomepageFeedTests(TestCase):
+    """首页内容预计算与缓存"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = CustomUser.objects.create_user(username='visitor', phone='13800000005')
+        self.categories = RouteCategory.objects.bulk_create([RouteCategory(name=f'分类{i}') for i in range(4)])
+        for category in self.categories:
+            Route.objects.bulk_create([
+                Route(name=f'{category.name}-路线{i}', price=199, group_size=20, deadline='2030-01-01',
+                      category=category, is_hot=(i == 4), is_recommended=(i == 3), rating=3 + i * 0.2,
+                      itinerary_summary='行程', cost_include='包含', cost_exclude='不含', notes='须知')
+                for i in range(5)
+            ])
+        ScenicSpot.objects.bulk_create([
+            ScenicSpot(name=f'景点{i}', address='保定市', ticket_price=50, open_time='8:00-17:00',
+                       description='介绍', is_hot=(i < 3), rating=4)
+            for i in range(10)
+        ])
+        Hotel.objects.bulk_create([
+            Hotel(name=f'酒店{i}', address='保定市', phone='0312-0000000', brief='简介', description='详情',
+                  is_recommended=(i % 2 == 0))
+            for i in range(8)
+        ])
+        News.objects.bulk_create([News(title=f'资讯{i}', abstract='摘要', content='正文') for i in range(6)])
+        spot = ScenicSpot.objects.first()
+        Comment.objects.bulk_create([
+            Comment(user=self.user, target_type='scenic', target_id=spot.id, content='很好', rating=5)
+            for _ in range(10)
+        ])
+
+    def test_feed_contents(self):
+        feed = get_feed()
+        self.assertEqual(len(feed['hot_spots']), 8)
+        self.assertTrue(all(spot.is_hot for spot in feed['hot_spots'][:3]))
+        self.assertEqual(list(feed['route_categories']), [c.name for c in self.categories])
+        for name, routes in feed['route_categories'].items():
+            # 热门、推荐优先，再按评分补足
+            self.assertEqual([r.name for r in routes], [f'{name}-路线4', f'{name}-路线3', f'{name}-路线2'])
+        self.assertEqual(len(feed['recommended_hotels']), 6)
+        self.assertEqual(sum(h.is_recommended for h in feed['recommended_hotels']), 4)
+        self.assertEqual(len(feed['latest_news']), 5)
+        self.assertEqual(len(feed['latest_comments']), 8)
+
+    def test_anonymous_homepage_is_served_from_cache(self):
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/')
+        self.assertContains(response, '分类0-路线4')
+        self.assertContains(response, 'visitor')
+
+    def test_cold_build_query_count_does_not_grow_with_categories(self):
+        with CaptureQueriesContext(connection) as queries:
+            build_feed()
+        RouteCategory.objects.bulk_create([RouteCategory(name=f'新分类{i}') for i in range(10)])
+        with self.assertNumQueries(len(queries)):
+            build_feed()
+
+    def test_model_changes_rebuild_feed(self):
+        get_feed()
+        with self.captureOnCommitCallbacks(execute=True):
+            News.objects.create(title='最新资讯', abstract='摘要', content='正文')
+        self.assertEqual(get_feed()['latest_news'][0].title, '最新资讯')
+
+
+class SearchIndexTests(TestCase):
+    """倒排索引检索：分词、BM25 排序、增量更新、高亮摘要"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(suggest, 'suggest_index', suggest.SuggestIndex(autostart=False))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.lake = ScenicSpot.objects.create(
+            name='白洋淀', address='保定市安新县', ticket_price=40, open_time='8:00-18:00',
+            description='华北明珠，夏季荷花盛开，可乘船游览芦苇荡。'
+        )
+        self.mansion = ScenicSpot.objects.create(
+            name='直隶总督署', address='保定市莲池区', ticket_price=30, open_time='8:30-17:30',
+            description='清代直隶省最高军政机关，距离白洋淀约一百五十公里。'
+        )
+        self.news = News.objects.create(
+            title='荷花节开幕', abstract='白洋淀荷花节今日开幕',
+            content='第十届白洋淀荷花节在安新县开幕，游客可以<b>乘船</b>赏荷。'
+        )
+
+    def test_tokenize(self):
+        self.assertEqual(search.tokenize('白洋淀 Hotel2024'), ['白洋', '洋淀', '淀', 'hotel2024'])
+        self.assertEqual(search.query_terms('白洋淀 荷'), [('白洋', False), ('洋淀', False), ('荷', True)])
+
+    def test_ranking_counts_and_prefix_match(self):
+        hits = search.search('白洋淀')
+        # 标题命中的排在正文命中之前
+        self.assertEqual(hits['scenic'].ids, [self.lake.id, self.mansion.id])
+        self.assertEqual(hits['scenic'].total, 2)
+        self.assertEqual(hits['news'].ids, [self.news.id])
+        self.assertEqual(hits['route'].total, 0)
+
+        self.assertEqual(search.search('直')['scenic'].ids, [self.mansion.id])
+        self.assertEqual(search.search('白洋淀 总督')['scenic'].ids, [self.mansion.id])
+        self.assertEqual(search.search('!!!'), {})
+
+    def test_index_follows_save_and_delete(self):
+        self.lake.name = '白洋淀景区'
+        self.lake.description = '水乡风光'
+        self.lake.save()
+        self.assertEqual(search.search('水乡')['scenic'].ids, [self.lake.id])
+        self.assertFalse(search.search('芦苇')['scenic'].ids)
+
+        self.mansion.delete()
+        self.assertEqual(search.search('白洋淀')['scenic'].ids, [self.lake.id])
+        self.assertFalse(SearchPosting.objects.filter(doc_type='scenic', object_id=self.mansion.id).exists())
+
+    def test_save_without_indexed_fields_skips_reindex(self):
+        self.lake.views_count = 10
+        with CaptureQueriesContext(connection) as queries:
+            self.lake.save(update_fields=['views_count'])
+        self.assertFalse([q for q in queries if 'index_search' in q['sql']])
+
+        self.lake.description = '水乡风光'
+        self.lake.save(update_fields=['description'])
+        self.assertEqual(search.search('水乡')['scenic'].ids, [self.lake.id])
+
+    def test_rebuild_command(self):
+        ScenicSpot.objects.filter(pk=self.lake.id).update(name='野三坡')
+        out = StringIO()
+        call_command('rebuild_search_index', '--type', 'scenic', stdout=out)
+        self.assertIn('已索引 2 个对象', out.getvalue())
+        self.assertEqual(search.search('野三坡')['scenic'].ids, [self.lake.id])
+        self.assertEqual(search.search('荷花节')['news'].ids, [self.news.id])
+
+    def test_highlight_escapes_and_marks(self):
+        text = search.highlight(self.news.content, '乘船')
+        self.assertIn('&lt;b&gt;<mark>乘船</mark>&lt;/b&gt;', text)
+        long_text = '无关内容' * 50 + '白洋淀' + '其他内容' * 50
+        snippet = search.highlight(long_text, '白洋淀', length=20)
+        self.assertIn('<mark>白洋淀</mark>', snippet)
+        self.assertTrue(snippet.startswith('…') and snippet.endswith('…'))
+
+    def test_search_page(self):
+        # 语料统计、文档频率各一条，每类一条排名查询（不足10条不再计数），有结果的两类各加载一次
+        with self.assertNumQueries(8):
+            response = self.client.get('/search/', {'q': '白洋淀'})
+        self.assertEqual(response.context['total_count'], 3)
+        self.assertEqual(response.context['scenic_count'], 2)
+        self.assertEqual([spot.id for spot in response.context['scenic_results']], [self.lake.id, self.mansion.id])
+        self.assertContains(response, '<mark>白洋淀</mark>')
+
+    def test_admin_list_uses_index(self):
+        staff = CustomUser.objects.create_user(username='staff', phone='13800000006', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/admin_panel/scenic/', {'search': '总督'})
+        self.assertEqual([spot.id for spot in response.context['page_obj']], [self.mansion.id])
+        response = self.client.get('/admin_panel/news/', {'search': '荷花'})
+        self.assertEqual([news.id for news in response.context['page_obj']], [self.news.id])
+
+
+class SuggestIndexTests(TestCase):
+    """输入联想：前缀 / 中间匹配、权重、增量更新、热门搜索"""
+
+    def setUp(self):
+        self.index = suggest.SuggestIndex(autostart=False)
+        patcher = mock.patch.object(suggest, 'suggest_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.lake = ScenicSpot.objects.create(
+            name='白洋淀', address='保定市安新县', ticket_price=40, open_time='8:00-18:00', description='介绍',
+            views_count=100
+        )
+        self.mansion = ScenicSpot.objects.create(
+            name='直隶总督署', address='保定市', ticket_price=30, open_time='8:30-17:30', description='介绍'
+        )
+        self.hotel = Hotel.objects.create(
+            name='白洋淀温泉城酒店', address='安新县', phone='0312-0000000', brief='简介', description='详情',
+            views_count=5
+        )
+        self.index.load()
+
+    def texts(self, prefix):
+        return [item.text for item in self.index.lookup(prefix)]
+
+    def test_prefix_and_infix_matches(self):
+        self.assertEqual(self.texts('白洋'), ['白洋淀', '白洋淀温泉城酒店'])
+        self.assertEqual(self.texts('总督'), ['直隶总督署'])
+        self.assertEqual(self.texts('温泉'), ['白洋淀温泉城酒店'])
+        self.assertEqual(self.texts('  '), [])
+
+    def test_api_does_not_touch_database(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/search/suggest', {'q': '直隶'})
+        data = response.json()['data']
+        self.assertEqual(data, [{
+            'text': '直隶总督署', 'type': 'scenic', 'type_label': '景点', 'url': f'/scenic/detail/{self.mansion.id}/'
+        }])
+
+    def test_incremental_updates_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mansion.name = '清河道署'
+            self.mansion.save()
+        self.assertEqual(self.texts('直隶'), [])
+        self.assertEqual(self.texts('河道'), ['清河道署'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lake.delete()
+        self.assertEqual(self.texts('白洋'), ['白洋淀温泉城酒店'])
+
+    def test_popular_queries_are_suggested_and_persisted(self):
+        for _ in range(3):
+            self.client.get('/search/', {'q': '温泉'})
+        self.assertEqual(self.index.lookup('温')[0].doc_type, 'query')
+        self.assertEqual(self.texts('温'), ['温泉', '白洋淀温泉城酒店'])
+
+        # 搜索次数提升同名对象的排序
+        for _ in range(30):
+            self.index.record_query('白洋淀温泉城酒店')
+        self.assertEqual(self.texts('白洋'), ['白洋淀温泉城酒店', '白洋淀'])
+        self.assertEqual(self.texts('温'), ['白洋淀温泉城酒店', '温泉'])
+
+        # 写库后重新加载，排序不变
+        self.index.refresh()
+        self.assertEqual(SearchQuery.objects.get(query='温泉').count, 3)
+        self.assertEqual(SearchQuery.objects.get(query='白洋淀温泉城酒店').count, 30)
+        self.assertEqual(self.texts('温'), ['白洋淀温泉城酒店', '温泉'])
+
+    def test_background_warm_up_loads_outside_event_loop(self):
+        # ASGI 服务器在事件循环中导入应用：在后台线程中加载，不在事件循环中同步访问数据库
+        index = suggest.SuggestIndex(autostart=False)
+        threads = []
+        with mock.patch.object(suggest, 'suggest_index', index), \
+                mock.patch.object(index, 'load', side_effect=lambda: threads.append(threading.current_thread().name)):
+            async def startup():
+                return suggest.warm_up(background=True)
+
+            asyncio.run(startup()).join(5)
+        self.assertEqual(threads, ['suggest-warm-up'])
+
+
+class PinyinIndexTests(TestCase):
+    """拼音 / 首字母索引：搜索页、列表筛选、AI 助手景点匹配、输入联想"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.index = suggest.SuggestIndex(autostart=False)
+        patcher = mock.patch.object(suggest, 'suggest_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.lake = ScenicSpot.objects.create(
+            name='白洋淀', address='保定市安新县', ticket_price=40, open_time='8:00-18:00', description='华北明珠'
+        )
+        self.mansion = ScenicSpot.objects.create(
+            name='直隶总督署', address='保定市', ticket_price=30, open_time='8:30-17:30', description='清代衙署'
+        )
+
+    def test_document_stores_pinyin_on_save(self):
+        document = SearchDocument.objects.get(doc_type='scenic', object_id=self.lake.id)
+        self.assertEqual((document.pinyin, document.initials), ('baiyangdian', 'byd'))
+        self.lake.name = '白洋淀景区'
+        self.lake.save()
+        document.refresh_from_db()
+        self.assertEqual(document.initials, 'bydjq')
+
+    def test_search_page_matches_pinyin_and_mixed_queries(self):
+        for query in ('baiyangdian', 'byd', 'baiyang', '白洋dian'):
+            hits = search.search(query, ['scenic'])
+            self.assertEqual(hits['scenic'].ids, [self.lake.id], query)
+        self.assertEqual(search.search('zlzd', ['scenic'])['scenic'].ids, [self.mansion.id])
+
+    def test_scenic_list_filters_by_pinyin(self):
+        response = self.client.get('/scenic/list/', {'search': 'zhili'})
+        self.assertEqual([spot.id for spot in response.context['spots']], [self.mansion.id])
+        response = self.client.get('/scenic/list/', {'search': '总督'})
+        self.assertEqual([spot.id for spot in response.context['spots']], [self.mansion.id])
+
+    def test_ai_plan_matches_spot_by_initials(self):
+        with mock.patch.object(resolver, 'scenic_resolver', resolver.ScenicResolver()), \
+                mock.patch.object(plan_cache, 'plan_cache', plan_cache.PlanCache()):
+            response = self.client.post('/api/v1/ai-assistant/plan/', {'scenic_spots': ['byd']}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['scenic_spots'][0]['id'], self.lake.id)
+
+    def test_suggest_matches_pinyin(self):
+        self.index.load()
+        for prefix in ('bai', 'byd', 'BaiYang', '白洋d'):
+            self.assertEqual([item.text for item in self.index.lookup(prefix)], ['白洋淀'], prefix)
+        self.assertEqual([item.text for item in self.index.lookup('zl')], ['直隶总督署'])
+
+
+class GeoIndexTests(TestCase):
+    """地理位置索引：附近的景点 / 酒店、景点周边酒店、地图图层聚合、详情页周边推荐"""
+
+    def setUp(self):
+        self.index = geo.GeoIndex()
+        patcher = mock.patch.object(geo, 'geo_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # 直隶总督署附近两家酒店（约 0.5、2.5 公里），白洋淀附近一家（约 40 公里外）
+        self.mansion = ScenicSpot.objects.create(
+            name='直隶总督署', address='保定市', ticket_price=30, open_time='8:30-17:30', description='清代衙署',
+            latitude='38.8700000', longitude='115.4700000'
+        )
+        self.lake = ScenicSpot.objects.create(
+            name='白洋淀', address='安新县', ticket_price=40, open_time='8:00-18:00', description='华北明珠',
+            latitude='38.9400000', longitude='115.9300000'
+        )
+        self.no_location = ScenicSpot.objects.create(
+            name='未标注景点', address='保定市', ticket_price=0, open_time='全天', description='介绍'
+        )
+        self.near = self.create_hotel('近处酒店', '38.8740000', '115.4730000')
+        self.far = self.create_hotel('稍远酒店', '38.8920000', '115.4720000')
+        self.lake_hotel = self.create_hotel('淀边酒店', '38.9410000', '115.9310000')
+
+    def create_hotel(self, name, lat, lng):
+        return Hotel.objects.create(
+            name=name, address='保定市', phone='0312-0000000', brief='简介', description='详情',
+            latitude=lat, longitude=lng
+        )
+
+    def test_haversine_matches_known_distance(self):
+        # 保定市区到北京天安门约 140 公里
+        distance = geo.haversine_km(38.8739, 115.4646, geo.np.array([39.9087]), geo.np.array([116.3975]))[0]
+        self.assertAlmostEqual(distance, 140, delta=3)
+
+    def test_nearby_orders_by_distance_within_radius(self):
+        hits = self.index.nearby('hotel', 38.87, 115.47, radius_km=5)
+        self.assertEqual([hit.id for hit in hits], [self.near.id, self.far.id])
+        self.assertLess(hits[0].distance_km, hits[1].distance_km)
+        self.assertEqual([hit.id for hit in self.index.nearby('hotel', 38.87, 115.47, radius_km=1)], [self.near.id])
+        self.assertEqual(len(self.index.nearby('hotel', 38.87, 115.47, radius_km=100)), 3)
+        with self.assertRaises(ValueError):
+            self.index.nearby('hotel', 120, 115.47)
+
+    def test_nearby_spots_api_runs_no_queries_once_loaded(self):
+        self.index.layer('scenic')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/v1/scenic/spots/nearby/', {'lat': 38.88, 'lng': 115.48, 'radius': 10})
+        data = response.json()['data']
+        self.assertEqual([item['id'] for item in data], [self.mansion.id])
+        self.assertEqual(data[0]['url'], f'/scenic/detail/{self.mansion.id}/')
+        response = self.client.get('/api/v1/scenic/spots/nearby/', {'lat': 'abc', 'lng': 115.48})
+        self.assertEqual(response.status_code, 400)
+
+    def test_spot_nearby_hotels_api(self):
+        response = self.client.get(f'/api/v1/scenic/spots/{self.lake.id}/hotels/', {'radius': 3})
+        self.assertEqual([item['id'] for item in response.json()['data']], [self.lake_hotel.id])
+        response = self.client.get(f'/api/v1/scenic/spots/{self.no_location.id}/hotels/')
+        self.assertEqual(response.json()['data'], [])
+        self.assertEqual(self.client.get('/api/v1/scenic/spots/999999/hotels/').status_code, 404)
+
+    def test_map_layer_clusters_by_zoom(self):
+        params = {'bbox': '115.0,38.5,116.5,39.5', 'types': 'scenic,hotel'}
+        features = self.client.get('/api/v1/scenic/map/', dict(params, zoom=8)).json()['features']
+        clusters = [f['properties'] for f in features if f['properties']['cluster']]
+        self.assertEqual(sum(f['properties']['count'] for f in features), 5)
+        self.assertTrue(clusters)
+        features = self.client.get('/api/v1/scenic/map/', dict(params, zoom=17)).json()['features']
+        self.assertEqual(len(features), 5)
+        self.assertEqual(
+            {(f['properties']['type'], f['properties']['id']) for f in features},
+            {('scenic', self.mansion.id), ('scenic', self.lake.id),
+             ('hotel', self.near.id), ('hotel', self.far.id), ('hotel', self.lake_hotel.id)},
+        )
+        self.assertEqual(features[0]['geometry']['type'], 'Point')
+        response = self.client.get('/api/v1/scenic/map/', {'bbox': '116,39,115,38'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_pages_show_nearby_objects(self):
+        with mock.patch.object(counters, 'counter', counters.ViewCounter(autostart=False)):
+            response = self.client.get(f'/scenic/detail/{self.mansion.id}/')
+            self.assertEqual([hotel.id for hotel in response.context['nearby_hotels']], [self.near.id, self.far.id])
+            self.assertContains(response, '周边酒店')
+            response = self.client.get(f'/hotels/detail/{self.lake_hotel.id}/')
+            self.assertEqual([spot.id for spot in response.context['nearby_spots']], [self.lake.id])
+
+    def test_index_reloads_after_save(self):
+        self.assertEqual(len(self.index.nearby('hotel', 38.94, 115.93, radius_km=3)), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.far.latitude, self.far.longitude = '38.9420000', '115.9320000'
+            self.far.save()
+        hits = self.index.nearby('hotel', 38.94, 115.93, radius_km=3)
+        self.assertEqual({hit.id for hit in hits}, {self.far.id, self.lake_hotel.id})
+
+
+class OpeningHoursTests(TestCase):
+    """开放时间解析、OpeningHours 索引与景点列表的开放时间筛选"""
+
+    def setUp(self):
+        self.daily = self.create_spot('直隶总督署', '8:30-17:30')
+        self.seasonal = self.create_spot('古莲花池', '旺季（4月1日-10月31日）8:00-18:00；淡季8:30-17:00；周一闭馆')
+        self.night = self.create_spot('夜市', '18:00-次日2:00')
+        self.unknown = self.create_spot('野三坡', '以景区公告为准')
+
+    def create_spot(self, name, open_time):
+        return ScenicSpot.objects.create(name=name, address='保定市', ticket_price=0, open_time=open_time,
+                                         description='介绍')
+
+    def hours_queries(self, queries):
+        return [query['sql'] for query in queries if 'index_openinghours' in query['sql']]
+
+    def open_names(self, **params):
+        response = self.client.get('/scenic/list/', params)
+        return sorted(spot.name for spot in response.context['spots'])
+
+    def test_parse_open_time(self):
+        Interval = hours.Interval
+        self.assertEqual(hours.parse_open_time('08:00-18:00'), (Interval(127, 101, 1231, 480, 1080),))
+        self.assertEqual(hours.parse_open_time('周二至周日 9点-17点半（16:30停止入园）'),
+                         (Interval(0b1111110, 101, 1231, 540, 1050),))
+        self.assertEqual(hours.parse_open_time('5-10月 8:00-18:30，11月-次年4月 8:30-17:00，每周一闭馆'), (
+            Interval(0b1111110, 501, 1031, 480, 1110), Interval(0b1111110, 1101, 430, 510, 1020),
+        ))
+        self.assertEqual(hours.parse_open_time('夏季：\n工作日 9:00-17:00\n周末 8:00-18:00'), (
+            Interval(0b0011111, 401, 1031, 540, 1020), Interval(0b1100000, 401, 1031, 480, 1080),
+        ))
+        self.assertEqual(hours.parse_open_time('8:00-12:00，14:00-17:30，12:00-13:30午休'), (
+            Interval(127, 101, 1231, 480, 720), Interval(127, 101, 1231, 840, 1050),
+        ))
+        self.assertEqual(hours.parse_open_time('全天开放'), (Interval(127, 101, 1231, 0, 1440),))
+        self.assertEqual(hours.parse_open_time('暂停开放'), ())
+        self.assertIsNone(hours.parse_open_time('以景区公告为准'))
+
+    def test_hours_on_and_is_open(self):
+        intervals = hours.parse_open_time(self.seasonal.open_time)
+        self.assertEqual(hours.hours_on(intervals, date(2026, 7, 7)), [(480, 1080)])
+        self.assertEqual(hours.hours_on(intervals, date(2026, 1, 6)), [(510, 1020)])
+        self.assertEqual(hours.hours_on(intervals, date(2026, 7, 6)), [])
+        self.assertEqual(hours.closed_weekdays(intervals), [0])
+        night = hours.parse_open_time(self.night.open_time)
+        self.assertTrue(hours.is_open(night, datetime(2026, 7, 7, 1, 30)))
+        self.assertFalse(hours.is_open(night, datetime(2026, 7, 7, 3, 0)))
+
+    def test_index_follows_open_time(self):
+        self.assertEqual(OpeningHours.objects.filter(spot=self.seasonal).count(), 2)
+        self.assertFalse(OpeningHours.objects.filter(spot=self.unknown).exists())
+        # 只改其他字段时不重新解析；开放时间没变时只查一次，不写库
+        with CaptureQueriesContext(connection) as queries:
+            self.daily.save(update_fields=['views_count'])
+        self.assertEqual(self.hours_queries(queries), [])
+        with CaptureQueriesContext(connection) as queries:
+            self.daily.save()
+        self.assertEqual([sql.split()[0] for sql in self.hours_queries(queries)], ['SELECT'])
+        self.daily.open_time = '9:00-16:00'
+        self.daily.save()
+        self.assertEqual(list(OpeningHours.objects.filter(spot=self.daily).values_list('opens', 'closes')),
+                         [(540, 960)])
+        self.daily.delete()
+        self.assertFalse(OpeningHours.objects.filter(spot_id=self.daily.id).exists())
+
+    def test_list_filters_open_now_and_on_date(self):
+        moments = {
+            datetime(2026, 7, 7, 10, 0): ['古莲花池', '直隶总督署'],
+            datetime(2026, 7, 6, 10, 0): ['直隶总督署'],
+            datetime(2026, 1, 6, 17, 10): ['直隶总督署'],
+            datetime(2026, 7, 7, 1, 30): ['夜市'],
+            datetime(2026, 7, 7, 18, 30): ['夜市'],
+        }
+        for moment, names in moments.items():
+            with mock.patch('django.utils.timezone.localtime', return_value=moment):
+                self.assertEqual(self.open_names(open='now'), names, moment)
+            spots = ScenicSpot.objects.filter(id__in=hours.open_spot_ids(moment))
+            self.assertEqual(sorted(spot.name for spot in spots), names)
+        self.assertEqual(self.open_names(open='2026-07-06'), ['夜市', '直隶总督署'])
+        self.assertEqual(self.open_names(open='2026-07-07'), ['古莲花池', '夜市', '直隶总督署'])
+        self.assertEqual(len(self.open_names(open='bad-date')), 4)
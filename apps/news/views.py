@@ -1,4 +1,5 @@
 from django.views.generic import TemplateView
+from apps.index.counters import apply_pending, record_view
 from .models import News, NewsCategory
 
 
@@ -30,7 +31,8 @@ class NewsListView(TemplateView):
         # 按发布时间排序
         news_list = news_list.order_by('-published_at')
         
-        context['news_list'] = news_list
+        # 加上尚未写库的阅读量
+        context['news_list'] = apply_pending(news_list)
         context['selected_category'] = int(category_id) if category_id else None
         context['search_query'] = search_query
         
@@ -45,9 +47,8 @@ class NewsDetailView(TemplateView):
         
         try:
             news = News.objects.get(pk=pk)
-            # 增加浏览次数
-            news.views_count += 1
-            news.save(update_fields=['views_count'])
+            # 增加浏览次数（缓冲后批量写库，见 apps/index/counters.py）
+            record_view(news)
             
             context['news'] = news
             context['page_title'] = f"{news.title} - 保定旅游网"
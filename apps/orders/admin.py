@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Order, OrderDetail
+from .models import Order, OrderDetail, WaitlistEntry
+from .holds import cancel_orders
 
 
 class OrderDetailInline(admin.TabularInline):
@@ -33,12 +34,12 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('contact_name', 'contact_phone')
         }),
         ('时间信息', {
-            'fields': ('created_at', 'paid_at'),
+            'fields': ('created_at', 'paid_at', 'expires_at'),
             'classes': ('collapse',)
         }),
     )
     
-    readonly_fields = ('order_sn', 'created_at', 'paid_at')  # 订单号和时间信息只读
+    readonly_fields = ('order_sn', 'created_at', 'paid_at', 'expires_at')  # 订单号和时间信息只读
     
     def save_formset(self, request, form, formset, change):
         """保存表单集时自动计算小计"""
@@ -100,8 +101,8 @@ class OrderAdmin(admin.ModelAdmin):
     mark_as_completed.short_description = "标记为已完成"
     
     def mark_as_cancelled(self, request, queryset):
-        """批量标记为已取消"""
-        count = queryset.filter(status__in=['pending', 'paid']).update(status='cancelled')
+        """批量标记为已取消（同时归还占用的名额和房间）"""
+        count = cancel_orders(list(queryset.values_list('id', flat=True)), statuses=('pending', 'paid'))
         self.message_user(request, f"已将 {count} 个订单标记为已取消")
     mark_as_cancelled.short_description = "标记为已取消"
 
@@ -137,4 +138,14 @@ class OrderDetailAdmin(admin.ModelAdmin):
     def save_model(self, request, obj, form, change):
         """保存时自动计算小计"""
         obj.subtotal = obj.price * obj.quantity
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    """路线候补队列管理"""
+    list_display = ('id', 'route', 'user', 'quantity', 'status', 'order', 'created_at', 'promoted_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('route__name', 'user__username', 'user__phone', 'contact_name', 'contact_phone')
+    raw_id_fields = ('route', 'user', 'order')
+    readonly_fields = ('created_at', 'promoted_at')
@@ -1,43 +1,408 @@
+import json
+from datetime import datetime
+
+from django.db.models import Q
 from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.views import View
-from .models import Order  # 确保导入 Order 模型
+from apps.routes.inventory import SeatsUnavailable
+
+from .models import Order, WaitlistEntry  # 确保导入 Order 模型
+from .holds import cancel_orders
+from .idempotency import idempotent
+from . import flash_sale
+from .checkout import MAX_CART_ITEMS, place_order
+from .waitlist import join_waitlist, leave_waitlist, waitlist_position
+from .views import OrderPaymentView
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+def format_datetime(value):
+    """统一的时间格式（东八区）"""
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def serialize_order(order):
+    """订单转为 JSON 数据（details 需已预取）"""
+    return {
+        "order_sn": order.order_sn,
+        "status": order.status,
+        "status_display": order.get_status_display(),
+        "total": float(order.total_amount),
+        "contact_name": order.contact_name,
+        "contact_phone": order.contact_phone,
+        "created_at": format_datetime(order.created_at),
+        "paid_at": format_datetime(order.paid_at),
+        "expires_at": format_datetime(order.expires_at),
+        "details": [
+            {
+                "item_type": detail.item_type,
+                "item_id": detail.item_id,
+                "item_name": detail.item_name,
+                "price": float(detail.price),
+                "quantity": detail.quantity,
+                "subtotal": float(detail.subtotal),
+                "check_in_date": detail.check_in_date.isoformat() if detail.check_in_date else None,
+                "check_out_date": detail.check_out_date.isoformat() if detail.check_out_date else None,
+            }
+            for detail in order.details.all()
+        ],
+    }
+
+
+def serialize_waitlist_entry(entry, position=None):
+    """候补记录转为 JSON 数据"""
+    return {
+        "id": entry.id,
+        "route_id": entry.route_id,
+        "quantity": entry.quantity,
+        "status": entry.status,
+        "status_display": entry.get_status_display(),
+        "position": position,
+        "order_sn": entry.order.order_sn if entry.order_id else None,
+        "created_at": format_datetime(entry.created_at),
+        "promoted_at": format_datetime(entry.promoted_at),
+    }
+
+
+def waitlist_response(entry):
+    """加入候补后的响应：已直接转为订单时返回订单号，否则返回排队位置"""
+    if entry.status == 'promoted':
+        return JsonResponse({
+            "status": "success",
+            "message": "有名额释放，已为您生成订单",
+            "order_sn": entry.order.order_sn,
+            "state": "promoted",
+            "payment_url": f"/orders/payment/{entry.order.order_sn}/",
+            "data": serialize_waitlist_entry(entry),
+        })
+    position = waitlist_position(entry)
+    return JsonResponse({
+        "status": "success",
+        "message": f"名额不足，已加入候补队列，当前排在第{position}位",
+        "state": "waitlisted",
+        "data": serialize_waitlist_entry(entry, position),
+    }, status=202)
+
+
+def encode_cursor(order):
+    """游标 = 最后一条订单的 (创建时间, ID)"""
+    return urlsafe_base64_encode(f"{order.created_at.isoformat()}|{order.id}".encode())
 
 
-# 1. 恢复：原有的创建订单视图
+def decode_cursor(cursor):
+    """解析游标，格式错误时抛出 ValueError"""
+    try:
+        created_at, order_id = urlsafe_base64_decode(cursor).decode().split('|')
+        return datetime.fromisoformat(created_at), int(order_id)
+    except (TypeError, UnicodeDecodeError, ValueError):
+        raise ValueError("cursor 参数无效")
+
+
+# 1. 创建订单：复用 OrderPaymentView.create_order 的事务逻辑
 class OrderCreateAPIView(View):
+    """
+    创建订单API
+    POST /api/v1/orders/create/
+    参数（JSON 或表单）：
+    - item_id / item_type / quantity: 预订项目（必填）
+    - contact_name / contact_phone: 联系人（必填）
+    - check_in_date / check_out_date / room_type_id: 酒店预订时填写
+    - join_waitlist: 路线名额不足时是否自动加入候补队列（可选，true/1）
+    请求头 Idempotency-Key（可选）：客户端重试时携带同一个值，不会重复下单
+
+    路线名额不足且 join_waitlist 为真时返回 202，state 为 waitlisted 并附带排队位置；
+    有名额释放时自动生成待支付订单并发送通知
+
+    秒杀模式的路线（Route.is_flash_sale）返回 202 和订单号，订单异步写库，
+    通过 state_url 查询最终结果
+    """
+
+    @idempotent('create')
+    def post(self, request):
+        if not request.user.is_authenticated:
+            return JsonResponse({"status": "error", "message": "请先登录"}, status=401)
+
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or '{}')
+            except ValueError:
+                return JsonResponse({"status": "error", "message": "请求数据格式错误"}, status=400)
+        else:
+            data = request.POST
+
+        item_id = data.get('item_id')
+        item_type = data.get('item_type')
+        contact_name = (data.get('contact_name') or '').strip()
+        contact_phone = (data.get('contact_phone') or '').strip()
+        if not all([item_id, item_type, contact_name, contact_phone]):
+            return JsonResponse({"status": "error", "message": "参数不完整"}, status=400)
+
+        try:
+            quantity = int(data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return JsonResponse({"status": "error", "message": "数量必须是整数"}, status=400)
+        if quantity <= 0:
+            return JsonResponse({"status": "error", "message": "数量必须大于0"}, status=400)
+
+        # 秒杀路线：缓存令牌准入，订单异步写库，立即返回订单号
+        if item_type == 'route' and str(item_id).isdigit():
+            route = flash_sale.get_flash_sale_route(int(item_id))
+            if route:
+                try:
+                    order_sn = flash_sale.admit(request.user, route, quantity, contact_name, contact_phone)
+                except ValueError as e:
+                    return JsonResponse({"status": "error", "message": str(e)}, status=400)
+                return JsonResponse({
+                    "status": "success",
+                    "message": "抢购成功，订单正在处理中",
+                    "order_sn": order_sn,
+                    "state": "queued",
+                    "state_url": f"/api/v1/orders/flash-sale/{order_sn}/",
+                    "payment_url": f"/orders/payment/{order_sn}/",
+                }, status=202)
+
+        try:
+            order = OrderPaymentView().create_order(
+                request.user, item_id, item_type, quantity, contact_name, contact_phone,
+                data.get('check_in_date'), data.get('check_out_date'), data.get('room_type_id')
+            )
+        except SeatsUnavailable as e:
+            # 路线名额不足：按需加入候补队列
+            if str(data.get('join_waitlist', '')).lower() not in ('1', 'true', 'on', 'yes'):
+                return JsonResponse({
+                    "status": "error",
+                    "message": f"{e}，可传入 join_waitlist=true 加入候补队列",
+                    "waitlist_available": True,
+                }, status=400)
+            try:
+                entry = join_waitlist(request.user, e.route_id, quantity, contact_name, contact_phone)
+            except ValueError as waitlist_error:
+                return JsonResponse({"status": "error", "message": str(waitlist_error)}, status=400)
+            return waitlist_response(entry)
+        except ValueError as e:
+            # 名额不足、房间不足、参数错误等业务错误
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+        order = Order.objects.prefetch_related('details').get(pk=order.pk)
+        return JsonResponse({
+            "status": "success",
+            "message": "订单创建成功",
+            "order_sn": order.order_sn,
+            "payment_url": f"/orders/payment/{order.order_sn}/",
+            "data": serialize_order(order),
+        })
+
+
+# 秒杀订单状态
+class FlashSaleStateAPIView(View):
+    """
+    查询秒杀订单的写库状态
+    GET /api/v1/orders/flash-sale/<order_sn>/
+    state: queued（排队写库）/ confirmed（已生成订单，待支付）/ rejected（名额不足，未生成订单）
+    只能查询本人的订单，其他用户的订单返回 404
+    """
+
+    def get(self, request, order_sn):
+        if not request.user.is_authenticated:
+            return JsonResponse({"status": "error", "message": "请先登录"}, status=401)
+
+        state = flash_sale.get_reservation_state(order_sn, user=request.user)
+        if state is None:
+            return JsonResponse({"status": "error", "message": "订单未找到"}, status=404)
+        return JsonResponse({"status": "success", "data": {"order_sn": order_sn, "state": state}})
+
+
+# 路线候补队列
+class WaitlistAPIView(View):
+    """
+    路线候补队列API
+    GET  /api/v1/orders/waitlist/      当前用户的候补记录（候补中的记录附带排队位置）
+    POST /api/v1/orders/waitlist/      加入候补，参数（JSON 或表单）：route_id / quantity / contact_name / contact_phone
+    """
+
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return JsonResponse({"status": "error", "message": "请先登录"}, status=401)
+
+        entries = WaitlistEntry.objects.filter(user=request.user).select_related('order').order_by('-id')[:MAX_PAGE_SIZE]
+        data = [
+            serialize_waitlist_entry(entry, waitlist_position(entry) if entry.status == 'waiting' else None)
+            for entry in entries
+        ]
+        return JsonResponse({"status": "success", "data": data})
+
+    def post(self, request):
+        if not request.user.is_authenticated:
+            return JsonResponse({"status": "error", "message": "请先登录"}, status=401)
+
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body or '{}')
+            except ValueError:
+                return JsonResponse({"status": "error", "message": "请求数据格式错误"}, status=400)
+        else:
+            data = request.POST
+
+        contact_name = (data.get('contact_name') or '').strip()
+        contact_phone = (data.get('contact_phone') or '').strip()
+        try:
+            route_id = int(data.get('route_id'))
+            quantity = int(data.get('quantity', 1))
+        except (TypeError, ValueError):
+            return JsonResponse({"status": "error", "message": "路线ID和数量必须是整数"}, status=400)
+        if not contact_name or not contact_phone:
+            return JsonResponse({"status": "error", "message": "参数不完整"}, status=400)
+
+        try:
+            entry = join_waitlist(request.user, route_id, quantity, contact_name, contact_phone)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+        return waitlist_response(entry)
+
+
+class WaitlistLeaveAPIView(View):
+    """
+    取消候补
+    DELETE /api/v1/orders/waitlist/<entry_id>/
+    """
+
+    def delete(self, request, entry_id):
+        if not request.user.is_authenticated:
+            return JsonResponse({"status": "error", "message": "请先登录"}, status=401)
+
+        if leave_waitlist(request.user, entry_id):
+            return JsonResponse({"status": "success", "message": "已取消候补"})
+        return JsonResponse({"status": "error", "message": "候补记录不存在或已处理"}, status=404)
+
+
+# 购物车结算：多个项目在一个事务内下单
+class OrderCheckoutAPIView(View):
+    """
+    购物车结算API
+    POST /api/v1/orders/checkout/
+    参数（JSON）：
+    - items: 购物车项目列表（必填，最多20项），每项包含 item_type / item_id / quantity，
+             酒店另需 check_in_date / check_out_date，可选 room_type_id
+    - contact_name / contact_phone: 联系人（必填）
+    请求头 Idempotency-Key（可选）：客户端重试时携带同一个值，不会重复下单
+
+    所有项目的库存在同一个事务中扣减，任意一项不足时整单失败、不扣减任何库存
+    """
+
+    @idempotent('checkout')
     def post(self, request):
-        # 创建订单逻辑
-        # 1. 获取前端提交的 (item_id, item_type, quantity, contact_info)
-        # 2. 验证库存/价格 (如果需要)
-        # 3. 创建 Order 和 OrderDetail
-        # 4. 返回订单号和支付信息
-        order_sn = "BD202511040001"
-        return JsonResponse({"status": "success", "message": "订单创建成功", "order_sn": order_sn})
+        if not request.user.is_authenticated:
+            return JsonResponse({"status": "error", "message": "请先登录"}, status=401)
+
+        try:
+            data = json.loads(request.body or '{}')
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "请求数据格式错误"}, status=400)
+
+        items = data.get('items')
+        contact_name = (data.get('contact_name') or '').strip()
+        contact_phone = (data.get('contact_phone') or '').strip()
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            return JsonResponse({"status": "error", "message": "items 必须是项目列表"}, status=400)
+        if not items or not contact_name or not contact_phone:
+            return JsonResponse({"status": "error", "message": "参数不完整"}, status=400)
+        if len(items) > MAX_CART_ITEMS:
+            return JsonResponse({"status": "error", "message": f"一次最多预订{MAX_CART_ITEMS}个项目"}, status=400)
 
+        try:
+            order = place_order(request.user, items, contact_name, contact_phone)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+        order = Order.objects.prefetch_related('details').get(pk=order.pk)
+        return JsonResponse({
+            "status": "success",
+            "message": "订单创建成功",
+            "order_sn": order.order_sn,
+            "payment_url": f"/orders/payment/{order.order_sn}/",
+            "data": serialize_order(order),
+        })
 
-# 2. 恢复：原有的订单列表视图
+
+# 2. 订单列表：按 (创建时间, ID) 游标分页
 class OrderListAPIView(View):
+    """
+    获取当前用户的订单列表API
+    GET /api/v1/orders/list/
+    参数：
+    - status: 订单状态（可选，pending / paid / completed / cancelled）
+    - cursor: 上一页返回的 next_cursor（可选，不传返回第一页）
+    - page_size: 每页数量（可选，默认10，最大50）
+
+    使用游标分页而不是 OFFSET，翻到多深都只按索引定位；
+    每页固定两条查询（订单 + 一次预取全部明细）
+    """
+
     def get(self, request):
-        # 获取当前用户的订单列表 (需要登录)
-        # request.GET.get('status') # 按状态筛选
-        orders = [{"order_sn": "BD202511040001", "status": "待支付", "total": 500.00}]
-        return JsonResponse({"status": "success", "data": orders})
+        if not request.user.is_authenticated:
+            return JsonResponse({"status": "error", "message": "请先登录"}, status=401)
+
+        try:
+            page_size = min(max(int(request.GET.get('page_size', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "page_size 参数无效"}, status=400)
+
+        queryset = Order.objects.filter(user=request.user)
+
+        status = request.GET.get('status')
+        if status:
+            if status not in dict(Order.STATUS_CHOICES):
+                return JsonResponse({"status": "error", "message": "订单状态无效"}, status=400)
+            queryset = queryset.filter(status=status)
 
+        cursor = request.GET.get('cursor')
+        if cursor:
+            try:
+                created_at, order_id = decode_cursor(cursor)
+            except ValueError as e:
+                return JsonResponse({"status": "error", "message": str(e)}, status=400)
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=order_id)
+            )
 
-# 3. 恢复：原有的订单详情视图
+        # 多取一条用于判断是否还有下一页
+        orders = list(queryset.order_by('-created_at', '-id').prefetch_related('details')[:page_size + 1])
+        has_more = len(orders) > page_size
+        orders = orders[:page_size]
+
+        return JsonResponse({
+            "status": "success",
+            "data": [serialize_order(order) for order in orders],
+            "pagination": {
+                "page_size": page_size,
+                "has_more": has_more,
+                "next_cursor": encode_cursor(orders[-1]) if has_more else None,
+            },
+        })
+
+
+# 3. 订单详情
 class OrderDetailAPIView(View):
+    """
+    获取订单详情API
+    GET /api/v1/orders/detail/<order_sn>/
+    只能查看自己的订单
+    """
+
     def get(self, request, order_sn):
-        # 获取订单详情 (需要登录和权限验证)
-        order_detail = {
-            "order_sn": order_sn,
-            "status": "待支付",
-            "total": 500.00,
-            "contact_name": "张三",
-            "details": [
-                {"item_name": "保定2日游", "price": 500.00, "quantity": 1}
-            ]
-        }
-        return JsonResponse({"status": "success", "data": order_detail})
+        if not request.user.is_authenticated:
+            return JsonResponse({"status": "error", "message": "请先登录"}, status=401)
+
+        try:
+            order = Order.objects.prefetch_related('details').get(order_sn=order_sn, user=request.user)
+        except Order.DoesNotExist:
+            return JsonResponse({"status": "error", "message": "订单未找到"}, status=404)
+
+        return JsonResponse({"status": "success", "data": serialize_order(order)})
 
 
 # 4. 保留：我们新增的取消订单视图
@@ -55,10 +420,8 @@ class OrderCancelAPIView(View):
             # 2. 获取订单，并确保订单是属于当前用户的
             order = Order.objects.get(order_sn=order_sn, user=request.user)
 
-            # 3. 只有 'pending' (待支付) 状态的订单才能被取消
-            if order.status == 'pending':
-                order.status = 'cancelled'  # 更新状态
-                order.save()
+            # 3. 只有 'pending' (待支付) 状态的订单才能被取消，取消时归还占用的名额和房间
+            if cancel_orders([order.id]):
                 return JsonResponse({"status": "success", "message": "订单已取消"})
             else:
                 return JsonResponse({"status": "error", "message": "当前状态无法取消订单"}, status=400)
@@ -4,6 +4,10 @@ from . import api
 # /api/v1/orders/
 urlpatterns = [
     path('create/', api.OrderCreateAPIView.as_view(), name='api-create'),
+    path('checkout/', api.OrderCheckoutAPIView.as_view(), name='api-checkout'),
+    path('flash-sale/<str:order_sn>/', api.FlashSaleStateAPIView.as_view(), name='api-flash-sale-state'),
+    path('waitlist/', api.WaitlistAPIView.as_view(), name='api-waitlist'),
+    path('waitlist/<int:entry_id>/', api.WaitlistLeaveAPIView.as_view(), name='api-waitlist-leave'),
     path('list/', api.OrderListAPIView.as_view(), name='api-list'),
     path('detail/<str:order_sn>/', api.OrderDetailAPIView.as_view(), name='api-detail'),
 
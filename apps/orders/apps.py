@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class OrdersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.orders'
+    verbose_name = '订单管理'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.signals import request_started
+
+        # 配置了清理间隔时，在收到第一个请求后启动进程内的超时订单清理线程
+        if getattr(settings, 'ORDER_SWEEP_INTERVAL', 0) > 0:
+            from .scheduler import start_on_first_request
+            request_started.connect(start_on_first_request, dispatch_uid='orders_start_sweeper')
@@ -0,0 +1,174 @@
+"""
+下单：在一个事务内预订一个或多个项目
+
+购物车中的每一项为一个字典：
+    {'item_type': 'route', 'item_id': 3, 'quantity': 2}
+    {'item_type': 'hotel', 'item_id': 1, 'quantity': 1,
+     'check_in_date': '2026-05-01', 'check_out_date': '2026-05-03', 'room_type_id': 2}
+
+place_order() 先把购物车项按 (类型, ID, 房型, 入住日期) 排序并合并重复项，再依次扣减库存，
+所有并发的购物车都按同一个全局顺序获取行锁 / 执行带条件的 UPDATE，不会互相等待形成死锁；
+任意一项库存不足时抛出 ValueError，整个事务回滚，已扣减的项目一并恢复。
+订单明细最后用一次 bulk_create 写入。
+"""
+from datetime import datetime
+
+from apps.hotels.inventory import reserve_room_nights
+from apps.hotels.models import Hotel, RoomType
+from apps.routes.inventory import reserve_route_seats
+from apps.routes.models import Route
+from apps.scenic.models import ScenicSpot
+
+from .holds import hold_deadline
+from .models import Order, OrderDetail
+from .order_sn import next_order_sn
+from .transactions import booking_transaction
+
+MAX_CART_ITEMS = 20
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"日期格式错误：{str(e)}")
+
+
+def normalize_item(item):
+    """校验购物车项并转换字段类型"""
+    item_type = item.get('item_type')
+    if item_type not in ('scenic', 'route', 'hotel'):
+        raise ValueError("不支持的项目类型")
+    try:
+        item_id = int(item.get('item_id'))
+        quantity = int(item.get('quantity', 1))
+        room_type_id = int(item['room_type_id']) if item.get('room_type_id') else None
+    except (TypeError, ValueError):
+        raise ValueError("项目ID和数量必须是整数")
+    if quantity <= 0:
+        raise ValueError("数量必须大于0")
+
+    check_in = check_out = None
+    if item_type == 'hotel':
+        if not item.get('check_in_date') or not item.get('check_out_date'):
+            raise ValueError("请选择入住和退房日期")
+        check_in = parse_date(item['check_in_date'])
+        check_out = parse_date(item['check_out_date'])
+
+    return {
+        'item_type': item_type,
+        'item_id': item_id,
+        'quantity': quantity,
+        'room_type_id': room_type_id,
+        'check_in': check_in,
+        'check_out': check_out,
+    }
+
+
+def lock_order_key(item):
+    """全局加锁顺序：类型、ID、房型、入住日期"""
+    return (item['item_type'], item['item_id'], item['room_type_id'] or 0,
+            item['check_in'] or datetime.min.date(), item['check_out'] or datetime.min.date())
+
+
+def sort_and_merge(items):
+    """按加锁顺序排序，同一项目（同房型同日期）合并数量"""
+    merged = {}
+    for item in map(normalize_item, items):
+        key = lock_order_key(item)
+        if key in merged:
+            merged[key]['quantity'] += item['quantity']
+        else:
+            merged[key] = item
+    return [merged[key] for key in sorted(merged)]
+
+
+def reserve_item(item):
+    """扣减单个项目的库存，返回未保存的 OrderDetail"""
+    try:
+        return _reserve_item(item)
+    except (ScenicSpot.DoesNotExist, Route.DoesNotExist, Hotel.DoesNotExist):
+        raise ValueError("预订的项目不存在")
+
+
+def _reserve_item(item):
+    item_type = item['item_type']
+    quantity = item['quantity']
+    room_type = None
+
+    if item_type == 'scenic':
+        # 景点门票通常不需要库存控制，直接获取
+        spot = ScenicSpot.objects.get(pk=item['item_id'])
+        item_name = spot.name
+        price = spot.ticket_price
+        subtotal = price * quantity
+
+    elif item_type == 'route':
+        # 路线需要控制成团人数：一条带条件的UPDATE完成检查和扣减，防止超卖
+        # （SQLite 不支持 select_for_update 行锁，不能依赖先查后改）
+        route = Route.objects.get(pk=item['item_id'])
+        item_name = route.name
+        price = route.price
+        reserve_route_seats(route.id, quantity)
+        subtotal = price * quantity
+
+    else:
+        # 酒店按房型、按晚扣减库存台账，不锁定整个酒店行
+        hotel = Hotel.objects.get(pk=item['item_id'])
+        if item['room_type_id']:
+            try:
+                room_type = RoomType.objects.get(pk=item['room_type_id'], hotel=hotel, is_available=True)
+            except RoomType.DoesNotExist:
+                raise ValueError("选择的房间类型不存在或不可用")
+        else:
+            # 如果没有指定，使用最低价格的房间
+            room_type = RoomType.objects.filter(hotel=hotel, is_available=True).order_by('price').first()
+        if not room_type:
+            raise ValueError("暂无可用房间")
+
+        item_name = f"{hotel.name} - {room_type.name}"
+        price = room_type.price
+        # 扣减入住区间内每一晚的库存（库存不足时抛出ValueError，事务回滚）
+        nights = reserve_room_nights(room_type, item['check_in'], item['check_out'], quantity)
+        # 总价 = 单价 * 天数 * 房间数
+        subtotal = price * nights * quantity
+
+    return OrderDetail(
+        item_type=item_type,
+        item_id=item['item_id'],
+        item_name=item_name,
+        price=price,
+        quantity=quantity,
+        subtotal=subtotal,
+        check_in_date=item['check_in'],
+        check_out_date=item['check_out'],
+        room_type_id=room_type.id if room_type else None,
+    )
+
+
+@booking_transaction
+def place_order(user, items, contact_name, contact_phone):
+    """
+    创建包含一个或多个项目的订单
+    所有项目的库存扣减、订单和明细写入在同一个事务中完成，任意一项失败整体回滚
+    """
+    if not items:
+        raise ValueError("购物车为空")
+    if len(items) > MAX_CART_ITEMS:
+        raise ValueError(f"一次最多预订{MAX_CART_ITEMS}个项目")
+
+    details = [reserve_item(item) for item in sort_and_merge(items)]
+
+    order = Order.objects.create(
+        order_sn=next_order_sn(),
+        user=user,
+        total_amount=sum(detail.subtotal for detail in details),
+        status='pending',
+        contact_name=contact_name,
+        contact_phone=contact_phone,
+        expires_at=hold_deadline(),
+    )
+    for detail in details:
+        detail.order = order
+    OrderDetail.objects.bulk_create(details)
+    return order
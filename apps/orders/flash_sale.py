@@ -0,0 +1,297 @@
+"""
+热门路线的秒杀模式（Route.is_flash_sale）
+
+普通下单时每个请求都要在事务里更新同一条路线记录，开售瞬间大量请求排队等待写锁。
+秒杀模式把"抢名额"和"写订单"拆开：
+1. 准入：缓存中为每条路线维护剩余名额令牌，请求到达时原子地扣减（cache.decr），
+   扣减后小于0则立即归还并拒绝，整个过程不访问数据库
+2. 异步写库：准入成功的请求先分配订单号返回给用户，由后台线程按批次写库——
+   每批在一个事务中对每条路线执行一次带条件的名额扣减，再用 bulk_create 写入订单和明细
+3. 对账：以数据库为准。写库时名额不足的请求（例如多个进程各自持有一份本地缓存计数）
+   按先到先得拒绝，并根据数据库重新设置令牌数量；订单取消或超时释放名额后也会重新设置
+
+多进程部署时应把 CACHES 配置为 Redis 等共享缓存，令牌计数才是全局一致的；
+使用默认的本地内存缓存时准入只在单进程内精确，超出的部分由对账拒绝，数据库中不会超卖。
+
+订单状态可通过 get_reservation_state(order_sn) 查询：queued（排队写库）/ confirmed / rejected。
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+
+from apps.routes.models import Route
+
+from .holds import hold_deadline
+from .models import Order, OrderDetail
+from .order_sn import next_order_sn
+from .transactions import booking_transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 0.05
+ROUTE_CACHE_TTL = 60
+STATE_TTL = 3600
+
+
+def _tokens_key(route_id):
+    return f"flash_sale:tokens:{route_id}"
+
+
+def _route_key(route_id):
+    return f"flash_sale:route:{route_id}"
+
+
+def _state_key(order_sn):
+    return f"flash_sale:order:{order_sn}"
+
+
+def get_flash_sale_route(route_id):
+    """
+    读取路线的秒杀配置（缓存 ROUTE_CACHE_TTL 秒），非秒杀路线返回 None
+    返回 {'id', 'name', 'price', 'is_flash_sale'}
+    """
+    snapshot = cache.get(_route_key(route_id))
+    if snapshot is None:
+        route = Route.objects.filter(pk=route_id).only('name', 'price', 'is_flash_sale').first()
+        if route is None:
+            return None
+        snapshot = {'id': route.id, 'name': route.name, 'price': route.price, 'is_flash_sale': route.is_flash_sale}
+        cache.set(_route_key(route_id), snapshot, ROUTE_CACHE_TTL)
+    return snapshot if snapshot['is_flash_sale'] else None
+
+
+def available_tokens(route_id):
+    """按数据库计算可发放的令牌数：剩余名额 - 本进程已准入但尚未写库的人数"""
+    route = Route.objects.only('group_size', 'sales_count').get(pk=route_id)
+    return max(route.group_size - route.sales_count - writer.queued_quantity(route_id), 0)
+
+
+def reset_tokens(route_id):
+    """以数据库为准重新设置路线的令牌数量（开售、对账时调用）"""
+    tokens = available_tokens(route_id)
+    cache.set(_tokens_key(route_id), tokens, None)
+    return tokens
+
+
+def sync_tokens(route_ids):
+    """名额被释放后，为已开启令牌计数的路线重新设置令牌数量"""
+    for route_id in route_ids:
+        if cache.get(_tokens_key(route_id)) is not None:
+            reset_tokens(route_id)
+
+
+def _take_tokens(route_id, quantity):
+    """原子地扣减令牌，返回扣减后的剩余数量"""
+    key = _tokens_key(route_id)
+    for _ in range(2):
+        try:
+            return cache.decr(key, quantity)
+        except ValueError:
+            # 令牌尚未初始化（或已被缓存淘汰）：按数据库初始化，cache.add 保证只初始化一次
+            cache.add(key, available_tokens(route_id), None)
+    return cache.decr(key, quantity)
+
+
+def admit(user, route, quantity, contact_name, contact_phone):
+    """
+    秒杀准入：名额足够时分配订单号并加入写库队列，返回订单号；名额不足时抛出 ValueError
+    route 为 get_flash_sale_route() 返回的配置
+    """
+    if quantity <= 0:
+        raise ValueError("报名人数必须大于0")
+
+    remaining = _take_tokens(route['id'], quantity)
+    if remaining < 0:
+        cache.incr(_tokens_key(route['id']), quantity)
+        raise ValueError("名额已抢完")
+
+    order_sn = next_order_sn()
+    _set_state(order_sn, user.pk, 'queued')
+    writer.submit({
+        'order_sn': order_sn,
+        'user_id': user.pk,
+        'route_id': route['id'],
+        'route_name': route['name'],
+        'price': route['price'],
+        'quantity': quantity,
+        'contact_name': contact_name,
+        'contact_phone': contact_phone,
+    })
+    return order_sn
+
+
+def _set_state(order_sn, user_id, state):
+    # 同时保存下单用户，查询时只返回本人的订单状态
+    cache.set(_state_key(order_sn), (user_id, state), STATE_TTL)
+
+
+def get_reservation_state(order_sn, user=None):
+    """
+    查询秒杀订单状态：queued / confirmed / rejected，未知订单返回 None
+    指定 user 时只查询该用户的订单，其他用户的订单同样返回 None
+    """
+    cached = cache.get(_state_key(order_sn))
+    if cached is not None:
+        user_id, state = cached
+        return state if user is None or user_id == user.pk else None
+    orders = Order.objects.filter(order_sn=order_sn)
+    if user is not None:
+        orders = orders.filter(user=user)
+    return 'confirmed' if orders.exists() else None
+
+
+@booking_transaction
+def _write_batch(reservations):
+    """
+    在一个事务中写入一批准入记录，返回 (写入的记录, 被拒绝的记录)
+    每条路线按准入顺序接受到名额用完为止，一条 UPDATE 扣减该路线的总人数
+    """
+    by_route = defaultdict(list)
+    for reservation in reservations:
+        by_route[reservation['route_id']].append(reservation)
+
+    accepted, rejected = [], []
+    for route_id in sorted(by_route):
+        # SQLite 上整个事务为 BEGIN IMMEDIATE；支持行锁的数据库上锁定路线行
+        route = Route.objects.select_for_update().only('group_size', 'sales_count').get(pk=route_id)
+        available = route.group_size - route.sales_count
+        taken = 0
+        for reservation in by_route[route_id]:
+            if taken + reservation['quantity'] <= available:
+                taken += reservation['quantity']
+                accepted.append(reservation)
+            else:
+                rejected.append(reservation)
+        if taken:
+            Route.objects.filter(pk=route_id).update(sales_count=F('sales_count') + taken)
+
+    deadline = hold_deadline()
+    orders = Order.objects.bulk_create([
+        Order(
+            order_sn=r['order_sn'], user_id=r['user_id'], total_amount=r['price'] * r['quantity'],
+            status='pending', contact_name=r['contact_name'], contact_phone=r['contact_phone'],
+            expires_at=deadline,
+        )
+        for r in accepted
+    ])
+    OrderDetail.objects.bulk_create([
+        OrderDetail(
+            order=order, item_type='route', item_id=r['route_id'], item_name=r['route_name'],
+            price=r['price'], quantity=r['quantity'], subtotal=r['price'] * r['quantity'],
+        )
+        for order, r in zip(orders, accepted)
+    ])
+    return accepted, rejected
+
+
+class FlashSaleWriter:
+    """
+    准入记录的异步写库队列
+    后台线程每攒够 batch_size 条或等待 interval 秒写一次库；flush() 可同步写完队列中的全部记录
+    """
+
+    def __init__(self, batch_size=None, interval=None, autostart=True):
+        self.batch_size = batch_size or getattr(settings, 'FLASH_SALE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.interval = interval or getattr(settings, 'FLASH_SALE_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self.autostart = autostart
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._queued = defaultdict(int)
+        self._thread = None
+
+    def submit(self, reservation):
+        with self._lock:
+            self._queued[reservation['route_id']] += reservation['quantity']
+        self._queue.put(reservation)
+        if self.autostart:
+            self._ensure_started()
+
+    def queued_quantity(self, route_id):
+        with self._lock:
+            return self._queued[route_id]
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='flash-sale-writer', daemon=True)
+                self._thread.start()
+
+    def _take_batch(self, block):
+        batch = []
+        if block:
+            # 等待第一条记录，之后最多再等 interval 秒凑满一批
+            batch.append(self._queue.get())
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if block and timeout > 0:
+                    batch.append(self._queue.get(timeout=timeout))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(block=True)
+            try:
+                self.write(batch)
+            except Exception as e:
+                # 对账失败不能让写库线程退出
+                logger.error(f"秒杀对账失败: {e}", exc_info=True)
+
+    def write(self, batch):
+        """写入一批准入记录并对账"""
+        if not batch:
+            return
+        try:
+            accepted, rejected = _write_batch(batch)
+        except Exception as e:
+            # 整批写库失败：全部拒绝，令牌按数据库重新设置
+            logger.error(f"秒杀订单写库失败: {e}", exc_info=True)
+            connection.close()
+            accepted, rejected = [], batch
+
+        with self._lock:
+            for reservation in batch:
+                self._queued[reservation['route_id']] -= reservation['quantity']
+        for reservation in accepted:
+            _set_state(reservation['order_sn'], reservation['user_id'], 'confirmed')
+        for reservation in rejected:
+            _set_state(reservation['order_sn'], reservation['user_id'], 'rejected')
+        if rejected:
+            for route_id in {r['route_id'] for r in rejected}:
+                reset_tokens(route_id)
+            logger.warning(f"秒杀对账：{len(rejected)} 个准入请求未能写入，已按数据库重新设置令牌")
+
+    def flush(self):
+        """同步写完队列中的全部记录（测试、压测和进程退出时使用）"""
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                return
+            self.write(batch)
+
+
+writer = FlashSaleWriter()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        writer.flush()
+    except Exception as e:
+        logger.error(f"进程退出时写入秒杀订单失败: {e}", exc_info=True)
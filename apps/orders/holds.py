@@ -0,0 +1,111 @@
+"""
+待支付订单的库存保留与超时释放
+
+下单时扣减的路线名额、酒店房间库存只保留到 Order.expires_at（默认下单后30分钟），
+超时未支付的订单由 expire_pending_orders() 分批取消并归还库存：
+- 每批按 (status, expires_at) 索引取出一批到期订单的ID，一条 UPDATE 改为已取消
+- 同一批订单的明细按路线 / 房型+日期汇总，路线名额一条 UPDATE 归还，房间库存每个房型一条 UPDATE 归还
+- 每批单独一个事务（SQLite 上为 BEGIN IMMEDIATE），不会长时间占用写锁
+- 归还的路线名额在同一事务中按先到先得分配给候补用户（见 waitlist.py）
+
+调用方式：
+- 定时任务：python manage.py expire_orders（见 management/commands/expire_orders.py）
+- 进程内：settings.ORDER_SWEEP_INTERVAL > 0 时由 scheduler.py 启动后台线程定期执行
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.hotels.inventory import iter_nights, release_room_nights_bulk
+from apps.routes.inventory import release_route_seats_bulk
+
+from .models import Order, OrderDetail
+from .transactions import booking_transaction
+
+DEFAULT_HOLD_MINUTES = 30
+SWEEP_BATCH_SIZE = 1000
+
+
+def hold_deadline(now=None):
+    """计算新订单的支付截止时间"""
+    minutes = getattr(settings, 'ORDER_HOLD_MINUTES', DEFAULT_HOLD_MINUTES)
+    return (now or timezone.now()) + timedelta(minutes=minutes)
+
+
+def release_inventory(order_ids):
+    """归还一批订单占用的路线名额和酒店房间库存"""
+    details = OrderDetail.objects.filter(order_id__in=order_ids)
+
+    route_quantities = {
+        row['item_id']: row['quantity']
+        for row in details.filter(item_type='route').values('item_id').annotate(quantity=Sum('quantity'))
+    }
+    release_route_seats_bulk(route_quantities)
+    if route_quantities:
+        # 释放的名额在同一事务中先分配给候补用户
+        from .waitlist import promote_waitlist
+        promote_waitlist(list(route_quantities))
+        # 秒杀路线的令牌计数在事务提交后按数据库重新设置
+        from .flash_sale import sync_tokens
+        transaction.on_commit(lambda: sync_tokens(route_quantities))
+
+    room_quantities = defaultdict(int)
+    hotel_rows = details.filter(
+        item_type='hotel',
+        room_type_id__isnull=False,
+        check_in_date__isnull=False,
+        check_out_date__isnull=False,
+    ).values('room_type_id', 'check_in_date', 'check_out_date').annotate(quantity=Sum('quantity'))
+    for row in hotel_rows:
+        for night in iter_nights(row['check_in_date'], row['check_out_date']):
+            room_quantities[(row['room_type_id'], night)] += row['quantity']
+    release_room_nights_bulk(room_quantities)
+
+
+def _lock_ids(queryset):
+    """取出订单ID；支持行锁的数据库上跳过其他事务正在处理的订单"""
+    if connection.features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True)
+    return list(queryset.values_list('id', flat=True))
+
+
+@booking_transaction
+def cancel_orders(order_ids, statuses=('pending',)):
+    """
+    取消订单并归还库存
+    只处理状态在 statuses 中的订单，返回实际取消的订单数量
+    """
+    ids = _lock_ids(Order.objects.filter(pk__in=order_ids, status__in=statuses))
+    if not ids:
+        return 0
+    Order.objects.filter(pk__in=ids).update(status='cancelled')
+    release_inventory(ids)
+    return len(ids)
+
+
+@booking_transaction
+def _expire_batch(now, batch_size):
+    queryset = Order.objects.filter(status='pending', expires_at__lte=now).order_by('expires_at')[:batch_size]
+    ids = _lock_ids(queryset)
+    if not ids:
+        return 0
+    Order.objects.filter(pk__in=ids, status='pending').update(status='cancelled')
+    release_inventory(ids)
+    return len(ids)
+
+
+def expire_pending_orders(now=None, batch_size=SWEEP_BATCH_SIZE):
+    """取消所有已超过支付截止时间的待支付订单，返回取消的订单数量"""
+    if batch_size < 1:
+        raise ValueError('每批处理的订单数量必须大于 0')
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        count = _expire_batch(now, batch_size)
+        expired += count
+        if count < batch_size:
+            return expired
@@ -0,0 +1,187 @@
+"""
+下单 / 支付请求的幂等处理
+
+客户端通过请求头 Idempotency-Key（或表单隐藏字段 idempotency_key）为一次操作生成唯一的键，
+浏览器重复点击、网络超时后重试时携带同一个键：
+- 第一次请求：在数据库中登记该键（唯一约束保证多个 worker 进程之间只有一个请求能登记成功），
+  执行视图后把成功的响应（跳转地址或 JSON）保存到记录和缓存中；
+  失败的响应（4xx/5xx，或 HTTP 200 的 {"status": "error"}）不保存并释放该键，客户端修正后可以用同一个键重试
+- 重复请求：直接返回保存的响应（响应头 Idempotent-Replayed: true），不再进入下单 / 支付的写流程
+- 第一次请求仍在处理中：返回 409，提示不要重复提交
+- 同一个键配合不同的请求内容：返回 422
+
+响应先查缓存，缓存未命中（例如 LocMemCache 下请求落在另一个进程）时再查数据库。
+保存时长见 settings.ORDER_IDEMPOTENCY_TTL（秒），过期记录由 expire_orders 命令清理。
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+DEFAULT_TTL = 600
+MAX_KEY_LENGTH = 64
+HEADER_NAME = 'Idempotency-Key'
+FORM_FIELD = 'idempotency_key'
+
+
+def get_ttl():
+    return getattr(settings, 'ORDER_IDEMPOTENCY_TTL', DEFAULT_TTL)
+
+
+def get_idempotency_key(request):
+    """从请求头或表单字段中读取幂等键"""
+    key = request.headers.get(HEADER_NAME)
+    if not key and request.method == 'POST':
+        key = request.POST.get(FORM_FIELD)
+    return (key or '').strip()
+
+
+def request_fingerprint(request):
+    """请求摘要：同一个键只能用于相同的请求"""
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.get_full_path().encode())
+    if request.method == 'POST' and request.content_type != 'application/json':
+        # 表单请求的数据流已被读取，按字段计算（CSRF 令牌每次渲染可能不同，不参与）
+        fields = sorted(
+            (name, values) for name, values in request.POST.lists() if name != 'csrfmiddlewaretoken'
+        )
+        digest.update(repr(fields).encode())
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _cache_key(user_id, scope, key):
+    return f"idempotency:{scope}:{user_id}:{hashlib.md5(key.encode()).hexdigest()}"
+
+
+def _serialize(response):
+    return {
+        'content': response.content.decode(response.charset),
+        'content_type': response.get('Content-Type'),
+        'location': response.get('Location'),
+    }
+
+
+def _failed(response):
+    """响应是否表示请求失败：4xx/5xx，或视图按惯例以 HTTP 200 返回的 {"status": "error"}"""
+    if response.status_code >= 400:
+        return True
+    if not (response.get('Content-Type') or '').startswith('application/json'):
+        return False
+    try:
+        data = json.loads(response.content)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get('status') == 'error'
+
+
+def _replay(status_code, data):
+    response = HttpResponse(data['content'], status=status_code, content_type=data['content_type'])
+    if data['location']:
+        response['Location'] = data['location']
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(user, scope, key, fingerprint):
+    """登记幂等键，返回 (记录, 是否为第一次请求)"""
+    now = timezone.now()
+    records = IdempotencyKey.objects.filter(user=user, scope=scope, key=key)
+    record = records.first()
+    if record is not None:
+        if record.expires_at > now:
+            return record, False
+        # 已过期的键可以重新使用
+        record.delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user, scope=scope, key=key, fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=get_ttl()),
+            )
+        return record, True
+    except IntegrityError:
+        # 其他进程同时登记了同一个键
+        return records.first(), False
+
+
+def idempotent(scope):
+    """
+    视图方法装饰器：携带幂等键的重复请求直接返回第一次的响应
+    用法：
+        @idempotent('create')
+        def post(self, request): ...
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = get_idempotency_key(request)
+            if not key or not request.user.is_authenticated:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return JsonResponse({'status': 'error', 'message': f'{HEADER_NAME} 不能超过{MAX_KEY_LENGTH}个字符'}, status=400)
+
+            fingerprint = request_fingerprint(request)
+            cache_key = _cache_key(request.user.pk, scope, key)
+            cached = cache.get(cache_key)
+            if cached is None:
+                record, created = _claim(request.user, scope, key, fingerprint)
+                if record is None:
+                    # 第一次请求刚刚失败并释放了该键
+                    return JsonResponse({'status': 'error', 'message': '请求正在处理中，请勿重复提交'}, status=409)
+                if created:
+                    return _execute(view_method, self, request, args, kwargs, record, cache_key)
+                cached = {
+                    'fingerprint': record.fingerprint,
+                    'status_code': record.status_code,
+                    'response': record.response,
+                }
+                if record.status_code is not None:
+                    cache.set(cache_key, cached, get_ttl())
+
+            if cached['fingerprint'] != fingerprint:
+                return JsonResponse({'status': 'error', 'message': f'{HEADER_NAME} 已用于其他请求'}, status=422)
+            if cached['status_code'] is None:
+                return JsonResponse({'status': 'error', 'message': '请求正在处理中，请勿重复提交'}, status=409)
+            return _replay(cached['status_code'], cached['response'])
+
+        return wrapper
+    return decorator
+
+
+def _execute(view_method, view, request, args, kwargs, record, cache_key):
+    """执行第一次请求并保存响应；失败的请求释放幂等键，允许客户端重试"""
+    try:
+        response = view_method(view, request, *args, **kwargs)
+    except Exception:
+        record.delete()
+        raise
+
+    if getattr(response, 'streaming', False) or _failed(response):
+        record.delete()
+        return response
+
+    data = _serialize(response)
+    IdempotencyKey.objects.filter(pk=record.pk).update(status_code=response.status_code, response=data)
+    cache.set(cache_key, {
+        'fingerprint': record.fingerprint,
+        'status_code': response.status_code,
+        'response': data,
+    }, get_ttl())
+    return response
+
+
+def purge_expired_keys(now=None):
+    """删除过期的幂等键记录，返回删除数量"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -0,0 +1,48 @@
+"""
+管理命令：取消超时未支付的订单并归还库存，同时清理过期的幂等键
+
+使用方法（建议每分钟由 cron 执行一次）：
+python manage.py expire_orders
+python manage.py expire_orders --batch-size 1000
+python manage.py expire_orders --dry-run
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.orders.holds import SWEEP_BATCH_SIZE, expire_pending_orders
+from apps.orders.idempotency import purge_expired_keys
+from apps.orders.models import Order
+
+
+class Command(BaseCommand):
+    help = '取消超时未支付的订单，归还路线名额和酒店房间库存'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SWEEP_BATCH_SIZE,
+            help=f'每个事务处理的订单数量（默认：{SWEEP_BATCH_SIZE}）',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='只统计超时订单数量，不做修改',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size 必须大于 0')
+        now = timezone.now()
+
+        if options['dry_run']:
+            count = Order.objects.filter(status='pending', expires_at__lte=now).count()
+            self.stdout.write(f'共有 {count} 个超时未支付订单')
+            return
+
+        count = expire_pending_orders(now=now, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'已取消 {count} 个超时未支付订单'))
+
+        purged = purge_expired_keys(now=now)
+        if purged:
+            self.stdout.write(f'已清理 {purged} 条过期的幂等键')
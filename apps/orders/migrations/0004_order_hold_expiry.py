@@ -0,0 +1,39 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:41
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_existing_deadlines(apps, schema_editor):
+    """已有的待支付订单按创建时间 + 30 分钟补齐支付截止时间"""
+    Order = apps.get_model('orders', 'Order')
+    for order in Order.objects.filter(status='pending', expires_at__isnull=True).only('id', 'created_at'):
+        Order.objects.filter(pk=order.pk).update(expires_at=order.created_at + timedelta(minutes=30))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_orderdetail_check_in_date_orderdetail_check_out_date_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='支付截止时间'),
+        ),
+        migrations.AddField(
+            model_name='orderdetail',
+            name='room_type_id',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='房型ID'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'expires_at'], name='orders_orde_status_62907b_idx'),
+        ),
+        migrations.RunPython(set_existing_deadlines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_list_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=20, verbose_name='操作类型')),
+                ('key', models.CharField(max_length=64, verbose_name='幂等键')),
+                ('fingerprint', models.CharField(max_length=64, verbose_name='请求摘要')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='响应状态码')),
+                ('response', models.JSONField(blank=True, null=True, verbose_name='响应内容')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='过期时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '幂等键',
+                'verbose_name_plural': '幂等键',
+                'unique_together': {('user', 'scope', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_idempotencykey'),
+        ('routes', '0005_route_is_flash_sale'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='人数')),
+                ('contact_name', models.CharField(max_length=50, verbose_name='联系人姓名')),
+                ('contact_phone', models.CharField(max_length=11, verbose_name='联系人手机')),
+                ('status', models.CharField(choices=[('waiting', '候补中'), ('promoted', '已转为订单'), ('cancelled', '已取消')], default='waiting', max_length=10, verbose_name='状态')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='加入时间')),
+                ('promoted_at', models.DateTimeField(blank=True, null=True, verbose_name='转为订单时间')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='orders.order', verbose_name='生成的订单')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='routes.route', verbose_name='路线')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='候补用户')),
+            ],
+            options={
+                'verbose_name': '候补记录',
+                'verbose_name_plural': '候补记录',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['route', 'status', 'id'], name='orders_wait_route_i_eed800_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='waitlistentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'waiting')), fields=('route', 'user'), name='waitlist_one_waiting_entry_per_user'),
+        ),
+    ]
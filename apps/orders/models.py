@@ -23,11 +23,18 @@ class Order(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
     paid_at = models.DateTimeField(null=True, blank=True, verbose_name="支付时间")
+    # 待支付订单的库存保留截止时间，超时未支付由定时任务取消并归还库存
+    expires_at = models.DateTimeField(null=True, blank=True, verbose_name="支付截止时间")
 
     class Meta:
         verbose_name = "订单"
         verbose_name_plural = verbose_name
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+            # 订单列表API按 (创建时间, ID) 游标分页
+            models.Index(fields=['user', '-created_at', '-id']),
+        ]
 
     def __str__(self):
         return self.order_sn
@@ -56,10 +63,74 @@ class OrderDetail(models.Model):
     # 酒店预订时间字段（仅对酒店类型有效）
     check_in_date = models.DateField(null=True, blank=True, verbose_name="入住日期")
     check_out_date = models.DateField(null=True, blank=True, verbose_name="退房日期")
+    # 酒店预订的房型ID（仅对酒店类型有效），用于归还房间库存
+    room_type_id = models.PositiveIntegerField(null=True, blank=True, verbose_name="房型ID")
 
     class Meta:
         verbose_name = "订单明细"
         verbose_name_plural = verbose_name
 
     def __str__(self):
-        return f"{self.order.order_sn} - {self.item_name}"
\ No newline at end of file
+        return f"{self.order.order_sn} - {self.item_name}"
+
+class IdempotencyKey(models.Model):
+    """
+    下单 / 支付请求的幂等键
+    同一用户重复提交同一个 Idempotency-Key 时直接返回第一次的响应，不再执行写操作。
+    缓存中保存一份用于快速命中，数据库记录保证多个 worker 进程之间也能识别重复请求。
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name="用户")
+    scope = models.CharField(max_length=20, verbose_name="操作类型")
+    key = models.CharField(max_length=64, verbose_name="幂等键")
+    fingerprint = models.CharField(max_length=64, verbose_name="请求摘要")
+    # 响应为空表示第一次请求仍在处理中
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="响应状态码")
+    response = models.JSONField(null=True, blank=True, verbose_name="响应内容")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="过期时间")
+
+    class Meta:
+        verbose_name = "幂等键"
+        verbose_name_plural = verbose_name
+        unique_together = ('user', 'scope', 'key')
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
+
+class WaitlistEntry(models.Model):
+    """
+    路线候补队列
+    路线名额不足时用户可加入候补，有名额释放（订单取消、超时未支付）时按加入顺序自动为候补用户下单
+    """
+    STATUS_CHOICES = (
+        ('waiting', '候补中'),
+        ('promoted', '已转为订单'),
+        ('cancelled', '已取消'),
+    )
+
+    route = models.ForeignKey('routes.Route', on_delete=models.CASCADE, related_name='waitlist', verbose_name="路线")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, verbose_name="候补用户")
+    quantity = models.PositiveIntegerField(default=1, verbose_name="人数")
+    contact_name = models.CharField(max_length=50, verbose_name="联系人姓名")
+    contact_phone = models.CharField(max_length=11, verbose_name="联系人手机")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='waiting', verbose_name="状态")
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="生成的订单")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="加入时间")
+    promoted_at = models.DateTimeField(null=True, blank=True, verbose_name="转为订单时间")
+
+    class Meta:
+        verbose_name = "候补记录"
+        verbose_name_plural = verbose_name
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['route', 'status', 'id']),
+        ]
+        constraints = [
+            # 同一用户在同一路线上只能有一条候补中的记录
+            models.UniqueConstraint(fields=['route', 'user'], condition=models.Q(status='waiting'),
+                                    name='waitlist_one_waiting_entry_per_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.route_id} - {self.user}"
@@ -0,0 +1,86 @@
+"""
+订单号分配器（Snowflake 思路：时间 + 节点 + 进程内序号）
+
+订单号格式（共31位，定长，按字符串排序即按时间排序）：
+    BD + 年月日时分秒(14) + 毫秒(3) + 节点ID(2) + 进程ID(7) + 毫秒内序号(3)
+
+- 节点ID：settings.ORDER_SN_NODE_ID（0-99），多台服务器部署时每台配置不同的值
+- 进程ID：同一台机器上存活的进程 PID 互不相同，多个 worker 进程之间不会冲突
+- 毫秒内序号：进程内加锁递增，同一毫秒最多分配1000个，用完后借用下一毫秒
+
+整个过程不访问数据库，也不需要重试等待。时钟回拨时沿用上一次的时间戳继续递增序号，
+保证同一进程内订单号单调递增。
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+SEQUENCE_LIMIT = 1000
+NODE_LIMIT = 100
+PID_LIMIT = 10 ** 7
+
+
+class OrderSnAllocator:
+    """进程内订单号分配器（线程安全）"""
+
+    def __init__(self, node_id=None, prefix='BD', clock=time.time):
+        self.node_id = node_id
+        self.prefix = prefix
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pid = None
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _get_node_id(self):
+        node_id = self.node_id
+        if node_id is None:
+            node_id = getattr(settings, 'ORDER_SN_NODE_ID', 0) or 0
+        if not 0 <= node_id < NODE_LIMIT:
+            raise ValueError(f"ORDER_SN_NODE_ID 必须在 0-{NODE_LIMIT - 1} 之间")
+        return node_id
+
+    def _next_ms_and_sequence(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            # fork 出的子进程 PID 不同，序号从头开始
+            self._pid = pid
+            self._last_ms = -1
+            self._sequence = 0
+
+        now_ms = int(self.clock() * 1000)
+        if now_ms <= self._last_ms:
+            # 同一毫秒内（或时钟回拨）：沿用上次的时间戳，序号递增
+            now_ms = self._last_ms
+            self._sequence += 1
+            if self._sequence >= SEQUENCE_LIMIT:
+                # 本毫秒序号用完，借用下一毫秒（不阻塞等待时钟）
+                now_ms = self._last_ms + 1
+                self._sequence = 0
+        else:
+            self._sequence = 0
+        self._last_ms = now_ms
+        return pid, now_ms, self._sequence
+
+    def next_sn(self):
+        """分配一个新的订单号"""
+        node_id = self._get_node_id()
+        with self._lock:
+            pid, now_ms, sequence = self._next_ms_and_sequence()
+
+        moment = datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc)
+        return (
+            f"{self.prefix}{moment.strftime('%Y%m%d%H%M%S')}{now_ms % 1000:03d}"
+            f"{node_id:02d}{pid % PID_LIMIT:07d}{sequence:03d}"
+        )
+
+
+allocator = OrderSnAllocator()
+
+
+def next_order_sn():
+    """分配一个新的订单号（使用进程级共享的分配器）"""
+    return allocator.next_sn()
@@ -0,0 +1,52 @@
+"""
+进程内的超时订单清理线程
+
+settings.ORDER_SWEEP_INTERVAL > 0 时，每个 Web 进程在收到第一个请求后启动一个守护线程，
+每隔 ORDER_SWEEP_INTERVAL 秒执行一次 expire_pending_orders()。
+多个进程同时清理是安全的：订单状态的修改和库存归还都在同一个事务内完成，已取消的订单不会被重复处理。
+生产环境更推荐关闭该线程，用 cron 定时执行 python manage.py expire_orders。
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection
+
+from .holds import expire_pending_orders
+
+logger = logging.getLogger(__name__)
+
+_started = False
+_start_lock = threading.Lock()
+
+
+def _run(interval, stop_event):
+    while not stop_event.wait(interval):
+        try:
+            count = expire_pending_orders()
+            if count:
+                logger.info(f"已取消 {count} 个超时未支付订单")
+        except Exception as e:
+            logger.error(f"清理超时订单失败: {e}", exc_info=True)
+        finally:
+            connection.close()
+
+
+def start_order_sweeper(interval=None):
+    """启动清理线程（每个进程只启动一次），返回用于停止线程的 Event"""
+    global _started
+    interval = interval or settings.ORDER_SWEEP_INTERVAL
+    with _start_lock:
+        if _started:
+            return None
+        _started = True
+
+    stop_event = threading.Event()
+    thread = threading.Thread(target=_run, args=(interval, stop_event), name='order-sweeper', daemon=True)
+    thread.start()
+    return stop_event
+
+
+def start_on_first_request(sender, **kwargs):
+    """request_started 信号处理函数"""
+    start_order_sweeper()
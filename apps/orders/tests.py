@@ -0,0 +1,728 @@
+import threading
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.hotels.inventory import get_available_count
+from apps.hotels.models import Hotel, RoomType
+from apps.routes.inventory import release_route_seats, reserve_route_seats
+from apps.routes.models import Route
+from apps.scenic.models import ScenicSpot
+from apps.users.models import CustomUser, Notification
+from . import flash_sale
+from .checkout import place_order, sort_and_merge
+from .holds import cancel_orders, expire_pending_orders
+from .models import IdempotencyKey, Order, OrderDetail, WaitlistEntry
+from .order_sn import OrderSnAllocator
+from .transactions import booking_transaction
+from .waitlist import join_waitlist, leave_waitlist, waitlist_position
+from .views import OrderPaymentView
+
+
+def create_route(**kwargs):
+    defaults = {
+        'name': '保定一日游', 'price': 199, 'group_size': 5, 'deadline': '2030-01-01',
+        'itinerary_summary': '行程', 'cost_include': '包含', 'cost_exclude': '不含', 'notes': '须知',
+    }
+    defaults.update(kwargs)
+    return Route.objects.create(**defaults)
+
+
+class RouteSeatTests(TestCase):
+    """路线名额扣减测试"""
+
+    def setUp(self):
+        self.route = create_route()
+        self.user = CustomUser.objects.create_user(username='buyer', password='pwd', phone='13800000001')
+
+    def test_guarded_update_never_exceeds_group_size(self):
+        reserve_route_seats(self.route.id, 3)
+        reserve_route_seats(self.route.id, 2)
+
+        with self.assertRaisesMessage(ValueError, '剩余0个名额'):
+            reserve_route_seats(self.route.id, 1)
+
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 5)
+
+    def test_release_returns_seats(self):
+        reserve_route_seats(self.route.id, 4)
+        release_route_seats(self.route.id, 3)
+
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 1)
+
+    def test_check_constraint_rejects_oversell(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Route.objects.filter(pk=self.route.pk).update(sales_count=F('group_size') + 1)
+
+    def test_create_order_for_route(self):
+        view = OrderPaymentView()
+        order = view.create_order(self.user, self.route.id, 'route', 4, '李四', '13800000001')
+
+        self.assertEqual(order.total_amount, 199 * 4)
+        with self.assertRaises(ValueError):
+            view.create_order(self.user, self.route.id, 'route', 2, '李四', '13800000001')
+
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 4)
+        self.assertEqual(self.user.order_set.count(), 1)
+
+
+class BookingTransactionTests(TransactionTestCase):
+    """下单事务重试测试"""
+
+    def test_retries_when_database_is_busy(self):
+        calls = []
+
+        @booking_transaction
+        def book():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'ok'
+
+        with mock.patch('apps.orders.transactions.time.sleep'):
+            self.assertEqual(book(), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up_after_bounded_retries(self):
+        @booking_transaction
+        def book():
+            raise OperationalError('database is locked')
+
+        with mock.patch('apps.orders.transactions.time.sleep'):
+            with self.assertRaisesMessage(ValueError, '系统繁忙'):
+                book()
+
+    def test_other_operational_errors_are_not_retried(self):
+        calls = []
+
+        @booking_transaction
+        def book():
+            calls.append(1)
+            raise OperationalError('no such table: foo')
+
+        with self.assertRaises(OperationalError):
+            book()
+        self.assertEqual(len(calls), 1)
+
+
+class OrderSnAllocatorTests(TestCase):
+    """订单号分配器测试"""
+
+    def test_sn_is_fixed_width_and_sortable(self):
+        allocator = OrderSnAllocator(node_id=7)
+        sns = [allocator.next_sn() for _ in range(3000)]
+
+        self.assertEqual(len(set(sns)), len(sns))
+        self.assertEqual(sns, sorted(sns))
+        self.assertTrue(all(len(sn) == 31 and sn.startswith('BD') for sn in sns))
+        self.assertEqual(sns[0][19:21], '07')
+
+    def test_unique_across_threads(self):
+        allocator = OrderSnAllocator(node_id=1)
+        results = []
+
+        def worker():
+            results.extend(allocator.next_sn() for _ in range(500))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(set(results)), 8 * 500)
+
+    def test_clock_moving_backwards_keeps_order(self):
+        ticks = iter([1000.0, 1000.5, 999.0, 999.0])
+        allocator = OrderSnAllocator(node_id=0, clock=lambda: next(ticks))
+        sns = [allocator.next_sn() for _ in range(4)]
+
+        self.assertEqual(sns, sorted(sns))
+        self.assertEqual(len(set(sns)), 4)
+
+
+class OrderHoldExpiryTests(TestCase):
+    """待支付订单超时释放库存测试"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='buyer', password='pwd', phone='13800000001')
+        self.route = create_route()
+        self.hotel = Hotel.objects.create(
+            name='测试酒店', address='保定市', phone='0312-0000000', brief='简介', description='详情'
+        )
+        self.room_type = RoomType.objects.create(
+            hotel=self.hotel, name='标准间', price=300, capacity=2, description='房间描述', remaining_count=3
+        )
+        self.view = OrderPaymentView()
+
+    def book_route(self, quantity):
+        return self.view.create_order(self.user, self.route.id, 'route', quantity, '张三', '13800000001')
+
+    def book_hotel(self, quantity):
+        return self.view.create_order(
+            self.user, self.hotel.id, 'hotel', quantity, '张三', '13800000001',
+            '2026-05-01', '2026-05-03', self.room_type.id
+        )
+
+    def test_new_order_has_deadline(self):
+        order = self.book_route(1)
+
+        self.assertGreater(order.expires_at, timezone.now() + timedelta(minutes=29))
+        self.assertEqual(self.book_hotel(1).details.get().room_type_id, self.room_type.id)
+
+    def test_expired_orders_release_seats_and_rooms(self):
+        self.book_route(2)
+        self.book_route(3)
+        self.book_hotel(2)
+
+        count = expire_pending_orders(now=timezone.now() + timedelta(minutes=31), batch_size=2)
+
+        self.assertEqual(count, 3)
+        self.assertFalse(Order.objects.filter(status='pending').exists())
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 0)
+        self.assertEqual(get_available_count(self.room_type, date(2026, 5, 1), date(2026, 5, 3)), 3)
+
+    def test_paid_and_unexpired_orders_are_kept(self):
+        paid = self.book_route(2)
+        Order.objects.filter(pk=paid.pk).update(status='paid')
+        self.book_route(1)
+
+        self.assertEqual(expire_pending_orders(), 0)
+        self.assertEqual(expire_pending_orders(now=timezone.now() + timedelta(minutes=31)), 1)
+
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 2)
+        self.assertEqual(Order.objects.get(pk=paid.pk).status, 'paid')
+
+    def test_cancel_api_releases_seats(self):
+        order = self.book_route(3)
+        self.client.force_login(self.user)
+
+        response = self.client.put(f'/api/v1/orders/cancel/{order.order_sn}/')
+        self.assertEqual(response.json()['status'], 'success')
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 0)
+
+        # 重复取消不会再次归还名额
+        response = self.client.put(f'/api/v1/orders/cancel/{order.order_sn}/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_expire_orders_command(self):
+        self.book_route(2)
+        Order.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        out = StringIO()
+        call_command('expire_orders', stdout=out)
+
+        self.assertIn('已取消 1 个', out.getvalue())
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 0)
+
+    def test_expire_rejects_non_positive_batch_size(self):
+        for batch_size in (0, -1):
+            with self.assertRaises(CommandError):
+                call_command('expire_orders', '--batch-size', str(batch_size), stdout=StringIO())
+            with self.assertRaises(ValueError):
+                expire_pending_orders(batch_size=batch_size)
+
+
+class OrderAPITests(TestCase):
+    """订单 JSON API 测试"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='buyer', password='pwd', phone='13800000001')
+        self.other = CustomUser.objects.create_user(username='other', password='pwd', phone='13800000002')
+        self.route = create_route(group_size=100)
+        self.client.force_login(self.user)
+
+    def create_orders(self, count, user=None, status='pending'):
+        user = user or self.user
+        orders = Order.objects.bulk_create([
+            Order(order_sn=f"BD{status}{user.id}{i:06d}", user=user, total_amount=100, status=status,
+                  contact_name='张三', contact_phone='13800000001')
+            for i in range(count)
+        ])
+        OrderDetail.objects.bulk_create([
+            OrderDetail(order=order, item_type='route', item_id=self.route.id, item_name='路线',
+                        price=50, quantity=2, subtotal=100)
+            for order in orders
+        ])
+        return orders
+
+    def test_create_order(self):
+        response = self.client.post('/api/v1/orders/create/', {
+            'item_id': self.route.id, 'item_type': 'route', 'quantity': 2,
+            'contact_name': '张三', 'contact_phone': '13800000001',
+        }, content_type='application/json')
+
+        data = response.json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual(data['data']['total'], 398)
+        self.assertEqual(data['data']['details'][0]['quantity'], 2)
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 2)
+
+    def test_create_order_reports_business_errors(self):
+        response = self.client.post('/api/v1/orders/create/', {
+            'item_id': self.route.id, 'item_type': 'route', 'quantity': 101,
+            'contact_name': '张三', 'contact_phone': '13800000001',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('名额不足', response.json()['message'])
+
+    def test_list_walks_all_pages_with_constant_queries(self):
+        self.create_orders(25)
+        self.create_orders(5, user=self.other)
+
+        seen = []
+        cursor = None
+        while True:
+            params = {'page_size': 10}
+            if cursor:
+                params['cursor'] = cursor
+            # 会话 + 用户 + 订单 + 明细
+            with self.assertNumQueries(4):
+                data = self.client.get('/api/v1/orders/list/', params).json()
+            seen.extend(order['order_sn'] for order in data['data'])
+            cursor = data['pagination']['next_cursor']
+            if not data['pagination']['has_more']:
+                break
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len(set(seen)), 25)
+        self.assertTrue(all(sn.startswith('BDpending') for sn in seen))
+
+    def test_list_filters_by_status(self):
+        self.create_orders(3)
+        self.create_orders(2, status='paid')
+
+        data = self.client.get('/api/v1/orders/list/', {'status': 'paid'}).json()
+        self.assertEqual([order['status'] for order in data['data']], ['paid', 'paid'])
+
+        response = self.client.get('/api/v1/orders/list/', {'status': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_is_limited_to_owner(self):
+        own = self.create_orders(1)[0]
+        foreign = self.create_orders(1, user=self.other, status='paid')[0]
+
+        data = self.client.get(f'/api/v1/orders/detail/{own.order_sn}/').json()
+        self.assertEqual(data['data']['details'][0]['item_name'], '路线')
+
+        response = self.client.get(f'/api/v1/orders/detail/{foreign.order_sn}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/v1/orders/list/').status_code, 401)
+
+
+class OrderDetailViewTests(TestCase):
+    """订单详情页：明细关联对象按类型批量加载"""
+
+    def test_query_count_does_not_grow_with_details(self):
+        user = CustomUser.objects.create_user(username='buyer', password='pwd', phone='13800000001')
+        hotel = Hotel.objects.create(
+            name='测试酒店', address='保定市', phone='0312-0000000', brief='简介', description='详情'
+        )
+        routes = [create_route(name=f'路线{i}') for i in range(20)]
+        order = Order.objects.create(order_sn='BD0001', user=user, total_amount=0,
+                                     contact_name='张三', contact_phone='13800000001')
+        OrderDetail.objects.bulk_create(
+            [OrderDetail(order=order, item_type='route', item_id=route.id, item_name=route.name,
+                         price=0, quantity=1, subtotal=0) for route in routes]
+            + [OrderDetail(order=order, item_type='hotel', item_id=hotel.id, item_name=hotel.name,
+                           price=0, quantity=1, subtotal=0)]
+        )
+        self.client.force_login(user)
+
+        # 会话 + 用户 + 订单 + 明细 + 路线 + 酒店
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/orders/detail/{order.order_sn}/')
+
+        detail_list = response.context['detail_list']
+        self.assertEqual(len(detail_list), 21)
+        self.assertEqual(detail_list[-1]['item_url'], f'/hotels/detail/{hotel.id}/')
+
+
+class IdempotencyTests(TestCase):
+    """下单幂等键测试"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='buyer', password='pwd', phone='13800000001')
+        self.route = create_route(group_size=10)
+        self.client.force_login(self.user)
+        self.form = {
+            'item_id': self.route.id, 'item_type': 'route', 'quantity': 2,
+            'contact_name': '张三', 'contact_phone': '13800000001', 'idempotency_key': 'form-token-1',
+        }
+
+    def test_repeated_form_submit_creates_one_order(self):
+        first = self.client.post('/orders/create/', self.form)
+        second = self.client.post('/orders/create/', self.form)
+
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 2)
+
+    def test_replay_falls_back_to_database_when_cache_misses(self):
+        first = self.client.post('/orders/create/', self.form)
+        # 模拟请求落在另一个进程（本地缓存中没有记录）
+        cache.clear()
+
+        # 会话 + 用户 + 幂等键记录，不再进入下单流程
+        with self.assertNumQueries(3):
+            second = self.client.post('/orders/create/', self.form)
+
+        self.assertEqual(second['Location'], first['Location'])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_api_header_and_mismatched_payload(self):
+        payload = {
+            'item_id': self.route.id, 'item_type': 'route', 'quantity': 1,
+            'contact_name': '张三', 'contact_phone': '13800000001',
+        }
+        first = self.client.post('/api/v1/orders/create/', payload, content_type='application/json',
+                                 headers={'Idempotency-Key': 'api-1'})
+        second = self.client.post('/api/v1/orders/create/', payload, content_type='application/json',
+                                  headers={'Idempotency-Key': 'api-1'})
+        self.assertEqual(second.json()['order_sn'], first.json()['order_sn'])
+
+        payload['quantity'] = 3
+        response = self.client.post('/api/v1/orders/create/', payload, content_type='application/json',
+                                    headers={'Idempotency-Key': 'api-1'})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_failed_request_releases_key(self):
+        payload = {
+            'item_id': self.route.id, 'item_type': 'route', 'quantity': 11,
+            'contact_name': '张三', 'contact_phone': '13800000001',
+        }
+        response = self.client.post('/api/v1/orders/create/', payload, content_type='application/json',
+                                    headers={'Idempotency-Key': 'api-2'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_error_response_with_ok_status_releases_key(self):
+        # 支付页下单时参数不完整：HTTP 200 + {"status": "error"}，不保存，重试时重新执行
+        self.form['contact_name'] = ''
+        for _ in range(2):
+            response = self.client.post('/orders/payment/new/', self.form)
+            self.assertEqual(response.json()['status'], 'error')
+            self.assertNotIn('Idempotent-Replayed', response)
+            self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.form['contact_name'] = '张三'
+        response = self.client.post('/orders/payment/new/', self.form)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_in_flight_request_is_rejected(self):
+        IdempotencyKey.objects.create(
+            user=self.user, scope='create', key='form-token-1', fingerprint='x',
+            expires_at=timezone.now() + timedelta(minutes=10),
+        )
+        self.form['idempotency_key'] = 'form-token-1'
+        response = self.client.post('/orders/create/', self.form)
+        # 请求内容不同 → 422；内容相同且仍在处理 → 409
+        self.assertEqual(response.status_code, 422)
+
+        IdempotencyKey.objects.update(fingerprint=self._fingerprint())
+        response = self.client.post('/orders/create/', self.form)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.exists())
+
+    def _fingerprint(self):
+        from django.test import RequestFactory
+        from .idempotency import request_fingerprint
+        return request_fingerprint(RequestFactory().post('/orders/create/', self.form))
+
+
+class CartCheckoutTests(TestCase):
+    """购物车结算测试"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='family', password='pwd', phone='13800000004')
+        self.route = create_route(group_size=4)
+        self.spot = ScenicSpot.objects.create(
+            name='古莲花池', address='保定市', ticket_price=60, open_time='8:00-17:00', description='介绍'
+        )
+        self.hotel = Hotel.objects.create(
+            name='测试酒店', address='保定市', phone='0312-0000000', brief='简介', description='详情'
+        )
+        self.standard = RoomType.objects.create(
+            hotel=self.hotel, name='标准间', price=300, capacity=2, description='房间描述', remaining_count=3
+        )
+        self.family = RoomType.objects.create(
+            hotel=self.hotel, name='家庭房', price=500, capacity=4, description='房间描述', remaining_count=1
+        )
+
+    def cart(self, route_quantity=2):
+        stay = {'item_type': 'hotel', 'item_id': self.hotel.id,
+                'check_in_date': '2026-05-01', 'check_out_date': '2026-05-03'}
+        return [
+            {**stay, 'room_type_id': self.family.id, 'quantity': 1},
+            {'item_type': 'scenic', 'item_id': self.spot.id, 'quantity': 4},
+            {'item_type': 'route', 'item_id': self.route.id, 'quantity': route_quantity},
+            {**stay, 'room_type_id': self.standard.id, 'quantity': 1},
+        ]
+
+    def test_one_order_for_all_items(self):
+        with CaptureQueriesContext(connection) as queries:
+            order = place_order(self.user, self.cart(), '张三', '13800000004')
+
+        detail_inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "orders_orderdetail"')]
+        self.assertEqual(len(detail_inserts), 1)
+        self.assertEqual(order.details.count(), 4)
+        self.assertEqual(order.total_amount, 60 * 4 + 199 * 2 + 300 * 2 + 500 * 2)
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 2)
+        self.assertEqual(get_available_count(self.family, date(2026, 5, 1), date(2026, 5, 3)), 0)
+
+    def test_shortage_rolls_back_every_item(self):
+        with self.assertRaisesMessage(ValueError, '名额不足'):
+            place_order(self.user, self.cart(route_quantity=5), '张三', '13800000004')
+
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(get_available_count(self.family, date(2026, 5, 1), date(2026, 5, 3)), 1)
+        self.assertEqual(get_available_count(self.standard, date(2026, 5, 1), date(2026, 5, 3)), 3)
+
+    def test_items_are_reserved_in_global_order(self):
+        items = sort_and_merge(self.cart() + [{'item_type': 'route', 'item_id': self.route.id, 'quantity': 1}])
+
+        self.assertEqual([item['item_type'] for item in items], ['hotel', 'hotel', 'route', 'scenic'])
+        self.assertEqual([item['room_type_id'] for item in items[:2]], sorted([self.standard.id, self.family.id]))
+        self.assertEqual(items[2]['quantity'], 3)
+
+    def test_checkout_api(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/api/v1/orders/checkout/', {
+            'items': self.cart(), 'contact_name': '张三', 'contact_phone': '13800000004',
+        }, content_type='application/json')
+
+        data = response.json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual(len(data['data']['details']), 4)
+
+        response = self.client.post('/api/v1/orders/checkout/', {
+            'items': self.cart(), 'contact_name': '张三', 'contact_phone': '13800000004',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('房间不足', response.json()['message'])
+
+
+class FlashSaleTests(TestCase):
+    """秒杀模式测试（写库队列不启动后台线程，由测试同步 flush）"""
+
+    def setUp(self):
+        cache.clear()
+        self.route = create_route(group_size=5, is_flash_sale=True)
+        self.users = [
+            CustomUser.objects.create_user(username=f'buyer{i}', phone=f'1380000010{i}')
+            for i in range(8)
+        ]
+        self.writer = flash_sale.FlashSaleWriter(autostart=False)
+        patcher = mock.patch.object(flash_sale, 'writer', self.writer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.snapshot = flash_sale.get_flash_sale_route(self.route.id)
+
+    def admit(self, user, quantity=1):
+        return flash_sale.admit(user, self.snapshot, quantity, '张三', '13800000001')
+
+    def test_tokens_reject_immediately_without_database_writes(self):
+        order_sns = [self.admit(user) for user in self.users[:5]]
+
+        with self.assertNumQueries(0):
+            with self.assertRaisesMessage(ValueError, '名额已抢完'):
+                self.admit(self.users[5])
+
+        self.assertFalse(Order.objects.exists())
+        self.writer.flush()
+
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 5)
+        self.assertEqual(Order.objects.count(), 5)
+        self.assertEqual({flash_sale.get_reservation_state(sn) for sn in order_sns}, {'confirmed'})
+
+    def test_shortfall_is_reconciled_against_database(self):
+        # 模拟另一个进程已经卖出3个名额，本进程的令牌计数仍为5
+        self.admit(self.users[0])
+        Route.objects.filter(pk=self.route.pk).update(sales_count=3)
+        later = [self.admit(user) for user in self.users[1:4]]
+
+        self.writer.flush()
+
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 5)
+        self.assertEqual([flash_sale.get_reservation_state(sn) for sn in later], ['confirmed', 'rejected', 'rejected'])
+        self.assertEqual(cache.get(flash_sale._tokens_key(self.route.id)), 0)
+
+    def test_cancelled_order_returns_token(self):
+        order_sn = self.admit(self.users[0], quantity=5)
+        self.writer.flush()
+        with self.assertRaises(ValueError):
+            self.admit(self.users[1])
+
+        self.client.force_login(self.users[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'/api/v1/orders/cancel/{order_sn}/')
+
+        self.assertTrue(self.admit(self.users[1]))
+
+    def test_create_api_uses_admission(self):
+        self.client.force_login(self.users[0])
+        response = self.client.post('/api/v1/orders/create/', {
+            'item_id': self.route.id, 'item_type': 'route', 'quantity': 2,
+            'contact_name': '张三', 'contact_phone': '13800000001',
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 202)
+        state_url = response.json()['state_url']
+        self.assertEqual(self.client.get(state_url).json()['data']['state'], 'queued')
+        self.writer.flush()
+        self.assertEqual(self.client.get(state_url).json()['data']['state'], 'confirmed')
+
+    def test_state_api_hides_other_users_orders(self):
+        order_sn = self.admit(self.users[0])
+        state_url = f'/api/v1/orders/flash-sale/{order_sn}/'
+        self.client.force_login(self.users[1])
+        self.assertEqual(self.client.get(state_url).status_code, 404)
+
+        # 写库后缓存过期，从数据库查询时同样只查本人的订单
+        self.writer.flush()
+        cache.delete(flash_sale._state_key(order_sn))
+        self.assertEqual(self.client.get(state_url).status_code, 404)
+        self.client.force_login(self.users[0])
+        self.assertEqual(self.client.get(state_url).json()['data']['state'], 'confirmed')
+
+
+class WaitlistTests(TestCase):
+    """路线候补队列测试"""
+
+    def setUp(self):
+        self.route = create_route(group_size=4)
+        self.users = [
+            CustomUser.objects.create_user(username=f'waiter{i}', phone=f'1380000020{i}')
+            for i in range(5)
+        ]
+        # 第一个用户订满全部名额
+        self.order = place_order(self.users[0], [{'item_type': 'route', 'item_id': self.route.id, 'quantity': 4}],
+                                 '张三', '13800000001')
+
+    def join(self, user, quantity=1):
+        return join_waitlist(user, self.route.id, quantity, '李四', '13800000002')
+
+    def test_cancellation_promotes_head_of_queue_in_fifo_order(self):
+        first = self.join(self.users[1], quantity=3)
+        second = self.join(self.users[2], quantity=1)
+        third = self.join(self.users[3], quantity=1)
+        self.assertEqual([waitlist_position(e) for e in (first, second, third)], [1, 2, 3])
+
+        cancel_orders([self.order.id])
+
+        for entry in (first, second, third):
+            entry.refresh_from_db()
+        self.assertEqual([first.status, second.status, third.status], ['promoted', 'promoted', 'waiting'])
+        self.route.refresh_from_db()
+        self.assertEqual(self.route.sales_count, 4)
+
+        order = first.order
+        self.assertEqual((order.user, order.status, order.total_amount), (self.users[1], 'pending', 597))
+        self.assertEqual(order.details.get().quantity, 3)
+        self.assertIsNotNone(order.expires_at)
+
+        notice = Notification.objects.get(user=self.users[1])
+        self.assertEqual(notice.category, 'waitlist')
+        self.assertEqual(notice.link, f'/orders/payment/{order.order_sn}/')
+        self.assertIsNone(notice.sent_at)
+        self.assertEqual(waitlist_position(third), 1)
+
+    def test_head_that_does_not_fit_blocks_later_entries(self):
+        Route.objects.filter(pk=self.route.pk).update(group_size=5)
+        big = self.join(self.users[1], quantity=2)
+        small = self.join(self.users[2], quantity=1)
+
+        # 只空出1个名额：排在前面的2人候补放不下，后面的1人候补也不能插队
+        self.assertEqual((big.status, small.status), ('waiting', 'waiting'))
+
+        cancel_orders([self.order.id])
+        big.refresh_from_db()
+        small.refresh_from_db()
+        self.assertEqual((big.status, small.status), ('promoted', 'promoted'))
+
+    def test_expired_order_promotes_waitlist(self):
+        entry = self.join(self.users[1], quantity=2)
+        Order.objects.filter(pk=self.order.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        self.assertEqual(expire_pending_orders(), 1)
+
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'promoted')
+        self.assertEqual(Notification.objects.filter(user=self.users[1]).count(), 1)
+
+    def test_join_and_leave(self):
+        entry = self.join(self.users[1])
+        with self.assertRaisesMessage(ValueError, '已在该路线的候补队列中'):
+            self.join(self.users[1])
+        with self.assertRaisesMessage(ValueError, '成团人数'):
+            self.join(self.users[2], quantity=5)
+
+        self.assertTrue(leave_waitlist(self.users[1], entry.id))
+        self.assertFalse(leave_waitlist(self.users[1], entry.id))
+        # 取消后可以重新加入，排在队尾
+        self.assertEqual(self.join(self.users[1]).status, 'waiting')
+
+        cancel_orders([self.order.id])
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'cancelled')
+
+    def test_create_api_joins_waitlist_when_sold_out(self):
+        self.client.force_login(self.users[1])
+        payload = {
+            'item_id': self.route.id, 'item_type': 'route', 'quantity': 2,
+            'contact_name': '李四', 'contact_phone': '13800000002',
+        }
+        response = self.client.post('/api/v1/orders/create/', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()['waitlist_available'])
+
+        response = self.client.post('/api/v1/orders/create/', dict(payload, join_waitlist=True),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['state'], 'waitlisted')
+        self.assertEqual(response.json()['data']['position'], 1)
+
+        cancel_orders([self.order.id])
+        data = self.client.get('/api/v1/orders/waitlist/').json()['data']
+        self.assertEqual(data[0]['status'], 'promoted')
+        self.assertTrue(Order.objects.filter(order_sn=data[0]['order_sn'], user=self.users[1]).exists())
+
+    def test_waitlist_api_join_and_leave(self):
+        self.client.force_login(self.users[1])
+        response = self.client.post('/api/v1/orders/waitlist/', {
+            'route_id': self.route.id, 'quantity': 1, 'contact_name': '李四', 'contact_phone': '13800000002',
+        })
+        self.assertEqual(response.status_code, 202)
+        entry_id = response.json()['data']['id']
+
+        self.assertEqual(self.client.delete(f'/api/v1/orders/waitlist/{entry_id}/').status_code, 200)
+        self.assertEqual(self.client.delete(f'/api/v1/orders/waitlist/{entry_id}/').status_code, 404)
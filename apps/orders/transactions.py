@@ -0,0 +1,55 @@
+"""
+下单事务工具
+
+booking_transaction 用于下单等写库存的路径：
+1. 在 SQLite 上以 BEGIN IMMEDIATE 开启事务，事务开始时就拿到写锁，
+   避免两个先读后写的事务同时升级写锁而直接报 "database is locked"
+2. 拿锁超时（SQLITE_BUSY）时按指数退避重试有限次，仍失败则抛出 ValueError("系统繁忙")
+3. 其他数据库上等价于 transaction.atomic
+
+已经处于外层事务中时只开启保存点，不做重试（外层事务的锁状态无法单独重来）。
+"""
+import functools
+import random
+import time
+
+from django.db import OperationalError, transaction
+
+# 数据库忙时的最大尝试次数和首次退避时间（秒）
+BUSY_RETRIES = 5
+BUSY_BACKOFF = 0.02
+
+
+def is_busy_error(exc):
+    """判断是否为 SQLite 锁等待超时错误"""
+    message = str(exc).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def booking_transaction(func):
+    """下单事务装饰器"""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+
+        for attempt in range(BUSY_RETRIES):
+            if connection.vendor == 'sqlite':
+                connection.next_transaction_mode = 'IMMEDIATE'
+            try:
+                with transaction.atomic():
+                    return func(*args, **kwargs)
+            except OperationalError as e:
+                if not is_busy_error(e):
+                    raise
+                if attempt == BUSY_RETRIES - 1:
+                    raise ValueError("系统繁忙，请稍后重试") from e
+                # 指数退避 + 随机抖动，避免所有请求同时重试
+                time.sleep(BUSY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+            finally:
+                connection.next_transaction_mode = None
+
+    return wrapper
@@ -2,17 +2,19 @@ from django.views.generic import TemplateView, View
 from django.http import HttpResponseRedirect, JsonResponse, Http404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.utils import timezone
-from django.utils.crypto import get_random_string
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
-from django.db import transaction
-from django.db.models import F
-import time
+from django.db import transaction, OperationalError
 import uuid
 from .models import Order, OrderDetail
+from .order_sn import next_order_sn
+from .checkout import place_order
+from .idempotency import idempotent
+from .transactions import booking_transaction
 from apps.scenic.models import ScenicSpot
 from apps.routes.models import Route
 from apps.hotels.models import Hotel, RoomType
+from apps.index.targets import resolve_targets
 
 
 class OrderConfirmView(LoginRequiredMixin, TemplateView):
@@ -73,6 +75,8 @@ class OrderConfirmView(LoginRequiredMixin, TemplateView):
         context['check_in_date'] = check_in_date
         context['check_out_date'] = check_out_date
         context['room_type_id'] = room_type_id
+        # 提交表单时携带的幂等键，重复提交不会生成重复订单
+        context['idempotency_key'] = uuid.uuid4().hex
         
         # 获取项目信息
         item = None
@@ -157,8 +161,9 @@ class OrderPaymentView(LoginRequiredMixin, View):
         
         return TemplateResponse(request, "orders/payment.html", context)
     
+    @idempotent('create')
     def post(self, request, order_sn=None):
-        """处理支付请求"""
+        """处理支付请求（携带幂等键的重复提交直接返回第一次的结果）"""
         # 获取订单参数
         item_id = request.POST.get('item_id')
         item_type = request.POST.get('item_type')
@@ -186,26 +191,22 @@ class OrderPaymentView(LoginRequiredMixin, View):
             return JsonResponse({'status': 'error', 'message': '订单创建失败'})
     
     def generate_unique_order_sn(self):
-        """生成唯一订单号 - 防止并发冲突"""
-        max_retries = 10
-        for _ in range(max_retries):
-            order_sn = f"BD{timezone.now().strftime('%Y%m%d%H%M%S')}{get_random_string(4, '0123456789')}"
-            if not Order.objects.filter(order_sn=order_sn).exists():
-                return order_sn
-            time.sleep(0.01)  # 等待10ms后重试
-        
-        # 如果还是重复，使用UUID保证唯一性
-        return f"BD{timezone.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:8].upper()}"
+        """生成唯一订单号 - 时间 + 节点 + 进程内序号，不查询数据库（见 order_sn.py）"""
+        return next_order_sn()
     
-    @transaction.atomic
+    @booking_transaction
     def create_order(self, user, item_id, item_type, quantity, contact_name, contact_phone, check_in_date=None, check_out_date=None, room_type_id=None):
         """
-        创建订单 - 使用事务和数据库锁保证并发一致性
+        创建订单 - 使用事务和条件更新保证并发一致性
         解决并发问题：
-        1. 使用 @transaction.atomic 保证原子性
-        2. 使用 select_for_update() 锁定资源，防止超卖
+        1. 使用 @booking_transaction 保证原子性（SQLite 上使用 BEGIN IMMEDIATE，锁忙时退避重试）
+        2. 路线名额用带条件的 UPDATE 扣减（sales_count + quantity <= group_size），防止超卖
         3. 使用 F() 表达式进行原子更新
-        4. 订单号生成时检查唯一性
+        4. 订单号由进程内分配器生成（时间 + 节点 + 进程 + 序号），无需查库去重
+        5. 酒店按房型、按晚通过库存台账做条件更新，不同房型和日期互不阻塞
+        6. 库存只保留到支付截止时间（expires_at），超时未支付由 expire_orders 取消并归还
+        
+        单个项目的下单与购物车结算共用 checkout.place_order()
         
         参数说明：
         - check_in_date: 酒店入住日期（仅对酒店类型有效）
@@ -213,127 +214,22 @@ class OrderPaymentView(LoginRequiredMixin, View):
         - room_type_id: 房间类型ID（仅对酒店类型有效）
         """
         try:
-            # 生成唯一订单号
-            order_sn = self.generate_unique_order_sn()
-            
-            # 获取项目信息和价格
-            item_name = ''
-            price = 0
-            
-            if item_type == 'scenic':
-                # 景点门票通常不需要库存控制，直接获取
-                item = ScenicSpot.objects.get(pk=item_id)
-                item_name = item.name
-                price = item.ticket_price
-                
-            elif item_type == 'route':
-                # 路线需要控制成团人数，使用悲观锁防止超卖
-                item = Route.objects.select_for_update().get(pk=item_id)
-                item_name = item.name
-                price = item.price
-                
-                # 检查剩余名额（在锁保护下）
-                available_slots = item.group_size - item.sales_count
-                if available_slots < quantity:
-                    raise ValueError(f"名额不足，剩余{available_slots}个名额，您需要{quantity}个")
-                
-                # 原子性更新销售数量（使用F表达式，数据库层面原子操作）
-                Route.objects.filter(id=item_id).update(
-                    sales_count=F('sales_count') + quantity
-                )
-                
-            elif item_type == 'hotel':
-                # 酒店需要控制房间数量
-                item = Hotel.objects.select_for_update().get(pk=item_id)
-                
-                # 如果指定了房间类型ID，使用指定的房间类型
-                if room_type_id:
-                    try:
-                        room_type = RoomType.objects.select_for_update().get(
-                            pk=room_type_id, 
-                            hotel=item, 
-                            is_available=True
-                        )
-                    except RoomType.DoesNotExist:
-                        raise ValueError("选择的房间类型不存在或不可用")
-                else:
-                    # 如果没有指定，使用最低价格的房间
-                    room_type = RoomType.objects.filter(
-                        hotel=item, 
-                        is_available=True
-                    ).order_by('price').first()
-                
-                if not room_type:
-                    raise ValueError("暂无可用房间")
-                
-                # 组合酒店名称和房间类型名称
-                item_name = f"{item.name} - {room_type.name}"
-                price = room_type.price
-                
-                # 计算酒店入住天数
-                if check_in_date and check_out_date:
-                    from datetime import datetime
-                    try:
-                        check_in = datetime.strptime(check_in_date, '%Y-%m-%d').date()
-                        check_out = datetime.strptime(check_out_date, '%Y-%m-%d').date()
-                        nights = (check_out - check_in).days
-                        if nights <= 0:
-                            raise ValueError("退房日期必须晚于入住日期")
-                        # 总价 = 单价 * 天数 * 房间数
-                        total_amount = price * nights * quantity
-                    except ValueError as e:
-                        raise ValueError(f"日期格式错误：{str(e)}")
-                    except Exception as e:
-                        raise ValueError(f"日期计算错误：{str(e)}")
-                else:
-                    # 如果没有提供日期，默认1晚
-                    total_amount = price * quantity
-                
-                # 这里可以添加房间库存控制逻辑
-                # 例如：RoomType.objects.filter(id=room_type.id).update(available_count=F('available_count') - quantity)
-                
-            else:
-                raise ValueError("不支持的项目类型")
-            
-            if item_type != 'hotel':
-                total_amount = price * quantity
-            
-            # 创建订单
-            order = Order.objects.create(
-                order_sn=order_sn,
-                user=user,
-                total_amount=total_amount,
-                status='pending',
-                contact_name=contact_name,
-                contact_phone=contact_phone
-            )
-            
-            # 创建订单明细
-            order_detail = OrderDetail.objects.create(
-                order=order,
-                item_type=item_type,
-                item_id=item_id,
-                item_name=item_name,
-                price=price,
-                quantity=quantity,
-                subtotal=total_amount
-            )
-            
-            # 如果是酒店预订，保存入住和退房日期
-            if item_type == 'hotel' and check_in_date and check_out_date:
-                from datetime import datetime
-                try:
-                    order_detail.check_in_date = datetime.strptime(check_in_date, '%Y-%m-%d').date()
-                    order_detail.check_out_date = datetime.strptime(check_out_date, '%Y-%m-%d').date()
-                    order_detail.save()
-                except:
-                    pass  # 如果日期格式错误，忽略但不影响订单创建
-            
-            return order
+            item = {
+                'item_type': item_type,
+                'item_id': item_id,
+                'quantity': quantity,
+                'check_in_date': check_in_date,
+                'check_out_date': check_out_date,
+                'room_type_id': room_type_id,
+            }
+            return place_order(user, [item], contact_name, contact_phone)
             
         except ValueError as e:
             # 业务逻辑错误（如名额不足），直接抛出
             raise
+        except OperationalError:
+            # 数据库锁忙，交给 booking_transaction 退避重试
+            raise
         except Exception as e:
             # 其他错误，记录日志并抛出
             import logging
@@ -341,6 +237,7 @@ class OrderPaymentView(LoginRequiredMixin, View):
             logger.error(f"创建订单失败: {e}", exc_info=True)
             raise ValueError(f"订单创建失败：{str(e)}")
     
+    @idempotent('pay')
     @transaction.atomic
     def handle_payment_success(self, request, order_sn):
         """
@@ -383,15 +280,23 @@ class OrderPaymentView(LoginRequiredMixin, View):
 class OrderCreateView(LoginRequiredMixin, View):
     """创建订单视图"""
     
+    @idempotent('create')
     def post(self, request):
         item_id = request.POST.get('item_id')
         item_type = request.POST.get('item_type')
         quantity = int(request.POST.get('quantity', 1))
         contact_name = request.POST.get('contact_name', '')
         contact_phone = request.POST.get('contact_phone', '')
+        # 酒店预订的入住/退房日期和房型（确认页以隐藏字段提交）
+        check_in_date = request.POST.get('check_in_date', '')
+        check_out_date = request.POST.get('check_out_date', '')
+        room_type_id = request.POST.get('room_type_id')
         
         payment_view = OrderPaymentView()
-        order = payment_view.create_order(request.user, item_id, item_type, quantity, contact_name, contact_phone)
+        order = payment_view.create_order(
+            request.user, item_id, item_type, quantity, contact_name, contact_phone,
+            check_in_date, check_out_date, room_type_id
+        )
         
         if order:
             return HttpResponseRedirect(f'/orders/payment/{order.order_sn}/')
@@ -417,13 +322,13 @@ class OrderDetailView(LoginRequiredMixin, TemplateView):
         context['order'] = order
         context['page_title'] = f'订单详情 - {order.order_sn}'
         
-        # 获取订单明细关联的对象信息
+        # 获取订单明细关联的对象信息（每种类型一次批量查询）
         detail_list = []
-        for detail in order.details.all():
+        for detail in resolve_targets(order.details.all(), 'item_type', 'item_id'):
             detail_data = {
                 'detail': detail,
-                'item': None,
-                'item_url': None,
+                'item': detail.target,
+                'item_url': detail.target_url,
                 'nights': None,  # 酒店入住天数
             }
             
@@ -432,29 +337,6 @@ class OrderDetailView(LoginRequiredMixin, TemplateView):
                 nights = (detail.check_out_date - detail.check_in_date).days
                 detail_data['nights'] = nights if nights > 0 else 1
             
-            # 根据item_type获取对应的对象
-            if detail.item_type == 'scenic':
-                try:
-                    item = ScenicSpot.objects.get(pk=detail.item_id)
-                    detail_data['item'] = item
-                    detail_data['item_url'] = reverse('scenic:detail', kwargs={'pk': detail.item_id})
-                except ScenicSpot.DoesNotExist:
-                    pass
-            elif detail.item_type == 'route':
-                try:
-                    item = Route.objects.get(pk=detail.item_id)
-                    detail_data['item'] = item
-                    detail_data['item_url'] = reverse('routes:detail', kwargs={'pk': detail.item_id})
-                except Route.DoesNotExist:
-                    pass
-            elif detail.item_type == 'hotel':
-                try:
-                    item = Hotel.objects.get(pk=detail.item_id)
-                    detail_data['item'] = item
-                    detail_data['item_url'] = reverse('hotels:detail', kwargs={'pk': detail.item_id})
-                except Hotel.DoesNotExist:
-                    pass
-            
             detail_list.append(detail_data)
         
         context['detail_list'] = detail_list
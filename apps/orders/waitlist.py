@@ -0,0 +1,137 @@
+"""
+路线候补队列
+
+路线名额不足时，用户可以加入候补（WaitlistEntry），不必反复重试下单。
+有名额释放时（订单取消、超时未支付，见 holds.release_inventory），在同一个事务中：
+1. 按加入顺序（先到先得）为候补用户分配名额，排在最前面的候补人数放不下时停止，
+   不跳过前面的用户去满足后面人数较少的候补
+2. 一条 UPDATE 扣减该路线的总人数，bulk_create 写入订单、订单明细
+3. 候补记录标记为已转为订单，并为每个用户写入一条待推送的通知（apps.users.models.Notification）
+
+转出的订单与普通订单一样处于待支付状态，超时未支付会再次释放名额给下一位候补。
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.routes.models import Route
+from apps.users.models import Notification
+
+from .holds import hold_deadline
+from .models import Order, OrderDetail, WaitlistEntry
+from .order_sn import next_order_sn
+from .transactions import booking_transaction
+
+
+def waitlist_position(entry):
+    """候补记录在队列中的位置（从1开始）"""
+    return WaitlistEntry.objects.filter(route_id=entry.route_id, status='waiting', id__lte=entry.id).count()
+
+
+@booking_transaction
+def join_waitlist(user, route_id, quantity, contact_name, contact_phone):
+    """
+    加入路线候补，返回候补记录
+    加入时如果恰好有名额释放，立即尝试转为订单
+    """
+    if quantity <= 0:
+        raise ValueError("报名人数必须大于0")
+    route = Route.objects.filter(pk=route_id).only('group_size').first()
+    if route is None:
+        raise ValueError("路线不存在")
+    if quantity > route.group_size:
+        raise ValueError(f"报名人数不能超过成团人数{route.group_size}")
+
+    try:
+        with transaction.atomic():
+            entry = WaitlistEntry.objects.create(
+                route_id=route_id, user=user, quantity=quantity,
+                contact_name=contact_name, contact_phone=contact_phone,
+            )
+    except IntegrityError:
+        raise ValueError("您已在该路线的候补队列中")
+
+    promote_waitlist([route_id])
+    entry.refresh_from_db()
+    return entry
+
+
+def leave_waitlist(user, entry_id):
+    """取消候补，返回是否取消成功"""
+    return bool(WaitlistEntry.objects.filter(pk=entry_id, user=user, status='waiting').update(status='cancelled'))
+
+
+@booking_transaction
+def promote_waitlist(route_ids):
+    """
+    把释放出来的名额分配给候补用户，返回转为订单的候补记录数量
+    在取消 / 超时释放名额的事务中调用时，名额直接交给候补用户，不会被其他请求抢走
+    """
+    waiting_routes = set(
+        WaitlistEntry.objects.filter(route_id__in=route_ids, status='waiting').values_list('route_id', flat=True)
+    )
+    if not waiting_routes:
+        return 0
+
+    entries_by_route = defaultdict(list)
+    for entry in WaitlistEntry.objects.filter(route_id__in=waiting_routes, status='waiting').order_by('id'):
+        entries_by_route[entry.route_id].append(entry)
+
+    promoted = []
+    routes = {}
+    for route_id in sorted(entries_by_route):
+        # 支持行锁的数据库上锁定路线行（SQLite 上整个事务为 BEGIN IMMEDIATE）
+        route = Route.objects.select_for_update().only('name', 'price', 'group_size', 'sales_count').get(pk=route_id)
+        routes[route_id] = route
+        available = route.group_size - route.sales_count
+        taken = 0
+        for entry in entries_by_route[route_id]:
+            if taken + entry.quantity > available:
+                break
+            taken += entry.quantity
+            promoted.append(entry)
+        if taken:
+            Route.objects.filter(pk=route_id).update(sales_count=F('sales_count') + taken)
+
+    if not promoted:
+        return 0
+
+    now = timezone.now()
+    deadline = hold_deadline(now)
+    orders = Order.objects.bulk_create([
+        Order(
+            order_sn=next_order_sn(), user_id=entry.user_id,
+            total_amount=routes[entry.route_id].price * entry.quantity, status='pending',
+            contact_name=entry.contact_name, contact_phone=entry.contact_phone, expires_at=deadline,
+        )
+        for entry in promoted
+    ])
+    OrderDetail.objects.bulk_create([
+        OrderDetail(
+            order=order, item_type='route', item_id=entry.route_id, item_name=routes[entry.route_id].name,
+            price=routes[entry.route_id].price, quantity=entry.quantity,
+            subtotal=routes[entry.route_id].price * entry.quantity,
+        )
+        for order, entry in zip(orders, promoted)
+    ])
+
+    for order, entry in zip(orders, promoted):
+        entry.status = 'promoted'
+        entry.order = order
+        entry.promoted_at = now
+    WaitlistEntry.objects.bulk_update(promoted, ['status', 'order', 'promoted_at'])
+
+    Notification.objects.bulk_create([
+        Notification(
+            user_id=entry.user_id,
+            category='waitlist',
+            title='候补成功',
+            content=(f"您候补的路线「{routes[entry.route_id].name}」已为您保留{entry.quantity}个名额，"
+                     f"订单号 {order.order_sn}，请在 {timezone.localtime(deadline):%Y-%m-%d %H:%M} 前完成支付。"),
+            link=f"/orders/payment/{order.order_sn}/",
+        )
+        for order, entry in zip(orders, promoted)
+    ])
+    return len(promoted)
@@ -15,7 +15,7 @@ class RouteItineraryInline(admin.TabularInline):
 @admin.register(Route)
 class RouteAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'price', 'days', 'rating', 'is_hot', 'is_recommended', 'sales_count', 'display_order')
-    list_filter = ('category', 'days', 'is_hot', 'is_recommended', 'departure_city')
+    list_filter = ('category', 'days', 'is_hot', 'is_recommended', 'is_flash_sale', 'departure_city')
     search_fields = ('name', 'tags', 'itinerary_summary')
     list_editable = ('is_hot', 'is_recommended', 'display_order')
     readonly_fields = ('views_count', 'sales_count', 'created_at', 'updated_at')
@@ -26,7 +26,7 @@ class RouteAdmin(admin.ModelAdmin):
             'fields': ('name', 'category', 'cover_image', 'departure_city', 'meeting_point')
         }),
         ('价格与行程', {
-            'fields': ('price', 'days', 'group_size', 'deadline', 'itinerary_summary')
+            'fields': ('price', 'days', 'group_size', 'deadline', 'is_flash_sale', 'itinerary_summary')
         }),
         ('费用说明', {
             'fields': ('cost_include', 'cost_exclude', 'notes')
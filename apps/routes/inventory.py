@@ -0,0 +1,62 @@
+"""
+路线名额扣减与归还
+
+名额检查和扣减合并为一条带条件的 UPDATE：
+    sales_count = sales_count + quantity  WHERE sales_count + quantity <= group_size
+不依赖 select_for_update()（SQLite 不支持行锁），在任何数据库上都不会超卖；
+Route 上的 CheckConstraint 在数据库层面再兜底一次。
+"""
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from .models import Route
+
+
+class SeatsUnavailable(ValueError):
+    """路线名额不足（可加入候补队列）"""
+
+    def __init__(self, route_id, available, quantity):
+        self.route_id = route_id
+        self.available = available
+        self.quantity = quantity
+        super().__init__(f"名额不足，剩余{available}个名额，您需要{quantity}个")
+
+
+def reserve_route_seats(route_id, quantity):
+    """扣减路线名额，名额不足时抛出 SeatsUnavailable（ValueError 的子类）"""
+    if quantity <= 0:
+        raise ValueError("报名人数必须大于0")
+
+    updated = Route.objects.filter(
+        pk=route_id,
+        sales_count__lte=F('group_size') - quantity,
+    ).update(sales_count=F('sales_count') + quantity)
+
+    if not updated:
+        route = Route.objects.only('group_size', 'sales_count').get(pk=route_id)
+        raise SeatsUnavailable(route_id, max(route.group_size - route.sales_count, 0), quantity)
+
+
+def release_route_seats(route_id, quantity):
+    """归还路线名额（取消订单、超时未支付时调用）"""
+    return Route.objects.filter(
+        pk=route_id,
+        sales_count__gte=quantity,
+    ).update(sales_count=F('sales_count') - quantity)
+
+
+def release_route_seats_bulk(quantities):
+    """
+    批量归还多条路线的名额
+    quantities 为 {路线ID: 人数}，所有路线在一条 UPDATE 中完成
+    """
+    if not quantities:
+        return 0
+    released = Case(
+        *[When(pk=route_id, then=Value(quantity)) for route_id, quantity in quantities.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return Route.objects.filter(pk__in=list(quantities)).update(
+        sales_count=Greatest(F('sales_count') - released, Value(0))
+    )
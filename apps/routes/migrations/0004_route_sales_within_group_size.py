@@ -0,0 +1,17 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0003_alter_route_cover_image'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='route',
+            constraint=models.CheckConstraint(check=models.Q(('sales_count__lte', models.F('group_size'))), name='route_sales_within_group_size'),
+        ),
+    ]
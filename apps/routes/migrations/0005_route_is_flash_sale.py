@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('routes', '0004_route_sales_within_group_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='route',
+            name='is_flash_sale',
+            field=models.BooleanField(default=False, verbose_name='秒杀模式'),
+        ),
+    ]
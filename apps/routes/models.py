@@ -48,6 +48,8 @@ class Route(models.Model):
     views_count = models.PositiveIntegerField(default=0, verbose_name="浏览次数")
     sales_count = models.PositiveIntegerField(default=0, verbose_name="销售数量")
     display_order = models.PositiveIntegerField(default=0, verbose_name="显示顺序（数字越小越靠前）")
+    # 秒杀模式：报名请求先经过缓存中的名额令牌计数，订单异步批量写库（见 apps/orders/flash_sale.py）
+    is_flash_sale = models.BooleanField(default=False, verbose_name="秒杀模式")
     created_at = models.DateTimeField(default=timezone.now, verbose_name="创建时间")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
 
@@ -55,6 +57,10 @@ class Route(models.Model):
         verbose_name = "旅游路线"
         verbose_name_plural = verbose_name
         ordering = ['display_order', '-is_hot', '-rating', '-created_at']
+        constraints = [
+            # 数据库层面保证已报名人数不超过成团人数
+            models.CheckConstraint(check=models.Q(sales_count__lte=models.F('group_size')), name='route_sales_within_group_size'),
+        ]
 
     def __str__(self):
         return self.name
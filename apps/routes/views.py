@@ -2,10 +2,12 @@ from django.views.generic import TemplateView
 from django.views import View
 from django.contrib import messages
 from django.shortcuts import redirect
-from django.db.models import Avg
 from django.template.response import TemplateResponse
 from .models import Route, RouteCategory
 from apps.comments.models import Comment
+from apps.comments.ratings import get_rating_summary
+from apps.index.counters import apply_pending, record_view
+from apps.index.search import name_filter
 
 
 class RouteListView(TemplateView):
@@ -36,7 +38,8 @@ class RouteListView(TemplateView):
         
         # 搜索筛选
         if search_query:
-            routes = routes.filter(name__icontains=search_query)
+            # 名称包含，或拼音 / 首字母匹配
+            routes = routes.filter(name_filter('route', search_query))
         
         # 排序
         sort_by = self.request.GET.get('sort', 'display_order')
@@ -51,7 +54,8 @@ class RouteListView(TemplateView):
         else:
             routes = routes.order_by('display_order', '-is_hot', '-rating', '-sales_count')
         
-        context['routes'] = routes
+        # 加上尚未写库的浏览次数
+        context['routes'] = apply_pending(routes)
         context['selected_category'] = int(category_id) if category_id else None
         context['selected_days'] = int(days) if days else None
         context['search_query'] = search_query
@@ -66,9 +70,8 @@ class RouteDetailView(View):
         """显示路线详情"""
         try:
             route = Route.objects.get(pk=pk)
-            # 增加浏览次数
-            route.views_count += 1
-            route.save(update_fields=['views_count'])
+            # 增加浏览次数（缓冲后批量写库，见 apps/index/counters.py）
+            record_view(route)
             
             # 获取行程安排
             itineraries = route.itineraries.all().order_by('day_number')
@@ -85,13 +88,9 @@ class RouteDetailView(View):
                 is_deleted=False
             ).select_related('user').order_by('-created_at')[:20]  # 最多显示20条
             
-            # 计算平均评分
-            if comments.exists():
-                avg_rating = comments.aggregate(
-                    avg_rating=Avg('rating')
-                )['avg_rating'] or 0
-            else:
-                avg_rating = 0
+            # 平均评分：读取预先汇总的一行（见 apps/comments/ratings.py）
+            rating_summary = get_rating_summary('route', pk)
+            avg_rating = rating_summary.average if rating_summary else 0
             
             context = {
                 'route': route,
@@ -99,6 +98,7 @@ class RouteDetailView(View):
                 'related_routes': related_routes,
                 'comments': comments,
                 'avg_rating': avg_rating,
+                'rating_summary': rating_summary,
                 'page_title': f"{route.name} - 路线详情 - 保定旅游网"
             }
             
@@ -16,7 +16,7 @@ class ScenicImageInline(admin.TabularInline):
 class ScenicSpotAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'ticket_price', 'rating', 'is_hot', 'is_recommended', 'views_count', 'display_order')
     list_filter = ('category', 'is_hot', 'is_recommended', 'best_season')
-    search_fields = ('name', 'address', 'tags', 'description')
+    search_fields = ('name', 'aliases', 'address', 'tags', 'description')
     list_editable = ('is_hot', 'is_recommended', 'display_order')
     readonly_fields = ('views_count', 'created_at', 'updated_at')
     inlines = [ScenicImageInline]
@@ -30,7 +30,7 @@ class ScenicSpotAdmin(admin.ModelAdmin):
                       'best_season', 'visit_duration', 'latitude', 'longitude')
         }),
         ('标签与评分', {
-            'fields': ('tags', 'rating', 'is_hot', 'is_recommended', 'display_order')
+            'fields': ('tags', 'aliases', 'rating', 'is_hot', 'is_recommended', 'display_order')
         }),
         ('统计信息', {
             'fields': ('views_count', 'created_at', 'updated_at'),
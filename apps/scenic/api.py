@@ -1,6 +1,11 @@
+import math
+
 from django.http import JsonResponse
 from django.views import View
 
+from apps.index import geo
+from .models import ScenicSpot
+
 # API 视图骨架
 class CategoryListView(View):
     def get(self, request):
@@ -30,4 +35,97 @@ class SpotDetailView(View):
             "images": [{"url": "/media/placeholder.jpg"}],
             "reviews": []
         }
-        return JsonResponse({"status": "success", "data": spot_detail})
\ No newline at end of file
+        return JsonResponse({"status": "success", "data": spot_detail})
+
+
+def _float_param(request, name, default=None):
+    value = request.GET.get(name)
+    if value in (None, ''):
+        if default is None:
+            raise ValueError(f'缺少参数 {name}')
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f'参数 {name} 应为数字')
+    if not math.isfinite(number):
+        raise ValueError(f'参数 {name} 应为数字')
+    return number
+
+
+def _limit_param(request):
+    try:
+        limit = int(request.GET.get('limit') or geo.DEFAULT_LIMIT)
+    except ValueError:
+        raise ValueError('参数 limit 应为整数')
+    return max(1, min(limit, geo.MAX_LIMIT))
+
+
+class NearbySpotsView(View):
+    """
+    附近的景点（或酒店）
+    GET /api/v1/scenic/spots/nearby/?lat=38.87&lng=115.46&radius=5&limit=10&type=scenic
+    按距离从近到远返回，radius 单位为公里；查内存中的地理位置索引（见 apps/index/geo.py），不访问数据库
+    """
+
+    def get(self, request):
+        doc_type = request.GET.get('type', 'scenic')
+        if doc_type not in geo.GEO_SOURCES:
+            return JsonResponse({"status": "error", "message": "type 只能是 scenic 或 hotel"}, status=400)
+        try:
+            lat, lng = _float_param(request, 'lat'), _float_param(request, 'lng')
+            radius = _float_param(request, 'radius', geo.DEFAULT_RADIUS_KM)
+            hits = geo.geo_index.nearby(doc_type, lat, lng, radius, _limit_param(request))
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+        return JsonResponse({"status": "success", "data": [geo.serialize_hit(doc_type, hit) for hit in hits]})
+
+
+class SpotNearbyHotelsView(View):
+    """
+    景点周边的酒店
+    GET /api/v1/scenic/spots/<pk>/hotels/?radius=5&limit=10
+    """
+
+    def get(self, request, pk):
+        spot = ScenicSpot.objects.filter(pk=pk).values('latitude', 'longitude').first()
+        if spot is None:
+            return JsonResponse({"status": "error", "message": "景点不存在"}, status=404)
+        if spot['latitude'] is None or spot['longitude'] is None:
+            return JsonResponse({"status": "success", "data": []})
+        try:
+            radius = _float_param(request, 'radius', geo.DEFAULT_RADIUS_KM)
+            hits = geo.geo_index.nearby(
+                'hotel', float(spot['latitude']), float(spot['longitude']), radius, _limit_param(request)
+            )
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+        return JsonResponse({"status": "success", "data": [geo.serialize_hit('hotel', hit) for hit in hits]})
+
+
+class MapLayerView(View):
+    """
+    地图图层（GeoJSON FeatureCollection）
+    GET /api/v1/scenic/map/?bbox=115.0,38.5,116.0,39.2&zoom=10&types=scenic,hotel
+    bbox 为 西经度,南纬度,东经度,北纬度；点较多时按缩放级别聚合，聚合点的 properties.cluster 为 true
+    """
+
+    def get(self, request):
+        types = [t for t in request.GET.get('types', 'scenic,hotel').split(',') if t]
+        if not types or any(t not in geo.GEO_SOURCES for t in types):
+            return JsonResponse({"status": "error", "message": "types 只能包含 scenic、hotel"}, status=400)
+        try:
+            bbox = [float(value) for value in request.GET.get('bbox', '').split(',')]
+            if len(bbox) != 4 or not all(math.isfinite(value) for value in bbox):
+                raise ValueError
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "bbox 格式应为 西经度,南纬度,东经度,北纬度"}, status=400)
+        try:
+            zoom = max(0, min(int(request.GET.get('zoom') or 10), 22))
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "zoom 应为整数"}, status=400)
+        try:
+            features = geo.geo_index.features(types, *bbox, zoom)
+        except ValueError as e:
+            return JsonResponse({"status": "error", "message": str(e)}, status=400)
+        return JsonResponse({"type": "FeatureCollection", "features": features})
@@ -5,5 +5,8 @@ from . import api
 urlpatterns = [
     path('categories/', api.CategoryListView.as_view(), name='api-category-list'),
     path('spots/', api.SpotListView.as_view(), name='api-spot-list'),
+    path('spots/nearby/', api.NearbySpotsView.as_view(), name='api-spot-nearby'),
     path('spots/<int:pk>/', api.SpotDetailView.as_view(), name='api-spot-detail'),
+    path('spots/<int:pk>/hotels/', api.SpotNearbyHotelsView.as_view(), name='api-spot-nearby-hotels'),
+    path('map/', api.MapLayerView.as_view(), name='api-map-layer'),
 ]
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scenic', '0002_alter_scenicspot_options_scenicspot_best_season_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scenicspot',
+            name='aliases',
+            field=models.CharField(blank=True, max_length=200, null=True, verbose_name='别名（用逗号分隔，AI助手按别名匹配景点）'),
+        ),
+    ]
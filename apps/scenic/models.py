@@ -44,6 +44,7 @@ class ScenicSpot(models.Model):
     best_season = models.CharField(max_length=50, blank=True, null=True, verbose_name="最佳游览季节")
     visit_duration = models.CharField(max_length=50, blank=True, null=True, verbose_name="建议游览时长")
     tags = models.CharField(max_length=200, blank=True, null=True, verbose_name="标签（用逗号分隔）")
+    aliases = models.CharField(max_length=200, blank=True, null=True, verbose_name="别名（用逗号分隔，AI助手按别名匹配景点）")
     views_count = models.PositiveIntegerField(default=0, verbose_name="浏览次数")
     latitude = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True, verbose_name="纬度")
     longitude = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True, verbose_name="经度")
@@ -63,6 +64,12 @@ class ScenicSpot(models.Model):
             return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
         return []
 
+    def get_aliases_list(self):
+        """获取别名列表（中英文逗号都可以分隔）"""
+        if self.aliases:
+            return [alias.strip() for alias in self.aliases.replace('，', ',').split(',') if alias.strip()]
+        return []
+
 
 class ScenicImage(models.Model):
     """
@@ -1,11 +1,18 @@
+from datetime import date
+
+from django.utils import timezone
 from django.views.generic import TemplateView
 from django.views import View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.shortcuts import redirect
-from django.db.models import Avg
 from .models import ScenicSpot, ScenicCategory
 from apps.comments.models import Comment
+from apps.comments.ratings import get_rating_summary
+from apps.index.counters import apply_pending, record_view
+from apps.index.geo import nearby_objects
+from apps.index.hours import open_on_spot_ids, open_spot_ids
+from apps.index.search import name_filter
 
 
 class ScenicListView(TemplateView):
@@ -31,7 +38,18 @@ class ScenicListView(TemplateView):
         
         # 搜索筛选
         if search_query:
-            spots = spots.filter(name__icontains=search_query)
+            # 名称包含，或拼音 / 首字母匹配（byd -> 白洋淀）
+            spots = spots.filter(name_filter('scenic', search_query))
+        
+        # 按开放时间筛选：open=now 正在开放，open=2026-05-01 当天开放（查解析好的开放时段，见 apps/index/hours.py）
+        open_filter = self.request.GET.get('open', '')
+        if open_filter == 'now':
+            spots = spots.filter(id__in=open_spot_ids(timezone.localtime()))
+        elif open_filter:
+            try:
+                spots = spots.filter(id__in=open_on_spot_ids(date.fromisoformat(open_filter)))
+            except ValueError:
+                open_filter = ''
         
         # 排序
         sort_by = self.request.GET.get('sort', 'display_order')
@@ -46,9 +64,11 @@ class ScenicListView(TemplateView):
         else:
             spots = spots.order_by('display_order', '-is_hot', '-rating', '-views_count')
         
-        context['spots'] = spots
+        # 加上尚未写库的浏览次数
+        context['spots'] = apply_pending(spots)
         context['selected_category'] = int(category_id) if category_id else None
         context['search_query'] = search_query
+        context['open_filter'] = open_filter
         
         return context
 
@@ -62,9 +82,8 @@ class ScenicDetailView(View):
         
         try:
             spot = ScenicSpot.objects.get(pk=pk)
-            # 增加浏览次数
-            spot.views_count += 1
-            spot.save(update_fields=['views_count'])
+            # 增加浏览次数（缓冲后批量写库，见 apps/index/counters.py）
+            record_view(spot)
             
             # 获取景点图片
             spot_images = spot.images.all().order_by('order')
@@ -74,6 +93,9 @@ class ScenicDetailView(View):
                 category=spot.category
             ).exclude(pk=pk).order_by('-rating', '-views_count')[:4]
             
+            # 周边酒店（按距离，查内存中的地理位置索引，见 apps/index/geo.py）
+            nearby_hotels = nearby_objects('hotel', spot)
+            
             # 获取评价列表（排除已删除的）
             comments = Comment.objects.filter(
                 target_type='scenic',
@@ -81,20 +103,18 @@ class ScenicDetailView(View):
                 is_deleted=False
             ).select_related('user').order_by('-created_at')[:20]  # 最多显示20条
             
-            # 计算平均评分
-            if comments.exists():
-                avg_rating = comments.aggregate(
-                    avg_rating=Avg('rating')
-                )['avg_rating'] or 0
-            else:
-                avg_rating = 0
+            # 平均评分：读取预先汇总的一行（见 apps/comments/ratings.py）
+            rating_summary = get_rating_summary('scenic', pk)
+            avg_rating = rating_summary.average if rating_summary else 0
             
             context = {
                 'spot': spot,
                 'spot_images': spot_images,
                 'related_spots': related_spots,
+                'nearby_hotels': nearby_hotels,
                 'comments': comments,
                 'avg_rating': avg_rating,
+                'rating_summary': rating_summary,
                 'page_title': f"{spot.name} - 景点详情 - 保定旅游网",
                 'user': request.user  # 确保传递用户对象
             }
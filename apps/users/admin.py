@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
-from .models import CustomUser, Favorite
+from .models import CustomUser, Favorite, Notification
 
 
 @admin.register(CustomUser)
@@ -88,3 +88,13 @@ class FavoriteAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ('created_at',)
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    """站内通知管理"""
+    list_display = ('id', 'user', 'category', 'title', 'is_read', 'created_at', 'sent_at')
+    list_filter = ('category', 'is_read', 'created_at')
+    search_fields = ('user__username', 'user__phone', 'title')
+    date_hierarchy = 'created_at'
+    readonly_fields = ('created_at',)
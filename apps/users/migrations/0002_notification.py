@@ -0,0 +1,34 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('waitlist', '候补成功'), ('system', '系统通知')], default='system', max_length=20, verbose_name='通知类型')),
+                ('title', models.CharField(max_length=100, verbose_name='标题')),
+                ('content', models.TextField(verbose_name='内容')),
+                ('link', models.CharField(blank=True, max_length=200, verbose_name='跳转链接')),
+                ('is_read', models.BooleanField(default=False, verbose_name='是否已读')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='推送时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='用户')),
+            ],
+            options={
+                'verbose_name': '通知',
+                'verbose_name_plural': '通知',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
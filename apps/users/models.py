@@ -42,4 +42,32 @@ class Favorite(models.Model):
         unique_together = ('user', 'target_id', 'target_type')
 
     def __str__(self):
-        return f"{self.user.username} 收藏了 {self.get_target_type_display()}: {self.target_id}"
\ No newline at end of file
+        return f"{self.user.username} 收藏了 {self.get_target_type_display()}: {self.target_id}"
+
+
+class Notification(models.Model):
+    """
+    站内通知
+    sent_at 为空表示尚未通过短信/邮件推送，由推送任务按创建顺序取出发送
+    """
+    CATEGORY_CHOICES = (
+        ('waitlist', '候补成功'),
+        ('system', '系统通知'),
+    )
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='notifications', verbose_name="用户")
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='system', verbose_name="通知类型")
+    title = models.CharField(max_length=100, verbose_name="标题")
+    content = models.TextField(verbose_name="内容")
+    link = models.CharField(max_length=200, blank=True, verbose_name="跳转链接")
+    is_read = models.BooleanField(default=False, verbose_name="是否已读")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="推送时间")
+
+    class Meta:
+        verbose_name = "通知"
+        verbose_name_plural = verbose_name
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user} - {self.title}"
@@ -0,0 +1,83 @@
+from django.test import TestCase
+
+from apps.comments.models import Comment
+from apps.hotels.models import Hotel
+from apps.news.models import News
+from apps.routes.models import Route
+from apps.scenic.models import ScenicSpot
+from .models import CustomUser, Favorite
+
+
+def create_targets(count):
+    """每种类型各创建 count 个目标对象"""
+    spots = ScenicSpot.objects.bulk_create([
+        ScenicSpot(name=f'景点{i}', address='保定市', ticket_price=50, open_time='8:00-17:00', description='介绍')
+        for i in range(count)
+    ])
+    routes = Route.objects.bulk_create([
+        Route(name=f'路线{i}', price=199, group_size=20, deadline='2030-01-01',
+              itinerary_summary='行程', cost_include='包含', cost_exclude='不含', notes='须知')
+        for i in range(count)
+    ])
+    hotels = Hotel.objects.bulk_create([
+        Hotel(name=f'酒店{i}', address='保定市', phone='0312-0000000', brief='简介', description='详情')
+        for i in range(count)
+    ])
+    news = News.objects.bulk_create([
+        News(title=f'资讯{i}', abstract='摘要', content='正文') for i in range(count)
+    ])
+    return {'scenic': spots, 'route': routes, 'hotel': hotels, 'news': news}
+
+
+class UserTargetListTests(TestCase):
+    """我的收藏 / 我的评价：目标对象按类型批量加载"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='fan', password='pwd', phone='13800000003')
+        self.client.force_login(self.user)
+
+    def add_favorites(self, targets):
+        Favorite.objects.bulk_create([
+            Favorite(user=self.user, target_type=target_type, target_id=obj.id)
+            for target_type in ('scenic', 'route')
+            for obj in targets[target_type]
+        ])
+
+    def add_comments(self, targets):
+        Comment.objects.bulk_create([
+            Comment(user=self.user, target_type=target_type, target_id=obj.id, content='不错')
+            for target_type, objs in targets.items()
+            for obj in objs
+        ])
+
+    def test_favorites_query_count_does_not_grow(self):
+        self.add_favorites(create_targets(250))
+
+        # 会话 + 用户 + 收藏 + 景点 + 路线
+        with self.assertNumQueries(5):
+            response = self.client.get('/users/favorites/')
+
+        favorite_list = response.context['favorite_list']
+        self.assertEqual(len(favorite_list), 500)
+        self.assertTrue(all(item['target_url'] != '#' for item in favorite_list))
+
+    def test_deleted_favorite_target(self):
+        spot = create_targets(1)['scenic'][0]
+        Favorite.objects.create(user=self.user, target_type='scenic', target_id=spot.id)
+        spot.delete()
+
+        item = self.client.get('/users/favorites/').context['favorite_list'][0]
+        self.assertEqual(item['target_url'], '#')
+        self.assertIn('已删除', item['target_name'])
+
+    def test_reviews_query_count_does_not_grow(self):
+        self.add_comments(create_targets(50))
+
+        # 会话 + 用户 + 评论 + 景点 + 路线 + 酒店 + 资讯
+        with self.assertNumQueries(7):
+            response = self.client.get('/users/reviews/')
+
+        names = {item['target_name'] for item in response.context['comment_list']}
+        self.assertIn('资讯0', names)
+        self.assertIn('酒店49', names)
+        self.assertEqual(len(response.context['comment_list']), 200)
@@ -7,6 +7,7 @@ from django.urls import reverse_lazy
 from django.views import View
 from apps.orders.models import Order  # 导入订单模型
 from apps.comments.models import Comment  # 导入评论模型
+from apps.index.targets import resolve_targets
 from .forms import CustomUserCreationForm
 
 
@@ -75,36 +76,23 @@ class UserFavoritesView(LoginRequiredMixin, TemplateView):  # 添加 LoginRequir
         # 获取当前用户的所有收藏
         favorites = Favorite.objects.filter(user=self.request.user).order_by('-created_at')
         
-        # 为每个收藏获取对应的对象信息
+        # 为每个收藏获取对应的对象信息（每种类型一次批量查询）
         favorite_list = []
-        for favorite in favorites:
+        for favorite in resolve_targets(favorites):
+            target = favorite.target
             favorite_data = {
                 'favorite': favorite,
                 'target_name': '未知',
                 'target_image': None,
-                'target_url': '#',
+                'target_url': favorite.target_url or '#',
                 'target_type_display': favorite.get_target_type_display(),
             }
             
-            # 根据target_type获取对应的对象信息
-            if favorite.target_type == 'scenic':
-                try:
-                    from apps.scenic.models import ScenicSpot
-                    target = ScenicSpot.objects.get(pk=favorite.target_id)
-                    favorite_data['target_name'] = target.name
-                    favorite_data['target_image'] = target.cover_image.url if target.cover_image else None
-                    favorite_data['target_url'] = f'/scenic/detail/{target.id}/'
-                except:
-                    favorite_data['target_name'] = f'景点 #{favorite.target_id} (已删除)'
-            elif favorite.target_type == 'route':
-                try:
-                    from apps.routes.models import Route
-                    target = Route.objects.get(pk=favorite.target_id)
-                    favorite_data['target_name'] = target.name
-                    favorite_data['target_image'] = target.cover_image.url if target.cover_image else None
-                    favorite_data['target_url'] = f'/routes/detail/{target.id}/'
-                except:
-                    favorite_data['target_name'] = f'路线 #{favorite.target_id} (已删除)'
+            if target:
+                favorite_data['target_name'] = target.name
+                favorite_data['target_image'] = target.cover_image.url if target.cover_image else None
+            elif favorite.target_type in ('scenic', 'route'):
+                favorite_data['target_name'] = f'{favorite.get_target_type_display()} #{favorite.target_id} (已删除)'
             else:
                 # 处理其他类型（如未来可能添加的酒店等）
                 favorite_data['target_name'] = f'{favorite.get_target_type_display()} #{favorite.target_id}'
@@ -127,47 +115,17 @@ class UserReviewsView(LoginRequiredMixin, TemplateView):  # 添加 LoginRequired
             is_deleted=False
         ).order_by('-created_at')
         
-        # 为每个评论获取关联的对象信息
+        # 为每个评论获取关联的对象信息（每种类型一次批量查询）
         comment_list = []
-        for comment in comments:
-            comment_data = {
+        for comment in resolve_targets(comments):
+            target = comment.target
+            comment_list.append({
                 'comment': comment,
-                'target_name': '未知',
+                # 资讯使用 title，其他类型使用 name
+                'target_name': (getattr(target, 'name', None) or getattr(target, 'title', None)) if target else '未知',
                 'target_id': comment.target_id,
                 'target_type': comment.target_type,
-            }
-            
-            # 根据target_type获取对应的对象名称
-            if comment.target_type == 'scenic':
-                try:
-                    from apps.scenic.models import ScenicSpot
-                    target = ScenicSpot.objects.get(pk=comment.target_id)
-                    comment_data['target_name'] = target.name
-                except:
-                    pass
-            elif comment.target_type == 'route':
-                try:
-                    from apps.routes.models import Route
-                    target = Route.objects.get(pk=comment.target_id)
-                    comment_data['target_name'] = target.name
-                except:
-                    pass
-            elif comment.target_type == 'hotel':
-                try:
-                    from apps.hotels.models import Hotel
-                    target = Hotel.objects.get(pk=comment.target_id)
-                    comment_data['target_name'] = target.name
-                except:
-                    pass
-            elif comment.target_type == 'news':
-                try:
-                    from apps.news.models import News
-                    target = News.objects.get(pk=comment.target_id)
-                    comment_data['target_name'] = target.title
-                except:
-                    pass
-            
-            comment_list.append(comment_data)
+            })
         
         context['comment_list'] = comment_list
         return context
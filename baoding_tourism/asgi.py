@@ -5,6 +5,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+部署示例（需要另行安装 ASGI 服务器）：
+    uvicorn baoding_tourism.asgi:application --workers 4
+AI规划（apps/ai_assistant/api.py）、打卡上传（apps/checkins/api.py）是异步视图，等待大模型应答、
+接收上传内容时不占用线程；其余同步视图由 Django 放到线程中执行
 """
 
 import os
@@ -13,4 +18,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'baoding_tourism.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+application = get_asgi_application()
+
+# 进程启动时加载搜索框的输入联想索引；ASGI 服务器在事件循环中导入本模块，同步的数据库访问放到后台线程
+from apps.index.suggest import warm_up  # noqa: E402
+
+warm_up(background=True)
@@ -76,6 +76,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'baoding_tourism.wsgi.application'
+# ASGI 入口（uvicorn / daphne 等），AI规划、打卡上传等异步视图在 ASGI 下等待 I/O 时不占用线程
+ASGI_APPLICATION = 'baoding_tourism.asgi.application'
 
 
 # Database
@@ -83,8 +85,13 @@ WSGI_APPLICATION = 'baoding_tourism.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # 基于Django自带SQLite后端，增加 BEGIN IMMEDIATE 事务支持（见 baoding_tourism/sqlite_backend）
+        'ENGINE': 'baoding_tourism.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # 等待写锁的最长时间（秒），超时后报 "database is locked"
+            'timeout': 5,
+        },
     }
 }
 
@@ -156,4 +163,61 @@ USE_AI_API = False
 AI_PROVIDER = 'openai'
 # OpenAI配置（如果使用OpenAI）
 OPENAI_API_KEY = ''  # 从环境变量读取：os.getenv('OPENAI_API_KEY', '')
-OPENAI_MODEL = 'gpt-3.5-turbo'  # 或 'gpt-4'
\ No newline at end of file
+OPENAI_MODEL = 'gpt-3.5-turbo'  # 或 'gpt-4'
+# 百度千帆、阿里通义千问（均通过兼容 OpenAI 的对话接口调用，见 apps/ai_assistant/providers.py）
+QIANFAN_API_KEY = ''
+QIANFAN_MODEL = 'ernie-4.0-8k'
+DASHSCOPE_API_KEY = ''
+DASHSCOPE_MODEL = 'qwen-plus'
+# 服务商接口地址，留空使用默认地址；离线联调时指向本地模拟服务（python manage.py ai_mock_server），
+# 如 'http://127.0.0.1:8765/v1'
+AI_API_BASE_URL = ''
+# 超时（秒）：建立连接、两次读取之间、整次调用
+AI_API_CONNECT_TIMEOUT = 5
+AI_API_READ_TIMEOUT = 20
+AI_API_TOTAL_TIMEOUT = 60
+# 每个服务商同时进行的调用数（也是连接池大小）、等待空位的最长时间（秒），等不到时改用规则引擎
+AI_API_MAX_CONCURRENCY = 8
+AI_API_QUEUE_TIMEOUT = 2
+# 熔断：连续失败多少次后暂停调用、暂停多少秒后再试，期间使用规则引擎
+AI_API_BREAKER_FAILURES = 5
+AI_API_BREAKER_RESET = 30
+# AI规划结果缓存：进程内最多缓存多少条、多少秒后过期（见 apps/ai_assistant/plan_cache.py）
+AI_PLAN_CACHE_SIZE = 512
+AI_PLAN_CACHE_TTL = 3600
+
+# 订单号分配器节点ID（0-99），多台服务器部署时每台设置不同的值（见 apps/orders/order_sn.py）
+ORDER_SN_NODE_ID = 0
+
+# 待支付订单保留库存的时长（分钟），超时未支付自动取消并归还名额/房间（见 apps/orders/holds.py）
+ORDER_HOLD_MINUTES = 30
+# 进程内超时订单清理间隔（秒），0 表示不启动，改用定时任务执行 python manage.py expire_orders
+ORDER_SWEEP_INTERVAL = 0
+# 下单/支付幂等键的保存时长（秒），期间携带同一 Idempotency-Key 的重复请求直接返回第一次的结果
+ORDER_IDEMPOTENCY_TTL = 600
+# 秒杀模式：准入请求每攒够多少条或等待多少秒批量写库一次（见 apps/orders/flash_sale.py）
+FLASH_SALE_BATCH_SIZE = 200
+FLASH_SALE_FLUSH_INTERVAL = 0.05
+
+# 详情页浏览次数先在进程内缓冲，每隔多少秒或累计多少次批量写库（见 apps/index/counters.py）
+VIEW_COUNTER_FLUSH_INTERVAL = 5
+VIEW_COUNTER_FLUSH_THRESHOLD = 1000
+# 缓冲区分片数，热门条目的并发浏览分散到不同的锁上
+VIEW_COUNTER_SHARDS = 16
+# 是否在第一次浏览时启动后台写库线程（测试中使用 ViewCounter(autostart=False) 手动 flush）
+VIEW_COUNTER_AUTOSTART = True
+
+# 首页内容缓存时长（秒），相关数据保存或删除时会立即清除（见 apps/index/feed.py）
+HOMEPAGE_FEED_TTL = 600
+
+# 搜索框输入联想：每隔多少秒写入搜索次数并重新加载浏览次数（见 apps/index/suggest.py）
+SUGGEST_REFRESH_INTERVAL = 300
+
+# AI助手景点名称解析的内存索引最长使用多少秒后重新加载，景点保存或删除时会立即过期（见 apps/ai_assistant/resolver.py）
+SCENIC_RESOLVER_TTL = 300
+
+# AI助手按描述推荐景点的 TF-IDF 索引多少秒后从数据库整体重新加载，景点保存或删除时增量更新（见 apps/ai_assistant/recommender.py）
+SPOT_RECOMMENDER_TTL = 300
+
+# 景点、酒店地理位置索引最长使用多少秒后重新加载，对象保存或删除时会立即过期（见 apps/index/geo.py）
+GEO_INDEX_TTL = 300
@@ -0,0 +1,43 @@
+"""
+SQLite 数据库后端 - 在 Django 自带后端的基础上支持 BEGIN IMMEDIATE 事务
+
+SQLite 默认的 BEGIN（DEFERRED）事务在第一次写入时才申请写锁，两个先读后写的事务
+同时升级写锁时会直接报 "database is locked"，busy timeout 不会生效。
+IMMEDIATE 事务在 BEGIN 时就申请写锁，拿不到锁会按 timeout 等待。
+
+配置方式：
+- DATABASES['default']['OPTIONS']['transaction_mode']：所有事务的默认模式
+  （与 Django 5.1 起的同名配置项保持一致）
+- 连接的 next_transaction_mode：只对下一个最外层事务生效，
+  由 apps.orders.transactions.booking_transaction 在下单路径上设置
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.next_transaction_mode = None
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        # transaction_mode 不是 sqlite3.connect() 的参数，在这里处理后移除
+        mode = kwargs.pop('transaction_mode', None)
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES['{self.alias}']['OPTIONS']['transaction_mode'] 无效：{mode}，"
+                f"可选值为 {', '.join(TRANSACTION_MODES)}"
+            )
+        return kwargs
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.next_transaction_mode or self.settings_dict['OPTIONS'].get('transaction_mode')
+        self.next_transaction_mode = None
+        if mode:
+            self.cursor().execute(f"BEGIN {mode.upper()}")
+        else:
+            super()._start_transaction_under_autocommit()
@@ -32,6 +32,7 @@ urlpatterns = [
     path('api/v1/foods/', include('apps.foods.api_urls')),  # 美食文化API
     path('api/v1/comments/', include('apps.comments.api_urls')),  # 评论API
     path('api/v1/ai-assistant/', include('apps.ai_assistant.api_urls')),  # AI助手API
+    path('api/v1/search/', include('apps.index.api_urls')),  # 搜索联想API
 ]
 
 # 在开发模式下，允许Django服务静态文件和媒体文件
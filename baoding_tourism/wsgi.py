@@ -13,4 +13,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'baoding_tourism.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# 进程启动时加载搜索框的输入联想索引
+from apps.index.suggest import warm_up  # noqa: E402
+
+warm_up()
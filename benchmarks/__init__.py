@@ -0,0 +1,106 @@
+"""
+性能基准与并发压测脚本
+
+所有脚本都在临时 SQLite 文件数据库上运行，自动执行迁移，不会改动项目的 db.sqlite3。
+在项目根目录下运行，例如：
+    python -m benchmarks.bench_room_inventory
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def setup_django(db_name=None, database=None):
+    """
+    初始化 Django 并切换到临时数据库
+    必须在导入任何模型之前调用；database 为完整的数据库配置（如 PostgreSQL），
+    不传时使用临时 SQLite 文件
+    """
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'baoding_tourism.settings')
+
+    from django.conf import settings
+    if database is not None:
+        settings.DATABASES['default'] = database
+        db_name = database['NAME']
+    else:
+        if db_name is None:
+            db_name = os.path.join(tempfile.mkdtemp(prefix='baoding_bench_'), 'bench.sqlite3')
+        settings.DATABASES['default']['NAME'] = db_name
+    settings.DEBUG = False
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0, interactive=False)
+    return db_name
+
+
+def postgres_database():
+    """
+    从环境变量读取 PostgreSQL 压测库配置（需要安装 psycopg，且使用专门的空库）：
+    BENCH_PG_NAME / BENCH_PG_USER / BENCH_PG_PASSWORD / BENCH_PG_HOST / BENCH_PG_PORT
+    """
+    name = os.environ.get('BENCH_PG_NAME')
+    if not name:
+        raise SystemExit('请通过环境变量 BENCH_PG_NAME 等指定 PostgreSQL 压测库')
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': name,
+        'USER': os.environ.get('BENCH_PG_USER', 'postgres'),
+        'PASSWORD': os.environ.get('BENCH_PG_PASSWORD', ''),
+        'HOST': os.environ.get('BENCH_PG_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('BENCH_PG_PORT', '5432'),
+    }
+
+
+def create_user(username='bench'):
+    """创建压测用户"""
+    from apps.users.models import CustomUser
+    user, _ = CustomUser.objects.get_or_create(
+        username=username, defaults={'phone': str(13000000000 + abs(hash(username)) % 10 ** 9)}
+    )
+    return user
+
+
+def run_threads(worker, threads):
+    """
+    并发执行 worker(thread_index)，返回总耗时（秒）
+    每个线程结束时关闭自己的数据库连接
+    """
+    from django.db import connection
+
+    def target(index):
+        try:
+            worker(index)
+        finally:
+            connection.close()
+
+    pool = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - started
+
+
+def percentile(values, pct):
+    """计算百分位数（毫秒列表等），values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def print_table(title, rows, columns):
+    """以对齐的表格打印结果，rows 为字典列表"""
+    print(f"\n== {title} ==")
+    widths = [max(len(col), *(len(str(row.get(col, ''))) for row in rows)) for col in columns]
+    print('  '.join(col.ljust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row.get(col, '')).ljust(w) for col, w in zip(columns, widths)))
@@ -0,0 +1,296 @@
+"""
+AI规划接口离线压测与质量检查
+
+回放请求语料（默认 benchmarks/data/ai_plan_corpus.json，格式为 {"spots": [景点信息], "requests": [请求]}；
+可以用 python manage.py export_ai_corpus 从查询记录导出），在本进程内调用 AIPlanAPIView，分两种模式：
+- rules：规则引擎（USE_AI_API = False）
+- provider：开启大模型，服务商为本地模拟服务（--latency、--chunk-delay 模拟应答耗时）
+每个请求先清空规划缓存后调用（generate：生成规划），再原样调用一次（cache：命中缓存）；
+另外按 --sizes 从语料景点中随机抽取不同数量的景点生成请求，观察耗时随景点数的变化。
+
+按模式，以及模式 × 规划类型、模式 × 景点数分组统计：
+- 耗时 p50/p95/p99，每个请求的查库次数（平均 / 最大）
+- 规划大小：各部分文字的总长度、响应字节数
+- 质量（quality）：HTTP 状态符合预期；成功时要求的部分都有内容、行程包含全部景点、结果来源与模式一致
+- 覆盖率（coverage）：规划文字中提到的景点占比（规则引擎的旅游策略是通用建议，不逐个提到景点）
+
+--output 把汇总和每个请求的明细写成 JSON，--compare 与之前保存的结果对比：
+    python -m benchmarks.bench_ai_plan --output before.json
+    python -m benchmarks.bench_ai_plan --compare before.json --output after.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime
+
+from benchmarks import percentile, print_table, setup_django
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ai_plan_corpus.json')
+PLAN_PATH = '/api/v1/ai-assistant/plan/'
+QUERY_TYPES = ['general', 'route', 'transport', 'strategy']
+SYNTHETIC_INPUTS = ['', '一天', '两天', '三天，周六出发', '带老人，节奏慢一点']
+# (景点数上限, 分组名)
+SPOT_BUCKETS = ((0, '0'), (1, '1'), (3, '2-3'), (6, '4-6'), (10, '7-10'))
+SUMMARY_COLUMNS = ['group', 'n', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_avg', 'queries_max', 'plan_chars_avg',
+                   'bytes_avg', 'quality', 'coverage']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='AI规划接口离线压测与质量检查')
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS, help='请求语料（JSON）')
+    parser.add_argument('--modes', nargs='+', choices=['rules', 'provider'], default=['rules', 'provider'])
+    parser.add_argument('--repeat', type=int, default=3, help='每个请求回放的次数')
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1, 3, 6, 10, 14],
+                        help='随机抽取景点生成请求时的景点数')
+    parser.add_argument('--synthetic', type=int, default=4, help='每种景点数生成的请求数')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟服务商开始应答前的等待（秒）')
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help='模拟服务商流式输出每段之间的间隔（秒）')
+    parser.add_argument('--login', action='store_true', help='以登录用户请求（同时写查询记录）')
+    parser.add_argument('--output', help='结果写入的 JSON 文件')
+    parser.add_argument('--compare', help='与之前 --output 保存的结果对比')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def load_corpus(path, args):
+    with open(path, encoding='utf-8') as f:
+        corpus = json.load(f)
+    requests = [dict(request, origin='corpus') for request in corpus['requests']]
+    rng = random.Random(args.seed)
+    names = [spot['name'] for spot in corpus['spots']]
+    for size in args.sizes:
+        for _ in range(args.synthetic):
+            requests.append({
+                'scenic_spots': rng.sample(names, min(size, len(names))),
+                'query_type': rng.choice(QUERY_TYPES),
+                'user_input': rng.choice(SYNTHETIC_INPUTS),
+                'origin': 'synthetic',
+            })
+    return corpus['spots'], requests
+
+
+def create_spots(spots):
+    from apps.scenic.models import ScenicSpot
+
+    for spot in spots:
+        ScenicSpot.objects.create(**{field: value for field, value in spot.items() if value is not None})
+
+
+def spot_bucket(count):
+    for limit, label in SPOT_BUCKETS:
+        if count <= limit:
+            return label
+    return f'{SPOT_BUCKETS[-1][0] + 1}+'
+
+
+def clear_plans():
+    """清空规划缓存（进程内和 AIPlanResult 表），下一次请求重新生成"""
+    from apps.ai_assistant import plan_cache
+    from apps.ai_assistant.models import AIPlanResult, AIQuery
+
+    plan_cache.plan_cache.clear()
+    AIQuery.objects.all().delete()
+    AIPlanResult.objects.all().delete()
+
+
+def evaluate(request, response, mode):
+    """请求结果的大小和质量检查"""
+    from apps.ai_assistant.providers import QUERY_SECTIONS
+
+    expected = request.get('expect_status', 200)
+    record = {'status': response.status_code, 'status_ok': response.status_code == expected,
+              'spots': len(request['scenic_spots']), 'plan_chars': 0, 'bytes': len(response.content),
+              'coverage': None}
+    if response.status_code != 200:
+        record['passed'] = record['status_ok']
+        return record
+    data = response.json()['data']
+    plan = data['plan']
+    names = [spot['name'] for spot in data['scenic_spots']]
+    text = ''.join(plan.get(key) or '' for key in ('route_plan', 'transport_plan', 'strategy_plan'))
+    record.update(
+        spots=len(names),
+        cached=data['cached'],
+        plan_chars=len(text),
+        sections_ok=all(plan.get(key) for key in QUERY_SECTIONS.get(request['query_type'], QUERY_SECTIONS['general'])),
+        coverage=round(sum(name in text for name in names) / len(names), 3),
+        itinerary_ok=sorted(plan['itinerary']['order']) == sorted(spot['id'] for spot in data['scenic_spots']),
+        source_ok=plan.get('source') == ('ai' if mode == 'provider' else 'rules'),
+    )
+    record['passed'] = all((record['status_ok'], record['sections_ok'], record['itinerary_ok'], record['source_ok']))
+    return record
+
+
+def replay(client, requests, mode, repeat):
+    """回放全部请求，返回每次调用的明细"""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    records = []
+    for index, request in enumerate(requests):
+        body = {key: request.get(key, '') for key in ('scenic_spots', 'query_type', 'user_input')}
+        for attempt in range(repeat):
+            clear_plans()
+            for phase in ('generate', 'cache'):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = client.post(PLAN_PATH, body, content_type='application/json')
+                    elapsed = (time.perf_counter() - started) * 1000
+                record = evaluate(request, response, mode)
+                record.update(mode=mode, phase=phase, request=index, attempt=attempt, origin=request['origin'],
+                              query_type=body['query_type'], ms=round(elapsed, 3), queries=len(queries))
+                records.append(record)
+    return records
+
+
+def summarize(group, records):
+    timings = [record['ms'] for record in records]
+    queries = [record['queries'] for record in records]
+    coverage = [record['coverage'] for record in records if record['coverage'] is not None]
+    return {
+        'group': group, 'n': len(records),
+        'p50_ms': round(percentile(timings, 50), 2), 'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'queries_avg': round(sum(queries) / len(queries), 1), 'queries_max': max(queries),
+        'plan_chars_avg': round(sum(record['plan_chars'] for record in records) / len(records)),
+        'bytes_avg': round(sum(record['bytes'] for record in records) / len(records)),
+        'quality': round(sum(record['passed'] for record in records) / len(records), 3),
+        'coverage': round(sum(coverage) / len(coverage), 3) if coverage else None,
+    }
+
+
+def summary_rows(records):
+    """按模式 × 阶段分组；规划类型和景点数只统计生成规划的请求"""
+    buckets = [label for _, label in SPOT_BUCKETS] + [spot_bucket(SPOT_BUCKETS[-1][0] + 1)]
+    rows = []
+    for mode in dict.fromkeys(record['mode'] for record in records):
+        records_of_mode = [record for record in records if record['mode'] == mode]
+        generated = [record for record in records_of_mode if record['phase'] == 'generate']
+        groups = [(f'{mode} / {phase}', [record for record in records_of_mode if record['phase'] == phase])
+                  for phase in ('generate', 'cache')]
+        groups += [(f'{mode} / {query_type}', [record for record in generated if record['query_type'] == query_type])
+                   for query_type in QUERY_TYPES]
+        groups += [(f'{mode} / 景点{bucket}', [record for record in generated if spot_bucket(record['spots']) == bucket])
+                   for bucket in buckets]
+        rows.extend(summarize(group, items) for group, items in groups if items)
+    return rows
+
+
+def failures(records):
+    """质量检查没有通过的请求（每个请求只列一次）"""
+    seen, rows = set(), []
+    for record in records:
+        key = (record['mode'], record['request'])
+        if record['passed'] or key in seen:
+            continue
+        seen.add(key)
+        checks = [name for name in ('status_ok', 'sections_ok', 'itinerary_ok', 'source_ok')
+                  if record.get(name) is False]
+        rows.append({'mode': record['mode'], 'request': record['request'], 'status': record['status'],
+                     'failed': ','.join(checks)})
+    return rows
+
+
+def compare(path, rows):
+    """与之前的结果对比各组的 p50/p95/p99 和质量"""
+    with open(path, encoding='utf-8') as f:
+        before = {row['group']: row for row in json.load(f)['summary']}
+
+    def change(old, new):
+        return f'{old}→{new} ({(new - old) / old * 100:+.0f}%)' if old else f'{old}→{new}'
+
+    table = []
+    for row in rows:
+        old = before.get(row['group'])
+        if old is None:
+            continue
+        table.append({
+            'group': row['group'],
+            **{name: change(old[name], row[name]) for name in ('p50_ms', 'p95_ms', 'p99_ms')},
+            'queries_avg': f"{old['queries_avg']}→{row['queries_avg']}",
+            'quality': f"{old['quality']}→{row['quality']}",
+            'coverage': f"{old.get('coverage')}→{row['coverage']}",
+        })
+    print_table(f'与 {path} 对比', table,
+                ['group', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_avg', 'quality', 'coverage'])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    import django
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+
+    from apps.ai_assistant import providers
+    from apps.ai_assistant.mock_provider import MockProviderServer
+    from benchmarks import create_user
+
+    spots, requests = load_corpus(args.corpus, args)
+    create_spots(spots)
+    # setup_django() 关闭了 DEBUG，需要允许测试客户端的主机名
+    settings.ALLOWED_HOSTS = ['testserver']
+    client = Client()
+    if args.login:
+        client.force_login(create_user())
+
+    records = []
+    for mode in args.modes:
+        server = None
+        if mode == 'provider':
+            server = MockProviderServer(latency=args.latency, chunk_delay=args.chunk_delay).start()
+            settings.AI_API_BASE_URL = server.base_url
+            providers.registry.reset()
+        settings.USE_AI_API = mode == 'provider'
+        # 预热：加载景点名称解析、推荐索引等，不计入结果
+        replay(client, requests[:3], mode, 1)
+        started = time.perf_counter()
+        records.extend(replay(client, requests, mode, args.repeat))
+        print(f'{mode}：{len(requests)} 个请求 × {args.repeat} 次，{time.perf_counter() - started:.1f}s')
+        if server is not None:
+            server.stop()
+            providers.registry.reset()
+
+    rows = summary_rows(records)
+    print_table('AI规划接口（generate：生成规划；cache：命中缓存）', [
+        dict(row, quality=f"{row['quality']:.0%}",
+             coverage='-' if row['coverage'] is None else f"{row['coverage']:.0%}") for row in rows
+    ], SUMMARY_COLUMNS)
+    failed = failures(records)
+    if failed:
+        print_table('质量检查未通过的请求', failed, ['mode', 'request', 'status', 'failed'])
+    if args.compare:
+        compare(args.compare, rows)
+    if args.output:
+        result = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+                'python': platform.python_version(), 'django': django.get_version(), 'database': connection.vendor,
+                'corpus': os.path.abspath(args.corpus), 'spots': len(spots), 'requests': len(requests),
+                'args': vars(args),
+            },
+            'summary': rows,
+            'requests': [dict(request, index=index) for index, request in enumerate(requests)],
+            'records': records,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'\n结果已写入 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
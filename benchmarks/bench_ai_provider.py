@@ -0,0 +1,122 @@
+"""
+大模型客户端压测（本地模拟服务，不需要网络和密钥）
+
+测量：
+- 首段文本耗时（TTFT）和整次调用耗时的 p50/p99：复用连接池 vs 每次新建连接
+- 并发：threads 个线程同时调用、每个服务商最多 max_concurrency 个调用时，完成数、排队超时（改用规则引擎）数
+- 熔断：服务商持续返回 503 时，熔断前后每次调用的耗时
+
+    python -m benchmarks.bench_ai_provider --calls 200 --threads 32
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import percentile, print_table, setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='大模型客户端压测')
+    parser.add_argument('--calls', type=int, default=200, help='串行调用次数')
+    parser.add_argument('--threads', type=int, default=32, help='并发线程数')
+    parser.add_argument('--max-concurrency', type=int, default=8, help='每个服务商的并发上限')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟服务开始应答前的等待（秒）')
+    parser.add_argument('--chunk-delay', type=float, default=0.002, help='模拟服务每段之间的间隔（秒）')
+    return parser.parse_args()
+
+
+def timed_call(client, messages):
+    started = time.perf_counter()
+    first = None
+    for _ in client.stream_chat(messages):
+        if first is None:
+            first = time.perf_counter()
+    return (first - started) * 1000, (time.perf_counter() - started) * 1000
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from apps.ai_assistant import providers
+    from apps.ai_assistant.mock_provider import MockProviderServer
+
+    server = MockProviderServer(latency=args.latency, chunk_delay=args.chunk_delay).start()
+    messages = providers.build_messages(
+        [{'name': f'景点{i}', 'address': '保定市', 'open_time': '全天', 'ticket_price': 40} for i in range(3)],
+        'general', '两天',
+    )
+
+    def make_client(**options):
+        options.setdefault('max_concurrency', args.max_concurrency)
+        return providers.ProviderClient('openai', server.base_url, 'bench', 'mock', **options)
+
+    rows = []
+    for label, reuse in (('连接池', True), ('每次新建连接', False)):
+        client = make_client()
+        connections = server.connections
+        ttft, total = [], []
+        for _ in range(args.calls):
+            first, whole = timed_call(client, messages)
+            ttft.append(first)
+            total.append(whole)
+            if not reuse:
+                client.pool.close()
+        rows.append({
+            'mode': label,
+            'ttft_p50_ms': f'{percentile(ttft, 50):.1f}', 'ttft_p99_ms': f'{percentile(ttft, 99):.1f}',
+            'total_p50_ms': f'{percentile(total, 50):.1f}', 'total_p99_ms': f'{percentile(total, 99):.1f}',
+            'connections': server.connections - connections,
+        })
+    print_table(f'串行调用 {args.calls} 次', rows,
+                ['mode', 'ttft_p50_ms', 'ttft_p99_ms', 'total_p50_ms', 'total_p99_ms', 'connections'])
+
+    rows = []
+    for queue_timeout in (0.05, 2.0):
+        client = make_client(queue_timeout=queue_timeout)
+        results, lock = {'ok': 0, 'busy': 0}, threading.Lock()
+        timings = []
+
+        def worker():
+            for _ in range(4):
+                try:
+                    _, whole = timed_call(client, messages)
+                except providers.ProviderBusy:
+                    with lock:
+                        results['busy'] += 1
+                    continue
+                with lock:
+                    results['ok'] += 1
+                    timings.append(whole)
+
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        rows.append({
+            'queue_timeout_s': queue_timeout, 'ok': results['ok'], 'fallback_busy': results['busy'],
+            'p99_ms': f'{percentile(timings, 99):.1f}', 'wall_s': f'{time.perf_counter() - started:.2f}',
+            'connections': client.pool.created,
+        })
+    print_table(f'{args.threads} 个线程并发（上限 {args.max_concurrency}）', rows,
+                ['queue_timeout_s', 'ok', 'fallback_busy', 'p99_ms', 'wall_s', 'connections'])
+
+    server.fail_status = 503
+    client = make_client(breaker=providers.CircuitBreaker(5, 30))
+    rows = []
+    for i in range(10):
+        started = time.perf_counter()
+        try:
+            client.chat(messages)
+        except providers.ProviderError as e:
+            error = type(e).__name__
+        rows.append({'call': i + 1, 'error': error, 'ms': f'{(time.perf_counter() - started) * 1000:.2f}',
+                     'breaker': client.breaker.state})
+    print_table('服务商持续返回 503', rows, ['call', 'error', 'ms', 'breaker'])
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
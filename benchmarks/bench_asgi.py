@@ -0,0 +1,219 @@
+"""
+WSGI 与 ASGI 并发承载能力对比
+
+AI规划接口开启大模型（本地模拟服务，每次应答前等待 --latency 秒，默认 2 秒），每个请求使用不同的需求，
+避开规划缓存，全部都要等服务商应答。分别用两种方式在本进程内提供服务：
+- WSGI：wsgiref 服务器 + --workers 个工作线程（相当于 gunicorn 的 gthread 工作模式）
+- ASGI：asyncio 上的最小 HTTP/1.1 前端调用 baoding_tourism.asgi.application（单个事件循环）
+对每个并发数同时发出请求，统计完成数、失败数、吞吐和延迟 p50/p99。
+
+两种方式的 HTTP 前端都是为压测写的最小实现，对比的是应用模型（线程等待 I/O vs 事件循环等待 I/O），
+不是服务器本身的性能；部署时使用 gunicorn / uvicorn。
+
+    python -m benchmarks.bench_asgi --concurrency 16 64 256 --workers 8
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from urllib.parse import unquote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from benchmarks import percentile, print_table, setup_django
+
+PLAN_PATH = '/api/v1/ai-assistant/plan/'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='WSGI 与 ASGI 并发承载能力对比')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[16, 64, 256], help='同时发出的请求数')
+    parser.add_argument('--workers', type=int, default=8, help='WSGI 工作线程数')
+    parser.add_argument('--latency', type=float, default=2.0, help='模拟服务商的应答延迟（秒）')
+    parser.add_argument('--timeout', type=float, default=30.0, help='客户端等待每个请求的最长时间（秒）')
+    return parser.parse_args()
+
+
+class PooledWSGIServer(ThreadingMixIn, WSGIServer):
+    """固定数量工作线程的 WSGI 服务器：超出的连接排队等待空闲线程"""
+    request_queue_size = 1024
+    executor = None
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def start_wsgi(workers):
+    """在后台线程中运行 WSGI 服务器，返回 (端口, 停止函数)"""
+    from django.core.wsgi import get_wsgi_application
+
+    server = make_server('127.0.0.1', 0, get_wsgi_application(), server_class=PooledWSGIServer,
+                         handler_class=QuietHandler)
+    server.executor = ThreadPoolExecutor(max_workers=workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def stop():
+        # 客户端已超时放弃、仍在排队的请求不再处理
+        server.shutdown()
+        server.executor.shutdown(wait=False, cancel_futures=True)
+
+    return server.server_address[1], stop
+
+
+def start_asgi():
+    """在后台线程的事件循环中运行最小的 ASGI 前端，返回 (端口, 停止函数)"""
+    from baoding_tourism.asgi import application
+
+    async def handle(reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers, length = [], 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            body = await reader.readexactly(length)
+            path, _, query = request_line[1].partition('?')
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': request_line[0], 'scheme': 'http', 'path': unquote(path),
+                'raw_path': path.encode('latin-1'), 'query_string': query.encode('latin-1'),
+                'root_path': '', 'headers': headers,
+                'client': writer.get_extra_info('peername')[:2], 'server': ('127.0.0.1', port),
+            }
+            disconnected = asyncio.Event()
+            received = False
+
+            async def receive():
+                nonlocal received
+                if not received:
+                    received = True
+                    return {'type': 'http.request', 'body': body, 'more_body': False}
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    lines = [f"HTTP/1.1 {message['status']} OK"]
+                    lines += [f"{k.decode('latin-1')}: {v.decode('latin-1')}" for k, v in message.get('headers', [])]
+                    lines.append('Connection: close')
+                    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+                elif message['type'] == 'http.response.body':
+                    writer.write(message.get('body', b''))
+                    if not message.get('more_body'):
+                        await writer.drain()
+
+            await application(scope, receive, send)
+            disconnected.set()
+        finally:
+            writer.close()
+
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    holder = {}
+
+    async def serve():
+        holder['server'] = await asyncio.start_server(handle, '127.0.0.1', 0, backlog=1024)
+        ready.set()
+        try:
+            await holder['server'].serve_forever()
+        except asyncio.CancelledError:
+            pass
+
+    threading.Thread(target=lambda: loop.run_until_complete(serve()), daemon=True).start()
+    ready.wait()
+    port = holder['server'].sockets[0].getsockname()[1]
+
+    def stop():
+        loop.call_soon_threadsafe(holder['server'].close)
+
+    return port, stop
+
+
+async def post_plan(port, index, timeout):
+    """发出一个规划请求，返回 (是否成功, 耗时毫秒)"""
+    started = time.perf_counter()
+    body = json.dumps({'scenic_spots': ['直隶总督署', '古莲花池'], 'user_input': f'需求{index}'},
+                      ensure_ascii=False).encode('utf-8')
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write((f'POST {PLAN_PATH} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+                      f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+        writer.close()
+    except (OSError, asyncio.TimeoutError):
+        return False, (time.perf_counter() - started) * 1000
+    status_ok = response.startswith(b'HTTP/1.1 200') or response.startswith(b'HTTP/1.0 200')
+    return status_ok and b'"source": "ai"' in response, (time.perf_counter() - started) * 1000
+
+
+async def run_load(port, concurrency, timeout, offset):
+    return await asyncio.gather(*(post_plan(port, offset + i, timeout) for i in range(concurrency)))
+
+
+def measure(label, port, args, offset):
+    rows = []
+    for concurrency in args.concurrency:
+        started = time.perf_counter()
+        results = asyncio.run(run_load(port, concurrency, args.timeout, offset))
+        offset += concurrency
+        wall = time.perf_counter() - started
+        timings = [ms for ok, ms in results if ok]
+        rows.append({
+            'server': label, 'concurrency': concurrency, 'ok': len(timings),
+            'failed': concurrency - len(timings), 'req_per_s': f'{len(timings) / wall:.1f}',
+            'p50_ms': f'{percentile(timings, 50):.0f}', 'p99_ms': f'{percentile(timings, 99):.0f}',
+        })
+    return rows, offset
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from django.conf import settings
+
+    from apps.ai_assistant.mock_provider import MockProviderServer
+    from apps.scenic.models import ScenicSpot
+
+    ScenicSpot.objects.create(name='直隶总督署', address='保定市', ticket_price=30, open_time='8:30-18:00',
+                              description='介绍', latitude='38.8900000', longitude='115.4700000')
+    ScenicSpot.objects.create(name='古莲花池', address='保定市', ticket_price=40, open_time='8:00-18:00',
+                              description='介绍', latitude='38.8700000', longitude='115.4800000')
+
+    provider = MockProviderServer(latency=args.latency).start()
+    # setup_django() 关闭了 DEBUG，需要允许本机地址
+    settings.ALLOWED_HOSTS = ['127.0.0.1']
+    settings.USE_AI_API = True
+    settings.AI_API_BASE_URL = provider.base_url
+    settings.AI_API_READ_TIMEOUT = args.timeout
+    settings.AI_API_TOTAL_TIMEOUT = args.timeout
+    # 对比的是服务器模型，不让服务商并发上限先成为瓶颈
+    settings.AI_API_MAX_CONCURRENCY = max(args.concurrency)
+    settings.AI_API_QUEUE_TIMEOUT = args.timeout
+
+    port, stop = start_wsgi(args.workers)
+    rows, offset = measure(f'WSGI（{args.workers} 线程）', port, args, 0)
+    stop()
+    port, stop = start_asgi()
+    asgi_rows, _ = measure('ASGI（1 个事件循环）', port, args, offset)
+    stop()
+    provider.stop()
+    print_table(f'AI规划接口，服务商延迟 {args.latency}s', rows + asgi_rows,
+                ['server', 'concurrency', 'ok', 'failed', 'req_per_s', 'p50_ms', 'p99_ms'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+秒杀模式压测
+
+大量买家同时抢同一条路线的少量名额（默认2000人抢50个名额），每个买家一个线程，
+所有线程就绪后同时发起请求。对比两种实现：
+- direct：普通下单（OrderPaymentView.create_order），每个请求都在事务中更新路线记录
+- flash：秒杀准入（apps/orders/flash_sale.py），缓存令牌准入后立即返回，订单由后台线程批量写库
+
+输出每个买家拿到结果（成功/售罄）的 p50/p99 延迟、成功人数、写库完成后的 sales_count 和订单数，
+以及超卖人数（应为0）。
+
+    python -m benchmarks.bench_flash_sale --buyers 2000 --seats 50
+"""
+import argparse
+import logging
+import threading
+import time
+
+from benchmarks import percentile, print_table, run_threads, setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='秒杀模式压测')
+    parser.add_argument('--buyers', type=int, default=2000, help='并发买家数量（每人一个线程）')
+    parser.add_argument('--seats', type=int, default=50, help='路线名额')
+    return parser.parse_args()
+
+
+def direct_buy(user, route_id):
+    from apps.orders.views import OrderPaymentView
+
+    OrderPaymentView().create_order(user, route_id, 'route', 1, '压测', '13000000000')
+
+
+def flash_buy(user, route_id):
+    from apps.orders import flash_sale
+
+    flash_sale.admit(user, flash_sale.get_flash_sale_route(route_id), 1, '压测', '13000000000')
+
+
+def run_path(name, buy, users, args):
+    from django.core.cache import cache
+    from apps.orders import flash_sale
+    from apps.orders.models import Order
+    from apps.routes.models import Route
+
+    cache.clear()
+    route = Route.objects.create(
+        name=f'秒杀路线-{name}', price=99, group_size=args.seats, deadline='2030-01-01', is_flash_sale=True,
+        itinerary_summary='压测', cost_include='压测', cost_exclude='压测', notes='压测'
+    )
+    # 预热路线配置和令牌（开售前完成）
+    flash_sale.get_flash_sale_route(route.id)
+    flash_sale.reset_tokens(route.id)
+
+    barrier = threading.Barrier(len(users))
+    results = [None] * len(users)
+
+    def worker(index):
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            buy(users[index], route.id)
+            outcome = 'admitted'
+        except ValueError as e:
+            outcome = 'busy' if '繁忙' in str(e) else 'sold_out'
+        results[index] = (outcome, (time.perf_counter() - started) * 1000)
+
+    elapsed = run_threads(worker, len(users))
+    # 等待异步写库完成
+    flash_sale.writer.flush()
+    while flash_sale.writer.queued_quantity(route.id):
+        time.sleep(0.01)
+
+    route.refresh_from_db()
+    latency = [ms for _, ms in results]
+    outcomes = [outcome for outcome, _ in results]
+    return {
+        'path': name,
+        'admitted': outcomes.count('admitted'),
+        'sold_out': outcomes.count('sold_out'),
+        'busy': outcomes.count('busy'),
+        'p50_ms': f"{percentile(latency, 50):.1f}",
+        'p99_ms': f"{percentile(latency, 99):.1f}",
+        'seconds': f"{elapsed:.2f}",
+        'sales_count': route.sales_count,
+        'orders': Order.objects.filter(details__item_id=route.id).count(),
+        'oversold': max(0, route.sales_count - route.group_size),
+    }
+
+
+def main():
+    args = parse_args()
+    setup_django()
+    logging.disable(logging.ERROR)
+
+    from apps.users.models import CustomUser
+
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'buyer{i}', phone=str(13100000000 + i)) for i in range(args.buyers)
+    ], batch_size=500)
+    users = list(CustomUser.objects.filter(username__startswith='buyer').order_by('id'))
+
+    rows = [
+        run_path('direct', direct_buy, users, args),
+        run_path('flash', flash_buy, users, args),
+    ]
+    print_table(
+        f"秒杀压测：{args.buyers}个买家同时抢{args.seats}个名额", rows,
+        ['path', 'admitted', 'sold_out', 'busy', 'p50_ms', 'p99_ms', 'seconds', 'sales_count', 'orders', 'oversold']
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+地理位置索引压测
+
+在保定市域范围（北纬 38.2~40.0，东经 113.6~116.4）内生成合成坐标（默认 10 万家酒店、1 万个景点，
+七成集中在几个城区 / 景区附近，其余均匀分布），测量：
+- 加载耗时
+- 附近查询（给定坐标，半径 2/5/20/50 公里取前 10 个）的 p50/p99，以及同样条件在数据库上
+  按经纬度矩形筛选后在 Python 中算距离排序的耗时（对照）
+- 地图图层（GeoJSON 聚合）在不同缩放级别、对应视野大小下的 p50/p99 和要素数
+
+    python -m benchmarks.bench_geo --points 100000
+"""
+import argparse
+import math
+import random
+import time
+
+from benchmarks import percentile, print_table, setup_django
+
+SOUTH, NORTH, WEST, EAST = 38.2, 40.0, 113.6, 116.4
+CENTERS = [(38.87, 115.46), (38.94, 115.93), (39.42, 115.58), (38.83, 114.98), (39.04, 115.25)]
+RADII_KM = [2, 5, 20, 50]
+# (缩放级别, 视野宽度（经度）)
+VIEWS = [(8, 2.8), (10, 0.7), (12, 0.18), (14, 0.045)]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='地理位置索引压测')
+    parser.add_argument('--points', type=int, default=100000, help='酒店数量')
+    parser.add_argument('--spots', type=int, default=10000, help='景点数量')
+    parser.add_argument('--queries', type=int, default=500, help='每组查询次数')
+    parser.add_argument('--db-queries', type=int, default=20, help='数据库对照每组查询次数')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def random_point(rng):
+    if rng.random() < 0.7:
+        lat, lng = rng.choice(CENTERS)
+        return lat + rng.gauss(0, 0.05), lng + rng.gauss(0, 0.06)
+    return rng.uniform(SOUTH, NORTH), rng.uniform(WEST, EAST)
+
+
+def build_points(args, rng):
+    from apps.hotels.models import Hotel
+    from apps.scenic.models import ScenicSpot
+
+    batch = []
+    for i in range(args.points):
+        lat, lng = random_point(rng)
+        batch.append(Hotel(name=f'酒店{i}', address='保定市', phone='0312', brief='简介', description='详情',
+                           latitude=f'{lat:.7f}', longitude=f'{lng:.7f}'))
+        if len(batch) == 5000:
+            Hotel.objects.bulk_create(batch)
+            batch = []
+    Hotel.objects.bulk_create(batch)
+    ScenicSpot.objects.bulk_create([
+        ScenicSpot(name=f'景点{i}', address='保定市', ticket_price=0, open_time='全天', description='介绍',
+                   latitude=f'{lat:.7f}', longitude=f'{lng:.7f}')
+        for i, (lat, lng) in enumerate(random_point(rng) for _ in range(args.spots))
+    ])
+
+
+def database_nearby(lat, lng, radius_km, limit=10):
+    """对照：数据库按经纬度矩形筛选，Python 中算距离排序"""
+    from apps.hotels.models import Hotel
+    from apps.index.geo import KM_PER_DEGREE, haversine_km
+
+    import numpy as np
+
+    delta_lat = radius_km / KM_PER_DEGREE
+    delta_lng = delta_lat / math.cos(math.radians(lat))
+    rows = list(Hotel.objects.filter(
+        latitude__range=(lat - delta_lat, lat + delta_lat), longitude__range=(lng - delta_lng, lng + delta_lng)
+    ).values_list('pk', 'latitude', 'longitude'))
+    if not rows:
+        return []
+    distances = haversine_km(lat, lng, np.array([float(r[1]) for r in rows]), np.array([float(r[2]) for r in rows]))
+    return sorted((d, r[0]) for d, r in zip(distances.tolist(), rows) if d <= radius_km)[:limit]
+
+
+def timed(func, points):
+    timings, sizes = [], []
+    for point in points:
+        started = time.perf_counter()
+        result = func(*point)
+        timings.append((time.perf_counter() - started) * 1000)
+        sizes.append(len(result))
+    return timings, sizes
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from apps.index.geo import GeoIndex
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    build_points(args, rng)
+    print(f'生成 {args.points} 家酒店、{args.spots} 个景点：{time.perf_counter() - started:.1f}s')
+
+    index = GeoIndex()
+    started = time.perf_counter()
+    index.layer('hotel')
+    index.layer('scenic')
+    print(f'加载索引：{(time.perf_counter() - started) * 1000:.0f}ms')
+
+    rows = []
+    for radius in RADII_KM:
+        points = [random_point(rng) for _ in range(args.queries)]
+        timings, sizes = timed(lambda lat, lng: index.nearby('hotel', lat, lng, radius, 10), points)
+        db_timings, _ = timed(lambda lat, lng: database_nearby(lat, lng, radius), points[:args.db_queries])
+        rows.append({
+            'radius_km': radius,
+            'index_p50_ms': f'{percentile(timings, 50):.2f}', 'index_p99_ms': f'{percentile(timings, 99):.2f}',
+            'db_p50_ms': f'{percentile(db_timings, 50):.1f}', 'avg_hits': f'{sum(sizes) / len(sizes):.1f}',
+        })
+    print_table('附近的酒店（前10个）', rows, ['radius_km', 'index_p50_ms', 'index_p99_ms', 'db_p50_ms', 'avg_hits'])
+
+    rows = []
+    for zoom, width in VIEWS:
+        height = width * 0.6
+        views = []
+        for _ in range(args.queries):
+            lat, lng = random_point(rng)
+            views.append((lng - width / 2, lat - height / 2, lng + width / 2, lat + height / 2))
+        timings, sizes = timed(
+            lambda west, south, east, north: index.features(['scenic', 'hotel'], west, south, east, north, zoom), views
+        )
+        rows.append({
+            'zoom': zoom, 'view_deg': width,
+            'p50_ms': f'{percentile(timings, 50):.2f}', 'p99_ms': f'{percentile(timings, 99):.2f}',
+            'avg_features': f'{sum(sizes) / len(sizes):.0f}',
+        })
+    print_table('地图图层（景点 + 酒店，聚合）', rows, ['zoom', 'view_deg', 'p50_ms', 'p99_ms', 'avg_features'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+景点开放时间筛选压测
+
+用几种常见写法合成景点的开放时间（默认 5000 个景点），测量：
+- 解析并写入 OpeningHours 的耗时
+- "正在开放"、"某天开放"筛选的 p50/p99：OpeningHours 子查询 vs 每次取出全部景点的开放时间逐个解析判断（对照，不使用解析缓存）
+
+    python -m benchmarks.bench_opening_hours --spots 5000
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks import percentile, print_table, setup_django
+
+OPEN_TIMES = [
+    '{o}:00-{c}:00', '{o}:30-{c}:30', '周二至周日 {o}:00-{c}:00', '{o}:00-{c}:00，周一闭馆',
+    '旺季（4月1日-10月31日）{o}:00-{c}:00；淡季{o}:30-{c2}:00；周一闭馆',
+    '工作日 {o}:00-{c}:00，周末 {o2}:00-{c}:30', '全天开放', '{c}:00-次日2:00', '以景区公告为准',
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='景点开放时间筛选压测')
+    parser.add_argument('--spots', type=int, default=5000, help='景点数量')
+    parser.add_argument('--queries', type=int, default=200, help='每组查询次数')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def random_open_time(rng, index):
+    # 加上编号，避免文字完全相同
+    opens = rng.randint(6, 10)
+    closes = rng.randint(16, 19)
+    text = rng.choice(OPEN_TIMES).format(o=opens, c=closes, c2=closes - 1, o2=opens - 1)
+    return f'{text}（{index}号门）'
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from django.db import connection, transaction
+
+    from apps.index import hours
+    from apps.scenic.models import ScenicSpot
+
+    rng = random.Random(args.seed)
+    ScenicSpot.objects.bulk_create([
+        ScenicSpot(name=f'景点{i}', address='保定市', ticket_price=0, open_time=random_open_time(rng, i),
+                   description='介绍')
+        for i in range(args.spots)
+    ], batch_size=2000)
+    started = time.perf_counter()
+    with transaction.atomic():
+        for spot in ScenicSpot.objects.only('id', 'open_time'):
+            hours.index_spot(spot)
+    print(f'解析并索引 {args.spots} 个景点：{time.perf_counter() - started:.1f}s')
+
+    def by_index(moment):
+        return list(ScenicSpot.objects.filter(id__in=hours.open_spot_ids(moment)).values_list('id', flat=True))
+
+    def by_parsing(moment):
+        return [
+            spot_id for spot_id, open_time in ScenicSpot.objects.values_list('id', 'open_time')
+            if hours.is_open(hours.parse_open_time.__wrapped__(open_time) or (), moment)
+        ]
+
+    def on_day_by_index(day):
+        return list(ScenicSpot.objects.filter(id__in=hours.open_on_spot_ids(day)).values_list('id', flat=True))
+
+    def on_day_by_parsing(day):
+        return [
+            spot_id for spot_id, open_time in ScenicSpot.objects.values_list('id', 'open_time')
+            if hours.hours_on(hours.parse_open_time.__wrapped__(open_time), day)
+        ]
+
+    start = datetime(2026, 1, 1)
+    moments = [start + timedelta(minutes=rng.randrange(365 * 24 * 60)) for _ in range(args.queries)]
+    days = [date(2026, 1, 1) + timedelta(days=rng.randrange(365)) for _ in range(args.queries)]
+    rows = []
+    for label, func, points in (
+        ('正在开放：OpeningHours', by_index, moments),
+        ('正在开放：逐个解析', by_parsing, moments[:max(args.queries // 20, 3)]),
+        ('某天开放：OpeningHours', on_day_by_index, days),
+        ('某天开放：逐个解析', on_day_by_parsing, days[:max(args.queries // 20, 3)]),
+    ):
+        timings, sizes = [], []
+        for point in points:
+            began = time.perf_counter()
+            sizes.append(len(func(point)))
+            timings.append((time.perf_counter() - began) * 1000)
+        rows.append({
+            'filter': label, 'p50_ms': f'{percentile(timings, 50):.1f}', 'p99_ms': f'{percentile(timings, 99):.1f}',
+            'avg_open': f'{sum(sizes) / len(sizes):.0f}',
+        })
+    # 两种方式的结果一致
+    for moment in moments[:20]:
+        assert sorted(by_index(moment)) == sorted(by_parsing(moment)), moment
+    print_table(f'{args.spots} 个景点（{connection.vendor}）', rows, ['filter', 'p50_ms', 'p99_ms', 'avg_open'])
+
+
+if __name__ == '__main__':
+    main()
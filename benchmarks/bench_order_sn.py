@@ -0,0 +1,91 @@
+"""
+订单号生成微基准
+
+对比两种实现：
+- legacy：BD + 秒级时间戳 + 4位随机数，exists() 查库去重，冲突时 sleep 10ms 重试
+- allocator：时间 + 节点 + 进程 + 序号（apps/orders/order_sn.py），不访问数据库
+
+输出单次生成耗时、每秒生成数，以及多线程并发生成时的重复订单号数量
+（legacy 的 exists() 检查与插入之间没有原子性，同一秒内并发生成仍可能重复）。
+
+    python -m benchmarks.bench_order_sn --calls 2000 --existing 20000
+"""
+import argparse
+import time
+import uuid
+
+from benchmarks import create_user, print_table, run_threads, setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='订单号生成微基准')
+    parser.add_argument('--calls', type=int, default=2000, help='每种实现的生成次数')
+    parser.add_argument('--existing', type=int, default=20000, help='预先写入的订单数量')
+    parser.add_argument('--threads', type=int, default=8, help='并发重复检测的线程数')
+    return parser.parse_args()
+
+
+def legacy_order_sn():
+    """原实现（OrderPaymentView.generate_unique_order_sn）"""
+    from django.utils import timezone
+    from django.utils.crypto import get_random_string
+    from apps.orders.models import Order
+
+    for _ in range(10):
+        order_sn = f"BD{timezone.now().strftime('%Y%m%d%H%M%S')}{get_random_string(4, '0123456789')}"
+        if not Order.objects.filter(order_sn=order_sn).exists():
+            return order_sn
+        time.sleep(0.01)
+    return f"BD{timezone.now().strftime('%Y%m%d')}{uuid.uuid4().hex[:8].upper()}"
+
+
+def measure(name, generate, calls, threads):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for _ in range(calls):
+            generate()
+        elapsed = time.perf_counter() - started
+
+    # 并发生成（不落库）统计重复数量
+    results = [[] for _ in range(threads)]
+
+    def worker(index):
+        results[index].extend(generate() for _ in range(calls // threads))
+
+    run_threads(worker, threads)
+    generated = [sn for chunk in results for sn in chunk]
+    return {
+        'generator': name,
+        'us/call': f"{elapsed / calls * 1e6:.1f}",
+        'calls/sec': f"{calls / elapsed:.0f}",
+        'db_queries': len(queries),
+        'duplicates': len(generated) - len(set(generated)),
+    }
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from apps.orders.models import Order
+    from apps.orders.order_sn import next_order_sn
+
+    user = create_user()
+    Order.objects.bulk_create([
+        Order(order_sn=f"BD{i:020d}", user=user, total_amount=0, contact_name='压测', contact_phone='13000000000')
+        for i in range(args.existing)
+    ], batch_size=1000)
+
+    rows = [
+        measure('legacy', legacy_order_sn, args.calls, args.threads),
+        measure('allocator', next_order_sn, args.calls, args.threads),
+    ]
+    print_table(f"订单号生成：{args.calls}次，已有订单{args.existing}条", rows,
+                ['generator', 'us/call', 'calls/sec', 'db_queries', 'duplicates'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+超时订单清理基准
+
+构造大量已过支付截止时间的待支付订单（路线订单 + 酒店订单），执行 expire_pending_orders()，
+输出总耗时、每秒处理订单数、SQL 条数，并核对清理后路线名额和房间库存是否全部归还。
+
+    python -m benchmarks.bench_order_sweeper --orders 100000
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks import create_user, print_table, setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='超时订单清理基准')
+    parser.add_argument('--orders', type=int, default=100000, help='超时订单数量')
+    parser.add_argument('--routes', type=int, default=50, help='路线数量')
+    parser.add_argument('--room-types', type=int, default=50, help='房型数量')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每个事务处理的订单数量')
+    parser.add_argument('--seed', type=int, default=2024, help='随机种子')
+    return parser.parse_args()
+
+
+def seed(args, user):
+    """批量写入超时订单，同时按订单明细把名额和房间库存记为已占用"""
+    from collections import Counter
+    from django.db.models import F
+    from django.utils import timezone
+    from apps.hotels.inventory import iter_nights
+    from apps.hotels.models import Hotel, RoomInventory, RoomType
+    from apps.orders.models import Order, OrderDetail
+    from apps.routes.models import Route
+
+    routes = Route.objects.bulk_create([
+        Route(name=f'压测路线{i}', price=199, group_size=10 ** 6, deadline='2030-01-01',
+              itinerary_summary='压测', cost_include='压测', cost_exclude='压测', notes='压测')
+        for i in range(args.routes)
+    ])
+    hotel = Hotel.objects.create(name='压测酒店', address='保定市', phone='0312-0000000', brief='压测', description='压测')
+    room_types = RoomType.objects.bulk_create([
+        RoomType(hotel=hotel, name=f'房型{i}', price=300, capacity=2, description='压测', remaining_count=10 ** 6)
+        for i in range(args.room_types)
+    ])
+
+    rng = random.Random(args.seed)
+    expired_at = timezone.now() - timedelta(minutes=1)
+    first_night = date(2030, 5, 1)
+    route_sold = Counter()
+    room_reserved = Counter()
+    orders, details = [], []
+    for i in range(args.orders):
+        orders.append(Order(
+            order_sn=f"BD{i:020d}", user=user, total_amount=0, status='pending',
+            contact_name='压测', contact_phone='13000000000', expires_at=expired_at,
+        ))
+        quantity = rng.randint(1, 3)
+        if i % 2:
+            route = rng.choice(routes)
+            route_sold[route.id] += quantity
+            details.append(dict(item_type='route', item_id=route.id, quantity=quantity))
+        else:
+            room_type = rng.choice(room_types)
+            check_in = first_night + timedelta(days=rng.randint(0, 30))
+            check_out = check_in + timedelta(days=rng.randint(1, 3))
+            for night in iter_nights(check_in, check_out):
+                room_reserved[(room_type.id, night)] += quantity
+            details.append(dict(item_type='hotel', item_id=hotel.id, room_type_id=room_type.id, quantity=quantity,
+                                check_in_date=check_in, check_out_date=check_out))
+
+    Order.objects.bulk_create(orders, batch_size=2000)
+    order_ids = Order.objects.order_by('id').values_list('id', flat=True)
+    OrderDetail.objects.bulk_create([
+        OrderDetail(order_id=order_id, item_name='压测', price=0, subtotal=0, **detail)
+        for order_id, detail in zip(order_ids, details)
+    ], batch_size=2000)
+
+    for route_id, quantity in route_sold.items():
+        Route.objects.filter(pk=route_id).update(sales_count=F('sales_count') + quantity)
+    RoomInventory.objects.bulk_create([
+        RoomInventory(room_type_id=room_type_id, date=night, total=10 ** 6, reserved=quantity)
+        for (room_type_id, night), quantity in room_reserved.items()
+    ], batch_size=2000)
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from django.db import connection
+    from django.db.models import Sum
+    from django.test.utils import CaptureQueriesContext
+    from apps.hotels.models import RoomInventory
+    from apps.orders.holds import expire_pending_orders
+    from apps.orders.models import Order
+    from apps.routes.models import Route
+
+    seed(args, create_user())
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        expired = expire_pending_orders(batch_size=args.batch_size)
+        elapsed = time.perf_counter() - started
+
+    print_table(f"超时订单清理：{args.orders}个订单，批大小{args.batch_size}", [{
+        'expired': expired,
+        'seconds': f"{elapsed:.2f}",
+        'orders/sec': f"{expired / elapsed:.0f}",
+        'sql_queries': len(queries),
+        'pending_left': Order.objects.filter(status='pending').count(),
+        'seats_left': Route.objects.aggregate(total=Sum('sales_count'))['total'] or 0,
+        'room_nights_left': RoomInventory.objects.aggregate(total=Sum('reserved'))['total'] or 0,
+    }], ['expired', 'seconds', 'orders/sec', 'sql_queries', 'pending_left', 'seats_left', 'room_nights_left'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+按描述推荐景点压测
+
+用若干组主题词（荷花、古建筑、红色旅游……）合成景点的标签、最佳游览季节和介绍（默认 5000 个景点），测量：
+- 加载耗时（查库 + 分词 + 构建稀疏矩阵）
+- 推荐前 3 个的 p50/p99：稀疏矩阵（NumPy）和逐个景点在 Python 中算点积（对照）
+- 增量更新：保存一个景点后重新计算该景点的耗时，以及增量区达到阈值时内存中重建矩阵的耗时
+
+    python -m benchmarks.bench_recommend --spots 5000
+"""
+import argparse
+import random
+import time
+
+from benchmarks import percentile, print_table, setup_django
+
+THEMES = [
+    ('荷花', '夏季满池荷花，可以乘船赏荷'), ('古建筑', '明清古建筑群保存完好，飞檐斗拱'),
+    ('园林', '北方园林，亭台楼阁、假山水榭'), ('红色旅游', '抗战遗址和纪念馆，适合学生研学'),
+    ('山水', '山高谷深，溪流瀑布'), ('徒步', '登山步道和徒步线路，适合户外爱好者'),
+    ('湖泊', '湖面开阔，芦苇荡和游船'), ('寺庙', '千年古刹，香火旺盛'),
+    ('博物馆', '馆藏文物丰富，可预约讲解'), ('美食', '驴肉火烧、槐茂酱菜等地方小吃'),
+    ('滑雪', '冬季开放雪场，有初级和中级雪道'), ('红叶', '秋季满山红叶，适合摄影'),
+]
+SEASONS = ['春季', '夏季', '秋季', '冬季', '四季']
+QUERIES = [
+    '想看荷花', '想看荷花和古建筑', '带孩子去博物馆和红色旅游景点', '秋天去山里徒步看红叶',
+    '冬天滑雪，顺便吃点地方小吃，最好还有古建筑和寺庙可以逛逛',
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='按描述推荐景点压测')
+    parser.add_argument('--spots', type=int, default=5000, help='景点数量')
+    parser.add_argument('--queries', type=int, default=500, help='每组查询次数')
+    parser.add_argument('--updates', type=int, default=200, help='增量更新次数')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def random_fields(rng):
+    themes = rng.sample(THEMES, rng.randint(1, 3))
+    return {
+        'tags': ','.join(tag for tag, _ in themes),
+        'best_season': rng.choice(SEASONS),
+        'description': '。'.join(text for _, text in themes) + f'。距市区约{rng.randint(5, 150)}公里',
+    }
+
+
+def brute_force(recommender, text, k=3):
+    """对照：逐个景点在 Python 中算点积"""
+    from apps.ai_assistant.recommender import query_frequencies, vectorize
+
+    matrix = recommender._matrix
+    query = vectorize(query_frequencies(text), matrix)
+    scores = []
+    for spot_id, (_, frequencies) in recommender._docs.items():
+        vector = vectorize(frequencies, matrix)
+        scores.append((sum(weight * vector.get(term, 0.0) for term, weight in query.items()), spot_id))
+    return sorted(scores, reverse=True)[:k]
+
+
+def timed(func, texts):
+    timings = []
+    for text in texts:
+        started = time.perf_counter()
+        func(text)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from apps.ai_assistant import recommender as recommender_module
+    from apps.ai_assistant.recommender import SpotRecommender
+    from apps.scenic.models import ScenicSpot
+
+    rng = random.Random(args.seed)
+    ScenicSpot.objects.bulk_create([
+        ScenicSpot(name=f'景点{i}', address='保定市', ticket_price=0, open_time='全天', **random_fields(rng))
+        for i in range(args.spots)
+    ], batch_size=2000)
+
+    recommender = SpotRecommender()
+    started = time.perf_counter()
+    recommender.load()
+    print(f'加载 {args.spots} 个景点：{(time.perf_counter() - started) * 1000:.0f}ms，'
+          f'词项 {len(recommender._matrix.vocab)} 个，非零元素 {len(recommender._matrix.weights)} 个')
+
+    rows = []
+    for text in QUERIES:
+        timings = timed(recommender.recommend, [text] * args.queries)
+        brute = timed(lambda t: brute_force(recommender, t), [text] * max(args.queries // 50, 3))
+        rows.append({
+            'query': text[:12], 'top3': '、'.join(item.spot['name'] for item in recommender.recommend(text)),
+            'p50_ms': f'{percentile(timings, 50):.2f}', 'p99_ms': f'{percentile(timings, 99):.2f}',
+            'python_p50_ms': f'{percentile(brute, 50):.1f}',
+        })
+    print_table('推荐前 3 个', rows, ['query', 'top3', 'p50_ms', 'p99_ms', 'python_p50_ms'])
+
+    spots = list(ScenicSpot.objects.order_by('?')[:args.updates])
+    update_timings, compactions, compact_timings = [], 0, []
+    for spot in spots:
+        for field, value in random_fields(rng).items():
+            setattr(spot, field, value)
+        delta_size = len(recommender._delta)
+        started = time.perf_counter()
+        recommender.update_spot(spot)
+        elapsed = (time.perf_counter() - started) * 1000
+        if recommender._delta or not delta_size:
+            update_timings.append(elapsed)
+        else:
+            compactions += 1
+            compact_timings.append(elapsed)
+    timings = timed(recommender.recommend, QUERIES * (args.queries // len(QUERIES)))
+    print_table(f'增量更新 {args.updates} 个景点', [{
+        'update_p50_ms': f'{percentile(update_timings, 50):.3f}',
+        'update_p99_ms': f'{percentile(update_timings, 99):.3f}',
+        'compactions': compactions,
+        'compact_ms': f'{percentile(compact_timings, 50):.1f}' if compact_timings else '-',
+        'query_p99_ms': f'{percentile(timings, 99):.2f}',
+        'compact_threshold': int(max(recommender_module.COMPACT_MIN, recommender_module.COMPACT_RATIO * args.spots)),
+    }], ['update_p50_ms', 'update_p99_ms', 'compactions', 'compact_ms', 'query_p99_ms', 'compact_threshold'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+酒店房间预订并发压测
+
+对比两种实现：
+- legacy：原 create_order 的做法，select_for_update 锁整个酒店行，不扣减房间库存
+- ledger：按房型、按晚条件更新库存台账（OrderPaymentView.create_order）
+
+每个线程随机选择房型、入住日期、晚数和房间数反复下单，结束后按订单明细
+统计每个房型每一晚的实际售出数量，超过可售总数的部分记为超卖房晚。
+
+    python -m benchmarks.bench_room_inventory --threads 8 --attempts 50
+"""
+import argparse
+import logging
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks import create_user, print_table, run_threads, setup_django
+
+LOCK_RETRIES = 50
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='酒店房间预订并发压测')
+    parser.add_argument('--threads', type=int, default=8, help='并发线程数')
+    parser.add_argument('--attempts', type=int, default=50, help='每个线程的下单次数')
+    parser.add_argument('--room-types', type=int, default=4, help='房型数量')
+    parser.add_argument('--rooms', type=int, default=5, help='每个房型每晚的可售房间数')
+    parser.add_argument('--days', type=int, default=7, help='可预订的日期范围（天）')
+    parser.add_argument('--seed', type=int, default=2024, help='随机种子')
+    return parser.parse_args()
+
+
+def build_plan(args, room_type_ids, start):
+    """为每个线程预先生成下单参数，两种实现使用同一份计划"""
+    rng = random.Random(args.seed)
+    plan = []
+    for _ in range(args.threads):
+        bookings = []
+        for _ in range(args.attempts):
+            check_in = start + timedelta(days=rng.randrange(args.days))
+            check_out = check_in + timedelta(days=rng.randint(1, 3))
+            bookings.append((rng.choice(room_type_ids), check_in, check_out, rng.randint(1, 2)))
+        plan.append(bookings)
+    return plan
+
+
+def legacy_book(user, hotel_id, room_type_id, check_in, check_out, quantity):
+    """原实现：锁定酒店行和房型行，创建订单，但不做任何库存扣减"""
+    from django.db import transaction
+    from apps.hotels.models import Hotel, RoomType
+    from apps.orders.models import Order, OrderDetail
+    from apps.orders.views import OrderPaymentView
+
+    with transaction.atomic():
+        order_sn = OrderPaymentView().generate_unique_order_sn()
+        hotel = Hotel.objects.select_for_update().get(pk=hotel_id)
+        room_type = RoomType.objects.select_for_update().get(pk=room_type_id, hotel=hotel, is_available=True)
+        total = room_type.price * (check_out - check_in).days * quantity
+        order = Order.objects.create(
+            order_sn=order_sn, user=user, total_amount=total, status='pending',
+            contact_name='压测', contact_phone='13000000000'
+        )
+        OrderDetail.objects.create(
+            order=order, item_type='hotel', item_id=hotel_id, item_name=f"{hotel.name} - {room_type.name}",
+            price=room_type.price, quantity=quantity, subtotal=total,
+            check_in_date=check_in, check_out_date=check_out
+        )
+
+
+def ledger_book(user, hotel_id, room_type_id, check_in, check_out, quantity):
+    """新实现：走 create_order，按晚扣减库存台账"""
+    from apps.orders.views import OrderPaymentView
+
+    OrderPaymentView().create_order(
+        user, hotel_id, 'hotel', quantity, '压测', '13000000000',
+        check_in.isoformat(), check_out.isoformat(), room_type_id
+    )
+
+
+def count_oversold_nights(room_types):
+    """根据订单明细统计超卖的房晚数"""
+    from apps.orders.models import OrderDetail
+
+    # 订单明细只冗余了"酒店 - 房型"名称，按名称对应回房型
+    room_type_ids = {f"{rt.hotel.name} - {rt.name}": rt.id for rt in room_types}
+    capacity = {rt.id: rt.remaining_count for rt in room_types}
+    sold = {}
+    for detail in OrderDetail.objects.filter(item_type='hotel'):
+        room_type_id = room_type_ids[detail.item_name]
+        night = detail.check_in_date
+        while night < detail.check_out_date:
+            key = (room_type_id, night)
+            sold[key] = sold.get(key, 0) + detail.quantity
+            night += timedelta(days=1)
+    return sum(max(0, count - capacity[room_type_id]) for (room_type_id, _), count in sold.items())
+
+
+def run_path(name, book, plan, user, hotel_id, room_types):
+    from apps.hotels.models import RoomInventory
+    from apps.orders.models import Order
+
+    Order.objects.all().delete()
+    RoomInventory.objects.all().delete()
+
+    stats = [{'booked': 0, 'sold_out': 0, 'locked': 0, 'retries': 0} for _ in plan]
+
+    def worker(index):
+        for room_type_id, check_in, check_out, quantity in plan[index]:
+            # SQLite 写锁冲突时立即报 "database is locked"，这里做有限次重试，
+            # 这样吞吐反映的是锁粒度本身，而不是被丢弃的请求
+            for attempt in range(LOCK_RETRIES):
+                try:
+                    book(user, hotel_id, room_type_id, check_in, check_out, quantity)
+                    stats[index]['booked'] += 1
+                except Exception as e:
+                    if 'locked' not in str(e):
+                        if not isinstance(e, ValueError):
+                            raise
+                        stats[index]['sold_out'] += 1
+                    elif attempt + 1 < LOCK_RETRIES:
+                        stats[index]['retries'] += 1
+                        time.sleep(0.001 * (attempt + 1))
+                        continue
+                    else:
+                        stats[index]['locked'] += 1
+                break
+
+    elapsed = run_threads(worker, len(plan))
+    booked = sum(s['booked'] for s in stats)
+    handled = booked + sum(s['sold_out'] for s in stats)
+    return {
+        'path': name,
+        'booked': booked,
+        'sold_out': sum(s['sold_out'] for s in stats),
+        'locked': sum(s['locked'] for s in stats),
+        'retries': sum(s['retries'] for s in stats),
+        'seconds': f"{elapsed:.2f}",
+        'bookings/sec': f"{booked / elapsed:.1f}",
+        'requests/sec': f"{handled / elapsed:.1f}",
+        'oversold_nights': count_oversold_nights(room_types),
+    }
+
+
+def main():
+    args = parse_args()
+    setup_django()
+    # create_order 失败时会记录错误日志，压测中属于预期情况
+    logging.disable(logging.ERROR)
+
+    from apps.hotels.models import Hotel, RoomType
+
+    user = create_user()
+    hotel = Hotel.objects.create(name='压测酒店', address='保定市', phone='0312', brief='压测', description='压测')
+    room_types = [
+        RoomType.objects.create(
+            hotel=hotel, name=f'房型{i + 1}', price=200 + i * 100, capacity=2,
+            description='压测房型', remaining_count=args.rooms
+        )
+        for i in range(args.room_types)
+    ]
+    plan = build_plan(args, [rt.id for rt in room_types], date.today() + timedelta(days=30))
+
+    rows = [
+        run_path('legacy', legacy_book, plan, user, hotel.id, room_types),
+        run_path('ledger', ledger_book, plan, user, hotel.id, room_types),
+    ]
+    print_table(
+        f"房间预订压测：{args.threads}线程 x {args.attempts}次，{args.room_types}个房型 x {args.rooms}间",
+        rows, ['path', 'booked', 'sold_out', 'locked', 'retries', 'seconds', 'bookings/sec', 'requests/sec', 'oversold_nights']
+    )
+
+
+if __name__ == '__main__':
+    main()
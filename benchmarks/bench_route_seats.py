@@ -0,0 +1,138 @@
+"""
+路线名额并发压测
+
+对比两种实现：
+- legacy：原 create_order 的做法，select_for_update 读取路线后检查名额再 F() 更新，
+          事务为默认的 DEFERRED 模式，不做锁忙重试
+- guarded：一条带条件的 UPDATE 扣减名额，SQLite 上使用 BEGIN IMMEDIATE 并退避重试
+           （OrderPaymentView.create_order）
+
+所有线程抢同一条路线的名额，输出吞吐、失败原因分布以及超卖人数
+（按订单明细统计的报名人数 - 成团人数）。
+
+    python -m benchmarks.bench_route_seats --threads 16 --attempts 20
+    BENCH_PG_NAME=bench python -m benchmarks.bench_route_seats --backend postgres
+"""
+import argparse
+import logging
+import random
+import time
+
+from benchmarks import create_user, percentile, postgres_database, print_table, run_threads, setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='路线名额并发压测')
+    parser.add_argument('--backend', choices=['sqlite', 'postgres'], default='sqlite', help='数据库类型')
+    parser.add_argument('--threads', type=int, default=16, help='并发线程数')
+    parser.add_argument('--attempts', type=int, default=20, help='每个线程的下单次数')
+    parser.add_argument('--group-size', type=int, default=100, help='路线成团人数')
+    parser.add_argument('--seed', type=int, default=2024, help='随机种子')
+    return parser.parse_args()
+
+
+def legacy_book(user, route_id, quantity):
+    """原实现：select_for_update + 先查后改"""
+    from django.db import transaction
+    from django.db.models import F
+    from apps.orders.models import Order, OrderDetail
+    from apps.orders.views import OrderPaymentView
+    from apps.routes.models import Route
+
+    with transaction.atomic():
+        order_sn = OrderPaymentView().generate_unique_order_sn()
+        route = Route.objects.select_for_update().get(pk=route_id)
+        available_slots = route.group_size - route.sales_count
+        if available_slots < quantity:
+            raise ValueError(f"名额不足，剩余{available_slots}个名额，您需要{quantity}个")
+        Route.objects.filter(id=route_id).update(sales_count=F('sales_count') + quantity)
+        total = route.price * quantity
+        order = Order.objects.create(
+            order_sn=order_sn, user=user, total_amount=total, status='pending',
+            contact_name='压测', contact_phone='13000000000'
+        )
+        OrderDetail.objects.create(
+            order=order, item_type='route', item_id=route_id, item_name=route.name,
+            price=route.price, quantity=quantity, subtotal=total
+        )
+
+
+def guarded_book(user, route_id, quantity):
+    """新实现：走 create_order"""
+    from apps.orders.views import OrderPaymentView
+
+    OrderPaymentView().create_order(user, route_id, 'route', quantity, '压测', '13000000000')
+
+
+def run_path(name, book, plan, user, route):
+    from django.db import IntegrityError
+    from django.db.models import Sum
+    from apps.orders.models import Order, OrderDetail
+    from apps.routes.models import Route
+
+    Order.objects.all().delete()
+    Route.objects.filter(pk=route.pk).update(sales_count=0)
+
+    stats = [{'booked': 0, 'sold_out': 0, 'locked': 0, 'constraint': 0, 'latency': []} for _ in plan]
+
+    def worker(index):
+        for quantity in plan[index]:
+            started = time.perf_counter()
+            try:
+                book(user, route.id, quantity)
+                stats[index]['booked'] += 1
+            except IntegrityError:
+                stats[index]['constraint'] += 1
+            except Exception as e:
+                if 'locked' in str(e) or '繁忙' in str(e):
+                    stats[index]['locked'] += 1
+                elif isinstance(e, ValueError):
+                    stats[index]['sold_out'] += 1
+                else:
+                    raise
+            stats[index]['latency'].append((time.perf_counter() - started) * 1000)
+
+    elapsed = run_threads(worker, len(plan))
+    sold = OrderDetail.objects.filter(item_type='route').aggregate(total=Sum('quantity'))['total'] or 0
+    latency = [ms for s in stats for ms in s['latency']]
+    handled = sum(s['booked'] + s['sold_out'] for s in stats)
+    return {
+        'path': name,
+        'booked': sum(s['booked'] for s in stats),
+        'sold_out': sum(s['sold_out'] for s in stats),
+        'locked': sum(s['locked'] for s in stats),
+        'constraint': sum(s['constraint'] for s in stats),
+        'requests/sec': f"{handled / elapsed:.1f}",
+        'p99_ms': f"{percentile(latency, 99):.1f}",
+        'seats_sold': sold,
+        'oversold': max(0, sold - route.group_size),
+    }
+
+
+def main():
+    args = parse_args()
+    setup_django(database=postgres_database() if args.backend == 'postgres' else None)
+    logging.disable(logging.ERROR)
+
+    from apps.routes.models import Route
+
+    user = create_user()
+    route = Route.objects.create(
+        name='压测路线', price=199, group_size=args.group_size, deadline='2030-01-01',
+        itinerary_summary='压测', cost_include='压测', cost_exclude='压测', notes='压测'
+    )
+    rng = random.Random(args.seed)
+    plan = [[rng.randint(1, 3) for _ in range(args.attempts)] for _ in range(args.threads)]
+
+    rows = [
+        run_path('legacy', legacy_book, plan, user, route),
+        run_path('guarded', guarded_book, plan, user, route),
+    ]
+    print_table(
+        f"路线名额压测（{args.backend}）：{args.threads}线程 x {args.attempts}次，成团人数{args.group_size}",
+        rows, ['path', 'booked', 'sold_out', 'locked', 'constraint', 'requests/sec', 'p99_ms', 'seats_sold', 'oversold']
+    )
+
+
+if __name__ == '__main__':
+    main()
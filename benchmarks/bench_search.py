@@ -0,0 +1,124 @@
+"""
+站内搜索压测
+
+生成合成语料（默认10万篇资讯，标题 + 摘要 + 约120字正文，词语按齐普夫分布抽取，
+常用词出现在大量文档中、地名等少见词只出现在少数文档中），对比两种检索：
+- icontains：原实现，标题/摘要/正文逐个 LIKE '%词%'，取前10条并 count() 总数
+- index：apps/index/search.py，倒排索引 + BM25，取前10条和总数
+
+输出索引构建耗时、倒排记录数，以及每类查询（少见词、常见词、多词组合、单字前缀）的 p50/p99 延迟和命中数。
+
+    python -m benchmarks.bench_search --docs 100000
+"""
+import argparse
+import random
+import time
+
+from benchmarks import percentile, print_table, setup_django
+
+PLACES = ['白洋淀', '直隶总督署', '古莲花池', '野三坡', '狼牙山', '清西陵', '满城汉墓', '涞源', '易县', '阜平',
+          '白石山', '天生桥', '冉庄地道战', '大慈阁', '光园', '保定军校', '曲阳', '安国药市', '鸡毛店', '淮军公所']
+COMMON = ['保定', '旅游', '游客', '景区', '文化', '历史', '活动', '开放', '门票', '假期', '交通', '服务', '推荐',
+          '美食', '体验', '季节', '风景', '特色', '线路', '酒店', '住宿', '观光', '民俗', '节日', '游览', '公园']
+FILLER = ['今年', '吸引', '大量', '市民', '前来', '参观', '同时', '提供', '多种', '优惠', '欢迎', '周末', '期间',
+          '举办', '系列', '相关', '部门', '表示', '进一步', '提升', '品质', '安全', '有序', '推出', '全新']
+
+QUERIES = {
+    '少见词': ['淮军公所', '鸡毛店', '天生桥', '冉庄地道战'],
+    '常见词': ['旅游', '游客', '文化', '门票'],
+    '多词组合': ['白洋淀 荷花', '古莲花池 门票', '野三坡 住宿 推荐', '保定 美食 节日'],
+    '单字前缀': ['淀', '陵', '坡', '桥'],
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='站内搜索压测')
+    parser.add_argument('--docs', type=int, default=100000, help='合成文档数量')
+    parser.add_argument('--repeat', type=int, default=5, help='每个查询重复次数')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def make_text(rng, words):
+    vocabulary = COMMON + FILLER
+    weights = [1.0 / (i + 1) for i in range(len(vocabulary))]
+    parts = rng.choices(vocabulary, weights=weights, k=words)
+    # 约三分之一的文档提到一个地名
+    if rng.random() < 0.35:
+        parts.insert(rng.randrange(len(parts) + 1), rng.choice(PLACES))
+    if rng.random() < 0.1:
+        parts.insert(rng.randrange(len(parts) + 1), '荷花')
+    return '，'.join(''.join(parts[i:i + 4]) for i in range(0, len(parts), 4)) + '。'
+
+
+def build_corpus(args):
+    from apps.news.models import News
+
+    rng = random.Random(args.seed)
+    batch = []
+    for i in range(args.docs):
+        batch.append(News(title=make_text(rng, 4)[:-1], abstract=make_text(rng, 10), content=make_text(rng, 60)))
+        if len(batch) == 5000:
+            News.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        News.objects.bulk_create(batch)
+
+
+def icontains_search(query):
+    from django.db.models import Q
+    from apps.news.models import News
+
+    matches = News.objects.filter(Q(title__icontains=query) | Q(abstract__icontains=query) | Q(content__icontains=query))
+    return list(matches[:10]), matches.count()
+
+
+def index_search(query):
+    from apps.index.search import load_results, search
+
+    hits = search(query, ['news'])['news']
+    return load_results('news', hits.ids, query), hits.total
+
+
+def measure(name, func, args):
+    rows = []
+    for group, queries in QUERIES.items():
+        timings, found = [], []
+        for query in queries:
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                _, total = func(query)
+                timings.append((time.perf_counter() - started) * 1000)
+            found.append(total)
+        rows.append({
+            'mode': name, 'queries': group,
+            'p50_ms': f'{percentile(timings, 50):.1f}', 'p99_ms': f'{percentile(timings, 99):.1f}',
+            'hits': '/'.join(str(n) for n in found),
+        })
+    return rows
+
+
+def main():
+    args = parse_args()
+    setup_django()
+
+    from django.core.cache import cache
+    from apps.index.models import SearchPosting
+    from apps.index.search import rebuild_index
+
+    started = time.perf_counter()
+    build_corpus(args)
+    print(f'生成 {args.docs} 篇文档：{time.perf_counter() - started:.1f}s')
+
+    started = time.perf_counter()
+    rebuild_index(['news'])
+    print(f'构建索引：{time.perf_counter() - started:.1f}s，倒排记录 {SearchPosting.objects.count()} 条')
+
+    cache.clear()
+    # 多词组合的 icontains 只能整串匹配，命中数按原实现的语义统计
+    rows = measure('icontains', icontains_search, args) + measure('index', index_search, args)
+    print_table(f'检索延迟（{args.docs} 篇）', rows, ['mode', 'queries', 'p50_ms', 'p99_ms', 'hits'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+搜索联想压测
+
+生成合成的景点、路线、酒店、美食名称和资讯标题（默认共10万个），测量：
+- 加载耗时和有序数组的条目数
+- 联想查询的 p50/p99 延迟：cold 为每次清空结果缓存后的查询（区间扫描 + 排序），
+  warm 为重复前缀命中结果缓存；按前缀长度（1~3个字）分组
+- 对照：同样前缀在数据库上 name LIKE '%前缀%' 按浏览次数取前8条
+
+    python -m benchmarks.bench_suggest --items 100000
+"""
+import argparse
+import random
+import time
+
+from benchmarks import percentile, print_table, setup_django
+
+PARTS = ['白洋', '总督', '莲花', '野三', '狼牙', '清西', '满城', '涞源', '易水', '阜平', '白石', '天生', '冉庄', '大慈',
+         '古城', '山水', '温泉', '湖畔', '古镇', '森林', '花园', '老街', '红色', '田园', '驴肉', '火烧', '槐茂', '酱菜']
+SUFFIXES = {
+    'scenic': ['景区', '公园', '风景区', '遗址', '博物馆'],
+    'route': ['一日游', '二日游', '研学线路', '精品线路'],
+    'hotel': ['大酒店', '宾馆', '民宿', '度假村'],
+    'food': ['小吃', '名菜', '点心'],
+    'news': ['开幕', '迎来客流高峰', '推出优惠活动', '举办文化节'],
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='搜索联想压测')
+    parser.add_argument('--items', type=int, default=100000, help='合成名称总数（五种类型平均分配）')
+    parser.add_argument('--lookups', type=int, default=2000, help='每组查询次数')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args()
+
+
+def build_items(args, rng):
+    from apps.foods.models import Food
+    from apps.hotels.models import Hotel
+    from apps.news.models import News
+    from apps.routes.models import Route
+    from apps.scenic.models import ScenicSpot
+
+    per_type = args.items // 5
+
+    def name(doc_type, i):
+        return ''.join(rng.sample(PARTS, 2)) + rng.choice(SUFFIXES[doc_type]) + str(i)
+
+    def views():
+        return int(rng.paretovariate(1.2) * 10)
+
+    ScenicSpot.objects.bulk_create([
+        ScenicSpot(name=name('scenic', i), address='保定市', ticket_price=0, open_time='全天', description='压测',
+                   views_count=views())
+        for i in range(per_type)
+    ], batch_size=5000)
+    Route.objects.bulk_create([
+        Route(name=name('route', i), price=99, group_size=20, deadline='2030-01-01', views_count=views(),
+              itinerary_summary='压测', cost_include='压测', cost_exclude='压测', notes='压测')
+        for i in range(per_type)
+    ], batch_size=5000)
+    Hotel.objects.bulk_create([
+        Hotel(name=name('hotel', i), address='保定市', phone='0312-0000000', brief='压测', description='压测',
+              views_count=views())
+        for i in range(per_type)
+    ], batch_size=5000)
+    Food.objects.bulk_create([
+        Food(name=name('food', i), description='压测', views_count=views()) for i in range(per_type)
+    ], batch_size=5000)
+    News.objects.bulk_create([
+        News(title='保定' + name('news', i), abstract='压测', content='压测', views_count=views())
+        for i in range(per_type)
+    ], batch_size=5000)
+
+
+def random_prefix(rng, length):
+    return ''.join(rng.choice(PARTS))[:length] if length <= 2 else rng.choice(PARTS) + rng.choice(PARTS)[0]
+
+
+def main():
+    args = parse_args()
+    setup_django()
+    rng = random.Random(args.seed)
+
+    from apps.index.suggest import SuggestIndex
+    from apps.scenic.models import ScenicSpot
+
+    build_items(args, rng)
+    index = SuggestIndex(autostart=False)
+    started = time.perf_counter()
+    count = index.load()
+    print(f'加载 {count} 个联想项：{time.perf_counter() - started:.2f}s，有序数组 {len(index._entries)} 条')
+
+    rows = []
+    for length in (1, 2, 3):
+        prefixes = [random_prefix(rng, length) for _ in range(args.lookups)]
+        for mode in ('cold', 'warm'):
+            timings = []
+            for prefix in prefixes:
+                if mode == 'cold':
+                    index._results = {}
+                started = time.perf_counter()
+                index.lookup(prefix)
+                timings.append((time.perf_counter() - started) * 1000)
+            rows.append({'mode': mode, 'prefix_len': length,
+                         'p50_ms': f'{percentile(timings, 50):.3f}', 'p99_ms': f'{percentile(timings, 99):.3f}'})
+
+        timings = []
+        for prefix in prefixes[:50]:
+            started = time.perf_counter()
+            list(ScenicSpot.objects.filter(name__icontains=prefix).order_by('-views_count')[:8])
+            timings.append((time.perf_counter() - started) * 1000)
+        rows.append({'mode': 'db like (scenic only)', 'prefix_len': length,
+                     'p50_ms': f'{percentile(timings, 50):.3f}', 'p99_ms': f'{percentile(timings, 99):.3f}'})
+
+    print_table('联想查询延迟', rows, ['mode', 'prefix_len', 'p50_ms', 'p99_ms'])
+
+
+if __name__ == '__main__':
+    main()
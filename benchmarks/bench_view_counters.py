@@ -0,0 +1,160 @@
+"""
+浏览次数写入压测
+
+多个线程同时刷少量热门详情页，同时另有线程不断下单（扣减路线名额），对比两种浏览计数：
+- sync：原实现，每次浏览 get() 后 views_count += 1 再 save()，每次都拿一次 SQLite 写锁
+- buffered：apps/index/counters.py，浏览只在进程内累加，按间隔批量 F() 写库
+
+输出浏览计数的写库次数、浏览请求的 p50/p99 延迟、锁忙失败次数、丢失的浏览次数（应记 - 实际写入），
+以及同时进行的下单请求的 p99 延迟和锁忙失败次数（衡量浏览计数对写锁的争用）。
+
+    python -m benchmarks.bench_view_counters --threads 16 --views 300
+"""
+import argparse
+import logging
+import threading
+import time
+
+from benchmarks import percentile, print_table, run_threads, setup_django
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='浏览次数写入压测')
+    parser.add_argument('--threads', type=int, default=16, help='浏览线程数')
+    parser.add_argument('--views', type=int, default=300, help='每个线程的浏览次数')
+    parser.add_argument('--spots', type=int, default=3, help='热门景点数量')
+    parser.add_argument('--bookers', type=int, default=2, help='同时下单的线程数')
+    parser.add_argument('--interval', type=float, default=0.5, help='buffered 模式的写库间隔（秒）')
+    parser.add_argument('--think', type=float, default=0.002, help='每次请求之间的间隔（秒），模拟页面渲染')
+    return parser.parse_args()
+
+
+def sync_view(model, pk):
+    """原实现：先读后写"""
+    obj = model.objects.get(pk=pk)
+    obj.views_count += 1
+    obj.save(update_fields=['views_count'])
+
+
+def run_path(name, args, spots, route):
+    from django.db import OperationalError
+    from apps.index import counters
+    from apps.orders.transactions import booking_transaction
+    from apps.routes.inventory import release_route_seats, reserve_route_seats
+    from apps.scenic.models import ScenicSpot
+
+    ScenicSpot.objects.filter(pk__in=[s.id for s in spots]).update(views_count=0)
+    counter = counters.ViewCounter(interval=args.interval)
+    counters.counter = counter
+
+    flushes = [0]
+    original_write = counters.write_deltas
+
+    def counted_write(deltas):
+        flushes[0] += 1
+        return original_write(deltas)
+
+    counters.write_deltas = counted_write
+
+    def buffered_view(model, pk):
+        counters.record_view(model.objects.get(pk=pk))
+
+    view = sync_view if name == 'sync' else buffered_view
+    view_latency, booking_latency = [], []
+    errors = {'view': 0, 'booking': 0}
+    lock = threading.Lock()
+    viewers_done = threading.Event()
+    remaining = [args.threads]
+
+    @booking_transaction
+    def book():
+        reserve_route_seats(route.id, 1)
+        release_route_seats(route.id, 1)
+
+    def booker():
+        while not viewers_done.is_set():
+            started = time.perf_counter()
+            try:
+                book()
+            except OperationalError:
+                with lock:
+                    errors['booking'] += 1
+            with lock:
+                booking_latency.append((time.perf_counter() - started) * 1000)
+            time.sleep(args.think)
+
+    def viewer(index):
+        local = []
+        for i in range(args.views):
+            spot = spots[(index + i) % len(spots)]
+            started = time.perf_counter()
+            try:
+                view(ScenicSpot, spot.id)
+            except OperationalError:
+                with lock:
+                    errors['view'] += 1
+            local.append((time.perf_counter() - started) * 1000)
+            # 模拟渲染页面等其他开销
+            time.sleep(args.think)
+        with lock:
+            view_latency.extend(local)
+            remaining[0] -= 1
+            if not remaining[0]:
+                viewers_done.set()
+
+    def worker(index):
+        if index < args.threads:
+            viewer(index)
+        else:
+            booker()
+
+    try:
+        elapsed = run_threads(worker, args.threads + args.bookers)
+        counter.flush()
+    finally:
+        counters.write_deltas = original_write
+
+    written = sum(ScenicSpot.objects.filter(pk__in=[s.id for s in spots]).values_list('views_count', flat=True))
+    expected = args.threads * args.views
+    return {
+        'path': name,
+        'views': expected,
+        'seconds': f"{elapsed:.2f}",
+        'view_writes': expected if name == 'sync' else flushes[0],
+        'view_p50_ms': f"{percentile(view_latency, 50):.2f}",
+        'view_p99_ms': f"{percentile(view_latency, 99):.2f}",
+        'view_errors': errors['view'],
+        'lost_views': expected - written,
+        'bookings': len(booking_latency),
+        'booking_p99_ms': f"{percentile(booking_latency, 99):.2f}",
+        'booking_errors': errors['booking'],
+    }
+
+
+def main():
+    args = parse_args()
+    setup_django()
+    logging.disable(logging.ERROR)
+
+    from apps.routes.models import Route
+    from apps.scenic.models import ScenicSpot
+
+    spots = ScenicSpot.objects.bulk_create([
+        ScenicSpot(name=f'热门景点{i}', address='保定市', ticket_price=50, open_time='8:00-17:00', description='压测')
+        for i in range(args.spots)
+    ])
+    route = Route.objects.create(
+        name='压测路线', price=99, group_size=10 ** 6, deadline='2030-01-01',
+        itinerary_summary='压测', cost_include='压测', cost_exclude='压测', notes='压测'
+    )
+
+    rows = [run_path('sync', args, spots, route), run_path('buffered', args, spots, route)]
+    print_table(
+        f"浏览计数压测：{args.threads}个线程各浏览{args.views}次，{args.bookers}个线程同时下单", rows,
+        ['path', 'views', 'seconds', 'view_writes', 'view_p50_ms', 'view_p99_ms', 'view_errors', 'lost_views',
+         'bookings', 'booking_p99_ms', 'booking_errors']
+    )
+
+
+if __name__ == '__main__':
+    main()
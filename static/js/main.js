@@ -223,4 +223,52 @@ $(document).ready(function() {
         });
     });
 
-});
\ No newline at end of file
+
+    // 顶部搜索框的输入联想（/api/v1/search/suggest/，只查服务端内存索引）
+    (function () {
+        var $input = $('form[role=search] input[name=q]');
+        if (!$input.length) {
+            return;
+        }
+        var $menu = $('<div class="dropdown-menu w-100 shadow-sm" style="top: 100%; left: 0;"></div>');
+        $input.closest('form').append($menu);
+        var timer = null;
+        var lastQuery = '';
+
+        function render(items) {
+            $menu.empty();
+            items.forEach(function (item) {
+                var $link = $('<a class="dropdown-item d-flex justify-content-between"></a>').attr('href', item.url);
+                $link.append($('<span class="text-truncate"></span>').text(item.text));
+                $link.append($('<small class="text-muted ms-2"></small>').text(item.type_label));
+                $menu.append($link);
+            });
+            $menu.toggleClass('show', items.length > 0);
+        }
+
+        $input.on('input', function () {
+            var query = $.trim($input.val());
+            clearTimeout(timer);
+            if (!query) {
+                lastQuery = '';
+                render([]);
+                return;
+            }
+            timer = setTimeout(function () {
+                lastQuery = query;
+                $.getJSON('/api/v1/search/suggest/', {q: query}, function (data) {
+                    // 只渲染最后一次输入的结果
+                    if (query === lastQuery && data.status === 'success') {
+                        render(data.data);
+                    }
+                });
+            }, 150);
+        });
+
+        $input.on('blur', function () {
+            // 延迟关闭，保证点击联想项时链接能生效
+            setTimeout(function () { $menu.removeClass('show'); }, 200);
+        });
+    })();
+
+});